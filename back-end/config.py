@@ -7,7 +7,6 @@ load_dotenv()
 # OpenAI API 설정
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBEDDING_MODEL = "text-embedding-ada-002"
-OPENAI_MODEL = "gpt-3.5-turbo"
 
 # 문서 및 데이터베이스 경로 설정
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -21,3 +20,159 @@ if not os.path.exists(DOCS_PATH):
 # vector_db 디렉토리가 없으면 생성
 if not os.path.exists(VECTOR_DB_PATH):
     os.makedirs(VECTOR_DB_PATH)
+
+# 멀티 워커 설정
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+LOCK_DIR = os.path.join(BASE_DIR, "data", "locks")
+# 서빙용 인덱스를 읽기 전용 mmap으로 로드하여 워커 간 페이지 캐시를 공유
+INDEX_MMAP = os.getenv("INDEX_MMAP", "true").lower() == "true"
+
+# locks 디렉토리가 없으면 생성
+if not os.path.exists(LOCK_DIR):
+    os.makedirs(LOCK_DIR)
+
+# 이벤트 루프 진단 설정 (ETF_LOOP_DIAGNOSTICS=1 로 활성화)
+LOOP_DIAGNOSTICS_ENABLED = os.getenv("ETF_LOOP_DIAGNOSTICS", "0").lower() in ("1", "true")
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "100"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+
+# 메모리 진단 설정 (ETF_MEMORY_DIAGNOSTICS=1 로 활성화하면 tracemalloc 추적과 스냅샷/비교 API 사용 가능)
+MEMORY_DIAGNOSTICS_ENABLED = os.getenv("ETF_MEMORY_DIAGNOSTICS", "0").lower() in ("1", "true")
+# 할당 위치별로 저장할 호출 스택 깊이 (클수록 원인 추적이 쉽지만 추적 오버헤드가 큼)
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "10"))
+# 보관할 메모리 스냅샷 수 (오래된 것부터 삭제)
+MEMORY_SNAPSHOT_LIMIT = int(os.getenv("MEMORY_SNAPSHOT_LIMIT", "5"))
+# RSS, 인덱스/docstore/캐시 크기 게이지 갱신 주기(초) (진단 설정과 관계없이 항상 수집)
+MEMORY_GAUGE_INTERVAL_SECONDS = float(os.getenv("MEMORY_GAUGE_INTERVAL_SECONDS", "15"))
+
+# 업로드 설정
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# 한 번의 임베딩 요청에 포함할 청크 수
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# 일괄 업로드 제한 (파일 수 / 압축 해제 후 전체 크기)
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "200"))
+BULK_MAX_TOTAL_BYTES = int(os.getenv("BULK_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+
+# 리밸런싱 리포트 섹션별 최대 출력 토큰
+REBALANCE_SECTION_MAX_TOKENS = {
+    "performance": int(os.getenv("REBALANCE_PERFORMANCE_MAX_TOKENS", "700")),
+    "necessity": int(os.getenv("REBALANCE_NECESSITY_MAX_TOKENS", "400")),
+    "suggestions": int(os.getenv("REBALANCE_SUGGESTIONS_MAX_TOKENS", "700")),
+}
+
+# LLM 응답 검증 실패 시 수정(repair) 요청의 최대 출력 토큰
+REPAIR_MAX_TOKENS = int(os.getenv("REPAIR_MAX_TOKENS", "400"))
+
+# 요청 처리 시간 예산 (라우터에서 시작하여 검색/LLM 호출까지 전파)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+# 남은 예산이 이보다 작으면 LLM을 호출하지 않고 카탈로그 기반 추천으로 대체
+LLM_MIN_BUDGET_SECONDS = float(os.getenv("LLM_MIN_BUDGET_SECONDS", "3"))
+# 벡터 검색(쿼리 임베딩 포함)에 필요한 최소 예산
+RETRIEVAL_MIN_BUDGET_SECONDS = float(os.getenv("RETRIEVAL_MIN_BUDGET_SECONDS", "0.5"))
+
+# 모델 호출(LLM/임베딩) 스케줄러 설정 (프로세스 단위)
+# 동시에 OpenAI로 나가는 호출 수 상한
+MODEL_MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", "8"))
+# 인터랙티브 요청 전용으로 남겨두는 슬롯 수 (배치/유지보수 작업은 나머지 슬롯만 사용)
+MODEL_INTERACTIVE_RESERVED = int(os.getenv("MODEL_INTERACTIVE_RESERVED", "2"))
+# 우선순위 클래스별 대기열 길이 상한 (초과 시 429 응답)
+MODEL_QUEUE_LIMITS = {
+    "interactive": int(os.getenv("MODEL_QUEUE_LIMIT_INTERACTIVE", "32")),
+    "batch": int(os.getenv("MODEL_QUEUE_LIMIT_BATCH", "16")),
+    "maintenance": int(os.getenv("MODEL_QUEUE_LIMIT_MAINTENANCE", "8")),
+}
+
+# 유사 고객 추천 재사용 설정
+SIMILARITY_REUSE_ENABLED = os.getenv("SIMILARITY_REUSE_ENABLED", "true").lower() == "true"
+# 정규화된 프로필 거리(0~1)가 이 값 이하이면 최근 추천을 재사용
+SIMILARITY_DISTANCE_THRESHOLD = float(os.getenv("SIMILARITY_DISTANCE_THRESHOLD", "0.1"))
+# 재사용 후보로 보관할 최근 추천 수와 유효 기간
+SIMILARITY_INDEX_CAPACITY = int(os.getenv("SIMILARITY_INDEX_CAPACITY", "5000"))
+SIMILARITY_TTL_SECONDS = int(os.getenv("SIMILARITY_TTL_SECONDS", str(24 * 60 * 60)))
+
+# 최신 버전으로 대체된 투자설명서를 옮겨두는 디렉토리 (DOCS_PATH 밖에 두어 인덱스 재생성 시 포함되지 않도록 함)
+PROSPECTUS_ARCHIVE_PATH = os.path.join(BASE_DIR, "data", "archive", "prospectus")
+
+# 로컬 cross-encoder 재순위화(rerank) 설정 (sentence-transformers 필요)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+# 재순위화할 후보 청크 수와 프롬프트에 넣을 청크 수
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "3"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# 재순위화 지연시간 예산 (초과하면 재순위화를 건너뛰고 기존 순서 사용)
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))
+# (쿼리 해시, 청크 ID) 점수 캐시 크기
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+
+# 서버 시작 후 Vector DB, LLM 클라이언트, tiktoken 인코딩을 백그라운드에서 미리 준비 (false면 첫 사용 시 생성)
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+
+# 추천/리밸런싱 결과 감사 로그 (append-only SQLite)
+AUDIT_LOG_ENABLED = os.getenv("AUDIT_LOG_ENABLED", "true").lower() == "true"
+AUDIT_DB_PATH = os.getenv("AUDIT_DB_PATH", os.path.join(BASE_DIR, "data", "audit", "audit_log.sqlite"))
+# 대기열의 기록을 모아서 쓰는 주기(초)와 한 번에 쓰는 최대 건수
+AUDIT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECONDS", "1.0"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+
+# 백그라운드 작업(고객 분석, 지식 업데이트) 상태 저장소 (워커 간 공유 SQLite)
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(BASE_DIR, "data", "jobs", "jobs.sqlite"))
+# 완료된 작업의 상태/결과를 보관하는 기간(초)
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(60 * 60)))
+
+# ETF 카탈로그 조회 API(/api/v1/etfs) 응답의 클라이언트 캐시 유효 시간(초) (이후에는 ETag로 재검증)
+ETF_CATALOG_CACHE_MAX_AGE = int(os.getenv("ETF_CATALOG_CACHE_MAX_AGE", "60"))
+
+# 작업별 LLM 라우팅: 쉼표로 구분한 모델을 앞에서부터(저렴하고 빠른 모델 먼저) 시도하고,
+# 응답 검증에 실패하거나 호출이 실패하면 다음 모델로 승격
+def _model_route(env_name: str, default: str) -> list:
+    return [model.strip() for model in os.getenv(env_name, default).split(",") if model.strip()]
+
+MODEL_ROUTES = {
+    "recommendation": _model_route("MODEL_ROUTE_RECOMMENDATION", "gpt-4o-mini,gpt-4o"),
+    "rebalance_performance": _model_route("MODEL_ROUTE_REBALANCE_PERFORMANCE", "gpt-4o-mini,gpt-4o"),
+    "rebalance_necessity": _model_route("MODEL_ROUTE_REBALANCE_NECESSITY", "gpt-4o-mini,gpt-4o"),
+    "rebalance_suggestions": _model_route("MODEL_ROUTE_REBALANCE_SUGGESTIONS", "gpt-4o-mini,gpt-4o"),
+    # 검증 실패 응답의 수정(repair) 요청
+    "repair": _model_route("MODEL_ROUTE_REPAIR", "gpt-4o-mini"),
+}
+
+# 벡터 인덱스 샤딩: asset_class(자산군별 equity/bond/mixed/alternative/other) 또는 hash(VECTOR_HASH_SHARDS개로 균등 분할)
+# 설정이 기존 인덱스와 다르면 서버 시작 시 기존 벡터를 재구성하여 새 샤드로 옮김 (재임베딩 없음)
+VECTOR_SHARD_STRATEGY = os.getenv("VECTOR_SHARD_STRATEGY", "asset_class")
+VECTOR_HASH_SHARDS = int(os.getenv("VECTOR_HASH_SHARDS", "4"))
+# 샤드를 동시에 검색하는 스레드 수 (1이면 순차 검색)
+VECTOR_SEARCH_WORKERS = int(os.getenv("VECTOR_SEARCH_WORKERS", "4"))
+
+# 가격 이력: PRICE_HISTORY_PATH의 CSV/Parquet 파일(date, etf_code, close[, nav] 컬럼의 일별 데이터)을
+# NumPy 배열로 변환해 두고 mmap으로 로드 (파일이 바뀌면 다음 조회 시 다시 변환)
+PRICE_HISTORY_PATH = os.path.join(BASE_DIR, "data", "prices")
+# 성과 지표 계산 기간(거래일)과 사용할 가격 (close: 종가, nav: 기준가)
+PRICE_LOOKBACK_DAYS = int(os.getenv("PRICE_LOOKBACK_DAYS", "252"))
+PRICE_FIELD = os.getenv("PRICE_FIELD", "close")
+
+# 고객 데이터 CSV (고객 저장소가 파일 변경을 감지하여 추가된 행만 반영)
+CUSTOMER_DATA_PATH = os.getenv(
+    "CUSTOMER_DATA_PATH", os.path.join(BASE_DIR, "data", "customer", "customer_data_20250420_004757.csv")
+)
+# 고객 집계의 월 투자액 구간 경계(원, 쉼표로 구분)
+CUSTOMER_MONTHLY_INVESTMENT_BANDS = [
+    int(edge) for edge in os.getenv("CUSTOMER_MONTHLY_INVESTMENT_BANDS", "300000,500000,700000,1000000").split(",")
+    if edge.strip()
+]
+
+# 벡터 검색 실행 방식: inprocess(기본, API 프로세스가 FAISS 인덱스를 직접 로드) 또는
+# remote(별도 검색 서비스 프로세스 `python -m services.vector_search_service`에 요청)
+VECTOR_SEARCH_MODE = os.getenv("VECTOR_SEARCH_MODE", "inprocess")
+# 검색 서비스 주소: unix:///경로 (같은 서버) 또는 http://호스트:포트
+VECTOR_SEARCH_SERVICE_URL = os.getenv(
+    "VECTOR_SEARCH_SERVICE_URL", "unix://" + os.path.join(BASE_DIR, "data", "run", "vector_search.sock")
+)
+# 검색 요청 타임아웃(초)
+VECTOR_SEARCH_TIMEOUT_SECONDS = float(os.getenv("VECTOR_SEARCH_TIMEOUT_SECONDS", "5.0"))
+# 클라이언트 요청 묶음: 첫 쿼리 후 최대 대기 시간(ms)과 한 번에 보내는 최대 쿼리 수
+VECTOR_SEARCH_BATCH_WINDOW_MS = float(os.getenv("VECTOR_SEARCH_BATCH_WINDOW_MS", "5"))
+VECTOR_SEARCH_MAX_BATCH = int(os.getenv("VECTOR_SEARCH_MAX_BATCH", "32"))
+# 검색 서비스에 동시에 보낼 수 있는 요청 수 (재사용하는 keep-alive 연결 수)
+VECTOR_SEARCH_CONNECTIONS = int(os.getenv("VECTOR_SEARCH_CONNECTIONS", "4"))
@@ -0,0 +1,23 @@
+import csv
+import pytest
+from services.etf_catalog import ETFCatalog
+
+CATALOG_COLUMNS = (
+    "etf_code", "etf_name", "listing_date", "market_large", "market_medium", "market_small",
+    "asset_large", "asset_medium", "asset_small", "theme", "fiscal_month", "total_expense",
+    "asset_management_company", "aum", "disparate_ratio", "dividend_yield",
+)
+
+
+@pytest.fixture
+def make_catalog(tmp_path):
+    """행 목록(누락된 컬럼은 빈 값)으로 etf_info.csv 형식의 임시 카탈로그를 만듭니다."""
+    def make(rows):
+        path = tmp_path / "etf_info.csv"
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=CATALOG_COLUMNS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({column: row.get(column, "") for column in CATALOG_COLUMNS})
+        return ETFCatalog(str(path))
+    return make
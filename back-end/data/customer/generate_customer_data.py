@@ -1,79 +1,316 @@
-import pandas as pd
-import numpy as np
-from faker import Faker
-import random
+import os
+import json
+import time
+import argparse
+import copy
 from datetime import datetime
+from itertools import permutations
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
 
-# Initialize Faker
-fake = Faker('ko_KR')
-
-def generate_customer_data(num_customers=1000):
-    # Define possible values for categorical variables
-    investment_tendencies = ['Conservative', 'Moderate', 'Aggressive']
-    financial_statuses = ['Poor', 'Fair', 'Good', 'Excellent']
-    risk_tolerances = ['Low', 'Medium', 'High']
-    investment_horizons = ['Short-term (1-3 years)', 'Medium-term (3-5 years)', 'Long-term (5+ years)']
-    
-    # ETF list (example ETFs)
-    etf_list = [
-        'KODEX 200', 'TIGER 200', 'KODEX 코스닥150', 'TIGER 미국S&P500',
-        'KODEX 미국나스닥100', 'TIGER 유로스탁스50', 'KODEX 일본TOPIX100',
-        'TIGER 중국CSI300', 'KODEX 인도Nifty50'
-    ]
-    
-    data = []
-    
-    for _ in range(num_customers):
-        age = random.randint(20, 70)
-        name = fake.name()
-        investment_tendency = random.choices(investment_tendencies, weights=[0.4, 0.4, 0.2])[0]
-        financial_status_category = random.choices(financial_statuses, weights=[0.2, 0.3, 0.3, 0.2])[0]
-        has_etf = random.choices([True, False], weights=[0.6, 0.4])[0]
-        
-        # Generate financial status details
-        income = random.randint(30000000, 150000000) // 1000000 * 1000000  # Rounded to nearest million
-        savings = random.randint(10000000, 500000000) // 1000000 * 1000000  # Rounded to nearest million
-        monthly_investment = random.randint(100000, 1000000) // 10000 * 10000  # Rounded to nearest 10,000
-        
-        # Generate ETF holdings if customer has ETFs
-        current_etf_holdings = []
-        if has_etf:
-            num_holdings = random.randint(1, 3)
-            current_etf_holdings = random.sample(etf_list, num_holdings)
-        
-        risk_tolerance = random.choices(risk_tolerances, weights=[0.4, 0.4, 0.2])[0]
-        investment_horizon = random.choices(investment_horizons, weights=[0.3, 0.4, 0.3])[0]
-        
-        customer = {
-            'customer_id': fake.uuid4(),
-            'age': age,
-            'name': name,
-            'investment_tendency': investment_tendency,
-            'financial_status': {
-                'category': financial_status_category,
-                'income': income,
-                'savings': savings,
-                'monthly_investment': monthly_investment
-            },
-            'has_etf': has_etf,
-            'current_etf_holdings': ','.join(current_etf_holdings) if current_etf_holdings else '',
-            'risk_tolerance': risk_tolerance,
-            'investment_horizon': investment_horizon,
-            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+CUSTOMER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 컬럼 순서 (기존 고객 데이터 CSV와 동일)
+COLUMNS = [
+    'customer_id', 'age', 'name', 'investment_tendency', 'financial_status', 'has_etf',
+    'current_etf_holdings', 'risk_tolerance', 'investment_horizon', 'created_at'
+]
+
+# ETF list (example ETFs)
+ETF_LIST = [
+    'KODEX 200', 'TIGER 200', 'KODEX 코스닥150', 'TIGER 미국S&P500',
+    'KODEX 미국나스닥100', 'TIGER 유로스탁스50', 'KODEX 일본TOPIX100',
+    'TIGER 중국CSI300', 'KODEX 인도Nifty50'
+]
+
+# 기본 분포 설정 (--config JSON 파일로 일부만 덮어쓸 수 있음)
+# - 범주형: {"values": [...], "weights": [...]} (weights는 합이 1이 아니어도 정규화)
+# - 수치형: {"dist": "uniform" | "normal" | "lognormal", ...분포 모수, "low", "high", "round"}
+#   uniform은 [low, high] 구간, normal/lognormal은 샘플링 후 [low, high]로 자르고 round 단위로 내림
+DEFAULT_DISTRIBUTIONS: Dict[str, Dict[str, Any]] = {
+    'age': {'dist': 'uniform', 'low': 20, 'high': 70, 'round': 1},
+    'investment_tendency': {'values': ['Conservative', 'Moderate', 'Aggressive'], 'weights': [0.4, 0.4, 0.2]},
+    'financial_status_category': {'values': ['Poor', 'Fair', 'Good', 'Excellent'], 'weights': [0.2, 0.3, 0.3, 0.2]},
+    'has_etf': {'values': [True, False], 'weights': [0.6, 0.4]},
+    'num_holdings': {'values': [1, 2, 3], 'weights': [1, 1, 1]},
+    'income': {'dist': 'uniform', 'low': 30000000, 'high': 150000000, 'round': 1000000},
+    'savings': {'dist': 'uniform', 'low': 10000000, 'high': 500000000, 'round': 1000000},
+    'monthly_investment': {'dist': 'uniform', 'low': 100000, 'high': 1000000, 'round': 10000},
+    'risk_tolerance': {'values': ['Low', 'Medium', 'High'], 'weights': [0.4, 0.4, 0.2]},
+    'investment_horizon': {
+        'values': ['Short-term (1-3 years)', 'Medium-term (3-5 years)', 'Long-term (5+ years)'],
+        'weights': [0.3, 0.4, 0.3]
+    },
+}
+
+# Faker가 없을 때 사용하는 이름 목록
+_FALLBACK_LAST_NAMES = {'김': 0.215, '이': 0.147, '박': 0.084, '최': 0.047, '정': 0.044, '강': 0.023, '조': 0.021, '윤': 0.021, '장': 0.020, '임': 0.017}
+_FALLBACK_FIRST_NAMES = {name: 1 for name in [
+    '민수', '서연', '지훈', '지민', '현우', '수빈', '상현', '영희', '도윤', '하은',
+    '준호', '미경', '성민', '은지', '동현', '예린', '재원', '수진', '태윤', '혜원'
+]}
+
+_HEX = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+
+def load_distributions(config_path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """기본 분포에 JSON 설정 파일의 항목을 덮어씁니다. (항목 단위로 병합)"""
+    distributions = copy.deepcopy(DEFAULT_DISTRIBUTIONS)
+    if config_path:
+        with open(config_path, encoding='utf-8') as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(distributions)
+        if unknown:
+            raise ValueError(f"알 수 없는 분포 항목: {sorted(unknown)}")
+        for key, spec in overrides.items():
+            distributions[key].update(spec)
+    return distributions
+
+
+def build_name_pool() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    성 × 이름 조합의 전체 이름 배열과 샘플링 확률을 미리 계산합니다.
+    (행마다 Faker를 호출하지 않고 인덱스 샘플링만으로 이름을 생성)
+    """
+    try:
+        from faker.providers.person.ko_KR import Provider
+        last_names, first_names = Provider.last_names, Provider.first_names
+    except ImportError:
+        last_names, first_names = _FALLBACK_LAST_NAMES, _FALLBACK_FIRST_NAMES
+    last = np.array(list(last_names), dtype=object)
+    first = np.array(list(first_names), dtype=object)
+    names = np.add.outer(last, first).ravel()
+    weights = np.outer(
+        np.array(list(last_names.values()), dtype=float),
+        np.array(list(first_names.values()), dtype=float)
+    ).ravel()
+    return names, weights / weights.sum()
+
+
+def build_holding_combinations(etf_list: List[str], max_holdings: int) -> Tuple[np.ndarray, List[int]]:
+    """
+    보유 ETF 문자열 조회 테이블. 보유 수 k별로 서로 다른 ETF k개의 순열을 모두 나열하고,
+    순열을 9진수처럼 인코딩한 코드로 바로 찾을 수 있도록 k별 시작 위치(offsets)를 반환합니다.
+    """
+    n = len(etf_list)
+    table = ['']
+    offsets = [0]
+    for k in range(1, max_holdings + 1):
+        offsets.append(len(table))
+        lookup = [''] * (n ** k)
+        for combo in permutations(range(n), k):
+            code = 0
+            for index in combo:
+                code = code * n + index
+            lookup[code] = ','.join(etf_list[index] for index in combo)
+        table.extend(lookup)
+    return np.array(table, dtype=object), offsets
+
+
+def _categorical(rng: np.random.Generator, spec: Dict[str, Any], size: int) -> np.ndarray:
+    """범주 인덱스를 샘플링합니다."""
+    weights = np.asarray(spec['weights'], dtype=float)
+    return rng.choice(len(spec['values']), size=size, p=weights / weights.sum())
+
+
+def _numeric(rng: np.random.Generator, spec: Dict[str, Any], size: int) -> np.ndarray:
+    dist = spec.get('dist', 'uniform')
+    low, high, step = spec['low'], spec['high'], spec.get('round', 1)
+    if dist == 'uniform':
+        values = rng.integers(low, high, size=size, endpoint=True)
+    elif dist == 'normal':
+        values = rng.normal(spec['mean'], spec['std'], size=size)
+    elif dist == 'lognormal':
+        values = rng.lognormal(spec['mean'], spec['sigma'], size=size)
+    else:
+        raise ValueError(f"지원하지 않는 분포: {dist}")
+    values = np.clip(values, low, high).astype(np.int64)
+    return values // step * step
+
+
+def _uuid4(rng: np.random.Generator, size: int) -> np.ndarray:
+    """시드 고정 난수로 UUID4 형식의 고객 ID를 생성합니다. (16진수 변환도 배열 연산)"""
+    raw = rng.integers(0, 256, size=(size, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # variant
+    hex_digits = np.empty((size, 32), dtype=np.uint8)
+    hex_digits[:, 0::2] = _HEX[raw >> 4]
+    hex_digits[:, 1::2] = _HEX[raw & 0x0F]
+    chars = np.full((size, 36), ord('-'), dtype=np.uint8)
+    for start, end, offset in ((0, 8, 0), (9, 13, 8), (14, 18, 12), (19, 23, 16), (24, 36, 20)):
+        chars[:, start:end] = hex_digits[:, offset:offset + end - start]
+    return chars.view('S36').ravel().astype(str).astype(object)
+
+
+class CustomerGenerator:
+    """
+    시드 고정 NumPy 벡터 샘플링으로 가상 고객 데이터를 청크 단위로 생성합니다.
+
+    같은 시드, 분포, 청크 크기이면 항상 같은 데이터가 생성됩니다.
+    범주형 컬럼과 이름/보유 ETF는 미리 계산한 배열의 인덱스만 샘플링하므로
+    청크 하나의 메모리 사용량이 작고, 전체 행 수와 관계없이 청크 크기만큼만 메모리를 사용합니다.
+    """
+
+    def __init__(
+        self,
+        seed: int = 42,
+        distributions: Optional[Dict[str, Dict[str, Any]]] = None,
+        created_at: Optional[str] = None
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.distributions = distributions or copy.deepcopy(DEFAULT_DISTRIBUTIONS)
+        self.created_at = created_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.names, self.name_weights = build_name_pool()
+        max_holdings = max(self.distributions['num_holdings']['values'])
+        if max_holdings > len(ETF_LIST):
+            raise ValueError(f"보유 ETF 수는 최대 {len(ETF_LIST)}개입니다.")
+        self.holdings, self.holding_offsets = build_holding_combinations(ETF_LIST, max_holdings)
+        self.categories = {
+            column: pd.Index(self.distributions[column]['values'])
+            for column in ('investment_tendency', 'risk_tolerance', 'investment_horizon')
         }
-        
-        data.append(customer)
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
-    
-    # Save to CSV
+
+    def _holdings(self, has_etf: np.ndarray, size: int) -> np.ndarray:
+        """보유 ETF 조회 테이블의 인덱스 (미보유 고객은 0 → 빈 문자열)"""
+        spec = self.distributions['num_holdings']
+        counts = np.asarray(spec['values'])[_categorical(self.rng, spec, size)]
+        counts = np.where(has_etf, counts, 0)
+        # 행마다 ETF 순서를 무작위로 섞은 뒤 앞에서 k개 선택 (중복 없는 표본)
+        n = len(ETF_LIST)
+        max_holdings = len(self.holding_offsets) - 1
+        order = self.rng.random((size, n)).argsort(axis=1)[:, :max_holdings]
+        codes = np.zeros(size, dtype=np.int64)
+        for position in range(max_holdings):
+            include = counts > position
+            codes = np.where(include, codes * n + order[:, position], codes)
+        offsets = np.asarray(self.holding_offsets)
+        return np.where(counts > 0, offsets[counts] + codes, 0)
+
+    def generate_chunk(self, size: int) -> pd.DataFrame:
+        """고객 size명을 생성합니다."""
+        rng, dist = self.rng, self.distributions
+        has_etf_spec = dist['has_etf']
+        has_etf = np.asarray(has_etf_spec['values'], dtype=bool)[_categorical(rng, has_etf_spec, size)]
+
+        category = np.asarray(dist['financial_status_category']['values'], dtype=object)[
+            _categorical(rng, dist['financial_status_category'], size)
+        ]
+        income = _numeric(rng, dist['income'], size)
+        savings = _numeric(rng, dist['savings'], size)
+        monthly_investment = _numeric(rng, dist['monthly_investment'], size)
+        # 기존 데이터와 같은 dict repr 형식 (서버는 ast.literal_eval로 파싱)
+        financial_status = (
+            "{'category': '" + category + "', 'income': " + income.astype(str).astype(object)
+            + ", 'savings': " + savings.astype(str).astype(object)
+            + ", 'monthly_investment': " + monthly_investment.astype(str).astype(object) + "}"
+        )
+
+        df = pd.DataFrame({
+            'customer_id': _uuid4(rng, size),
+            'age': _numeric(rng, dist['age'], size),
+            'name': pd.Categorical.from_codes(
+                rng.choice(len(self.names), size=size, p=self.name_weights), categories=pd.Index(self.names)
+            ),
+            'investment_tendency': pd.Categorical.from_codes(
+                _categorical(rng, dist['investment_tendency'], size), categories=self.categories['investment_tendency']
+            ),
+            'financial_status': financial_status,
+            'has_etf': has_etf,
+            'current_etf_holdings': self.holdings[self._holdings(has_etf, size)],
+            'risk_tolerance': pd.Categorical.from_codes(
+                _categorical(rng, dist['risk_tolerance'], size), categories=self.categories['risk_tolerance']
+            ),
+            'investment_horizon': pd.Categorical.from_codes(
+                _categorical(rng, dist['investment_horizon'], size), categories=self.categories['investment_horizon']
+            ),
+            'created_at': self.created_at,
+        })
+        return df[COLUMNS]
+
+    def iter_chunks(self, num_customers: int, chunk_size: int) -> Iterator[pd.DataFrame]:
+        for start in range(0, num_customers, chunk_size):
+            yield self.generate_chunk(min(chunk_size, num_customers - start))
+
+
+def generate_customer_data(
+    num_customers: int = 1000,
+    seed: int = 42,
+    chunk_size: int = 200000,
+    formats: Tuple[str, ...] = ('csv',),
+    output_dir: str = CUSTOMER_DIR,
+    distributions: Optional[Dict[str, Dict[str, Any]]] = None,
+    created_at: Optional[str] = None
+) -> List[str]:
+    """
+    가상 고객 데이터를 청크 단위로 생성하여 CSV/Parquet 파일에 이어서 기록합니다.
+
+    Args:
+        num_customers: 생성할 고객 수 (수천만 건도 청크 크기만큼의 메모리로 생성)
+        seed: 난수 시드 (같은 시드/분포/청크 크기면 같은 데이터)
+        chunk_size: 한 번에 생성하여 기록하는 행 수
+        formats: 'csv', 'parquet' 중 출력 형식
+        output_dir: 출력 디렉토리
+        distributions: 분포 설정 (기본값 DEFAULT_DISTRIBUTIONS)
+        created_at: created_at 컬럼 값 (기본값: 현재 시각)
+
+    Returns:
+        List[str]: 생성한 파일 경로
+    """
+    unsupported = set(formats) - {'csv', 'parquet'}
+    if unsupported:
+        raise ValueError(f"지원하지 않는 출력 형식: {sorted(unsupported)}")
+    os.makedirs(output_dir, exist_ok=True)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f'customer_data_{timestamp}.csv'
-    df.to_csv(f'data/customer/{filename}', index=False, encoding='utf-8')
-    
-    return df
+    base = os.path.join(output_dir, f'customer_data_{timestamp}')
+    paths = [f'{base}.{fmt}' for fmt in formats]
+
+    generator = CustomerGenerator(seed=seed, distributions=distributions, created_at=created_at)
+    parquet_writer = None
+    written = 0
+    started = time.perf_counter()
+    try:
+        for chunk in generator.iter_chunks(num_customers, chunk_size):
+            if 'csv' in formats:
+                chunk.to_csv(f'{base}.csv', mode='a' if written else 'w', header=not written, index=False, encoding='utf-8')
+            if 'parquet' in formats:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(f'{base}.parquet', table.schema)
+                parquet_writer.write_table(table)
+            written += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"{written:,}/{num_customers:,}행 생성 ({written / elapsed:,.0f}행/s)", flush=True)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="부하 테스트용 가상 고객 데이터 생성")
+    parser.add_argument('-n', '--num-customers', type=int, default=1000, help="생성할 고객 수")
+    parser.add_argument('--seed', type=int, default=42, help="난수 시드")
+    parser.add_argument('--chunk-size', type=int, default=200000, help="청크당 행 수 (메모리 사용량 상한)")
+    parser.add_argument('--format', default='csv', help="출력 형식: csv, parquet 또는 csv,parquet")
+    parser.add_argument('--output-dir', default=CUSTOMER_DIR, help="출력 디렉토리")
+    parser.add_argument('--config', help="분포 설정 JSON 파일 (DEFAULT_DISTRIBUTIONS 항목 단위로 덮어씀)")
+    parser.add_argument('--created-at', help="created_at 컬럼 값 (재현 가능한 출력을 위해 고정할 때 사용)")
+    args = parser.parse_args()
+
+    paths = generate_customer_data(
+        num_customers=args.num_customers,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        formats=tuple(fmt.strip() for fmt in args.format.split(',') if fmt.strip()),
+        output_dir=args.output_dir,
+        distributions=load_distributions(args.config),
+        created_at=args.created_at
+    )
+    print(f"Generated {args.num_customers} customer records: {', '.join(paths)}")
+
 
 if __name__ == "__main__":
-    df = generate_customer_data(1000)
-    print(f"Generated {len(df)} customer records") 
\ No newline at end of file
+    main()
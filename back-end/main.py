@@ -1,13 +1,26 @@
-from fastapi import FastAPI
-from prometheus_fastapi_instrumentator import Instrumentator
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from monitoring.metrics import metrics_middleware, metrics_endpoint, monitor_event_loop_lag, mark_process_dead
 from routers.etf_router import router as etf_router
+from routers.etf_catalog_router import router as etf_catalog_router
+from routers.diagnostics_router import router as diagnostics_router, memory_router
+from routers.customer_cohort_router import router as customer_cohort_router
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from services.etf_service import vector_db_manager
-from config import BASE_DIR
+from services.process_sync import LeaderLease
+from services.model_scheduler import MAINTENANCE, ModelOverloadedError, priority_class
+from services.reranker import reranker
+from services.warmup import start_background_warmup
+from services.audit_log import audit_log
+from monitoring.loop_diagnostics import loop_stall_detector
+from monitoring.memory_diagnostics import memory_tracker, monitor_memory
+from config import BASE_DIR, LOCK_DIR, API_WORKERS, LOOP_DIAGNOSTICS_ENABLED, MEMORY_DIAGNOSTICS_ENABLED, STARTUP_WARMUP
 import logging
 from datetime import datetime
 import os
+import asyncio
 from contextlib import asynccontextmanager
 
 # 로깅 설정
@@ -17,20 +30,62 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def elect_scheduler_leader(scheduler: BackgroundScheduler, lease: LeaderLease):
+    """
+    리더 리스를 획득한 워커에만 증분 업데이트 작업을 등록합니다.
+    리더 워커가 종료되면 남은 워커 중 하나가 다음 주기에 리스를 이어받습니다.
+    """
+    if lease.is_leader or not lease.try_acquire():
+        return
+    scheduler.add_job(
+        perform_incremental_update,
+        trigger=CronTrigger(hour=23, minute=59),
+        id="incremental_update",
+        replace_existing=True
+    )
+    logger.info(f"스케줄러 리더로 선출됨: pid={os.getpid()}")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """서버 시작/종료 시 스케줄러 관리"""
+    # 인덱스/캐시 적재 전에 추적을 시작해야 워밍업 중의 할당도 스냅샷에 포함됨
+    if MEMORY_DIAGNOSTICS_ENABLED:
+        memory_tracker.start()
     scheduler = BackgroundScheduler()
+    lease = LeaderLease(os.path.join(LOCK_DIR, "scheduler.leader.lock"))
+    elect_scheduler_leader(scheduler, lease)
     scheduler.add_job(
-        perform_incremental_update,
-        trigger=CronTrigger(hour=23, minute=59),
-        id="incremental_update",
+        elect_scheduler_leader,
+        trigger=IntervalTrigger(seconds=30),
+        args=[scheduler, lease],
+        id="scheduler_leader_election",
         replace_existing=True
     )
     scheduler.start()
     logger.info("백그라운드 스케줄러 시작")
+    # Vector DB, LLM 클라이언트, tiktoken 인코딩 등은 서버가 요청을 받기 시작한 뒤 백그라운드에서 준비
+    # (준비 상태는 GET /api/v1/health/ready 로 확인)
+    if STARTUP_WARMUP:
+        start_background_warmup()
+    # 재순위화 모델은 첫 요청 전에 백그라운드에서 로드 (RERANK_ENABLED=true 인 경우)
+    reranker.warm_up()
+    loop_lag_task = asyncio.create_task(monitor_event_loop_lag())
+    # RSS, 인덱스/docstore/캐시 크기 게이지 (진단 설정과 관계없이 수집)
+    memory_task = asyncio.create_task(monitor_memory())
+    if LOOP_DIAGNOSTICS_ENABLED:
+        loop_stall_detector.start()
     yield
+    if LOOP_DIAGNOSTICS_ENABLED:
+        loop_stall_detector.stop()
+    loop_lag_task.cancel()
+    memory_task.cancel()
+    if MEMORY_DIAGNOSTICS_ENABLED:
+        memory_tracker.stop()
     scheduler.shutdown()
+    # 대기 중인 감사 기록을 모두 기록한 뒤 종료
+    audit_log.close()
+    lease.release()
+    mark_process_dead()
     logger.info("백그라운드 스케줄러 종료")
 
 app = FastAPI(
@@ -40,18 +95,36 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Prometheus 메트릭 노출
-Instrumentator().instrument(app).expose(app)
+# Prometheus 메트릭 수집 및 노출 (PROMETHEUS_MULTIPROC_DIR 설정 시 멀티 워커 합산)
+app.middleware("http")(metrics_middleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+@app.exception_handler(ModelOverloadedError)
+async def model_overloaded_handler(request: Request, exc: ModelOverloadedError):
+    """모델 호출 대기열이 가득 차면 429와 Retry-After 헤더로 응답합니다."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "priority": exc.priority},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
 
 # 라우터 등록
 app.include_router(etf_router)
+app.include_router(etf_catalog_router)
+app.include_router(customer_cohort_router)
+if LOOP_DIAGNOSTICS_ENABLED:
+    app.include_router(diagnostics_router)
+if MEMORY_DIAGNOSTICS_ENABLED:
+    app.include_router(memory_router)
 
 def perform_incremental_update():
     """매일 밤 11시 59분에 실행되는 증분 업데이트 작업"""
     try:
         logger.info(f"증분 업데이트 시작: {datetime.now()}")
         csv_path = os.path.join(BASE_DIR, "data", "docs", "etf_info.csv")
-        success = vector_db_manager.update_etf_data(csv_path)
+        # 인터랙티브 요청과 업로드보다 낮은 우선순위로 임베딩 호출
+        with priority_class(MAINTENANCE):
+            success = vector_db_manager.update_etf_data(csv_path)
         if success:
             logger.info("증분 업데이트 성공")
         else:
@@ -64,5 +137,18 @@ def home():
     return {"message": "ETF Recommendation API is running"}
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="ETF Recommendation API")
+    parser.add_argument("--profile-startup", action="store_true", help="import/초기화 단계별 시작 시간을 출력하고 종료")
+    args = parser.parse_args()
+    if args.profile_startup:
+        from monitoring.startup_profile import profile_startup
+        print(profile_startup())
+        raise SystemExit(0)
+
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if API_WORKERS > 1:
+        # 멀티 워커 모드는 각 워커가 앱을 임포트할 수 있도록 문자열로 전달해야 함
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=API_WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,137 @@
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from collections import Counter as StackCounter, deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from config import LOOP_STALL_THRESHOLD_MS
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_to_stack(frame) -> List[str]:
+    """프레임을 루트부터 리프 순서의 'module:function:line' 목록으로 변환합니다."""
+    return [
+        f"{summary.filename.rsplit('/', 1)[-1]}:{summary.name}:{summary.lineno}"
+        for summary in traceback.extract_stack(frame)
+    ]
+
+
+class LoopStallDetector:
+    """
+    이벤트 루프 블로킹 감지기
+
+    루프 안에서 짧은 주기로 heartbeat를 갱신하고, 별도 감시 스레드가
+    heartbeat가 임계값 이상 멈춘 것을 발견하면 루프 스레드의 스택을
+    샘플링하여 무엇이 루프를 막고 있는지 기록합니다.
+    """
+
+    def __init__(self, threshold: float = 0.1, heartbeat_interval: float = 0.02, max_records: int = 100):
+        self.threshold = threshold
+        self.heartbeat_interval = heartbeat_interval
+        self.loop_thread_id: Optional[int] = None
+        self.stalls = deque(maxlen=max_records)
+        self._heartbeat = time.monotonic()
+        self._current_stall: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    async def _beat(self):
+        while True:
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.heartbeat_interval)
+
+    def _watch(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            blocked_for = time.monotonic() - self._heartbeat
+            if blocked_for >= self.threshold:
+                self._sample_stall(blocked_for)
+            elif self._current_stall is not None:
+                self._finish_stall()
+
+    def _sample_stall(self, blocked_for: float):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return
+        stack = ";".join(_frame_to_stack(frame))
+        if self._current_stall is None:
+            self._current_stall = {
+                "started_at": datetime.now().isoformat(),
+                "blocked_seconds": blocked_for,
+                "samples": StackCounter(),
+            }
+        self._current_stall["blocked_seconds"] = blocked_for
+        self._current_stall["samples"][stack] += 1
+
+    def _finish_stall(self):
+        stall = self._current_stall
+        self._current_stall = None
+        top_stack, _ = stall["samples"].most_common(1)[0]
+        logger.warning(
+            f"이벤트 루프 블로킹 {stall['blocked_seconds'] * 1000:.0f}ms 감지: {top_stack.rsplit(';', 3)[-3:]}"
+        )
+        self.stalls.append({
+            "started_at": stall["started_at"],
+            "blocked_seconds": round(stall["blocked_seconds"], 4),
+            "samples": [
+                {"stack": stack.split(";"), "count": count}
+                for stack, count in stall["samples"].most_common(5)
+            ],
+        })
+
+    def start(self):
+        """이벤트 루프 안에서 호출하여 감지를 시작합니다."""
+        self.loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"이벤트 루프 블로킹 감지 시작 (임계값 {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        """감지를 중지합니다."""
+        self._stop.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+        if self._watchdog:
+            self._watchdog.join(timeout=1)
+
+    def recent_stalls(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """최근 감지된 블로킹 기록을 최신순으로 반환합니다."""
+        return list(self.stalls)[-limit:][::-1]
+
+
+def sample_profile(seconds: float, interval: float = 0.005, thread_id: Optional[int] = None) -> str:
+    """
+    지정된 시간 동안 스레드 스택을 주기적으로 샘플링하여
+    flamegraph.pl / speedscope 에서 읽을 수 있는 collapsed stack 형식으로 반환합니다.
+
+    Args:
+        seconds: 샘플링 시간
+        interval: 샘플링 간격
+        thread_id: 특정 스레드만 샘플링 (None이면 샘플러 자신을 제외한 전체 스레드)
+
+    Returns:
+        str: "frame;frame;frame count" 형식의 텍스트
+    """
+    own_id = threading.get_ident()
+    thread_names = {t.ident: t.name for t in threading.enumerate()}
+    samples = StackCounter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == own_id or (thread_id is not None and ident != thread_id):
+                continue
+            thread_name = thread_names.get(ident, str(ident))
+            samples[";".join([thread_name] + _frame_to_stack(frame))] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in samples.most_common())
+
+
+# 싱글톤 인스턴스 (ETF_LOOP_DIAGNOSTICS 활성화 시 main.py에서 시작)
+loop_stall_detector = LoopStallDetector(threshold=LOOP_STALL_THRESHOLD_MS / 1000)
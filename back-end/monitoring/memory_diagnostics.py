@@ -0,0 +1,238 @@
+import os
+import gc
+import time
+import asyncio
+import logging
+import threading
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from config import MEMORY_GAUGE_INTERVAL_SECONDS, MEMORY_SNAPSHOT_LIMIT, TRACEMALLOC_FRAMES
+from monitoring.metrics import MEMORY_COMPONENT_BYTES, MEMORY_COMPONENT_ITEMS, PROCESS_RSS_BYTES, TRACED_MEMORY_BYTES
+
+logger = logging.getLogger(__name__)
+
+# 구성 요소 이름 → 현재 크기({"items": 항목 수, "bytes": 바이트}, 일부만 있어도 됨)를 반환하는 함수
+_sources: Dict[str, Callable[[], Dict[str, int]]] = {}
+
+# 스냅샷 비교에서 제외하는 할당 (tracemalloc 자체, import 시스템)
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+KEY_TYPES = ("lineno", "filename", "traceback")
+
+
+def register_memory_source(name: str, func: Callable[[], Dict[str, int]]):
+    """
+    메모리 게이지 대상 구성 요소를 등록합니다.
+    func는 아직 생성되지 않은 리소스를 새로 만들지 않아야 하며, 빈 dict를 반환하면 해당 주기의 기록을 건너뜁니다.
+    """
+    _sources[name] = func
+
+
+def process_rss_bytes() -> Optional[int]:
+    """현재 프로세스의 RSS (Linux: /proc/self/statm, 그 외: 최대 RSS)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS는 바이트, Linux는 KB 단위
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def component_sizes() -> Dict[str, Dict[str, int]]:
+    """등록된 구성 요소별 현재 크기 (조회에 실패한 구성 요소는 경고를 남기고 제외)"""
+    sizes = {}
+    for name, func in list(_sources.items()):
+        try:
+            size = func()
+        except Exception as e:
+            logger.warning(f"메모리 구성 요소 크기 조회 실패: {name} - {str(e)}")
+            continue
+        if size:
+            sizes[name] = size
+    return sizes
+
+
+def update_memory_gauges() -> Dict[str, Any]:
+    """RSS, 구성 요소 크기, tracemalloc 추적량 게이지를 갱신하고 현재 값을 반환합니다."""
+    rss = process_rss_bytes()
+    if rss is not None:
+        PROCESS_RSS_BYTES.set(rss)
+    sizes = component_sizes()
+    for name, size in sizes.items():
+        if "items" in size:
+            MEMORY_COMPONENT_ITEMS.labels(component=name).set(size["items"])
+        if "bytes" in size:
+            MEMORY_COMPONENT_BYTES.labels(component=name).set(size["bytes"])
+    traced = None
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        traced = {"current": current, "peak": peak}
+        TRACED_MEMORY_BYTES.set(current)
+    return {"rss_bytes": rss, "components": sizes, "traced": traced}
+
+
+async def monitor_memory(interval: float = MEMORY_GAUGE_INTERVAL_SECONDS):
+    """주기적으로 메모리 게이지를 갱신합니다. (docstore 행 수 조회 등이 루프를 막지 않도록 스레드에서 실행)"""
+    while True:
+        try:
+            await asyncio.to_thread(update_memory_gauges)
+        except Exception as e:
+            logger.warning(f"메모리 게이지 갱신 실패: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+class MemoryTracker:
+    """
+    tracemalloc 스냅샷을 보관하고 두 시점을 비교하여 증가한 할당 위치를 찾습니다.
+
+    스냅샷마다 당시의 RSS와 구성 요소(인덱스, docstore, 캐시) 크기를 함께 기록하므로,
+    할당 위치의 증가분과 구성 요소의 증가분을 같이 보고 어떤 하위 시스템이 메모리를 늘렸는지 판단할 수 있습니다.
+    추적(start)을 시작한 뒤의 할당만 기록되며, 추적 중에는 할당마다 호출 스택을 저장하는 오버헤드가 있습니다.
+    """
+
+    def __init__(self, frames: int = TRACEMALLOC_FRAMES, max_snapshots: int = MEMORY_SNAPSHOT_LIMIT):
+        self.frames = max(1, frames)
+        self._snapshots = deque(maxlen=max(1, max_snapshots))
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            logger.info(f"tracemalloc 추적 시작 (스택 깊이 {self.frames})")
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            with self._lock:
+                self._snapshots.clear()
+            logger.info("tracemalloc 추적 중지")
+
+    def _take(self) -> tracemalloc.Snapshot:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc 추적 중이 아닙니다. (ETF_MEMORY_DIAGNOSTICS=1 로 서버를 시작하세요)")
+        # 순환 참조로만 남아 있는 객체는 비교 대상에서 제외
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces([tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES])
+
+    def snapshot(self, label: Optional[str] = None, top: int = 10) -> Dict[str, Any]:
+        """스냅샷을 저장하고 요약(추적 메모리 합계, 크기가 큰 할당 위치)을 반환합니다."""
+        started = time.perf_counter()
+        snapshot = self._take()
+        state = update_memory_gauges()
+        with self._lock:
+            entry = self._entry(self._next_id, label, snapshot, state)
+            self._next_id += 1
+            self._snapshots.append(entry)
+        stats = snapshot.statistics("lineno")
+        summary = self._describe(entry)
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        summary["top"] = [self._stat(stat) for stat in stats[:top]]
+        return summary
+
+    @staticmethod
+    def _entry(
+        snapshot_id: Optional[int],
+        label: Optional[str],
+        snapshot: tracemalloc.Snapshot,
+        state: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        return {
+            "id": snapshot_id,
+            "label": label,
+            "taken_at": datetime.now().isoformat(),
+            "rss_bytes": state["rss_bytes"],
+            "traced_bytes": tracemalloc.get_traced_memory()[0],
+            "components": state["components"],
+            "snapshot": snapshot,
+        }
+
+    @staticmethod
+    def _describe(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in entry.items() if key != "snapshot"}
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._describe(entry) for entry in self._snapshots]
+
+    def _get(self, snapshot_id: int) -> Dict[str, Any]:
+        with self._lock:
+            for entry in self._snapshots:
+                if entry["id"] == snapshot_id:
+                    return entry
+        raise KeyError(f"스냅샷을 찾을 수 없습니다: {snapshot_id} (최근 {self._snapshots.maxlen}개만 보관)")
+
+    def diff(
+        self,
+        base_id: int,
+        target_id: Optional[int] = None,
+        key_type: str = "lineno",
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        두 스냅샷을 비교하여 증가량이 큰 할당 위치를 반환합니다.
+
+        Args:
+            base_id: 기준 스냅샷 ID
+            target_id: 비교할 스냅샷 ID (없으면 지금 새로 찍은 스냅샷, 보관하지 않음)
+            key_type: lineno(코드 줄), filename(파일), traceback(호출 스택)
+            limit: 반환할 할당 위치 수
+        """
+        if key_type not in KEY_TYPES:
+            raise ValueError(f"key_type은 {', '.join(KEY_TYPES)} 중 하나입니다.")
+        base = self._get(base_id)
+        if target_id is None:
+            snapshot = self._take()
+            target = self._entry(None, "now", snapshot, update_memory_gauges())
+        else:
+            target = self._get(target_id)
+        stats = target["snapshot"].compare_to(base["snapshot"], key_type)
+        growing = [stat for stat in stats if stat.size_diff > 0][:limit]
+        components = {}
+        for name in sorted(set(base["components"]) | set(target["components"])):
+            before, after = base["components"].get(name, {}), target["components"].get(name, {})
+            components[name] = {
+                field: {"before": before.get(field), "after": after.get(field),
+                        "diff": (after.get(field) or 0) - (before.get(field) or 0)}
+                for field in sorted(set(before) | set(after))
+            }
+        rss = (target["rss_bytes"] - base["rss_bytes"]) if None not in (target["rss_bytes"], base["rss_bytes"]) else None
+        return {
+            "base": self._describe(base),
+            "target": self._describe(target),
+            "key_type": key_type,
+            "rss_diff_bytes": rss,
+            "traced_diff_bytes": sum(stat.size_diff for stat in stats),
+            "components": components,
+            "top_growth": [self._stat(stat) for stat in growing],
+        }
+
+    @staticmethod
+    def _stat(stat: Any) -> Dict[str, Any]:
+        """tracemalloc Statistic/StatisticDiff → dict (location은 바깥 호출부터 할당 위치까지)"""
+        item = {
+            "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        if hasattr(stat, "size_diff"):
+            item["size_diff_bytes"] = stat.size_diff
+            item["count_diff"] = stat.count_diff
+        return item
+
+
+# 싱글톤 인스턴스 (프로세스 단위)
+memory_tracker = MemoryTracker()
@@ -0,0 +1,276 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Dict, List
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# PROMETHEUS_MULTIPROC_DIR 가 설정되어 있으면 워커별 메트릭 파일을 합산하여 노출
+MULTIPROCESS_MODE = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# SLO 기준 버킷 (인터랙티브 API: p95 < 3s, LLM 호출 포함 최대 30s)
+API_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+STAGE_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0)
+SEARCH_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# API 엔드포인트별 지연시간
+HTTP_REQUEST_LATENCY = Histogram(
+    'etf_http_request_duration_seconds',
+    'HTTP request latency by endpoint',
+    ['method', 'route', 'status'],
+    buckets=API_LATENCY_BUCKETS
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    'etf_http_requests_in_progress',
+    'Number of HTTP requests currently being processed',
+    ['method'],
+    multiprocess_mode='livesum'
+)
+
+# 요청 처리 단계별 지연시간 (retrieval, llm, parsing 등)
+STAGE_LATENCY = Histogram(
+    'etf_stage_duration_seconds',
+    'Latency of individual request processing stages',
+    ['stage'],
+    buckets=STAGE_LATENCY_BUCKETS
+)
+
+# Vector DB
+VECTOR_SEARCH_LATENCY = Histogram(
+    'etf_vector_search_duration_seconds',
+    'Latency of vector similarity searches',
+    buckets=SEARCH_LATENCY_BUCKETS
+)
+INDEX_VECTORS = Gauge(
+    'etf_index_vectors',
+    'Number of vectors in the serving index',
+    multiprocess_mode='livemax'
+)
+INDEX_SIZE_BYTES = Gauge(
+    'etf_index_size_bytes',
+    'On-disk size of the serving index',
+    multiprocess_mode='livemax'
+)
+# 샤드별 검색 지연시간과 벡터 수 (샤드는 동시에 검색되므로 전체 지연시간은 가장 느린 샤드에 가까움)
+SHARD_SEARCH_LATENCY = Histogram(
+    'etf_vector_shard_search_duration_seconds',
+    'Latency of similarity searches per index shard',
+    ['shard'],
+    buckets=SEARCH_LATENCY_BUCKETS
+)
+SHARD_VECTORS = Gauge(
+    'etf_index_shard_vectors',
+    'Number of vectors per serving index shard',
+    ['shard'],
+    multiprocess_mode='livemax'
+)
+
+# 캐시 적중률: rate(hit) / rate(hit + miss)
+CACHE_REQUESTS = Counter(
+    'etf_cache_requests_total',
+    'Cache lookups by cache name and result',
+    ['cache', 'result']
+)
+
+# 유사 고객 추천 재사용: 재사용률은 etf_cache_requests_total{cache="customer_similarity"} 로 확인
+CUSTOMER_SIMILARITY_DISTANCE = Histogram(
+    'etf_customer_similarity_distance',
+    'Distance to the nearest recent customer profile at recommendation time',
+    buckets=(0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.5, 0.75, 1.0)
+)
+
+# 지식 수집(ingestion) 처리량
+INGESTED_CHUNKS = Counter(
+    'etf_ingested_chunks_total',
+    'Number of chunks added to the vector index',
+    ['source_type']
+)
+INGESTED_BYTES = Counter(
+    'etf_ingested_bytes_total',
+    'Number of source bytes ingested into the vector index',
+    ['source_type']
+)
+INGESTION_DURATION = Histogram(
+    'etf_ingestion_duration_seconds',
+    'Duration of a single ingestion run',
+    ['source_type'],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+
+# 이벤트 루프 지연
+EVENT_LOOP_LAG = Histogram(
+    'etf_event_loop_lag_seconds',
+    'Delay between scheduled and actual wake-up of the event loop',
+    buckets=LOOP_LAG_BUCKETS
+)
+
+
+# 모델 호출 스케줄러 (우선순위 클래스별 대기열)
+MODEL_QUEUE_DEPTH = Gauge(
+    'etf_model_queue_depth',
+    'Number of model calls waiting for a scheduler slot',
+    ['priority'],
+    multiprocess_mode='livesum'
+)
+MODEL_CALLS_IN_FLIGHT = Gauge(
+    'etf_model_calls_in_flight',
+    'Number of model calls currently holding a scheduler slot',
+    ['priority'],
+    multiprocess_mode='livesum'
+)
+MODEL_QUEUE_WAIT = Histogram(
+    'etf_model_queue_wait_seconds',
+    'Time a model call waited in the scheduler queue',
+    ['priority'],
+    buckets=STAGE_LATENCY_BUCKETS
+)
+MODEL_CALLS_SHED = Counter(
+    'etf_model_calls_shed_total',
+    'Model calls rejected because the priority class queue was full',
+    ['priority']
+)
+
+# cross-encoder 재순위화: 건너뛴 횟수 (budget: 시간 예산 부족, loading: 모델 로딩 중, unavailable: 모델 사용 불가)
+RERANK_SKIPPED = Counter(
+    'etf_rerank_skipped_total',
+    'Rerank stages skipped, by reason',
+    ['reason']
+)
+
+# 감사 로그: 쓰기 대기 중인 기록 수와 기록/실패 건수
+AUDIT_QUEUE_DEPTH = Gauge(
+    'etf_audit_queue_depth',
+    'Number of audit records waiting to be flushed',
+    multiprocess_mode='livesum'
+)
+AUDIT_RECORDS_WRITTEN = Counter(
+    'etf_audit_records_written_total',
+    'Number of audit records flushed to the audit store',
+    ['kind']
+)
+AUDIT_FLUSH_ERRORS = Counter(
+    'etf_audit_flush_errors_total',
+    'Number of failed audit store flushes (records are retried)'
+)
+
+# 메모리: 워커별 RSS와 구성 요소(인덱스, docstore, 캐시)별 항목 수/크기
+# (멀티 워커에서도 워커별로 구분되도록 liveall, 합계는 sum by (component)로 조회)
+PROCESS_RSS_BYTES = Gauge(
+    'etf_process_resident_memory_bytes',
+    'Resident set size of the worker process',
+    multiprocess_mode='liveall'
+)
+MEMORY_COMPONENT_ITEMS = Gauge(
+    'etf_memory_component_items',
+    'Number of items held by an in-memory component (index vectors, docstore rows, cache entries)',
+    ['component'],
+    multiprocess_mode='liveall'
+)
+MEMORY_COMPONENT_BYTES = Gauge(
+    'etf_memory_component_bytes',
+    'Size of a component in bytes (index/docstore files, price arrays)',
+    ['component'],
+    multiprocess_mode='liveall'
+)
+# tracemalloc 추적 중인 메모리 (ETF_MEMORY_DIAGNOSTICS=1 인 경우)
+TRACED_MEMORY_BYTES = Gauge(
+    'etf_traced_memory_bytes',
+    'Memory currently traced by tracemalloc',
+    multiprocess_mode='livesum'
+)
+
+
+@contextmanager
+def observe_stage(stage: str):
+    """요청 처리 단계의 지연시간을 기록합니다."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool):
+    """캐시 조회 결과를 기록합니다."""
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_index_stats(shard_vectors: Dict[str, int], index_paths: List[str]):
+    """서빙 인덱스의 (샤드별) 벡터 수와 디스크 크기를 기록합니다."""
+    INDEX_VECTORS.set(sum(shard_vectors.values()))
+    for shard, vector_count in shard_vectors.items():
+        SHARD_VECTORS.labels(shard=shard).set(vector_count)
+    size = 0
+    for index_path in index_paths:
+        try:
+            size += os.path.getsize(index_path)
+        except OSError:
+            pass
+    INDEX_SIZE_BYTES.set(size)
+
+
+async def metrics_middleware(request: Request, call_next):
+    """엔드포인트(라우트 템플릿)별 지연시간을 기록하는 미들웨어"""
+    method = request.method
+    start = time.perf_counter()
+    status = 500
+    in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method=method)
+    in_progress.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        in_progress.dec()
+        # 라우트 템플릿을 사용하여 경로 파라미터로 인한 라벨 폭증을 방지
+        matched = request.scope.get("route")
+        route = getattr(matched, "path", None) or "unmatched"
+        HTTP_REQUEST_LATENCY.labels(method=method, route=route, status=str(status)).observe(
+            time.perf_counter() - start
+        )
+
+
+def metrics_endpoint(request: Request) -> Response:
+    """Prometheus 스크레이프용 /metrics 엔드포인트"""
+    if MULTIPROCESS_MODE:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead():
+    """워커 종료 시 live* 게이지에서 현재 프로세스 값을 제거합니다."""
+    if MULTIPROCESS_MODE:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """
+    주기적으로 sleep 하고 실제로 깨어난 시각과의 차이를 측정하여
+    이벤트 루프가 블로킹된 시간을 기록합니다.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - scheduled)
+        EVENT_LOOP_LAG.observe(lag)
+        if lag > 1.0:
+            logger.warning(f"이벤트 루프 지연 감지: {lag:.3f}s")
@@ -0,0 +1,80 @@
+import os
+import re
+import sys
+import time
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from config import BASE_DIR
+
+# python -X importtime 출력: 'import time:  self [us] | cumulative | imported package'
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$")
+
+
+def _measure_imports(module: str = "main") -> List[Tuple[int, int, int, str]]:
+    """새 인터프리터에서 module을 import하며 -X importtime 결과를 (깊이, self us, 누적 us, 모듈명) 목록으로 반환합니다."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} import 실패:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append(((len(indent) - 1) // 2, int(self_us), int(cumulative_us), name))
+    return rows
+
+
+def _summarize_imports(rows: List[Tuple[int, int, int, str]], module: str, top: int) -> List[str]:
+    # -X importtime은 하위 모듈을 상위 모듈보다 먼저 출력하므로, module 행 직전의 깊이 1 행들이 직접 import한 모듈
+    root, direct, children = None, [], []
+    for row in rows:
+        if row[0] == 0:
+            if row[3] == module:
+                root, direct = row, children
+            children = []
+        elif row[0] == 1:
+            children.append(row)
+    lines = [f"[import] {module}: {root[2] / 1e6:.3f}s" if root else f"[import] {module}: 측정 실패"]
+
+    # module이 직접 import한 모듈별 누적 시간
+    lines.append("  직접 import (누적):")
+    direct = sorted(direct, key=lambda row: row[2], reverse=True)
+    for _, _, cumulative_us, name in direct[:top]:
+        lines.append(f"    {cumulative_us / 1e6:8.3f}s  {name}")
+
+    # 최상위 패키지별 self 시간 합계 (어떤 의존성이 무거운지)
+    by_package: Dict[str, int] = defaultdict(int)
+    for _, self_us, _, name in rows:
+        by_package[name.split(".")[0]] += self_us
+    lines.append("  패키지별 (self 합계):")
+    for name, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"    {self_us / 1e6:8.3f}s  {name}")
+    return lines
+
+
+def profile_startup(module: str = "main", top: int = 15) -> str:
+    """
+    서버 시작 비용을 import 단계와 리소스 초기화(워밍업) 단계로 나누어 보고서를 만듭니다.
+
+    - import: 새 인터프리터에서 `python -X importtime -c "import main"`을 실행하여 측정
+      (헬스 체크를 받을 수 있게 되기까지의 시간)
+    - 초기화: 등록된 지연 초기화 리소스(vector_db, model_router, tiktoken 등)를 현재 프로세스에서 순서대로 생성하며 측정
+    """
+    lines = _summarize_imports(_measure_imports(module), module, top)
+
+    from services.warmup import warm_up
+    started = time.perf_counter()
+    status = warm_up()
+    lines.append(f"[init] 워밍업 합계: {time.perf_counter() - started:.3f}s")
+    for name, entry in status.items():
+        seconds = f"{entry['init_seconds']:8.3f}s" if entry["init_seconds"] is not None else "       -"
+        state = "ready" if entry["ready"] else f"failed: {entry['error']}"
+        lines.append(f"    {seconds}  {name} ({state})")
+    return "\n".join(lines)
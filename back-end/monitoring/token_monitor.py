@@ -1,8 +1,9 @@
-from tiktoken import get_encoding
-from prometheus_client import Counter, Gauge, Histogram
-from langchain.callbacks import get_openai_callback
+from prometheus_client import Counter, Histogram
 import logging
 from typing import Dict, Any
+from monitoring.metrics import STAGE_LATENCY_BUCKETS
+from services.warmup import LazyResource
+from services.audit_log import add_token_usage
 
 # 로깅 설정
 logger = logging.getLogger(__name__)
@@ -28,18 +29,57 @@ TOKEN_COST = Counter(
 RESPONSE_TIME = Histogram(
     'openai_response_time_seconds',
     'Response time for OpenAI API calls',
-    ['model', 'operation']
+    ['model', 'operation'],
+    buckets=STAGE_LATENCY_BUCKETS
 )
-CURRENT_TOKENS = Gauge(
-    'openai_current_tokens',
-    'Current number of tokens being used',
-    ['model', 'operation']
+# 멀티 워커에서 마지막 호출 값으로 덮어써지는 Gauge 대신 호출당 분포를 기록
+TOKENS_PER_CALL = Histogram(
+    'openai_tokens_per_call',
+    'Number of tokens used per call',
+    ['model', 'operation'],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+)
+
+# 작업(라우트)별 모델 호출 메트릭 (services/model_router.py)
+# 승격률 = outcome="escalated" / 전체, 라우트별 비용 = 호출마다 실제 사용한 모델 기준
+MODEL_ROUTE_CALLS = Counter(
+    'openai_route_calls_total',
+    'LLM calls per route and model by outcome (accepted, escalated, failed)',
+    ['operation', 'model', 'outcome']
+)
+MODEL_ROUTE_LATENCY = Histogram(
+    'openai_route_latency_seconds',
+    'Latency of one LLM attempt per route and model',
+    ['operation', 'model'],
+    buckets=STAGE_LATENCY_BUCKETS
+)
+MODEL_ROUTE_TOKENS = Counter(
+    'openai_route_tokens_total',
+    'Tokens used per route and model',
+    ['operation', 'model']
 )
+MODEL_ROUTE_COST = Counter(
+    'openai_route_cost_total',
+    'Cost in USD per route and model',
+    ['operation', 'model']
+)
+
+# track_usage는 함수(요청) 단위 합계이며, 함수 안에서 여러 모델이 라우팅되므로 model 라벨은 고정값
+ROUTED_MODEL_LABEL = "routed"
+
+def _load_encoding():
+    from tiktoken import get_encoding
+    return get_encoding("cl100k_base")
 
 class TokenMonitor:
     def __init__(self):
-        self.encoding = get_encoding("cl100k_base")  # GPT-4, GPT-3.5-turbo용 인코딩
+        # GPT-4, GPT-3.5-turbo용 인코딩 (인코딩 파일을 읽거나 내려받으므로 처음 사용할 때 또는 워밍업 시 로드)
+        self._encoding = LazyResource("tiktoken", _load_encoding)
         logger.info("TokenMonitor initialized")
+
+    @property
+    def encoding(self):
+        return self._encoding.get()
         
     def count_tokens(self, text: str) -> int:
         token_count = len(self.encoding.encode(text))
@@ -48,10 +88,11 @@ class TokenMonitor:
     
     def track_usage(self, func):
         async def wrapper(*args, **kwargs):
+            from langchain.callbacks import get_openai_callback
             logger.info(f"Starting token usage tracking for function: {func.__name__}")
             with get_openai_callback() as cb:
                 logger.info("OpenAI callback initialized")
-                with RESPONSE_TIME.labels(model="gpt-3.5-turbo", operation=func.__name__).time():
+                with RESPONSE_TIME.labels(model=ROUTED_MODEL_LABEL, operation=func.__name__).time():
                     result = await func(*args, **kwargs)
                     
                     # 토큰 사용량 기록
@@ -73,23 +114,47 @@ class TokenMonitor:
                     # Prometheus 메트릭 업데이트
                     logger.info("Updating Prometheus metrics...")
                     TOKEN_USAGE.labels(
-                        model="gpt-3.5-turbo",
+                        model=ROUTED_MODEL_LABEL,
                         operation=func.__name__
                     ).inc(token_count)
                     
                     TOKEN_COST.labels(
-                        model="gpt-3.5-turbo",
+                        model=ROUTED_MODEL_LABEL,
                         operation=func.__name__
                     ).inc(cost)
                     
-                    CURRENT_TOKENS.labels(
-                        model="gpt-3.5-turbo",
+                    TOKENS_PER_CALL.labels(
+                        model=ROUTED_MODEL_LABEL,
                         operation=func.__name__
-                    ).set(token_count)
+                    ).observe(token_count)
+                    
+                    # 감사 로그에 요청 단위 토큰 사용량 기록
+                    add_token_usage(prompt_tokens, completion_tokens, token_count, cost)
                     
                     logger.info("Token usage tracking completed")
                     return result
         return wrapper
 
+    def record_route_call(
+        self,
+        operation: str,
+        model: str,
+        outcome: str,
+        seconds: float,
+        total_tokens: int = 0,
+        cost: float = 0.0
+    ):
+        """라우팅된 LLM 호출 한 번(한 단계 시도)의 결과, 지연시간, 토큰 수, 비용을 기록합니다."""
+        MODEL_ROUTE_CALLS.labels(operation=operation, model=model, outcome=outcome).inc()
+        MODEL_ROUTE_LATENCY.labels(operation=operation, model=model).observe(seconds)
+        if total_tokens:
+            MODEL_ROUTE_TOKENS.labels(operation=operation, model=model).inc(total_tokens)
+        if cost:
+            MODEL_ROUTE_COST.labels(operation=operation, model=model).inc(cost)
+        logger.info(
+            f"LLM route {operation}: model={model}, outcome={outcome}, "
+            f"latency={seconds:.2f}s, tokens={total_tokens}, cost=${cost:.6f}"
+        )
+
 # 싱글톤 인스턴스 생성
 token_monitor = TokenMonitor() 
\ No newline at end of file
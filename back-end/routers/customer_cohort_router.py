@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Query
+from services.customer_cohorts import DIMENSION_NAMES, customer_cohorts
+
+router = APIRouter(prefix="/api/v1/cohorts", tags=["customer-cohorts"])
+
+# 집계는 고객 저장소가 파일 변경을 반영할 때 함께 갱신되므로 조회 시에는 파일 크기/수정 시각만 확인
+# (추가된 행을 읽는 경우가 있어 스레드풀에서 처리)
+
+def _ensure_customers():
+    if not customer_cohorts.store.available:
+        raise HTTPException(status_code=404, detail="고객 데이터 파일을 찾을 수 없습니다.")
+
+@router.get("")
+def get_cohort_summary():
+    """전체 고객 수, ETF 보유/미보유 고객 수, 차원별 값 분포를 반환합니다."""
+    _ensure_customers()
+    return customer_cohorts.summary()
+
+@router.get("/group-by")
+def group_customers(
+    by: str = Query(..., description=f"집계 차원 (쉼표로 구분): {', '.join(DIMENSION_NAMES)}")
+):
+    """
+    차원 조합별 고객 수를 반환합니다. (예: by=risk_tolerance,investment_horizon)
+
+    1~2개 차원의 집계는 증분 유지되므로 고객 수와 관계없이 바로 반환되며, 3개 이상은 전체 차원의
+    결합 분포에서 계산하여 다음 고객 데이터 변경 전까지 재사용합니다.
+    """
+    _ensure_customers()
+    dimensions = [name.strip() for name in by.split(",") if name.strip()]
+    try:
+        return customer_cohorts.group_by(dimensions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/holdings")
+def get_popular_holdings(limit: int = Query(20, ge=1, le=500)):
+    """보유 고객이 많은 ETF와 보유 조합을 반환합니다."""
+    _ensure_customers()
+    return customer_cohorts.holdings(limit)
+
+@router.get("/profile-buckets")
+def get_profile_buckets(top: int = Query(20, ge=0, le=500)):
+    """
+    프로필 버킷(위험 감내도, 투자 성향, 투자 기간, 월 투자액 구간, 보유 ETF 조합) 카디널리티를 반환합니다.
+    버킷 수, 크기 1인 버킷 수, 버킷 크기 분포로 추천 재사용 캐시의 적중률 상한과 캐시 크기를 가늠할 수 있습니다.
+    """
+    _ensure_customers()
+    return customer_cohorts.profile_buckets(top)
@@ -0,0 +1,99 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from monitoring.loop_diagnostics import loop_stall_detector, sample_profile
+from monitoring.memory_diagnostics import memory_tracker, update_memory_gauges
+from config import PROFILE_MAX_SECONDS
+from typing import Optional
+import logging
+import gc
+
+router = APIRouter(prefix="/api/v1/diagnostics", tags=["diagnostics"])
+logger = logging.getLogger(__name__)
+
+@router.get("/loop-stalls")
+def get_loop_stalls(limit: int = Query(20, ge=1, le=100)):
+    """최근 감지된 이벤트 루프 블로킹과 당시의 스택 샘플을 반환합니다."""
+    return {
+        "threshold_ms": loop_stall_detector.threshold * 1000,
+        "stalls": loop_stall_detector.recent_stalls(limit)
+    }
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    seconds: float = Query(5.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    loop_only: bool = Query(False)
+):
+    """
+    지정된 시간 동안 샘플링 프로파일을 수집합니다.
+    
+    응답은 collapsed stack 형식으로, flamegraph.pl 또는 speedscope에 그대로 입력할 수 있습니다.
+    
+    Args:
+        seconds: 샘플링 시간
+        interval_ms: 샘플링 간격 (밀리초)
+        loop_only: 이벤트 루프 스레드만 샘플링할지 여부
+    """
+    if seconds > PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"샘플링 시간은 최대 {PROFILE_MAX_SECONDS}초입니다.")
+    
+    logger.info(f"샘플링 프로파일 시작: {seconds}s, {interval_ms}ms 간격")
+    # 샘플러는 별도 스레드에서 실행하여 프로파일링 중에도 루프가 요청을 처리하도록 함
+    return await run_in_threadpool(
+        sample_profile,
+        seconds,
+        interval_ms / 1000,
+        loop_stall_detector.loop_thread_id if loop_only else None
+    )
+
+# 메모리 진단 (ETF_MEMORY_DIAGNOSTICS=1 인 경우에만 등록)
+memory_router = APIRouter(prefix="/api/v1/diagnostics/memory", tags=["diagnostics"])
+
+@memory_router.get("")
+def get_memory_status():
+    """현재 RSS, 구성 요소(인덱스, docstore, 캐시)별 크기, tracemalloc 추적량, 보관 중인 스냅샷 목록을 반환합니다."""
+    state = update_memory_gauges()
+    return {
+        **state,
+        "tracing": memory_tracker.tracing,
+        "gc_counts": gc.get_count(),
+        "snapshots": memory_tracker.snapshots(),
+    }
+
+@memory_router.post("/snapshots")
+async def take_memory_snapshot(label: Optional[str] = None, top: int = Query(10, ge=0, le=100)):
+    """
+    tracemalloc 스냅샷을 저장하고 크기가 큰 할당 위치를 반환합니다. (최근 MEMORY_SNAPSHOT_LIMIT개 보관)
+    
+    힙이 크면 수 초가 걸릴 수 있으므로 스레드풀에서 실행합니다.
+    """
+    try:
+        return await run_in_threadpool(memory_tracker.snapshot, label, top)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@memory_router.get("/snapshots")
+def list_memory_snapshots():
+    return {"snapshots": memory_tracker.snapshots()}
+
+@memory_router.get("/diff")
+async def diff_memory_snapshots(
+    base: int = Query(..., description="기준 스냅샷 ID"),
+    target: Optional[int] = Query(None, description="비교할 스냅샷 ID (없으면 지금 시점)"),
+    key_type: str = Query("lineno", description="lineno, filename, traceback"),
+    limit: int = Query(20, ge=1, le=200)
+):
+    """
+    두 시점 사이에 증가한 할당 위치(증가량 순)와 RSS/구성 요소 크기 변화를 반환합니다.
+    
+    예: 지식 업데이트 전후로 스냅샷을 찍어 비교하면 인덱스/docstore 증가분과 그 밖의 증가분을 구분할 수 있습니다.
+    """
+    try:
+        return await run_in_threadpool(memory_tracker.diff, base, target, key_type, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,139 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from services.etf_catalog import NUMERIC_COLUMNS, SORT_COLUMNS, etf_catalog
+from config import ETF_CATALOG_CACHE_MAX_AGE
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional
+
+router = APIRouter(prefix="/api/v1/etfs", tags=["etf-catalog"])
+
+# 카탈로그는 워밍업 시 미리 로드되고 조회는 메모리 인덱스만 사용하므로 이벤트 루프에서 바로 처리 (스레드풀 전환 없음)
+
+def _cache_headers() -> Dict[str, str]:
+    """카탈로그 파일 버전에 연결된 캐시 헤더"""
+    return {
+        "ETag": f'"{etf_catalog.content_hash}"',
+        "Last-Modified": formatdate(etf_catalog.version, usegmt=True),
+        "Cache-Control": f"public, max-age={ETF_CATALOG_CACHE_MAX_AGE}",
+    }
+
+def _not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """If-None-Match(우선) 또는 If-Modified-Since 조건으로 클라이언트 캐시가 최신인지 확인합니다."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = headers["ETag"]
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP 날짜는 초 단위
+        return int(etf_catalog.version) <= since
+    return False
+
+def _cached_response(request: Request, content: Dict) -> Response:
+    headers = _cache_headers()
+    if _not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in etf_catalog.api_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 필드: {', '.join(unknown)}")
+    return requested
+
+def _ensure_catalog():
+    if etf_catalog.version is None:
+        raise HTTPException(status_code=503, detail="ETF 카탈로그를 불러올 수 없습니다.")
+
+@router.get("")
+async def list_etfs(
+    request: Request,
+    asset_class: Optional[List[str]] = Query(None, description="자산 대분류 (주식, 원자재, 부동산)"),
+    asset_medium: Optional[List[str]] = Query(None, description="자산 중분류 (업종섹터, 금속, 리츠 등)"),
+    asset_small: Optional[List[str]] = Query(None, description="자산 소분류 (정보기술, 헬스케어 등)"),
+    market: Optional[List[str]] = Query(None, description="시장 대분류 (국내, 해외, 국내&해외)"),
+    region: Optional[List[str]] = Query(None, description="시장 중분류 (코스피, 북미, 아시아 등)"),
+    company: Optional[List[str]] = Query(None, description="자산운용사"),
+    theme: Optional[List[str]] = Query(None, description="테마 (IT펀드, 헬스케어 등)"),
+    min_expense: Optional[float] = Query(None, ge=0, description="최소 총보수(%)"),
+    max_expense: Optional[float] = Query(None, ge=0, description="최대 총보수(%)"),
+    min_aum: Optional[float] = Query(None, ge=0, description="최소 순자산총액(원)"),
+    max_aum: Optional[float] = Query(None, ge=0, description="최대 순자산총액(원)"),
+    min_dividend_yield: Optional[float] = Query(None, description="최소 분배율(%)"),
+    max_dividend_yield: Optional[float] = Query(None, description="최대 분배율(%)"),
+    sort: str = Query("-aum", description="정렬 컬럼 (앞에 '-'를 붙이면 내림차순)"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=500),
+    fields: Optional[str] = Query(None, description="응답에 포함할 컬럼 (쉼표로 구분, 예: etf_code,etf_name,aum)")
+):
+    """
+    ETF 카탈로그를 필터링/정렬/페이지네이션하여 조회합니다. (LLM 호출 없음)
+
+    같은 필터를 여러 번 지정하면 OR(예: asset_class=주식&asset_class=부동산), 서로 다른 필터는 AND로 결합합니다.
+    범위 필터는 경계를 포함하며, 값이 없는 ETF는 제외됩니다.
+    응답의 ETag/Last-Modified는 카탈로그 파일 버전을 따르며, If-None-Match/If-Modified-Since가
+    일치하면 304를 반환합니다.
+    """
+    _ensure_catalog()
+    column = sort.lstrip("-")
+    if column not in SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"정렬 가능한 컬럼: {', '.join(SORT_COLUMNS)}")
+    projection = _parse_fields(fields)
+    # 캐시가 최신이면 조회 없이 304
+    headers = _cache_headers()
+    if _not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+
+    filters = {
+        "asset_class": asset_class,
+        "asset_medium": asset_medium,
+        "asset_small": asset_small,
+        "market": market,
+        "region": region,
+        "company": company,
+        "theme": theme,
+    }
+    ranges = {
+        "total_expense": (min_expense, max_expense),
+        "aum": (min_aum, max_aum),
+        "dividend_yield": (min_dividend_yield, max_dividend_yield),
+    }
+    total, items = etf_catalog.query(
+        filters=filters,
+        ranges=ranges,
+        sort=column,
+        descending=sort.startswith("-"),
+        offset=offset,
+        limit=limit,
+        fields=projection
+    )
+    return JSONResponse(content={"total": total, "offset": offset, "limit": limit, "items": items}, headers=headers)
+
+@router.get("/facets")
+async def get_etf_facets(request: Request):
+    """범주형 필터별 선택 가능한 값과 ETF 수, 범위/정렬에 사용할 수 있는 컬럼을 반환합니다."""
+    _ensure_catalog()
+    return _cached_response(request, {
+        "filters": etf_catalog.facets(),
+        "ranges": list(NUMERIC_COLUMNS),
+        "sort": list(SORT_COLUMNS),
+        "fields": etf_catalog.api_fields,
+    })
+
+@router.get("/{etf_code}")
+async def get_etf(request: Request, etf_code: str, fields: Optional[str] = None):
+    """ETF 코드('A091160' 또는 '091160')로 카탈로그 항목을 조회합니다."""
+    _ensure_catalog()
+    projection = _parse_fields(fields)
+    item = etf_catalog.get_api_record(etf_code, projection)
+    if item is None:
+        raise HTTPException(status_code=404, detail="ETF를 찾을 수 없습니다.")
+    return _cached_response(request, item)
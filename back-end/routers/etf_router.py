@@ -1,21 +1,60 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from services.etf_service import recommend_etf, generate_rebalance_report, check_openai_api_key, vector_db
+from fastapi import APIRouter, HTTPException, UploadFile, File, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from services.etf_service import recommend_etf, generate_rebalance_report, check_openai_api_key, vector_db, vector_search
+from services.catalog_recommender import recommend_from_catalog
+from services.deadline import request_deadline
+from services.model_scheduler import BATCH, ModelOverloadedError, with_priority
+from services.customer_similarity import customer_index
+from services.customer_store import customer_store
+from services.warmup import is_ready, readiness
+from services import audit_log as audit
+from services.audit_log import REBALANCE, RECOMMENDATION, audit_log
+from services.job_store import job_store, report_progress
+from services.upload_storage import (
+    StoredUpload,
+    UploadTooLargeError,
+    commit_upload,
+    discard_upload,
+    extract_pdfs_from_zip,
+    rollback_upload,
+    safe_filename,
+    stream_upload_to_disk,
+)
 from schemas import CustomerProfile, ETFRecommendation, RebalanceReport, RebalanceReportRequest, CustomerRequest, FinancialStatus
-import pandas as pd
-import os
-import shutil
-from config import BASE_DIR, DOCS_PATH
+from config import BULK_MAX_FILES, BULK_MAX_TOTAL_BYTES, REQUEST_DEADLINE_SECONDS
 from datetime import datetime
 import logging
-from typing import Dict, Any
+import zipfile
+from typing import Dict, Any, List, Optional
 
 router = APIRouter(prefix="/api/v1", tags=["etf"])
 logger = logging.getLogger(__name__)
 
+def _deadline_seconds(request_timeout: Optional[float]) -> float:
+    """클라이언트가 X-Request-Timeout 헤더로 보낸 시간 예산을 서버 기본값 이내로 제한합니다."""
+    if request_timeout is None or request_timeout <= 0:
+        return REQUEST_DEADLINE_SECONDS
+    return min(request_timeout, REQUEST_DEADLINE_SECONDS)
+
 @router.get("/health")
 def health_check():
     return {"status": "healthy"}
 
+@router.get("/health/ready")
+def readiness_check():
+    """
+    Vector DB, LLM 클라이언트 등 지연 초기화 리소스가 모두 준비되었는지 확인합니다.
+    준비 중이면 503을 반환하므로 로드밸런서/오케스트레이터의 readiness probe로 사용합니다.
+    (/health 는 프로세스가 살아 있는지만 확인하는 liveness probe)
+    """
+    status = readiness()
+    ready = is_ready(status)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "warming_up", "resources": status}
+    )
+
 @router.get("/health/openai")
 def openai_health_check():
     try:
@@ -28,133 +67,302 @@ def openai_health_check():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/customer-etf-analysis", response_model=Dict[str, Any])
-async def analyze_customer_etf(request: CustomerRequest) -> Dict[str, Any]:
+async def analyze_customer_etf(
+    request: CustomerRequest,
+    x_request_timeout: Optional[float] = Header(None)
+) -> Dict[str, Any]:
     """
     고객의 ETF 포트폴리오를 분석하고 추천합니다.
     
+    요청 시간 예산(X-Request-Timeout 헤더, 최대 REQUEST_DEADLINE_SECONDS)은 검색과 LLM 호출까지
+    전파되며, 예산 안에 LLM 응답을 받을 수 없으면 카탈로그 기반 추천(degraded=true)을 반환합니다.
+    반환한 결과는 감사 로그에 기록됩니다.
+    
     Args:
         request: 고객 정보 요청
+        x_request_timeout: 요청 시간 예산(초)
         
     Returns:
         Dict[str, Any]: ETF 분석 결과
     """
+    async with audit_log.audited(
+        RECOMMENDATION, request.customer_id, "/customer-etf-analysis", request.model_dump()
+    ) as entry:
+        entry["result"] = await _analyze_customer_etf(request, x_request_timeout)
+    return entry["result"]
+
+def _get_customer(customer_id: str) -> Dict[str, Any]:
+    """고객 저장소에서 고객 레코드를 조회합니다. (파일에 추가된 행은 조회 시 반영)"""
+    if not customer_store.available:
+        raise HTTPException(status_code=404, detail="고객 데이터 파일을 찾을 수 없습니다.")
+    customer = customer_store.get(customer_id)
+    if customer is None:
+        raise HTTPException(status_code=404, detail="고객을 찾을 수 없습니다.")
+    return customer
+
+def _job_accepted(job: Dict[str, Any]) -> JSONResponse:
+    """작업 제출 응답 (202). 같은 요청의 작업이 이미 진행 중이면 created=false와 함께 기존 작업을 반환합니다."""
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job["job_id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "created": job["created"],
+            "status_url": f"{router.prefix}/jobs/{job['job_id']}"
+        }
+    )
+
+@router.post("/jobs/customer-etf-analysis", status_code=202)
+async def submit_customer_etf_analysis(
+    request: CustomerRequest,
+    x_request_timeout: Optional[float] = Header(None)
+):
+    """
+    고객 ETF 분석을 백그라운드 작업으로 실행하고 job_id를 즉시 반환합니다.
+    
+    결과와 진행률은 GET /jobs/{job_id}로 조회합니다. 같은 고객의 분석이 진행 중이면
+    새로 실행하지 않고 진행 중인 작업을 반환합니다.
+    """
+    job = job_store.submit(
+        "customer_etf_analysis",
+        lambda: analyze_customer_etf(request, x_request_timeout=x_request_timeout),
+        dedupe_key=f"customer_etf_analysis:{request.customer_id}"
+    )
+    return _job_accepted(job)
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    백그라운드 작업의 상태(queued/running/succeeded/failed), 진행률(0~1), 단계 메시지를 반환합니다.
+    완료된 작업은 result(동기 API와 같은 응답), 실패한 작업은 error와 status_code를 포함합니다.
+    """
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다. (만료되었거나 잘못된 job_id)")
+    return job
+
+async def _analyze_customer_etf(request: CustomerRequest, x_request_timeout: Optional[float]) -> Dict[str, Any]:
+    risk_tolerance = None
+    financial_status = None
     try:
         logger.info(f"ETF 분석 요청 수신: customer_id={request.customer_id}, name={request.name}")
+        report_progress(0.05, "고객 정보를 조회하고 있습니다.")
         
-        # 고객 데이터 파일 경로
-        customer_data_path = os.path.join(BASE_DIR, "data", "customer", "customer_data_20250420_004757.csv")
-        
-        if not os.path.exists(customer_data_path):
-            raise HTTPException(status_code=404, detail="고객 데이터 파일을 찾을 수 없습니다.")
-        
-        # CSV 파일에서 고객 정보 읽기
-        df = pd.read_csv(customer_data_path)
-        customer_data = df[df['customer_id'] == request.customer_id]
-        
-        if customer_data.empty:
-            raise HTTPException(status_code=404, detail="고객을 찾을 수 없습니다.")
+        customer = _get_customer(request.customer_id)
         
         # 고객 프로필 정보 가져오기
-        financial_status = eval(customer_data['financial_status'].iloc[0])
-        risk_tolerance = customer_data['risk_tolerance'].iloc[0]
-        age = customer_data['age'].iloc[0]
-        has_etf = customer_data['has_etf'].iloc[0]
-        current_etf_holdings = customer_data['current_etf_holdings'].iloc[0]
+        financial_status = customer['financial_status']
+        risk_tolerance = customer['risk_tolerance']
+        age = customer['age']
+        has_etf = customer['has_etf']
+        current_etf_holdings = customer['current_etf_holdings']
+        audit.note_inputs(
+            customer_id=request.customer_id,
+            name=request.name,
+            risk_tolerance=risk_tolerance,
+            age=age,
+            financial_status=financial_status,
+            current_etf_holdings=current_etf_holdings,
+            investment_tendency=customer['investment_tendency'],
+            investment_horizon=customer['investment_horizon'],
+        )
         
         # ETF 보유 여부에 따른 처리
-        if has_etf and pd.notna(current_etf_holdings):
-            # ETF 보유 고객의 경우 리밸런싱 리포트 생성
-            logger.info(f"ETF 보유 고객 리밸런싱 리포트 생성: {request.customer_id}")
-            result = await get_rebalance_report(RebalanceReportRequest(
-                customer_id=request.customer_id,
-                current_etf_holdings=current_etf_holdings,
-                risk_tolerance=risk_tolerance,
-                age=age,
-                financial_status=financial_status
-            ))
-        else:
-            # ETF 미보유 고객의 경우 ETF 추천
-            logger.info(f"ETF 미보유 고객 추천: {request.customer_id}")
-            result = await recommend_etf(
-                customer_id=request.customer_id,
-                risk_tolerance=risk_tolerance,
-                age=age,
-                financial_status=financial_status,
-                etfs_owned=None
-            )
+        with request_deadline(_deadline_seconds(x_request_timeout)):
+            if has_etf and current_etf_holdings:
+                # ETF 보유 고객의 경우 리밸런싱 리포트 생성
+                logger.info(f"ETF 보유 고객 리밸런싱 리포트 생성: {request.customer_id}")
+                result = await get_rebalance_report(RebalanceReportRequest(
+                    customer_id=request.customer_id,
+                    current_etf_holdings=current_etf_holdings,
+                    risk_tolerance=risk_tolerance,
+                    age=age,
+                    financial_status=financial_status
+                ), x_request_timeout=x_request_timeout)
+            else:
+                # ETF 미보유 고객의 경우 ETF 추천
+                logger.info(f"ETF 미보유 고객 추천: {request.customer_id}")
+                result = await recommend_etf(
+                    customer_id=request.customer_id,
+                    risk_tolerance=risk_tolerance,
+                    age=age,
+                    financial_status=financial_status,
+                    etfs_owned=None,
+                    investment_tendency=customer['investment_tendency'],
+                    investment_horizon=customer['investment_horizon']
+                )
         
-        logger.info(f"ETF 분석 완료: {result}")
+        logger.info(
+            f"ETF 분석 완료: customer_id={request.customer_id}, "
+            f"degraded={result.get('degraded', False)}, reused={result.get('reused', False)}"
+        )
         return result
         
     except HTTPException as e:
         logger.error(f"HTTP 에러 발생: {str(e)}")
         raise
         
+    except ModelOverloadedError as e:
+        # 429 응답은 main.py의 예외 핸들러에서 Retry-After 헤더와 함께 반환
+        logger.warning(f"ETF 분석 요청 거절: {str(e)}")
+        raise
+        
     except Exception as e:
         logger.error(f"ETF 분석 중 오류 발생: {str(e)}")
-        # 기본 ETF 추천 반환
-        return {
-            "recommendations": ["SPY - SPDR S&P 500 ETF Trust", "QQQ - Invesco QQQ Trust", "VTI - Vanguard Total Stock Market ETF"],
-            "reasons": "죄송합니다. 현재 시스템에 일시적인 오류가 발생했습니다. 잠시 후 다시 시도해주시기 바랍니다."
-        }
+        # 고객 프로필(읽지 못했다면 중간 위험도) 기준의 카탈로그 기반 추천 반환
+        return recommend_from_catalog(risk_tolerance or "Medium", financial_status)
 
 @router.post("/recommend-etf", response_model=ETFRecommendation)
-async def get_etf_recommendation(customer: CustomerProfile):
+async def get_etf_recommendation(customer: CustomerProfile, x_request_timeout: Optional[float] = Header(None)):
     try:
         # Convert comma-separated string to list
         etfs_owned = customer.current_etf_holdings.split(',') if customer.current_etf_holdings else []
         
-        result = await recommend_etf(
-            customer_id=customer.customer_id,
-            risk_tolerance=customer.risk_tolerance,
-            age=customer.age,
-            financial_status=customer.financial_status,
-            etfs_owned=etfs_owned
-        )
+        async with audit_log.audited(
+            RECOMMENDATION, customer.customer_id, "/recommend-etf", customer.model_dump()
+        ) as entry:
+            with request_deadline(_deadline_seconds(x_request_timeout)):
+                result = await recommend_etf(
+                    customer_id=customer.customer_id,
+                    risk_tolerance=customer.risk_tolerance,
+                    age=customer.age,
+                    financial_status=customer.financial_status.model_dump(),
+                    etfs_owned=etfs_owned,
+                    investment_tendency=customer.investment_tendency,
+                    investment_horizon=customer.investment_horizon
+                )
+            entry["result"] = result
         return ETFRecommendation(**result)
+    except ModelOverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/customer-similarity/stats")
+def customer_similarity_stats():
+    """
+    유사 고객 추천 재사용 통계를 반환합니다.
+    재사용률과 최근접 거리 분포를 보고 SIMILARITY_DISTANCE_THRESHOLD를 조정할 수 있습니다. (워커 프로세스 단위)
+    """
+    return customer_index.stats()
+
+@router.get("/vector-shards")
+def get_vector_shards():
+    """벡터 인덱스의 샤드 구성과 샤드별 벡터 수, 인덱스 크기, 세대 값을 반환합니다."""
+    return vector_search.shard_stats()
+
+@router.post("/vector-shards/{shard}/rebuild", status_code=202)
+async def rebuild_vector_shard(shard: str):
+    """
+    인덱스 샤드 하나를 백그라운드 작업으로 다시 빌드합니다. (저장된 벡터를 재구성하므로 임베딩 호출 없음)
+    
+    다른 샤드는 재빌드 중에도 그대로 검색됩니다. 진행 상태와 결과는 GET /jobs/{job_id}로 조회합니다.
+    """
+    stats = await run_in_threadpool(vector_search.shard_stats)
+    if shard not in stats["shards"]:
+        raise HTTPException(status_code=404, detail="샤드를 찾을 수 없습니다.")
+    job = job_store.submit(
+        "vector_shard_rebuild",
+        lambda: run_in_threadpool(vector_db.rebuild_shard, shard),
+        dedupe_key=f"vector_shard_rebuild:{shard}"
+    )
+    return _job_accepted(job)
+
+@router.get("/audit/records")
+def get_audit_records(
+    customer_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    kind: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    """
+    추천/리밸런싱 감사 기록을 고객과 기간으로 조회합니다. (최신순)
+    
+    Args:
+        customer_id: 고객 ID
+        start: 조회 시작 시각 (포함, 시간대가 없으면 UTC)
+        end: 조회 종료 시각 (미포함, 시간대가 없으면 UTC)
+        kind: recommendation / rebalance
+        limit, offset: 페이지 크기와 시작 위치
+    """
+    if kind is not None and kind not in (RECOMMENDATION, REBALANCE):
+        raise HTTPException(status_code=400, detail=f"kind는 {RECOMMENDATION} 또는 {REBALANCE}만 가능합니다.")
+    records = audit_log.query(customer_id=customer_id, start=start, end=end, kind=kind, limit=limit, offset=offset)
+    return {"records": records, "count": len(records), "limit": limit, "offset": offset}
+
 @router.post("/rebalance-report", response_model=Dict[str, Any])
-async def get_rebalance_report(request: RebalanceReportRequest):
+async def get_rebalance_report(request: RebalanceReportRequest, x_request_timeout: Optional[float] = Header(None)):
+    """리밸런싱 리포트를 생성합니다. 반환한 리포트는 감사 로그에 기록됩니다."""
+    async with audit_log.audited(
+        REBALANCE, request.customer_id, "/rebalance-report", request.model_dump()
+    ) as entry:
+        entry["result"] = await _rebalance_report(request, x_request_timeout)
+    return entry["result"]
+
+async def _rebalance_report(request: RebalanceReportRequest, x_request_timeout: Optional[float]) -> Dict[str, Any]:
     try:
-        # 고객 데이터 파일 경로
-        customer_data_path = os.path.join(BASE_DIR, "data", "customer", "customer_data_20250420_004757.csv")
-        
-        if not os.path.exists(customer_data_path):
-            raise HTTPException(status_code=404, detail="고객 데이터 파일을 찾을 수 없습니다.")
-        
-        # CSV 파일에서 고객 정보 읽기
-        df = pd.read_csv(customer_data_path)
-        customer_data = df[df['customer_id'] == request.customer_id]
-        
-        if customer_data.empty:
-            raise HTTPException(status_code=404, detail="고객을 찾을 수 없습니다.")
+        customer = _get_customer(request.customer_id)
         
         # Convert comma-separated string to list
         etfs_owned = request.current_etf_holdings.split(',') if request.current_etf_holdings else []
         
         # 고객 프로필 정보 가져오기
-        financial_status = eval(customer_data['financial_status'].iloc[0])
-        risk_tolerance = customer_data['risk_tolerance'].iloc[0]
-        age = customer_data['age'].iloc[0]
-        
-        result = await generate_rebalance_report(
+        financial_status = customer['financial_status']
+        risk_tolerance = customer['risk_tolerance']
+        age = customer['age']
+        audit.note_inputs(
             customer_id=request.customer_id,
-            etfs_owned=etfs_owned,
             risk_tolerance=risk_tolerance,
             age=age,
-            financial_status=financial_status
+            financial_status=financial_status,
+            current_etf_holdings=etfs_owned,
         )
+        
+        # analyze_customer_etf에서 호출된 경우 이미 설정된(더 짧은) deadline이 유지됨
+        with request_deadline(_deadline_seconds(x_request_timeout)):
+            result = await generate_rebalance_report(
+                customer_id=request.customer_id,
+                etfs_owned=etfs_owned,
+                risk_tolerance=risk_tolerance,
+                age=age,
+                financial_status=financial_status
+            )
         return result
+    except ModelOverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _skipped_upload(stored: StoredUpload) -> Dict[str, Any]:
+    return {
+        "status": "skipped",
+        "message": "이미 수집된 문서입니다.",
+        "filename": stored.filename,
+        "content_hash": stored.content_hash,
+        "update_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def _rollback_unrecorded(items: List[StoredUpload]):
+    """수집 중 오류가 나면 인덱스에 기록되지 않은 업로드 파일을 삭제합니다. (인덱스 파일을 읽으므로 스레드에서 실행)"""
+    for item in items:
+        try:
+            recorded = bool(item.content_hash) and vector_db.is_ingested(item.content_hash)
+        except Exception:
+            recorded = False
+        if not recorded:
+            rollback_upload(item)
+
 @router.post("/update-etf-knowledge")
 async def update_etf_knowledge(pdf_file: UploadFile = File(...)):
     """
     새로운 ETF 정보를 PDF 파일과 함께 업데이트합니다.
     
+    파일은 청크 단위로 디스크에 기록되며, 같은 내용의 파일이 이미 수집되어 있으면
+    재수집하지 않고 skipped 상태를 반환합니다.
+    
     Args:
         pdf_file: 업로드된 PDF 파일
         
@@ -163,27 +371,191 @@ async def update_etf_knowledge(pdf_file: UploadFile = File(...)):
     """
     try:
         logger.info(f"ETF 지식 업데이트 요청 수신: {pdf_file.filename}")
+        if not safe_filename(pdf_file.filename).lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail="PDF 파일만 업로드할 수 있습니다.")
         
-        # PDF 파일 저장 경로
-        pdf_path = os.path.join(DOCS_PATH, pdf_file.filename)
+        # PDF 파일을 스트리밍으로 저장하면서 내용 해시 계산
+        stored = await stream_upload_to_disk(pdf_file)
         
-        # PDF 파일 저장
-        with open(pdf_path, "wb") as buffer:
-            shutil.copyfileobj(pdf_file.file, buffer)
+        # 첫 호출이면 인덱스를 로드하므로 이벤트 루프 밖에서 확인
+        if await run_in_threadpool(vector_db.is_ingested, stored.content_hash):
+            discard_upload(stored.path)
+            logger.info(f"이미 수집된 문서 업로드: {stored.filename} ({stored.content_hash[:12]})")
+            return _skipped_upload(stored)
         
-        # Vector DB 업데이트
-        update_result = vector_db.update_etf_data(pdf_path)
+        pdf_path = commit_upload(stored)
         
-        if not update_result:
+        # Vector DB 업데이트 (PDF 파싱/임베딩은 이벤트 루프 밖에서 배치 우선순위로 실행)
+        try:
+            report = await run_in_threadpool(with_priority(BATCH, vector_db.ingest_files), [(pdf_path, stored.content_hash)])
+        except BaseException:
+            await run_in_threadpool(_rollback_unrecorded, [stored])
+            raise
+        entry = report[0]
+        
+        if entry["status"] == "superseded":
+            # 같은 펀드의 더 최신 투자설명서가 이미 수집되어 있음 (업로드 파일은 보관 디렉토리로 이동됨)
+            return {
+                "status": "superseded",
+                "message": entry["message"],
+                "filename": stored.filename,
+                "content_hash": stored.content_hash,
+                "update_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+        
+        if entry["status"] != "success":
+            # 수집하지 못한 파일(또는 다른 워커가 먼저 수집한 같은 내용의 파일)은 문서 디렉토리에 남기지 않음
+            rollback_upload(stored)
+            if entry["status"] == "skipped":
+                return _skipped_upload(stored)
             raise HTTPException(status_code=500, detail="Vector DB 업데이트 실패")
         
         return {
             "status": "success",
             "message": "ETF 지식이 성공적으로 업데이트되었습니다.",
-            "filename": pdf_file.filename,
+            "filename": stored.filename,
+            "content_hash": stored.content_hash,
             "update_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
+    except UploadTooLargeError as e:
+        logger.warning(f"ETF 지식 업데이트 거부: {str(e)}")
+        raise HTTPException(status_code=413, detail=str(e))
+        
+    except HTTPException:
+        raise
+        
+    except ModelOverloadedError:
+        # 429 응답은 main.py의 예외 핸들러에서 Retry-After 헤더와 함께 반환
+        raise
+        
     except Exception as e:
         logger.error(f"ETF 지식 업데이트 중 오류 발생: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/update-etf-knowledge/bulk")
+async def bulk_update_etf_knowledge(files: List[UploadFile] = File(...), background: bool = Query(False)):
+    """
+    여러 PDF 파일 또는 PDF가 담긴 ZIP 파일을 한 번에 수집합니다.
+    
+    모든 파일은 한 번의 배치 임베딩 패스로 인덱스에 추가되고, 인덱스는 마지막에 한 번만 저장됩니다.
+    
+    Args:
+        files: 업로드된 PDF/ZIP 파일 목록
+        background: true면 업로드 저장까지만 기다리고 수집은 백그라운드 작업으로 실행 (202와 job_id 반환,
+            파일별 진행률과 결과는 GET /jobs/{job_id}로 조회)
+        
+    Returns:
+        Dict[str, Any]: 파일별 수집 결과와 요약
+    """
+    logger.info(f"ETF 지식 일괄 업데이트 요청 수신: {len(files)}개 파일")
+    if len(files) > BULK_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"한 번에 업로드할 수 있는 파일은 최대 {BULK_MAX_FILES}개입니다.")
+    
+    report = []
+    staged = []
+    # 수집 전에 실패하면 정리할 업로드 파일 (업로드 원본, ZIP에서 추출한 파일, 문서 디렉토리로 옮긴 파일)
+    uploaded = []
+    seen_hashes = set()
+    used_names = set()
+    total_bytes = 0
+    try:
+        for upload in files:
+            filename = safe_filename(upload.filename)
+            try:
+                stored = await stream_upload_to_disk(upload)
+                uploaded.append(stored)
+                total_bytes += stored.size
+                if total_bytes > BULK_MAX_TOTAL_BYTES:
+                    discard_upload(stored.path)
+                    raise UploadTooLargeError("일괄 업로드 전체 크기가 허용 범위를 초과했습니다.")
+                
+                if filename.lower().endswith('.zip'):
+                    items = await run_in_threadpool(extract_pdfs_from_zip, stored)
+                    uploaded.extend(items)
+                    if not items:
+                        report.append({"file": filename, "status": "failed", "chunks": 0, "message": "ZIP 파일에 PDF가 없습니다."})
+                elif filename.lower().endswith('.pdf'):
+                    items = [stored]
+                else:
+                    discard_upload(stored.path)
+                    report.append({"file": filename, "status": "failed", "chunks": 0, "message": "지원하지 않는 파일 형식입니다."})
+                    continue
+            except UploadTooLargeError as e:
+                report.append({"file": filename, "status": "rejected", "chunks": 0, "message": str(e)})
+                continue
+            except zipfile.BadZipFile:
+                report.append({"file": filename, "status": "failed", "chunks": 0, "message": "올바른 ZIP 파일이 아닙니다."})
+                continue
+            
+            for item in items:
+                if item.content_hash in seen_hashes or await run_in_threadpool(vector_db.is_ingested, item.content_hash):
+                    discard_upload(item.path)
+                    report.append({
+                        "file": item.filename,
+                        "content_hash": item.content_hash,
+                        "status": "skipped",
+                        "chunks": 0,
+                        "message": "이미 수집된 문서입니다."
+                    })
+                    continue
+                # 같은 요청 안에서 파일명이 겹치면 해시를 붙여 덮어쓰기를 방지
+                if item.filename in used_names:
+                    item.filename = f"{item.content_hash[:8]}_{item.filename}"
+                seen_hashes.add(item.content_hash)
+                used_names.add(item.filename)
+                staged.append(item)
+        
+        for item in staged:
+            commit_upload(item)
+        if background:
+            job = job_store.submit("knowledge_update", lambda: _ingest_uploads(report, staged))
+            return _job_accepted(job)
+        return await _ingest_uploads(report, staged)
+        
+    except ModelOverloadedError:
+        await run_in_threadpool(_rollback_unrecorded, uploaded)
+        raise
+        
+    except Exception as e:
+        logger.error(f"ETF 지식 일괄 업데이트 중 오류 발생: {str(e)}")
+        # 임시 파일과 문서 디렉토리로 옮겼지만 수집되지 않은 파일 모두 정리
+        await run_in_threadpool(_rollback_unrecorded, uploaded)
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _ingest_uploads(report: List[Dict[str, Any]], staged: List[StoredUpload]) -> Dict[str, Any]:
+    """
+    문서 디렉토리로 옮긴 업로드 파일을 수집하고 파일별 결과와 요약을 반환합니다.
+    수집하지 못한 파일은 문서 디렉토리에서 삭제합니다. (오류가 나면 인덱스에 기록되지 않은 파일 모두)
+    """
+    def on_progress(done: int, total: int, filename: str):
+        report_progress(0.9 * done / total, f"{done}/{total} 파일 처리 중: {filename}")
+    
+    if staged:
+        report_progress(0.0, f"{len(staged)}개 파일 수집을 시작합니다.")
+        # PDF 파싱/임베딩은 이벤트 루프 밖에서 배치 우선순위로 실행
+        try:
+            results = await run_in_threadpool(
+                with_priority(BATCH, vector_db.ingest_files),
+                [(item.path, item.content_hash) for item in staged],
+                on_progress
+            )
+        except BaseException:
+            await run_in_threadpool(_rollback_unrecorded, staged)
+            raise
+        # ingest_files는 입력 순서대로 결과를 반환 (superseded 파일은 이미 보관 디렉토리로 이동됨)
+        for item, entry in zip(staged, results):
+            if entry["status"] in ("failed", "skipped"):
+                rollback_upload(item)
+        report.extend(results)
+    
+    summary = {status: sum(1 for entry in report if entry["status"] == status)
+               for status in ("success", "skipped", "superseded", "failed", "rejected")}
+    logger.info(f"ETF 지식 일괄 업데이트 완료: {summary}")
+    return {
+        "status": "success" if not summary["failed"] and not summary["rejected"] else "partial",
+        "summary": summary,
+        "total_chunks": sum(entry.get("chunks", 0) for entry in report),
+        "files": report,
+        "update_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
@@ -31,15 +31,33 @@ class RebalanceReportRequest(BaseModel):
     age: int
     financial_status: Dict[str, Any]
 
+class ETFPick(BaseModel):
+    etf_code: str = Field(description="ETF 카탈로그의 ETF 코드 (예: A091160)")
+    etf_name: str = Field(description="ETF 이름")
+    reason: str = Field(description="위험 감내도와 월 투자액을 고려한 추천 이유")
+
+class ETFRecommendationDraft(BaseModel):
+    """LLM이 JSON으로 생성하는 추천 결과"""
+    recommendations: List[ETFPick] = Field(min_length=3, max_length=3)
+
 class ETFRecommendation(BaseModel):
     recommendations: List[str]
-    reasons: str
+    reasons: List[str]
     portfolio_analysis: Optional[str] = None
     rebalancing_needed: Optional[bool] = None
     rebalancing_suggestions: Optional[List[str]] = None
+    degraded: Optional[bool] = None  # 시간 예산 부족 등으로 카탈로그 기반 추천을 반환한 경우 True
+    reused: Optional[bool] = None  # 유사한 프로필의 고객에게 최근 생성한 추천을 재사용한 경우 True
+
+class RebalanceNecessity(BaseModel):
+    rebalancing_needed: bool = Field(description="현재 포트폴리오의 리밸런싱이 필요한지 여부")
+    analysis: str = Field(description="리밸런싱이 필요한(또는 필요하지 않은) 이유와 고객 상황에 맞는 조언")
 
 class RebalanceReport(BaseModel):
     report: str
     performance_analysis: str
     rebalancing_needed: bool
     suggestions: str
+    rebalancing_analysis: Optional[str] = None
+    degraded: Optional[bool] = None  # 시간 예산 부족 등으로 카탈로그 기반 리포트를 반환한 경우 True
+    portfolio_metrics: Optional[Dict[str, Any]] = None  # 가격 이력으로 계산한 보유 ETF/포트폴리오 성과 지표
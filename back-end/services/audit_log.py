@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from config import AUDIT_BATCH_SIZE, AUDIT_DB_PATH, AUDIT_FLUSH_INTERVAL_SECONDS, AUDIT_LOG_ENABLED
+from monitoring.metrics import AUDIT_FLUSH_ERRORS, AUDIT_QUEUE_DEPTH, AUDIT_RECORDS_WRITTEN
+
+logger = logging.getLogger(__name__)
+
+# 감사 기록 종류
+RECOMMENDATION = "recommendation"
+REBALANCE = "rebalance"
+
+# 기록 컬럼 (순서대로 INSERT)
+COLUMNS = (
+    "created_at", "kind", "customer_id", "endpoint", "inputs", "result", "chunk_ids", "model",
+    "prompt_tokens", "completion_tokens", "total_tokens", "cost", "latency_ms", "degraded", "reused", "error",
+)
+JSON_COLUMNS = ("inputs", "result", "chunk_ids")
+
+# 요청 처리 중 서비스 계층이 감사 정보(검색 청크 ID, 토큰 수 등)를 덧붙이는 기록
+_current_entry: ContextVar[Optional[Dict[str, Any]]] = ContextVar("audit_entry", default=None)
+
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _to_utc_iso(value: datetime) -> str:
+    """조회 조건의 시각을 저장 형식(UTC ISO 8601)으로 변환합니다. 시간대가 없으면 UTC로 간주합니다."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def note(**fields: Any):
+    """현재 요청의 감사 기록에 필드를 추가합니다. 감사 대상 요청이 아니면 무시합니다."""
+    entry = _current_entry.get()
+    if entry is not None:
+        entry.update(fields)
+
+
+def note_inputs(**fields: Any):
+    """현재 요청의 감사 기록 입력값(inputs)에 필드를 추가합니다. (요청 본문 외에 조회한 고객 프로필 등)"""
+    entry = _current_entry.get()
+    if entry is not None:
+        entry["inputs"] = {**(entry.get("inputs") or {}), **fields}
+
+
+def note_model(model: str):
+    """현재 요청의 감사 기록에 응답을 생성한 모델을 추가합니다. (여러 모델을 사용하면 쉼표로 구분)"""
+    entry = _current_entry.get()
+    if entry is None:
+        return
+    models = [name for name in (entry.get("model") or "").split(",") if name]
+    if model not in models:
+        entry["model"] = ",".join(models + [model])
+
+
+def add_token_usage(prompt_tokens: int, completion_tokens: int, total_tokens: int, cost: float):
+    """현재 요청의 감사 기록에 LLM 토큰 사용량을 누적합니다. (리밸런싱처럼 여러 번 호출하는 경우 합산)"""
+    entry = _current_entry.get()
+    if entry is None:
+        return
+    for field, value in (
+        ("prompt_tokens", prompt_tokens),
+        ("completion_tokens", completion_tokens),
+        ("total_tokens", total_tokens),
+        ("cost", cost),
+    ):
+        entry[field] = (entry.get(field) or 0) + value
+
+
+class AuditLog:
+    """
+    고객에게 제공한 추천/리밸런싱 결과를 기록하는 append-only 감사 로그입니다.
+
+    요청 경로에서는 메모리 대기열에 넣기만 하고, 백그라운드 스레드가 AUDIT_FLUSH_INTERVAL_SECONDS
+    주기(또는 AUDIT_BATCH_SIZE건)마다 모아서 한 트랜잭션으로 SQLite에 기록하므로 요청 지연시간에
+    영향을 주지 않습니다. 테이블에는 UPDATE/DELETE를 막는 트리거가 있어 기록을 수정할 수 없습니다.
+    여러 워커가 같은 파일에 기록할 수 있도록 WAL 모드를 사용합니다.
+    """
+
+    def __init__(
+        self,
+        db_path: str = AUDIT_DB_PATH,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL_SECONDS,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        enabled: bool = AUDIT_LOG_ENABLED
+    ):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.enabled = enabled
+        # 감사 기록은 버리지 않으므로 크기 제한 없는 대기열 사용 (대기 건수는 etf_audit_queue_depth로 감시)
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._local = threading.local()
+        self._initialized = False
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 연결은 스레드 간에 공유할 수 없으므로 스레드별로 생성
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        if not self._initialized:
+            self._create_schema(conn)
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS audit_records (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    customer_id TEXT,
+                    endpoint TEXT,
+                    inputs TEXT,
+                    result TEXT,
+                    chunk_ids TEXT,
+                    model TEXT,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    total_tokens INTEGER,
+                    cost REAL,
+                    latency_ms REAL,
+                    degraded INTEGER,
+                    reused INTEGER,
+                    error TEXT
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_audit_customer_time ON audit_records(customer_id, created_at)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_audit_time ON audit_records(created_at)")
+            for operation in ("UPDATE", "DELETE"):
+                conn.execute(
+                    f"""
+                    CREATE TRIGGER IF NOT EXISTS audit_records_no_{operation.lower()}
+                    BEFORE {operation} ON audit_records
+                    BEGIN
+                        SELECT RAISE(ABORT, 'audit_records is append-only');
+                    END
+                    """
+                )
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run_writer, name="audit-log-writer", daemon=True)
+                self._writer.start()
+
+    def record(self, entry: Dict[str, Any]):
+        """감사 기록을 대기열에 넣습니다. (블로킹 없음)"""
+        if not self.enabled:
+            return
+        entry.setdefault("created_at", _utcnow())
+        self._queue.put(entry)
+        AUDIT_QUEUE_DEPTH.inc()
+        self._ensure_writer()
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        rows = []
+        for entry in batch:
+            row = []
+            for column in COLUMNS:
+                value = entry.get(column)
+                if column in JSON_COLUMNS and value is not None:
+                    value = json.dumps(value, ensure_ascii=False, default=str)
+                elif column in ("degraded", "reused") and value is not None:
+                    value = int(bool(value))
+                row.append(value)
+            rows.append(row)
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                f"INSERT INTO audit_records ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows
+            )
+        for entry in batch:
+            AUDIT_RECORDS_WRITTEN.labels(kind=entry.get("kind", "unknown")).inc()
+
+    def _run_writer(self):
+        pending: List[Dict[str, Any]] = []
+        stop = False
+        while not stop:
+            deadline = time.monotonic() + self.flush_interval
+            # flush 주기 동안(또는 batch_size건이 찰 때까지) 기록을 모음
+            while len(pending) < self.batch_size:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                pending.append(entry)
+            if not pending:
+                continue
+            try:
+                self._write(pending)
+                AUDIT_QUEUE_DEPTH.dec(len(pending))
+                pending = []
+            except Exception as e:
+                # 기록을 버리지 않고 다음 주기에 다시 시도
+                AUDIT_FLUSH_ERRORS.inc()
+                logger.error(f"감사 로그 기록 실패 ({len(pending)}건, 다음 주기에 재시도): {str(e)}")
+                if stop:
+                    logger.error(f"종료 중 감사 로그 {len(pending)}건을 기록하지 못했습니다.")
+
+    def close(self, timeout: float = 10.0):
+        """대기 중인 기록을 모두 쓰고 기록 스레드를 종료합니다."""
+        writer = self._writer
+        if writer is None or not writer.is_alive():
+            return
+        self._queue.put(None)
+        writer.join(timeout)
+
+    def query(
+        self,
+        customer_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        kind: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        감사 기록을 조회합니다. (최신순)
+
+        Args:
+            customer_id: 고객 ID
+            start: 이 시각 이후(포함) 기록
+            end: 이 시각 이전(미포함) 기록
+            kind: recommendation / rebalance
+            limit, offset: 페이지 크기와 시작 위치
+        """
+        conditions, params = [], []
+        if customer_id:
+            conditions.append("customer_id = ?")
+            params.append(customer_id)
+        if start:
+            conditions.append("created_at >= ?")
+            params.append(_to_utc_iso(start))
+        if end:
+            conditions.append("created_at < ?")
+            params.append(_to_utc_iso(end))
+        if kind:
+            conditions.append("kind = ?")
+            params.append(kind)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connection().execute(
+            f"SELECT * FROM audit_records {where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset)
+        ).fetchall()
+        records = []
+        for row in rows:
+            record = dict(row)
+            for column in JSON_COLUMNS:
+                if record[column] is not None:
+                    record[column] = json.loads(record[column])
+            for column in ("degraded", "reused"):
+                if record[column] is not None:
+                    record[column] = bool(record[column])
+            records.append(record)
+        return records
+
+    @asynccontextmanager
+    async def audited(self, kind: str, customer_id: str, endpoint: str, inputs: Dict[str, Any]):
+        """
+        블록에서 생성한 결과를 감사 로그에 기록합니다.
+
+        블록 안에서 entry["result"]에 고객에게 반환할 결과를 넣으면, 블록 종료 시 처리 시간과
+        서비스 계층이 note()/add_token_usage()로 덧붙인 정보와 함께 기록됩니다.
+        이미 감사 중인 요청 안에서 호출되면(고객 분석 → 리밸런싱 리포트) 바깥 기록 하나로 합칩니다.
+        """
+        outer = _current_entry.get()
+        if outer is not None:
+            # 안쪽 호출이 실제로 생성한 결과 종류를 따름
+            outer["kind"] = kind
+            yield outer
+            return
+        entry: Dict[str, Any] = {
+            "created_at": _utcnow(),
+            "kind": kind,
+            "customer_id": customer_id,
+            "endpoint": endpoint,
+            "inputs": inputs,
+        }
+        token = _current_entry.set(entry)
+        started = time.perf_counter()
+        try:
+            yield entry
+        except Exception as e:
+            entry["error"] = str(e)
+            raise
+        finally:
+            _current_entry.reset(token)
+            # 결과가 고객에게 반환된 경우에만 기록 (오류로 응답이 실패한 요청은 제외)
+            if "result" in entry:
+                entry["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                result = entry["result"]
+                if isinstance(result, dict):
+                    entry.setdefault("degraded", bool(result.get("degraded")))
+                    entry.setdefault("reused", bool(result.get("reused")))
+                self.record(entry)
+
+
+# 싱글톤 인스턴스 (프로세스 단위)
+audit_log = AuditLog()
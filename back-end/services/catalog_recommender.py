@@ -0,0 +1,241 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from schemas import ETFRecommendation, RebalanceReport
+from services.etf_catalog import etf_catalog, _to_float
+from services import audit_log
+
+logger = logging.getLogger(__name__)
+
+# 위험 감내도별 점수 가중치와 제외 키워드
+# - aum: 순자산총액 (유동성/규모), expense: 총보수 (낮을수록 높은 점수), dividend: 분배율
+RISK_PROFILES = {
+    "Low": {
+        "weights": {"aum": 0.3, "expense": 0.3, "dividend": 0.4},
+        "exclude_keywords": ("레버리지", "인버스", "2X", "선물"),
+        "label": "분배율이 높고 비용이 낮은 ETF",
+    },
+    "Medium": {
+        "weights": {"aum": 0.5, "expense": 0.3, "dividend": 0.2},
+        "exclude_keywords": ("레버리지", "인버스", "2X"),
+        "label": "규모가 크고 비용이 낮은 대표 ETF",
+    },
+    "High": {
+        "weights": {"aum": 0.7, "expense": 0.2, "dividend": 0.1},
+        "exclude_keywords": ("인버스",),
+        "label": "성장성이 높은 대형 ETF",
+    },
+}
+
+RISK_ALIASES = {"낮음": "Low", "중간": "Medium", "높음": "High"}
+
+# 월 투자액이 이 금액보다 적으면 비용(총보수) 가중치를 높임
+LOW_INVESTMENT_THRESHOLD = 500000
+
+
+def _risk_key(risk_tolerance: str) -> str:
+    risk_tolerance = str(risk_tolerance or "").strip()
+    return RISK_ALIASES.get(risk_tolerance, risk_tolerance if risk_tolerance in RISK_PROFILES else "Medium")
+
+
+def _percentile_ranks(values: List[float]) -> List[float]:
+    """값의 순위를 0~1 범위로 변환합니다. (동점은 같은 순위)"""
+    if len(values) < 2:
+        return [1.0] * len(values)
+    ordered = sorted(values)
+    positions = {}
+    for i, value in enumerate(ordered):
+        positions.setdefault(value, i)
+    return [positions[value] / (len(values) - 1) for value in values]
+
+
+class CatalogRecommender:
+    """
+    LLM 없이 ETF 카탈로그만으로 추천을 계산하는 결정적(deterministic) 추천기입니다.
+
+    요청 시간 예산이 LLM 호출에 부족하거나 LLM 호출이 실패했을 때 사용하며,
+    카탈로그의 수치 필드 순위는 카탈로그가 바뀔 때만 다시 계산하므로
+    추천 한 건은 수 밀리초 안에 계산됩니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: Optional[float] = None
+        self._rows: List[Dict[str, Any]] = []
+
+    def _ensure_ranked(self) -> List[Dict[str, Any]]:
+        version = etf_catalog.version
+        if version == self._version:
+            return self._rows
+        with self._lock:
+            if version != self._version:
+                records = [record for record in etf_catalog.records() if _to_float(record.get("aum")) > 0]
+                aum_ranks = _percentile_ranks([_to_float(r.get("aum")) for r in records])
+                expense_ranks = _percentile_ranks([-_to_float(r.get("total_expense"), 1.0) for r in records])
+                dividend_ranks = _percentile_ranks([_to_float(r.get("dividend_yield")) for r in records])
+                self._rows = [
+                    {"record": record, "aum": aum, "expense": expense, "dividend": dividend}
+                    for record, aum, expense, dividend in zip(records, aum_ranks, expense_ranks, dividend_ranks)
+                ]
+                self._version = version
+        return self._rows
+
+    def rank(
+        self,
+        risk_tolerance: str,
+        monthly_investment: int = 0,
+        exclude: Optional[set] = None,
+        n: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        위험 감내도에 맞는 ETF를 점수순으로 n개 선택합니다.
+        가능한 한 서로 다른 시장/자산군에서 고르도록 하여 분산 효과를 확보합니다.
+        """
+        profile = RISK_PROFILES[_risk_key(risk_tolerance)]
+        weights = dict(profile["weights"])
+        if monthly_investment < LOW_INVESTMENT_THRESHOLD:
+            weights["expense"] += 0.2
+        exclude = exclude or set()
+
+        scored = []
+        for row in self._ensure_ranked():
+            record = row["record"]
+            if record["etf_code"] in exclude:
+                continue
+            if any(keyword in record["etf_name"].upper() for keyword in profile["exclude_keywords"]):
+                continue
+            score = sum(weight * row[field] for field, weight in weights.items())
+            scored.append((score, record))
+        scored.sort(key=lambda item: (-item[0], item[1]["etf_code"]))
+
+        picked, buckets = [], set()
+        for _, record in scored:
+            bucket = (record.get("market_small"), record.get("asset_small"))
+            if bucket not in buckets:
+                picked.append(record)
+                buckets.add(bucket)
+            if len(picked) == n:
+                return picked
+        # 서로 다른 분류만으로 n개를 채우지 못하면 점수순으로 보완
+        for _, record in scored:
+            if record not in picked:
+                picked.append(record)
+            if len(picked) == n:
+                break
+        return picked
+
+
+catalog_recommender = CatalogRecommender()
+
+
+def _describe(record: Dict[str, Any]) -> str:
+    parts = [f"{record.get('market_small') or record.get('market_large')} {record.get('asset_small') or record.get('asset_large')}"]
+    parts.append(f"총보수 {_to_float(record.get('total_expense')):.2f}%")
+    aum = _to_float(record.get("aum"))
+    if aum:
+        parts.append(f"순자산 {aum / 1e8:,.0f}억원")
+    dividend = _to_float(record.get("dividend_yield"))
+    if dividend:
+        parts.append(f"분배율 {dividend:.2f}%")
+    return ", ".join(parts)
+
+
+def recommend_from_catalog(
+    risk_tolerance: str,
+    financial_status: Optional[Dict[str, Any]] = None,
+    exclude: Optional[set] = None
+) -> Dict[str, Any]:
+    """
+    카탈로그 기반의 결정적 ETF 추천을 ETFRecommendation 형식으로 반환합니다.
+    결과에는 degraded=True가 표시됩니다.
+    """
+    financial_status = financial_status or {}
+    profile = RISK_PROFILES[_risk_key(risk_tolerance)]
+    audit_log.note(model="catalog")
+    picks = catalog_recommender.rank(
+        risk_tolerance,
+        monthly_investment=int(financial_status.get("monthly_investment", 0) or 0),
+        exclude=exclude
+    )
+    return ETFRecommendation(
+        recommendations=[f"{record['etf_code']} - {record['etf_name']}" for record in picks],
+        reasons=[
+            f"위험 감내도({risk_tolerance})에 맞는 {profile['label']}로 선정했습니다. ({_describe(record)})"
+            for record in picks
+        ],
+        degraded=True
+    ).model_dump(exclude_none=True)
+
+
+def rebalance_from_catalog(
+    customer_id: str,
+    etfs_owned: List[str],
+    risk_tolerance: str,
+    age: int,
+    financial_status: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    보유 ETF의 카탈로그 정보만으로 간단한 리밸런싱 리포트를 생성합니다.
+    결과에는 degraded=True가 표시됩니다.
+    """
+    audit_log.note(model="catalog")
+    holdings = etf_catalog.match_names(",".join(etfs_owned))
+    risk_key = _risk_key(risk_tolerance)
+    markets = {record.get("market_small") for record in holdings}
+    expenses = [_to_float(record.get("total_expense")) for record in holdings]
+    average_expense = sum(expenses) / len(expenses) if expenses else 0.0
+    risky = [
+        record["etf_name"] for record in holdings
+        if any(keyword in record["etf_name"].upper() for keyword in RISK_PROFILES[risk_key]["exclude_keywords"])
+    ]
+
+    reasons = []
+    if len(etfs_owned) < 3:
+        reasons.append(f"보유 ETF가 {len(etfs_owned)}개로 분산이 충분하지 않습니다.")
+    if holdings and len(markets) < 2:
+        reasons.append("보유 ETF가 한 시장에 집중되어 있습니다.")
+    if risky:
+        reasons.append(f"위험 감내도({risk_tolerance})에 비해 변동성이 큰 상품({', '.join(risky)})을 보유하고 있습니다.")
+    if average_expense > 0.5:
+        reasons.append(f"평균 총보수가 {average_expense:.2f}%로 높은 편입니다.")
+    rebalancing_needed = bool(reasons)
+
+    performance_lines = [f"- {record['etf_name']}: {_describe(record)}" for record in holdings]
+    unknown = len(etfs_owned) - len(holdings)
+    if unknown > 0:
+        performance_lines.append(f"- 카탈로그에서 찾을 수 없는 보유 ETF {unknown}개는 분석에서 제외했습니다.")
+    performance_analysis = "\n".join(performance_lines) or "보유 ETF 정보를 카탈로그에서 찾을 수 없습니다."
+    if rebalancing_needed:
+        rebalancing_analysis = " ".join(reasons)
+    elif not holdings:
+        rebalancing_analysis = "보유 ETF의 상세 정보를 확인할 수 없어 분산과 비용 수준을 점검하지 못했습니다. 정기적인 점검을 권장합니다."
+    else:
+        rebalancing_analysis = "보유 ETF의 분산과 비용 수준이 위험 감내도에 맞는 편으로, 지금은 큰 조정이 필요하지 않습니다."
+
+    additions = recommend_from_catalog(
+        risk_tolerance, financial_status, exclude={record["etf_code"] for record in holdings}
+    )["recommendations"]
+    suggestions = "분산을 위해 다음 ETF의 편입을 검토해보세요: " + ", ".join(additions)
+
+    report = f"""
+        고객 ID: {customer_id}
+        분석일자: {datetime.now().strftime('%Y-%m-%d')}
+
+        1. 포트폴리오 성과 분석
+        {performance_analysis}
+
+        2. 리밸런싱 필요성
+        {rebalancing_analysis}
+
+        3. 리밸런싱 제안
+        {suggestions}
+        """
+    return RebalanceReport(
+        report=report,
+        performance_analysis=performance_analysis,
+        rebalancing_needed=rebalancing_needed,
+        suggestions=suggestions,
+        rebalancing_analysis=rebalancing_analysis,
+        degraded=True
+    ).model_dump()
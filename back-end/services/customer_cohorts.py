@@ -0,0 +1,233 @@
+import logging
+import threading
+from collections import Counter
+from itertools import combinations
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from config import CUSTOMER_MONTHLY_INVESTMENT_BANDS
+from services.customer_store import customer_store
+from services.warmup import register
+from monitoring.memory_diagnostics import register_memory_source
+
+logger = logging.getLogger(__name__)
+
+NON_HOLDER = "non_holder"
+HOLDER = "holder"
+UNKNOWN = "unknown"
+
+
+def _won(amount: int) -> str:
+    return f"{amount // 10000:,}만원"
+
+
+def monthly_investment_band(amount: Any, edges: List[int] = CUSTOMER_MONTHLY_INVESTMENT_BANDS) -> str:
+    """월 투자액을 구간 이름으로 변환합니다. (예: '30만원~50만원')"""
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        return UNKNOWN
+    for position, edge in enumerate(edges):
+        if amount < edge:
+            return f"{_won(edges[position - 1])}~{_won(edge)}" if position else f"{_won(edge)} 미만"
+    return f"{_won(edges[-1])} 이상" if edges else "전체"
+
+
+def _age_band(age: Any) -> str:
+    return f"{age // 10 * 10}대" if isinstance(age, int) else UNKNOWN
+
+
+def holding_set(record: Dict[str, Any]) -> Tuple[str, ...]:
+    """보유 ETF 이름 (정렬, 중복 제거)"""
+    if not record.get("has_etf") or not record.get("current_etf_holdings"):
+        return ()
+    return tuple(sorted({name.strip() for name in record["current_etf_holdings"].split(",") if name.strip()}))
+
+
+# 집계 차원: 이름 → 고객 레코드에서 값을 꺼내는 함수
+DIMENSIONS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "risk_tolerance": lambda record: record.get("risk_tolerance") or UNKNOWN,
+    "investment_tendency": lambda record: record.get("investment_tendency") or UNKNOWN,
+    "investment_horizon": lambda record: record.get("investment_horizon") or UNKNOWN,
+    "holder": lambda record: HOLDER if holding_set(record) else NON_HOLDER,
+    "monthly_investment_band": lambda record: monthly_investment_band(
+        record["financial_status"].get("monthly_investment")
+    ),
+    "age_band": lambda record: _age_band(record.get("age")),
+    "financial_category": lambda record: record["financial_status"].get("category") or UNKNOWN,
+}
+DIMENSION_NAMES = tuple(DIMENSIONS)
+# 고객 수와 무관하게 바로 조회할 수 있도록 증분 유지하는 집계 (1~2개 차원의 모든 조합)
+MAINTAINED_GROUPS = [
+    group for size in (1, 2) for group in combinations(range(len(DIMENSION_NAMES)), size)
+]
+# 프로필 버킷: 추천 재사용 캐시에서 같은 결과를 공유할 수 있는 고객 프로필 단위
+PROFILE_BUCKET_DIMENSIONS = ("risk_tolerance", "investment_tendency", "investment_horizon", "monthly_investment_band")
+
+
+class CustomerCohorts:
+    """
+    고객 저장소와 동기화되는 고객 집단 집계입니다.
+
+    고객 저장소의 리스너로 등록되어, 고객이 추가/변경될 때 이전 값은 빼고 새 값은 더하는 방식으로
+    집계를 갱신합니다. (파일이 교체된 경우에만 전체 재계산)
+    - 모든 차원의 결합 분포, 1~2개 차원 조합별 분포: 고객 수와 무관한 시간에 조회
+    - 3개 이상 차원의 group-by: 결합 분포(차원 값 조합 수에 비례)에서 계산하고 다음 변경 전까지 재사용
+    - 보유 ETF별/보유 조합별 고객 수
+    - 프로필 버킷(PROFILE_BUCKET_DIMENSIONS + 보유 조합)별 고객 수와 버킷 크기 분포
+    """
+
+    def __init__(self, store=customer_store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._subscribe_lock = threading.Lock()
+        self._subscribed = False
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self._customers = 0
+        self._joint: Counter = Counter()
+        self._groups: Dict[Tuple[int, ...], Counter] = {group: Counter() for group in MAINTAINED_GROUPS}
+        self._etfs: Counter = Counter()
+        self._combinations: Counter = Counter()
+        self._buckets: Counter = Counter()
+        # 버킷 크기별 버킷 수 (크기 1인 버킷은 캐시가 재사용될 수 없는 프로필)
+        self._bucket_sizes: Counter = Counter()
+        self._derived: Dict[Tuple[int, ...], Counter] = {}
+
+    def _ensure_synced(self):
+        if not self._subscribed:
+            with self._subscribe_lock:
+                if not self._subscribed:
+                    self.store.subscribe(self)
+                    self._subscribed = True
+        # 고객 저장소가 파일 변경을 반영하면서 on_reset/on_change를 호출
+        self.store.load()
+
+    # 고객 저장소 리스너
+    def on_reset(self, records: Iterable[Dict[str, Any]]):
+        with self._lock:
+            self._reset_counters()
+            for record in records:
+                self._apply(record, 1)
+        logger.info(f"고객 집계 재계산 완료: {self._customers}명, 프로필 버킷 {len(self._buckets)}개")
+
+    def on_change(self, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+        with self._lock:
+            if old is not None:
+                self._apply(old, -1)
+            if new is not None:
+                self._apply(new, 1)
+
+    def _apply(self, record: Dict[str, Any], sign: int):
+        key = tuple(extract(record) for extract in DIMENSIONS.values())
+        held = holding_set(record)
+        self._customers += sign
+        self._increment(self._joint, key, sign)
+        for group, counter in self._groups.items():
+            self._increment(counter, tuple(key[i] for i in group), sign)
+        for name in held:
+            self._increment(self._etfs, name, sign)
+        if held:
+            self._increment(self._combinations, held, sign)
+        bucket = tuple(key[DIMENSION_NAMES.index(name)] for name in PROFILE_BUCKET_DIMENSIONS) + (held,)
+        size = self._buckets[bucket]
+        if size:
+            self._increment(self._bucket_sizes, size, -1)
+        if size + sign:
+            self._increment(self._bucket_sizes, size + sign, 1)
+        self._increment(self._buckets, bucket, sign)
+        self._derived.clear()
+
+    @staticmethod
+    def _increment(counter: Counter, key: Any, sign: int):
+        value = counter[key] + sign
+        if value:
+            counter[key] = value
+        else:
+            del counter[key]
+
+    def _group_counter(self, group: Tuple[int, ...]) -> Counter:
+        counter = self._groups.get(group) if group else Counter({(): self._customers})
+        if counter is None:
+            counter = self._derived.get(group)
+            if counter is None:
+                counter = Counter()
+                for key, count in self._joint.items():
+                    counter[tuple(key[i] for i in group)] += count
+                self._derived[group] = counter
+        return counter
+
+    def summary(self) -> Dict[str, Any]:
+        """고객 수, 보유/미보유 고객 수, 차원별 값 분포"""
+        self._ensure_synced()
+        with self._lock:
+            by_holder = self._groups[(DIMENSION_NAMES.index("holder"),)]
+            return {
+                "version": self.store.version,
+                "customers": self._customers,
+                "holders": by_holder.get((HOLDER,), 0),
+                "non_holders": by_holder.get((NON_HOLDER,), 0),
+                "dimensions": {
+                    name: dict(sorted((key[0], count) for key, count in self._groups[(position,)].items()))
+                    for position, name in enumerate(DIMENSION_NAMES)
+                },
+            }
+
+    def group_by(self, dimensions: List[str]) -> Dict[str, Any]:
+        """차원 조합별 고객 수 (고객 수가 많은 순)"""
+        unknown = [name for name in dimensions if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"알 수 없는 차원: {', '.join(unknown)} (가능한 차원: {', '.join(DIMENSION_NAMES)})")
+        group = tuple(sorted({DIMENSION_NAMES.index(name) for name in dimensions}))
+        names = [DIMENSION_NAMES[i] for i in group]
+        self._ensure_synced()
+        with self._lock:
+            counter = self._group_counter(group)
+            groups = [
+                {**dict(zip(names, key)), "count": count}
+                for key, count in sorted(counter.items(), key=lambda item: (-item[1], item[0]))
+            ]
+            return {"version": self.store.version, "dimensions": names, "customers": self._customers, "groups": groups}
+
+    def holdings(self, limit: int = 20) -> Dict[str, Any]:
+        """보유 고객이 많은 ETF와 보유 조합"""
+        self._ensure_synced()
+        with self._lock:
+            return {
+                "version": self.store.version,
+                "etfs": [{"etf_name": name, "customers": count} for name, count in self._etfs.most_common(limit)],
+                "combinations": [
+                    {"etfs": list(names), "customers": count} for names, count in self._combinations.most_common(limit)
+                ],
+            }
+
+    def profile_buckets(self, top: int = 20) -> Dict[str, Any]:
+        """
+        프로필 버킷 카디널리티와 버킷 크기 분포를 반환합니다.
+
+        버킷마다 첫 요청만 캐시 미스라고 보면 전체 고객을 한 번씩 처리할 때의 최대 캐시 적중률은
+        1 - 버킷 수 / 고객 수이며, 크기 1인 버킷(singletons)의 고객은 재사용될 수 없습니다.
+        """
+        self._ensure_synced()
+        with self._lock:
+            customers, buckets = self._customers, len(self._buckets)
+            singletons = self._bucket_sizes.get(1, 0)
+            return {
+                "version": self.store.version,
+                "dimensions": [*PROFILE_BUCKET_DIMENSIONS, "holdings"],
+                "customers": customers,
+                "buckets": buckets,
+                "singletons": singletons,
+                "singleton_customers_ratio": round(singletons / customers, 4) if customers else 0.0,
+                "max_cache_hit_rate": round(1 - buckets / customers, 4) if customers else 0.0,
+                "bucket_size_distribution": {str(size): count for size, count in sorted(self._bucket_sizes.items())},
+                "top_buckets": [
+                    {**dict(zip(PROFILE_BUCKET_DIMENSIONS, bucket[:-1])), "holdings": list(bucket[-1]), "customers": count}
+                    for bucket, count in self._buckets.most_common(top)
+                ],
+            }
+
+
+# 싱글톤 인스턴스 (프로세스 단위)
+customer_cohorts = CustomerCohorts()
+register("customer_cohorts", customer_cohorts.summary)
+register_memory_source("customer_profile_buckets", lambda: {"items": len(customer_cohorts._buckets)})
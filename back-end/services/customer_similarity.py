@@ -0,0 +1,209 @@
+import copy
+import time
+import zlib
+import logging
+import threading
+import numpy as np
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config import (
+    SIMILARITY_DISTANCE_THRESHOLD,
+    SIMILARITY_INDEX_CAPACITY,
+    SIMILARITY_REUSE_ENABLED,
+    SIMILARITY_TTL_SECONDS,
+)
+from monitoring.metrics import CUSTOMER_SIMILARITY_DISTANCE, record_cache
+from monitoring.memory_diagnostics import register_memory_source
+
+logger = logging.getLogger(__name__)
+
+RISK_LEVELS = {"low": 0.0, "낮음": 0.0, "medium": 0.5, "중간": 0.5, "high": 1.0, "높음": 1.0}
+TENDENCY_LEVELS = {"conservative": 0.0, "moderate": 0.5, "aggressive": 1.0}
+HORIZON_LEVELS = {"short": 0.0, "medium": 0.5, "long": 1.0}
+
+# 보유 ETF 이름을 해싱하여 담는 버킷 수
+HOLDING_BUCKETS = 8
+
+# 특성별 가중치 (추천 프롬프트에서 강조하는 위험 감내도와 월 투자액에 큰 가중치)
+FEATURE_WEIGHTS = np.array(
+    [
+        1.0,  # age
+        2.0,  # risk_tolerance
+        1.0,  # investment_tendency
+        1.0,  # investment_horizon
+        0.5,  # income
+        0.5,  # savings
+        1.5,  # monthly_investment
+    ] + [1.0 / np.sqrt(HOLDING_BUCKETS)] * HOLDING_BUCKETS,
+    dtype=np.float32
+)
+# 모든 특성이 최대로 다를 때의 거리 (거리를 0~1 범위로 정규화)
+MAX_DISTANCE = float(np.linalg.norm(FEATURE_WEIGHTS))
+
+
+def _ordinal(value: Any, levels: Dict[str, float]) -> float:
+    """범주형 값을 0~1 순서 값으로 변환합니다. 알 수 없는 값은 중간값(0.5)."""
+    text = str(value or "").strip().lower()
+    for prefix, level in levels.items():
+        if text.startswith(prefix):
+            return level
+    return 0.5
+
+
+def _log_scale(value: Any, low: float, high: float) -> float:
+    """금액을 log10 기준으로 [low, high] 구간에서 0~1로 변환합니다."""
+    try:
+        amount = max(0.0, float(value))
+    except (TypeError, ValueError):
+        amount = 0.0
+    return float(np.clip((np.log10(amount + 1) - low) / (high - low), 0.0, 1.0))
+
+
+def _holding_vector(holdings: Optional[Iterable[str]]) -> np.ndarray:
+    """보유 ETF 이름을 고정 크기 버킷으로 해싱합니다. (이름 순서와 무관)"""
+    vector = np.zeros(HOLDING_BUCKETS, dtype=np.float32)
+    if isinstance(holdings, str):
+        holdings = holdings.split(",")
+    names = {"".join(str(name).split()).upper() for name in (holdings or []) if str(name).strip()}
+    for name in names:
+        vector[zlib.crc32(name.encode("utf-8")) % HOLDING_BUCKETS] += 1.0
+    if names:
+        vector /= len(names)
+    return vector
+
+
+def vectorize_profile(
+    age: Any,
+    risk_tolerance: Any,
+    financial_status: Dict[str, Any],
+    investment_tendency: Any = None,
+    investment_horizon: Any = None,
+    holdings: Optional[Iterable[str]] = None
+) -> np.ndarray:
+    """
+    고객 프로필을 가중치가 적용된 고정 길이 벡터로 변환합니다.
+    각 특성은 0~1로 정규화되므로 두 벡터의 L2 거리 / MAX_DISTANCE 가 0~1 범위의 유사도 거리가 됩니다.
+    """
+    try:
+        age_value = float(age)
+    except (TypeError, ValueError):
+        age_value = 50.0
+    features = np.concatenate([
+        np.array([
+            np.clip((age_value - 20) / 60, 0.0, 1.0),
+            _ordinal(risk_tolerance, RISK_LEVELS),
+            _ordinal(investment_tendency, TENDENCY_LEVELS),
+            _ordinal(investment_horizon, HORIZON_LEVELS),
+            _log_scale(financial_status.get("income"), 6, 9),        # 100만원 ~ 10억원
+            _log_scale(financial_status.get("savings"), 6, 9),
+            _log_scale(financial_status.get("monthly_investment"), 4, 7),  # 1만원 ~ 1000만원
+        ], dtype=np.float32),
+        _holding_vector(holdings),
+    ])
+    return features * FEATURE_WEIGHTS
+
+
+class CustomerSimilarityIndex:
+    """
+    최근 생성된 추천을 고객 프로필 벡터와 함께 보관하는 kNN 인덱스입니다.
+
+    고정 크기 링 버퍼(NumPy 배열)에 벡터를 저장하고, 조회 시 전체 후보와의 거리를
+    한 번의 벡터 연산으로 계산합니다. 용량을 넘으면 가장 오래된 항목부터 덮어씁니다.
+    """
+
+    def __init__(
+        self,
+        capacity: int = SIMILARITY_INDEX_CAPACITY,
+        ttl_seconds: float = SIMILARITY_TTL_SECONDS,
+        threshold: float = SIMILARITY_DISTANCE_THRESHOLD
+    ):
+        self.capacity = max(1, capacity)
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((self.capacity, len(FEATURE_WEIGHTS)), dtype=np.float32)
+        self._created = np.full(self.capacity, -np.inf)
+        self._payloads: List[Optional[Dict[str, Any]]] = [None] * self.capacity
+        self._next = 0
+        self._lookups = 0
+        self._reuses = 0
+        self._recent_distances = deque(maxlen=1000)
+
+    def add(self, vector: np.ndarray, payload: Dict[str, Any]):
+        """프로필 벡터와 추천 결과를 추가합니다."""
+        with self._lock:
+            slot = self._next
+            self._vectors[slot] = vector
+            self._created[slot] = time.monotonic()
+            self._payloads[slot] = copy.deepcopy(payload)
+            self._next = (slot + 1) % self.capacity
+
+    def knn(self, vector: np.ndarray, k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        """유효 기간 안의 항목 중 가장 가까운 k개를 (추천 결과, 정규화 거리) 목록으로 반환합니다."""
+        with self._lock:
+            valid = np.flatnonzero(self._created >= time.monotonic() - self.ttl_seconds)
+            if not len(valid):
+                return []
+            distances = np.linalg.norm(self._vectors[valid] - vector, axis=1) / MAX_DISTANCE
+            k = min(k, len(valid))
+            nearest = np.argpartition(distances, k - 1)[:k]
+            nearest = nearest[np.argsort(distances[nearest])]
+            return [(copy.deepcopy(self._payloads[valid[i]]), float(distances[i])) for i in nearest]
+
+    def lookup(self, vector: np.ndarray, exclude_codes: Optional[set] = None) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        거리 임계값 안의 가장 가까운 추천을 반환합니다.
+        exclude_codes(고객이 이미 보유한 ETF)가 포함된 추천은 재사용하지 않습니다.
+        조회 결과는 재사용률과 거리 분포 통계에 반영됩니다.
+        """
+        neighbours = self.knn(vector, k=5)
+        distance = neighbours[0][1] if neighbours else None
+        match = None
+        for payload, candidate_distance in neighbours:
+            if candidate_distance > self.threshold:
+                break
+            codes = {item.split(" - ", 1)[0] for item in payload.get("recommendations", [])}
+            if not (exclude_codes and codes & exclude_codes):
+                match = (payload, candidate_distance)
+                break
+        with self._lock:
+            self._lookups += 1
+            if match:
+                self._reuses += 1
+            if distance is not None:
+                self._recent_distances.append(distance)
+        if distance is not None:
+            CUSTOMER_SIMILARITY_DISTANCE.observe(distance)
+        record_cache("customer_similarity", match is not None)
+        return match
+
+    def stats(self) -> Dict[str, Any]:
+        """재사용률과 최근 조회의 최근접 거리 분포를 반환합니다."""
+        with self._lock:
+            distances = np.array(self._recent_distances, dtype=np.float32)
+            size = int(np.count_nonzero(self._created >= time.monotonic() - self.ttl_seconds))
+            lookups, reuses = self._lookups, self._reuses
+        distribution = {}
+        if len(distances):
+            distribution = {
+                f"p{q}": round(float(np.percentile(distances, q)), 4) for q in (10, 25, 50, 75, 90)
+            }
+            distribution["within_threshold"] = round(float(np.mean(distances <= self.threshold)), 4)
+        return {
+            "enabled": SIMILARITY_REUSE_ENABLED,
+            "threshold": self.threshold,
+            "size": size,
+            "lookups": lookups,
+            "reuses": reuses,
+            "reuse_rate": round(reuses / lookups, 4) if lookups else 0.0,
+            "distance_distribution": distribution,
+        }
+
+
+# 싱글톤 인스턴스 (프로세스 단위)
+customer_index = CustomerSimilarityIndex()
+# 만료된 항목도 덮어쓰기 전까지 메모리에 남아 있으므로 채워진 슬롯 수를 기록
+register_memory_source(
+    "customer_similarity_index",
+    lambda: {"items": sum(payload is not None for payload in customer_index._payloads)}
+)
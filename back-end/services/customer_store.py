@@ -0,0 +1,192 @@
+import io
+import os
+import csv
+import ast
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from config import CUSTOMER_DATA_PATH
+from services.warmup import register
+from monitoring.memory_diagnostics import register_memory_source
+
+logger = logging.getLogger(__name__)
+
+# 파일 앞부분이 바뀌지 않았는지(추가만 되었는지) 확인할 때 비교하는 마지막 반영 위치 직전 바이트 수
+_FINGERPRINT_BYTES = 256
+
+
+def parse_financial_status(value: Any) -> Dict[str, Any]:
+    """
+    financial_status 컬럼("{'category': 'Good', 'income': ...}" 형식의 Python dict 리터럴)을 dict로 변환합니다.
+    eval 대신 ast.literal_eval을 사용하므로 리터럴이 아닌 표현식은 실행하지 않고 ValueError로 거부합니다.
+    """
+    if isinstance(value, dict):
+        return value
+    try:
+        parsed = ast.literal_eval(str(value).strip())
+    except (SyntaxError, ValueError) as e:
+        raise ValueError(f"financial_status 형식 오류: {str(value)[:100]}") from e
+    if not isinstance(parsed, dict):
+        raise ValueError(f"financial_status 형식 오류: {str(value)[:100]}")
+    return parsed
+
+
+def _text(value: Any) -> Optional[str]:
+    value = str(value).strip() if value is not None else ""
+    return value or None
+
+
+def normalize_record(row: Dict[str, Any]) -> Dict[str, Any]:
+    """CSV 행을 고객 레코드로 변환합니다. (age: int, has_etf: bool, financial_status: dict, 빈 값: None)"""
+    record = {column: _text(value) for column, value in row.items() if column}
+    try:
+        record["age"] = int(float(record["age"])) if record.get("age") else None
+    except ValueError:
+        record["age"] = None
+    record["has_etf"] = str(record.get("has_etf") or "").lower() in ("true", "1", "yes")
+    try:
+        record["financial_status"] = parse_financial_status(record.get("financial_status") or "{}")
+    except ValueError as e:
+        logger.warning(f"고객 {record.get('customer_id')}: {str(e)}")
+        record["financial_status"] = {}
+    return record
+
+
+class CustomerStore:
+    """
+    고객 데이터 CSV를 customer_id로 조회하는 메모리 저장소입니다.
+
+    파일 끝에 행이 추가되면(크기 증가, 기존 내용 유지) 추가된 행만 읽어 반영하고, 파일이 교체되거나
+    앞부분이 바뀌면 전체를 다시 읽습니다. 같은 customer_id의 행이 다시 나오면 나중 행으로 갱신합니다.
+    subscribe로 등록한 리스너(on_reset(records), on_change(old, new) 메서드를 가진 객체)에
+    변경 내용을 전달하므로 집계 등을 전체 재계산 없이 함께 갱신할 수 있습니다.
+    """
+
+    def __init__(self, csv_path: str = CUSTOMER_DATA_PATH):
+        self.csv_path = csv_path
+        self._lock = threading.RLock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._listeners: List[Any] = []
+        self._columns: Optional[List[str]] = None
+        # (inode, 크기, 수정 시각), 반영한 바이트 위치, 반영 위치 직전 바이트
+        self._state: Optional[Tuple[int, int, int]] = None
+        self._offset = 0
+        self._fingerprint = b""
+        self._missing_logged = False
+        self.version = 0
+
+    @property
+    def available(self) -> bool:
+        return os.path.exists(self.csv_path)
+
+    def subscribe(self, listener: Any):
+        """리스너를 등록하고 현재 레코드 전체를 on_reset으로 전달합니다."""
+        with self._lock:
+            self._sync()
+            self._listeners.append(listener)
+            listener.on_reset(self._records.values())
+
+    def load(self) -> int:
+        """파일 변경 사항을 반영하고 고객 수를 반환합니다."""
+        with self._lock:
+            self._sync()
+            return len(self._records)
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """고객 레코드를 반환합니다. (없으면 None, 반환값은 복사본)"""
+        with self._lock:
+            self._sync()
+            record = self._records.get(customer_id)
+            if record is None:
+                return None
+            return {**record, "financial_status": dict(record["financial_status"])}
+
+    def _sync(self):
+        try:
+            stat = os.stat(self.csv_path)
+        except OSError:
+            if not self._missing_logged:
+                logger.warning(f"고객 데이터 파일을 찾을 수 없음: {self.csv_path}")
+                self._missing_logged = True
+            if self._state is not None or self._records:
+                self._reset([], None, 0, b"", None)
+            return
+        self._missing_logged = False
+        state = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if state == self._state:
+            return
+        if self._state is not None and self._is_append(stat):
+            self._read_appended(state)
+        else:
+            self._read_all(state)
+
+    def _is_append(self, stat: os.stat_result) -> bool:
+        """같은 파일에 행이 추가되기만 했는지 (반영 위치 직전 바이트가 그대로인지) 확인합니다."""
+        if stat.st_ino != self._state[0] or stat.st_size < self._offset:
+            return False
+        start = max(self._offset - _FINGERPRINT_BYTES, 0)
+        with open(self.csv_path, "rb") as f:
+            f.seek(start)
+            return f.read(self._offset - start) == self._fingerprint
+
+    def _read_all(self, state: Tuple[int, int, int]):
+        with open(self.csv_path, "rb") as f:
+            data = f.read()
+        rows = csv.DictReader(io.StringIO(data.decode("utf-8-sig"), newline=""))
+        records = {}
+        for row in rows:
+            record = normalize_record(row)
+            if record.get("customer_id"):
+                records[record["customer_id"]] = record
+        offset = len(data)
+        self._reset(list(rows.fieldnames or []), state, offset, data[max(offset - _FINGERPRINT_BYTES, 0):], records)
+        logger.info(f"고객 데이터 로드 완료: {len(records)}명")
+
+    def _reset(
+        self,
+        columns: List[str],
+        state: Optional[Tuple[int, int, int]],
+        offset: int,
+        fingerprint: bytes,
+        records: Optional[Dict[str, Dict[str, Any]]]
+    ):
+        self._columns, self._state, self._offset, self._fingerprint = columns or None, state, offset, fingerprint
+        self._records = records or {}
+        self.version += 1
+        for listener in self._listeners:
+            listener.on_reset(self._records.values())
+
+    def _read_appended(self, state: Tuple[int, int, int]):
+        """마지막으로 반영한 위치 이후에 추가된 완전한 행(줄바꿈으로 끝나는 행)만 읽어 반영합니다."""
+        with open(self.csv_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(state[1] - self._offset)
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            # 아직 기록 중인 행만 있으면 다음 조회 때 다시 확인
+            return
+        chunk = data[:end]
+        changes: List[Tuple[Optional[Dict[str, Any]], Dict[str, Any]]] = []
+        for row in csv.DictReader(io.StringIO(chunk.decode("utf-8"), newline=""), fieldnames=self._columns):
+            record = normalize_record(row)
+            customer_id = record.get("customer_id")
+            if not customer_id:
+                continue
+            changes.append((self._records.get(customer_id), record))
+            self._records[customer_id] = record
+        self._offset += end
+        self._fingerprint = (self._fingerprint + chunk)[-_FINGERPRINT_BYTES:]
+        # 기록 중인 행이 남아 있으면 상태를 갱신하지 않아 다음 조회 때 이어서 읽음
+        self._state = state if end == len(data) else (state[0], self._offset, 0)
+        if changes:
+            self.version += 1
+            for listener in self._listeners:
+                for old, new in changes:
+                    listener.on_change(old, new)
+            logger.info(f"고객 데이터 추가 반영: {len(changes)}행")
+
+
+# 싱글톤 인스턴스 (프로세스 단위)
+customer_store = CustomerStore()
+register("customer_store", customer_store.load)
+register_memory_source("customer_store", lambda: {"items": len(customer_store._records)})
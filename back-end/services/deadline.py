@@ -0,0 +1,93 @@
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """요청 처리 시간 예산이 부족하거나 소진된 경우"""
+
+
+class Deadline:
+    """요청 단위의 처리 시간 예산 (monotonic 시계 기준)"""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """현재 요청에 설정된 deadline을 반환합니다. 설정되지 않았다면 None."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    """
+    블록 안에서 실행되는 코루틴(및 asyncio.to_thread로 실행되는 함수)에
+    deadline을 전파합니다. 이미 더 짧은 deadline이 설정되어 있으면 그것을 유지합니다.
+    """
+    parent = _current_deadline.get()
+    deadline = Deadline(seconds)
+    if parent is not None and parent.expires_at < deadline.expires_at:
+        deadline = parent
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """남은 시간 예산(초)을 반환합니다. deadline이 없으면 None."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+def ensure_budget(min_budget: float, stage: str):
+    """남은 예산이 min_budget보다 작으면 DeadlineExceeded를 발생시킵니다."""
+    remaining = remaining_budget()
+    if remaining is not None and remaining < min_budget:
+        raise DeadlineExceeded(f"{stage}: 남은 시간 {remaining:.2f}s < 필요 시간 {min_budget:.2f}s")
+
+
+async def run_with_deadline(awaitable: Awaitable[T], stage: str, min_budget: float = 0.0) -> T:
+    """
+    남은 예산 안에서 awaitable을 실행합니다.
+
+    Args:
+        awaitable: 실행할 코루틴
+        stage: 로깅용 단계 이름
+        min_budget: 실행을 시작하기 위해 필요한 최소 예산 (부족하면 시작하지 않음)
+
+    Raises:
+        DeadlineExceeded: 예산이 부족하거나 실행 중 예산이 소진된 경우
+    """
+    remaining = remaining_budget()
+    if remaining is None:
+        return await awaitable
+    if remaining < min_budget:
+        # 시작하지 않은 코루틴이 경고를 남기지 않도록 닫아줌
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(f"{stage}: 남은 시간 {remaining:.2f}s < 필요 시간 {min_budget:.2f}s")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=remaining)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"{stage}: 시간 예산 {remaining:.2f}s 초과")
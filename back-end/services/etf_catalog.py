@@ -0,0 +1,280 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from config import DOCS_PATH
+from services.warmup import register
+from monitoring.memory_diagnostics import register_memory_source
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = os.path.join(DOCS_PATH, "etf_info.csv")
+
+# 조회 API 필터 이름 → 카탈로그 범주형 컬럼 (값별 ETF 코드 인덱스를 만듦)
+CATEGORY_FILTERS = {
+    "asset_class": "asset_large",
+    "asset_medium": "asset_medium",
+    "asset_small": "asset_small",
+    "market": "market_large",
+    "region": "market_medium",
+    "company": "asset_management_company",
+    "theme": "theme",
+}
+# theme은 쉼표로 구분된 여러 값을 가짐
+MULTI_VALUE_COLUMNS = ("theme",)
+# 범위 필터/정렬에 사용하는 수치 컬럼 (조회 API 응답에서는 숫자로 변환)
+NUMERIC_COLUMNS = ("total_expense", "aum", "dividend_yield", "disparate_ratio")
+INTEGER_COLUMNS = ("fiscal_month",)
+SORT_COLUMNS = NUMERIC_COLUMNS + ("etf_code", "etf_name", "listing_date")
+
+
+def _normalize_name(name: str) -> str:
+    """공백을 제거하고 대문자로 바꿔 파일명/본문과 비교할 수 있는 형태로 변환합니다."""
+    return re.sub(r"\s+", "", str(name)).upper()
+
+
+def _to_float(value: Any, default: float = 0.0) -> float:
+    """카탈로그 수치 필드를 float로 변환합니다. (원본 CSV에는 빈 값이 '\\n'으로 기록된 경우가 있음)"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _clean(value: Any) -> Optional[str]:
+    """빈 값('\\n', NaN)을 None으로 바꿉니다."""
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    return None if value in ("", "\\n") else value
+
+
+def _api_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """조회 API 응답용 항목: 빈 값은 null, 수치 컬럼은 숫자로 변환합니다."""
+    item = {column: _clean(value) for column, value in record.items()}
+    for column in NUMERIC_COLUMNS:
+        item[column] = _to_float(item.get(column), None)
+    for column in INTEGER_COLUMNS:
+        value = _to_float(item.get(column), None)
+        item[column] = int(value) if value is not None else None
+    item["theme"] = [theme.strip() for theme in item["theme"].split(",") if theme.strip()] if item.get("theme") else []
+    return item
+
+
+class ETFCatalog:
+    """
+    etf_info.csv 기반의 ETF 카탈로그입니다.
+    파일이 변경되면 다음 조회 시 자동으로 다시 로드합니다.
+    """
+
+    def __init__(self, csv_path: str = CATALOG_PATH):
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._by_code: Dict[str, Dict[str, Any]] = {}
+        self._normalized_names: List[tuple] = []
+        self._content_hash: Optional[str] = None
+        # 조회 API 인덱스 (로드 시 한 번 생성)
+        self._api_records: Dict[str, Dict[str, Any]] = {}
+        self._value_index: Dict[str, Dict[str, Set[str]]] = {}
+        self._range_index: Dict[str, Tuple[List[float], List[str]]] = {}
+        self._sort_index: Dict[str, Tuple[List[str], List[str]]] = {}
+
+    def _ensure_loaded(self):
+        try:
+            mtime = os.path.getmtime(self.csv_path)
+        except OSError:
+            logger.warning(f"ETF 카탈로그 파일을 찾을 수 없음: {self.csv_path}")
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            import pandas as pd
+            with open(self.csv_path, "rb") as f:
+                content_hash = hashlib.sha256(f.read()).hexdigest()
+            df = pd.read_csv(self.csv_path, dtype=str, encoding="utf-8-sig")
+            df = df.apply(lambda column: column.str.strip())
+            records = df.to_dict(orient="records")
+            self._by_code = {record["etf_code"]: record for record in records}
+            # 이름이 긴 ETF부터 매칭하여 'KODEX 200'이 'KODEX 200 IT'를 가리지 않도록 함
+            self._normalized_names = sorted(
+                ((_normalize_name(record["etf_name"]), record["etf_code"]) for record in records),
+                key=lambda item: len(item[0]),
+                reverse=True
+            )
+            self._build_query_indexes(records)
+            self._content_hash = content_hash
+            self._mtime = mtime
+            logger.info(f"ETF 카탈로그 로드 완료: {len(records)}개")
+
+    def _build_query_indexes(self, records: List[Dict[str, Any]]):
+        """조회 API용 인덱스: 범주 값별 코드 집합, 수치 컬럼별 정렬 배열(범위 검색), 정렬 컬럼별 코드 순서."""
+        api_records = {record["etf_code"]: _api_record(record) for record in records}
+        value_index: Dict[str, Dict[str, Set[str]]] = {}
+        for column in CATEGORY_FILTERS.values():
+            index = defaultdict(set)
+            for code, item in api_records.items():
+                values = item[column] if column in MULTI_VALUE_COLUMNS else [item[column]]
+                for value in values:
+                    if value is not None:
+                        index[value].add(code)
+            value_index[column] = dict(index)
+        range_index = {}
+        for column in NUMERIC_COLUMNS:
+            pairs = sorted((item[column], code) for code, item in api_records.items() if item[column] is not None)
+            range_index[column] = ([value for value, _ in pairs], [code for _, code in pairs])
+        sort_index = {}
+        for column in SORT_COLUMNS:
+            present = sorted(
+                (code for code, item in api_records.items() if item[column] is not None),
+                key=lambda code: (api_records[code][column], code)
+            )
+            # 값이 없는 항목은 정렬 방향과 관계없이 마지막
+            missing = sorted(code for code, item in api_records.items() if item[column] is None)
+            sort_index[column] = (present, missing)
+        self._api_records, self._value_index = api_records, value_index
+        self._range_index, self._sort_index = range_index, sort_index
+
+    @property
+    def version(self) -> Optional[float]:
+        """현재 로드된 카탈로그 파일의 수정 시각 (카탈로그 기반 파생 캐시의 무효화 키)"""
+        self._ensure_loaded()
+        return self._mtime
+
+    @property
+    def content_hash(self) -> Optional[str]:
+        """현재 로드된 카탈로그 파일 내용의 SHA-256 (조회 API의 ETag)"""
+        self._ensure_loaded()
+        return self._content_hash
+
+    def records(self) -> List[Dict[str, Any]]:
+        """카탈로그 전체 항목을 반환합니다."""
+        self._ensure_loaded()
+        return list(self._by_code.values())
+
+    @property
+    def codes(self) -> List[str]:
+        self._ensure_loaded()
+        return list(self._by_code)
+
+    def normalize_code(self, code: str) -> Optional[str]:
+        """'091160', 'a091160' 등의 표기를 카탈로그 코드('A091160')로 변환합니다. 없으면 None."""
+        self._ensure_loaded()
+        code = str(code or "").strip().upper()
+        if re.fullmatch(r"\d{6}", code):
+            code = f"A{code}"
+        return code if code in self._by_code else None
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        """ETF 코드로 카탈로그 항목을 조회합니다."""
+        normalized = self.normalize_code(code)
+        return self._by_code.get(normalized) if normalized else None
+
+    def match_names(self, text: str) -> List[Dict[str, Any]]:
+        """텍스트(문서 본문, 파일명 등)에 이름이 등장하는 ETF 목록을 반환합니다."""
+        self._ensure_loaded()
+        normalized_text = _normalize_name(text)
+        matched = []
+        for name, code in self._normalized_names:
+            if name and name in normalized_text:
+                matched.append(self._by_code[code])
+                normalized_text = normalized_text.replace(name, " ")
+        return matched
+
+    def top_by_aum(self, n: int, exclude: Optional[set] = None) -> List[Dict[str, Any]]:
+        """순자산총액 기준 상위 ETF를 반환합니다."""
+        self._ensure_loaded()
+        exclude = exclude or set()
+        records = [record for code, record in self._by_code.items() if code not in exclude]
+        records.sort(key=lambda record: _to_float(record.get("aum")), reverse=True)
+        return records[:n]
+
+    def query(
+        self,
+        filters: Optional[Dict[str, Iterable[str]]] = None,
+        ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        sort: str = "aum",
+        descending: bool = True,
+        offset: int = 0,
+        limit: int = 20,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        카탈로그를 필터링/정렬/페이지네이션하여 (전체 일치 수, 현재 페이지 항목)을 반환합니다.
+
+        Args:
+            filters: CATEGORY_FILTERS 이름 → 허용 값 목록 (같은 필터 안에서는 OR, 필터 간에는 AND)
+            ranges: NUMERIC_COLUMNS 컬럼 → (최소, 최대) (포함, None이면 제한 없음, 값이 없는 ETF는 제외)
+            sort: SORT_COLUMNS 중 정렬 컬럼 (값이 없는 ETF는 항상 마지막)
+            descending: 내림차순 여부
+            offset, limit: 페이지 시작 위치와 크기
+            fields: 응답에 포함할 컬럼 (None이면 전체)
+        """
+        self._ensure_loaded()
+        candidates: Optional[Set[str]] = None
+        for name, values in (filters or {}).items():
+            values = [value for value in values or () if value]
+            if not values:
+                continue
+            index = self._value_index[CATEGORY_FILTERS[name]]
+            matched = set().union(*(index.get(value, ()) for value in values))
+            candidates = matched if candidates is None else candidates & matched
+        for column, (low, high) in (ranges or {}).items():
+            if low is None and high is None:
+                continue
+            values, codes = self._range_index[column]
+            start = bisect_left(values, low) if low is not None else 0
+            end = bisect_right(values, high) if high is not None else len(values)
+            matched = set(codes[start:end])
+            candidates = matched if candidates is None else candidates & matched
+
+        present, missing = self._sort_index[sort]
+        ordered = (present[::-1] if descending else present) + missing
+        if candidates is not None:
+            ordered = [code for code in ordered if code in candidates]
+        page = ordered[offset:offset + limit]
+        items = [self._api_records[code] for code in page]
+        if fields:
+            items = [{field: item.get(field) for field in fields} for item in items]
+        else:
+            items = [dict(item) for item in items]
+        return len(ordered), items
+
+    def get_api_record(self, code: str, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """조회 API 응답 형식의 ETF 항목을 반환합니다. 없으면 None."""
+        normalized = self.normalize_code(code)
+        if normalized is None:
+            return None
+        item = self._api_records[normalized]
+        return {field: item.get(field) for field in fields} if fields else dict(item)
+
+    @property
+    def api_fields(self) -> List[str]:
+        """조회 API 응답 항목의 컬럼 목록"""
+        self._ensure_loaded()
+        return list(next(iter(self._api_records.values()), {}))
+
+    def facets(self) -> Dict[str, Dict[str, int]]:
+        """범주형 필터별 값과 ETF 수 (필터 선택지 표시용)"""
+        self._ensure_loaded()
+        return {
+            name: dict(sorted(
+                ((value, len(codes)) for value, codes in self._value_index[column].items()),
+                key=lambda item: item[1],
+                reverse=True
+            ))
+            for name, column in CATEGORY_FILTERS.items()
+        }
+
+
+# 싱글톤 인스턴스 생성
+etf_catalog = ETFCatalog()
+# 카탈로그 기반 대체 추천이 첫 요청부터 바로 동작하도록 워밍업 시 미리 로드
+register("etf_catalog", etf_catalog.records)
+register_memory_source("etf_catalog", lambda: {"items": len(etf_catalog._by_code)})
@@ -1,31 +1,101 @@
 import os
+import glob
 import json
-import pandas as pd
-from typing import Dict, List, Any, Optional
-from langchain_community.document_loaders import PyMuPDFLoader, DirectoryLoader, CSVLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
-from langchain.schema import Document
-from schemas import FinancialStatus, CustomerProfile, ETFRecommendation
+import asyncio
+import time
+import queue
+import socket
+import threading
+import http.client
+import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from urllib.parse import urlsplit
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple, Type, Callable
+# langchain_openai, 문서 로더, pandas 등 무거운 의존성은 사용하는 함수 안에서 import (서버 시작 시간 단축)
+from langchain_core.documents import Document
+from pydantic import BaseModel, ValidationError
+from schemas import (
+    FinancialStatus,
+    CustomerProfile,
+    ETFRecommendation,
+    ETFRecommendationDraft,
+    RebalanceNecessity,
+    RebalanceReport,
+)
 from config import *
 import logging
 import shutil
 from datetime import datetime
 from monitoring.token_monitor import token_monitor
+from monitoring.memory_diagnostics import register_memory_source
+from services.process_sync import InterProcessLock
+from services.etf_catalog import etf_catalog
+from services.catalog_recommender import recommend_from_catalog, rebalance_from_catalog
+from services.deadline import DeadlineExceeded, run_with_deadline
+from services.model_scheduler import ModelOverloadedError, ScheduledEmbeddings, model_scheduler
+from services.customer_similarity import customer_index, vectorize_profile
+from services.reranker import reranker
+from services.warmup import LazyResource, register, register_check
+from services.model_router import LLMOutputValidationError, model_router
+from services.job_store import report_progress
+from services.portfolio_analytics import analyze_portfolio, format_facts
+from services import audit_log
+from services.prospectus import ProspectusVersion, read_version, select_latest
+from services.vector_store import (
+    DOCSTORE_FILE,
+    INDEX_FILE,
+    ETFVectorStore,
+    ShardedVectorStore,
+    dependable_faiss_import,
+    migrate_pickled_faiss,
+)
+from services.vector_shards import layout_name, query_shards, shard_router
+from monitoring.metrics import (
+    INGESTED_BYTES,
+    INGESTED_CHUNKS,
+    INGESTION_DURATION,
+    SHARD_SEARCH_LATENCY,
+    VECTOR_SEARCH_LATENCY,
+    observe_stage,
+    record_index_stats,
+)
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+INDEX_GENERATION_FILE = "index_generation"
+CONTENT_HASH_FILE = "content_hashes.json"
+PROSPECTUS_VERSION_FILE = "prospectus_versions.json"
+SHARD_DIR = "shards"
+SHARD_MANIFEST_FILE = "shards.json"
+
 class ETFVectorDB:
+    """
+    ETF 문서 벡터 DB입니다. 인덱스는 자산군(또는 해시)별 샤드로 나누어 VECTOR_DB_PATH/shards/<구성>/<샤드>에 저장합니다.
+
+    샤드마다 인덱스/docstore/세대 파일이 따로 있어, 문서 추가/삭제 시에는 변경된 샤드만 쓰기 가능하게 읽어 저장하고
+    다른 워커도 바뀐 샤드만 다시 로드합니다. 검색은 샤드를 스레드풀로 동시에 검색하여 거리순으로 병합합니다.
+    """
+
     def __init__(self):
-        self.vector_db_path = os.path.join(BASE_DIR, "data", "vector_db")
+        self.vector_db_path = VECTOR_DB_PATH
         self.last_update = {}
         self.vectordb = None
         self.embeddings = None
+        self.generation = None
+        # 서빙 중인 샤드 구성 (manifest 기준)과 샤드별 (세대, 저장소)
+        self.layout = None
+        self._route = None
+        self._loaded_shards: Dict[Tuple[str, str], Tuple[Optional[str], ETFVectorStore]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=VECTOR_SEARCH_WORKERS, thread_name_prefix="vector-search") \
+            if VECTOR_SEARCH_WORKERS > 1 else None
+        # 쓰기 작업(문서 추가 + 저장)을 워커 간에 직렬화
+        self._write_lock_path = os.path.join(LOCK_DIR, "vector_db.write.lock")
+        # 인덱스 파일 교체와 읽기를 조율 (읽기: 공유, 교체: 배타)
+        self._swap_lock_path = os.path.join(LOCK_DIR, "vector_db.swap.lock")
+        self._reload_lock = threading.Lock()
         self._initialize_embeddings()
         self._load_or_create_db()
 
@@ -33,9 +103,14 @@ class ETFVectorDB:
         """OpenAI Embeddings 초기화"""
         try:
             logger.info("OpenAI Embeddings 초기화 시작")
-            self.embeddings = OpenAIEmbeddings(
-                model=EMBEDDING_MODEL,
-                openai_api_key=OPENAI_API_KEY
+            from langchain_openai import OpenAIEmbeddings
+            # 임베딩 호출도 LLM 호출과 같은 스케줄러 슬롯을 사용
+            self.embeddings = ScheduledEmbeddings(
+                OpenAIEmbeddings(
+                    model=EMBEDDING_MODEL,
+                    openai_api_key=OPENAI_API_KEY
+                ),
+                model_scheduler
             )
             logger.info("OpenAI Embeddings 초기화 완료")
         except Exception as e:
@@ -43,23 +118,311 @@ class ETFVectorDB:
             raise
 
     def _load_or_create_db(self):
-        """기존 DB 로드 또는 새로 생성"""
+        """기존 DB 로드 또는 새로 생성 (샤드 구성이 바뀌었거나 단일 인덱스 형식이면 샤드로 변환)"""
         try:
-            if os.path.exists(self.vector_db_path):
+            target = layout_name(VECTOR_SHARD_STRATEGY, VECTOR_HASH_SHARDS)
+            if self._read_layout() == target:
                 logger.info("기존 Vector DB 로드")
-                self.vectordb = FAISS.load_local(
-                    self.vector_db_path,
-                    self.embeddings,
-                    allow_dangerous_deserialization=True
-                )
-                self._load_last_update_times()
-            else:
-                logger.info("새로운 Vector DB 생성")
-                self._create_initial_db()
+                self._reload()
+                return
+            with InterProcessLock(self._write_lock_path):
+                # 다른 워커가 먼저 생성/변환했을 수 있으므로 잠금 획득 후 다시 확인
+                current = self._read_layout()
+                if current == target:
+                    logger.info("다른 워커가 생성한 Vector DB 로드")
+                elif current is not None:
+                    self._reshard(current, target)
+                elif os.path.exists(os.path.join(self.vector_db_path, INDEX_FILE)):
+                    self._migrate_single_index(target)
+                else:
+                    logger.info("새로운 Vector DB 생성")
+                    self._create_initial_db(target)
+            self._reload()
         except Exception as e:
             logger.error(f"Vector DB 로드/생성 실패: {str(e)}")
             raise
 
+    def _shard_path(self, layout: str, name: str) -> str:
+        return os.path.join(self.vector_db_path, SHARD_DIR, layout, name)
+
+    def _shard_names(self, layout: str) -> List[str]:
+        """디스크에 인덱스가 저장된 샤드 목록"""
+        root = os.path.join(self.vector_db_path, SHARD_DIR, layout)
+        if not os.path.isdir(root):
+            return []
+        return sorted(
+            name for name in os.listdir(root)
+            if os.path.exists(os.path.join(root, name, INDEX_FILE))
+        )
+
+    def _read_layout(self) -> Optional[str]:
+        """서빙 중인 샤드 구성 이름을 읽습니다. (샤드 인덱스가 없으면 None)"""
+        try:
+            with open(os.path.join(self.vector_db_path, SHARD_MANIFEST_FILE), 'r') as f:
+                return json.load(f)["layout"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_layout(self, layout: str):
+        manifest_file = os.path.join(self.vector_db_path, SHARD_MANIFEST_FILE)
+        tmp_file = f"{manifest_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"layout": layout, "updated_at": datetime.now().isoformat()}, f)
+        os.replace(tmp_file, manifest_file)
+
+    def _read_generation(self, path: Optional[str] = None) -> Optional[str]:
+        """디스크에 기록된 인덱스(또는 샤드) 세대(generation) 값을 읽습니다."""
+        try:
+            with open(os.path.join(path or self.vector_db_path, INDEX_GENERATION_FILE), 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _bump_generation(self, path: Optional[str] = None) -> str:
+        """인덱스(또는 샤드) 교체를 다른 워커에 알리기 위해 세대 값을 갱신합니다."""
+        generation = f"{time.time_ns()}-{os.getpid()}"
+        generation_file = os.path.join(path or self.vector_db_path, INDEX_GENERATION_FILE)
+        tmp_file = f"{generation_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(generation)
+        os.replace(tmp_file, generation_file)
+        return generation
+
+    def _reload(self):
+        """
+        인덱스 파일 교체가 끝난 시점의 일관된 스냅샷을 로드합니다.
+        세대 값이 바뀌지 않은 샤드는 이미 로드한 인덱스를 그대로 사용합니다.
+        """
+        with InterProcessLock(self._swap_lock_path, shared=True):
+            generation = self._read_generation()
+            layout = self._read_layout()
+            loaded = {}
+            for name in self._shard_names(layout):
+                path = self._shard_path(layout, name)
+                shard_generation = self._read_generation(path)
+                cached = self._loaded_shards.get((layout, name))
+                if cached is not None and cached[0] == shard_generation:
+                    loaded[(layout, name)] = cached
+                else:
+                    loaded[(layout, name)] = (shard_generation, ETFVectorStore.load(self.embeddings, path, mmap=INDEX_MMAP))
+        if layout != self.layout:
+            self._route = shard_router(layout)
+            self.layout = layout
+        self._loaded_shards = loaded
+        self.vectordb = ShardedVectorStore(
+            self.embeddings,
+            {name: store for (_, name), (_, store) in loaded.items()},
+            self._route,
+            executor=self._executor,
+            on_search=lambda shard, seconds: SHARD_SEARCH_LATENCY.labels(shard=shard).observe(seconds)
+        )
+        self.generation = generation
+        self._load_last_update_times()
+        record_index_stats(
+            {name: store.ntotal for name, store in self.vectordb.shards.items()},
+            [os.path.join(self._shard_path(layout, name), INDEX_FILE) for name in self.vectordb.shards]
+        )
+        logger.info(
+            f"Vector DB 로드 완료 (generation={generation}, layout={layout}, "
+            f"shards={ {name: store.ntotal for name, store in self.vectordb.shards.items()} }, mmap={INDEX_MMAP})"
+        )
+
+    def refresh_if_stale(self):
+        """다른 워커가 인덱스를 교체했다면 바뀐 샤드를 다시 로드합니다."""
+        generation = self._read_generation()
+        if generation == self.generation:
+            return
+        with self._reload_lock:
+            if self._read_generation() != self.generation:
+                logger.info(f"인덱스 교체 감지: {self.generation} -> {generation}")
+                self._reload()
+
+    def _open_writer(self, layout: str) -> ShardedVectorStore:
+        """
+        쓰기용 저장소를 만듭니다. 샤드는 처음 쓸 때 디스크에서 쓰기 가능하게 읽거나(없으면 생성)
+        저장되지 못한 이전 쓰기 작업이 남긴 docstore 행을 정리합니다. (서빙 중인 인덱스는 그대로 유지)
+        """
+        def open_shard(name: str) -> ETFVectorStore:
+            path = self._shard_path(layout, name)
+            if os.path.exists(os.path.join(path, INDEX_FILE)):
+                store = ETFVectorStore.load(self.embeddings, path, mmap=False)
+                store.docstore.delete_after(store.max_vector_id())
+            else:
+                os.makedirs(path, exist_ok=True)
+                store = ETFVectorStore.create(self.embeddings, path)
+                store.docstore.delete_after(-1)
+            return store
+        return ShardedVectorStore(self.embeddings, {}, shard_router(layout), open_shard=open_shard)
+
+    def _persist(self, writer: ShardedVectorStore, layout: str):
+        """
+        쓰기용 저장소에서 연 샤드(변경된 샤드)의 인덱스를 스테이징 디렉토리에 저장한 뒤 원자적으로 교체하고
+        샤드/전체 세대 값을 갱신하여 다른 워커에 알립니다.
+        """
+        staging_path = os.path.join(self.vector_db_path, f".staging-{os.getpid()}")
+        os.makedirs(staging_path, exist_ok=True)
+        try:
+            # docstore 행은 추가 시점에 이미 기록되었으므로 인덱스 파일만 교체
+            saved = []
+            for name, store in writer.shards.items():
+                if store.index is None:
+                    continue
+                os.makedirs(os.path.join(staging_path, name), exist_ok=True)
+                store.save(os.path.join(staging_path, name))
+                saved.append(name)
+            with InterProcessLock(self._swap_lock_path):
+                for name in saved:
+                    path = self._shard_path(layout, name)
+                    os.replace(os.path.join(staging_path, name, INDEX_FILE), os.path.join(path, INDEX_FILE))
+                    self._bump_generation(path)
+                self._write_layout(layout)
+                self.generation = self._bump_generation()
+            logger.info(f"샤드 저장 완료: {saved}")
+        finally:
+            shutil.rmtree(staging_path, ignore_errors=True)
+
+    def _copy_vectors(self, source: ETFVectorStore, writer: ShardedVectorStore) -> int:
+        """저장소의 벡터를 재구성하여 쓰기용 샤드 저장소로 옮기고 옮긴 벡터 수를 반환합니다. (재임베딩 없음)"""
+        copied = 0
+        for _, vectors, docs in source.export():
+            writer.add_embeddings(vectors, docs)
+            copied += len(docs)
+        return copied
+
+    def _migrate_single_index(self, layout: str):
+        """단일 인덱스(IndexIDMap2 + SQLite 또는 pickle 형식)를 샤드로 나누고 원본 파일은 .migrated로 보관합니다."""
+        if os.path.exists(os.path.join(self.vector_db_path, "index.pkl")):
+            logger.info("pickle 형식의 기존 Vector DB 변환")
+            source = migrate_pickled_faiss(self.embeddings, self.vector_db_path)
+        else:
+            logger.info("단일 인덱스 형식의 기존 Vector DB 변환")
+            source = ETFVectorStore.load(self.embeddings, self.vector_db_path, mmap=False)
+        writer = self._open_writer(layout)
+        copied = self._copy_vectors(source, writer)
+        self._persist(writer, layout)
+        source.docstore.close()
+        for legacy_file in ("index.pkl", INDEX_FILE, DOCSTORE_FILE, f"{DOCSTORE_FILE}-wal", f"{DOCSTORE_FILE}-shm"):
+            legacy_path = os.path.join(self.vector_db_path, legacy_file)
+            if os.path.exists(legacy_path):
+                os.replace(legacy_path, f"{legacy_path}.migrated")
+        logger.info(f"Vector DB 샤드 변환 완료: {copied}개 벡터 → {sorted(writer.shards)}")
+
+    def _reshard(self, current: str, target: str):
+        """기존 샤드 구성의 벡터를 새 구성의 샤드로 옮기고 이전 구성 디렉토리를 삭제합니다."""
+        logger.info(f"샤드 구성 변경: {current} -> {target}")
+        writer = self._open_writer(target)
+        copied = 0
+        for name in self._shard_names(current):
+            source = ETFVectorStore.load(self.embeddings, self._shard_path(current, name), mmap=False)
+            copied += self._copy_vectors(source, writer)
+            source.docstore.close()
+        self._persist(writer, target)
+        shutil.rmtree(os.path.join(self.vector_db_path, SHARD_DIR, current), ignore_errors=True)
+        logger.info(f"샤드 구성 변경 완료: {copied}개 벡터 → {sorted(writer.shards)}")
+
+    def rebuild_shard(self, name: str) -> Dict[str, Any]:
+        """
+        샤드 하나를 다시 빌드합니다. (다른 샤드의 검색과 저장에는 영향 없음)
+
+        IndexIDMap2에서 벡터를 재구성하여(재임베딩 없음) 벡터 ID를 유지한 새 인덱스를 만들고,
+        인덱스에 없는 docstore 행은 정리합니다. 라우팅 결과가 바뀐 청크(예: 카탈로그의 자산 분류 변경)는
+        해당 샤드로 옮깁니다.
+        """
+        started = time.perf_counter()
+        with InterProcessLock(self._write_lock_path):
+            self.refresh_if_stale()
+            layout = self.layout
+            if name not in self._shard_names(layout):
+                raise KeyError(f"샤드가 없습니다: {name}")
+            writer = self._open_writer(layout)
+            current = writer.shard(name)
+            rebuilt = ETFVectorStore(self.embeddings, None, current.docstore)
+            faiss = dependable_faiss_import()
+            rebuilt.index = faiss.IndexIDMap2(faiss.IndexFlatL2(current.index.d))
+            moved_ids = []
+            for vector_ids, vectors, docs in current.export():
+                targets = [writer.route(doc) for doc in docs]
+                keep = [i for i, target in enumerate(targets) if target == name]
+                move = [i for i, target in enumerate(targets) if target != name]
+                if keep:
+                    rebuilt.add_embeddings(vectors[keep], [docs[i] for i in keep], vector_ids=vector_ids[keep])
+                if move:
+                    writer.add_embeddings(vectors[move], [docs[i] for i in move])
+                    moved_ids.extend(int(vector_ids[i]) for i in move)
+            kept = set(int(vector_id) for vector_id in faiss.vector_to_array(rebuilt.index.id_map))
+            orphans = [vector_id for vector_id in current.docstore.ids() if vector_id not in kept]
+            writer.shards[name] = rebuilt
+            try:
+                self._persist(writer, layout)
+                # 새 인덱스로 교체한 뒤 옮겨졌거나 인덱스에 없는 행 삭제
+                current.docstore.delete(orphans)
+            finally:
+                self._reload()
+        result = {
+            "shard": name,
+            "vectors": rebuilt.ntotal,
+            "moved": len(moved_ids),
+            "removed_rows": len(orphans) - len(moved_ids),
+            "touched_shards": sorted(writer.shards),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info(f"샤드 재빌드 완료: {result}")
+        return result
+
+    def shard_stats(self) -> Dict[str, Any]:
+        """서빙 중인 샤드 구성과 샤드별 벡터 수, 인덱스 크기, 세대 값을 반환합니다."""
+        self.refresh_if_stale()
+        shards = {}
+        for (layout, name), (generation, store) in self._loaded_shards.items():
+            try:
+                index_bytes = os.path.getsize(os.path.join(self._shard_path(layout, name), INDEX_FILE))
+            except OSError:
+                index_bytes = None
+            shards[name] = {"vectors": store.ntotal, "index_bytes": index_bytes, "generation": generation}
+        return {"layout": self.layout, "generation": self.generation, "vectors": self.vectordb.ntotal, "shards": shards}
+
+    def _file_bytes(self, file_names: Tuple[str, ...]) -> int:
+        size = 0
+        for (layout, name) in list(self._loaded_shards):
+            for file_name in file_names:
+                try:
+                    size += os.path.getsize(os.path.join(self._shard_path(layout, name), file_name))
+                except OSError:
+                    pass
+        return size
+
+    def index_usage(self) -> Dict[str, int]:
+        """서빙 인덱스의 벡터 수와 인덱스 파일 크기 (메모리 게이지용, 파일을 다시 읽지 않음)"""
+        return {"items": self.vectordb.ntotal, "bytes": self._file_bytes((INDEX_FILE,))}
+
+    def docstore_usage(self) -> Dict[str, int]:
+        """docstore 행 수와 파일 크기 (WAL 포함)"""
+        rows = sum(store.docstore.count() for _, store in list(self._loaded_shards.values()))
+        return {"items": rows, "bytes": self._file_bytes((DOCSTORE_FILE, f"{DOCSTORE_FILE}-wal"))}
+
+    def similarity_search(self, query: str, k: int = 4, shards: Optional[List[str]] = None) -> List[Document]:
+        """최신 인덱스 기준으로 유사도 검색을 수행합니다. (shards: 검색할 샤드, 기본값은 전체)"""
+        self.refresh_if_stale()
+        with VECTOR_SEARCH_LATENCY.time():
+            return self.vectordb.similarity_search(query, k=k, shards=shards)
+
+    def similarity_search_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        shards: Optional[List[str]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        여러 쿼리를 한 번의 임베딩 호출과 샤드별 한 번의 인덱스 검색으로 처리하여 쿼리별 (문서, L2 거리)를 반환합니다.
+        (검색 서비스가 클라이언트에서 묶어 보낸 쿼리를 처리할 때 사용)
+        """
+        if not queries:
+            return []
+        self.refresh_if_stale()
+        vectors = np.asarray(self.embeddings.embed_documents(queries), dtype=np.float32)
+        with VECTOR_SEARCH_LATENCY.time():
+            return self.vectordb.similarity_search_with_score_by_vectors(vectors, k=k, shards=shards)
+
     def _load_last_update_times(self):
         """마지막 업데이트 시간 로드"""
         try:
@@ -80,12 +443,19 @@ class ETFVectorDB:
         except Exception as e:
             logger.warning(f"마지막 업데이트 시간 저장 실패: {str(e)}")
 
-    def _create_initial_db(self):
+    def _create_initial_db(self, layout: str):
         """초기 Vector DB 생성"""
         try:
             documents = []
             
+            # 같은 펀드의 이전 버전 투자설명서는 인덱스에 넣지 않고 보관
+            _, superseded = select_latest(self._prospectus_versions())
+            for version in superseded:
+                self._archive_prospectus(version.source)
+            
             # PDF 파일 로딩
+            from langchain_community.document_loaders import DirectoryLoader, PyMuPDFLoader
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
             try:
                 pdf_loader = DirectoryLoader(DOCS_PATH, glob="**/*.pdf", loader_cls=PyMuPDFLoader)
                 pdf_docs = pdf_loader.load()
@@ -114,14 +484,15 @@ class ETFVectorDB:
             texts = text_splitter.split_documents(documents)
             logger.info(f"문서 {len(texts)}개로 분할 완료")
             
-            # 벡터 DB 생성
-            logger.info("FAISS 벡터 DB 생성 시작")
-            self.vectordb = FAISS.from_documents(texts, self.embeddings)
+            # 벡터 DB 생성 (청크별 샤드에 추가)
+            logger.info(f"FAISS 벡터 DB 생성 시작 (layout={layout})")
+            writer = self._open_writer(layout)
+            self._add_in_batches(writer, texts)
             logger.info("FAISS 벡터 DB 생성 완료")
             
             # 벡터 DB 저장
             logger.info("벡터 DB 저장 시작")
-            self.vectordb.save_local(self.vector_db_path)
+            self._persist(writer, layout)
             logger.info("벡터 DB 저장 완료")
             
             # 마지막 업데이트 시간 저장
@@ -133,6 +504,7 @@ class ETFVectorDB:
 
     def _load_csv_documents(self, csv_path: str) -> List[Document]:
         """CSV 파일에서 Document 객체 생성"""
+        import pandas as pd
         try:
             documents = []
             df = pd.read_csv(csv_path)
@@ -158,7 +530,8 @@ class ETFVectorDB:
                     'base_index_name': row['base_index_name'],
                     'listing_date': row['listing_date'],
                     'risk_level': row['risk_level'],  # 위험도 추가
-                    'expense_ratio': row['expense_ratio']  # 수수료 추가
+                    'expense_ratio': row['expense_ratio'],  # 수수료 추가
+                    'asset_class': row.get('asset_large')  # 자산군 (인덱스 샤드 구분)
                 }
                 
                 # Document 생성
@@ -172,61 +545,288 @@ class ETFVectorDB:
             logger.error(f"CSV 문서 변환 실패: {str(e)}")
             return []
 
-    def update_etf_data(self, file_path: str) -> bool:
+    def _load_content_hashes(self) -> Dict[str, Any]:
+        """수집된 파일의 내용 해시 목록을 로드합니다."""
+        try:
+            hash_file = os.path.join(self.vector_db_path, CONTENT_HASH_FILE)
+            if os.path.exists(hash_file):
+                with open(hash_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"내용 해시 목록 로드 실패: {str(e)}")
+        return {}
+
+    def _save_content_hashes(self, content_hashes: Dict[str, Any]):
+        """수집된 파일의 내용 해시 목록을 저장합니다."""
+        try:
+            hash_file = os.path.join(self.vector_db_path, CONTENT_HASH_FILE)
+            with open(hash_file, 'w') as f:
+                json.dump(content_hashes, f, ensure_ascii=False)
+        except Exception as e:
+            logger.warning(f"내용 해시 목록 저장 실패: {str(e)}")
+
+    def _prospectus_versions(self) -> List[ProspectusVersion]:
+        """
+        DOCS_PATH에 있는 투자설명서 PDF의 펀드/버전 정보를 반환합니다.
+        크기와 수정 시각이 바뀌지 않은 파일은 첫 페이지를 다시 읽지 않도록 캐시를 사용합니다.
+        """
+        cache_file = os.path.join(self.vector_db_path, PROSPECTUS_VERSION_FILE)
+        try:
+            with open(cache_file, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        versions, fresh_cache = [], {}
+        for path in sorted(glob.glob(os.path.join(DOCS_PATH, "**", "*.pdf"), recursive=True)):
+            stat = os.stat(path)
+            cached = cache.get(path)
+            if cached and cached["size"] == stat.st_size and cached["version"]["mtime"] == stat.st_mtime:
+                version = ProspectusVersion(**cached["version"])
+            else:
+                version = read_version(path)
+            fresh_cache[path] = {"size": stat.st_size, "version": version.to_dict()}
+            versions.append(version)
+        if fresh_cache != cache:
+            try:
+                with open(cache_file, 'w') as f:
+                    json.dump(fresh_cache, f, ensure_ascii=False)
+            except Exception as e:
+                logger.warning(f"투자설명서 버전 캐시 저장 실패: {str(e)}")
+        return versions
+
+    def _archive_prospectus(self, path: str):
+        """대체된 투자설명서를 인덱스 밖의 보관 디렉토리로 옮깁니다."""
+        os.makedirs(PROSPECTUS_ARCHIVE_PATH, exist_ok=True)
+        target = os.path.join(PROSPECTUS_ARCHIVE_PATH, os.path.basename(path))
+        if os.path.exists(target):
+            target = os.path.join(PROSPECTUS_ARCHIVE_PATH, f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{os.path.basename(path)}")
+        shutil.move(path, target)
+        self.last_update.pop(path, None)
+        logger.info(f"이전 버전 투자설명서 보관: {os.path.basename(path)}")
+
+    def _evict_sources(self, writer: ShardedVectorStore, paths: List[str]) -> int:
+        """
+        지정된 파일에서 생성된 벡터와 청크를 쓰기용 저장소의 해당 샤드에서 삭제하고 삭제된 벡터 수를 반환합니다.
+        docstore의 source 경로는 인덱스를 만든 환경에 따라 다를 수 있으므로 파일명으로 비교합니다.
+        """
+        names = {os.path.basename(path) for path in paths}
+        evicted = 0
+        for shard, store in self.vectordb.shards.items():
+            vector_ids = []
+            for source in store.docstore.sources():
+                if os.path.basename(source) in names:
+                    vector_ids.extend(store.docstore.ids_for_source(source))
+            if vector_ids:
+                evicted += writer.shard(shard).delete(vector_ids)
+        return evicted
+
+    def is_ingested(self, content_hash: str) -> bool:
+        """같은 내용의 파일이 이미 인덱스에 수집되었는지 확인합니다."""
+        return content_hash in self._load_content_hashes()
+
+    def _iter_chunks(self, file_path: str) -> Iterator[Document]:
+        """
+        파일을 청크 단위 Document로 변환하는 제너레이터입니다.
+        PDF는 페이지 단위로 읽고 분할하므로 문서 크기와 무관하게 메모리 사용량이 일정합니다.
+        """
+        from langchain_community.document_loaders import PyMuPDFLoader
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+        if file_path.lower().endswith('.pdf'):
+            for page in PyMuPDFLoader(file_path).lazy_load():
+                yield from text_splitter.split_documents([page])
+        elif file_path.lower().endswith('.csv'):
+            yield from text_splitter.split_documents(self._load_csv_documents(file_path))
+        else:
+            raise ValueError(f"지원하지 않는 파일 형식: {file_path}")
+
+    def _add_in_batches(
+        self,
+        writer: ShardedVectorStore,
+        chunks: Iterable[Document],
+        batch_size: int = EMBED_BATCH_SIZE
+    ) -> int:
+        """청크를 배치 단위로 임베딩하여 각 청크의 샤드에 추가하고 추가된 청크 수를 반환합니다."""
+        added = 0
+        batch = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                writer.add_documents(batch)
+                added += len(batch)
+                batch = []
+        if batch:
+            writer.add_documents(batch)
+            added += len(batch)
+        return added
+
+    def update_etf_data(self, file_path: str, content_hash: Optional[str] = None) -> bool:
         """
         PDF 또는 CSV 파일을 사용하여 ETF 데이터를 업데이트합니다.
         
         Args:
             file_path: PDF 또는 CSV 파일 경로
+            content_hash: 파일 내용의 SHA-256 해시 (같은 내용이 이미 수집되었다면 건너뜀)
             
         Returns:
             bool: 업데이트 성공 여부
         """
         try:
-            logger.info(f"ETF 데이터 업데이트 시작: {file_path}")
-            
-            documents = []
-            
-            # 파일 확장자에 따라 적절한 로더 선택
-            if file_path.lower().endswith('.pdf'):
-                loader = PyMuPDFLoader(file_path)
-                documents = loader.load()
-            elif file_path.lower().endswith('.csv'):
-                documents = self._load_csv_documents(file_path)
-            else:
-                logger.warning(f"지원하지 않는 파일 형식: {file_path}")
-                return False
-            
-            if not documents:
-                logger.warning(f"파일에서 문서를 로드할 수 없습니다: {file_path}")
-                return False
+            report = self.ingest_files([(file_path, content_hash)])
+            return report[0]["status"] in ("success", "skipped", "superseded")
+        except Exception as e:
+            logger.error(f"ETF 데이터 업데이트 실패: {str(e)}")
+            return False
+
+    def ingest_files(
+        self,
+        sources: List[Tuple[str, Optional[str]]],
+        on_progress: Optional[Callable[[int, int, str], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        여러 파일을 한 번의 배치 임베딩 패스로 수집하고 인덱스를 한 번만 저장합니다.
+        
+        Args:
+            sources: (파일 경로, 내용 해시) 목록
+            on_progress: 파일 하나의 파싱이 끝날 때마다 (완료 파일 수, 전체 파일 수, 파일명)으로 호출
+                (임베딩은 파일 경계를 넘는 배치로 진행되므로 근사적인 진행률)
             
-            # 문서 분할
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-            texts = text_splitter.split_documents(documents)
+        같은 펀드의 투자설명서가 여러 버전 있으면 최신 버전만 인덱스에 남깁니다.
+        업로드된 파일이 이전 버전이면 수집하지 않고(superseded), 더 최신 버전이 수집되면
+        이전 버전의 벡터를 삭제합니다. 대체된 파일은 PROSPECTUS_ARCHIVE_PATH로 옮겨집니다.
+        
+        Returns:
+            List[Dict[str, Any]]: 파일별 수집 결과 (status: success/skipped/superseded/failed)
+        """
+        started = time.perf_counter()
+        logger.info(f"ETF 데이터 일괄 업데이트 시작: {len(sources)}개 파일")
+        report = [
+            {"file": os.path.basename(path), "content_hash": content_hash, "status": "pending", "chunks": 0}
+            for path, content_hash in sources
+        ]
+        
+        with InterProcessLock(self._write_lock_path):
+            # 다른 워커의 업데이트를 잃지 않도록 최신 샤드 기준으로 작업
+            self.refresh_if_stale()
+            content_hashes = self._load_content_hashes()
+            pending = []
+            for entry, (path, content_hash) in zip(report, sources):
+                source_type = os.path.splitext(path)[1].lstrip('.').lower()
+                if source_type not in ('pdf', 'csv'):
+                    entry.update(status="failed", message="지원하지 않는 파일 형식입니다.")
+                elif content_hash and content_hash in content_hashes:
+                    entry.update(status="skipped", message="이미 수집된 문서입니다.")
+                else:
+                    pending.append((entry, path, source_type))
             
-            # Vector DB 업데이트
-            self.vectordb.add_documents(texts)
+            # 투자설명서 버전 확인: 펀드별 최신 버전만 수집
+            indexed = {os.path.basename(source) for source in self.vectordb.sources()}
+            latest, superseded = select_latest(self._prospectus_versions(), prefer=indexed)
+            superseded_by = {
+                os.path.basename(version.source): os.path.basename(latest[version.fund_key].source)
+                for version in superseded
+            }
+            for entry, path, source_type in pending:
+                newer = superseded_by.get(os.path.basename(path))
+                if newer:
+                    entry.update(status="superseded", message=f"더 최신 버전의 투자설명서가 있어 수집하지 않았습니다: {newer}")
+            pending = [item for item in pending if item[0]["status"] == "pending"]
+            # 인덱스에 없는 이전 버전은 바로 보관, 인덱스에 있는 이전 버전은 삭제 대상
+            stale = []
+            for version in superseded:
+                if os.path.basename(version.source) in indexed:
+                    stale.append(version)
+                else:
+                    self._archive_prospectus(version.source)
             
-            # 업데이트 상태 저장
-            self.vectordb.save_local(self.vector_db_path)
-            self.last_update[file_path] = os.path.getmtime(file_path)
-            self._save_last_update_times()
+            if not pending and not stale:
+                return report
             
-            logger.info(f"ETF 데이터 업데이트 완료: {len(texts)}개 문서 추가")
-            return True
+            def tagged_chunks():
+                # 파일별 파싱 오류는 해당 파일만 실패로 기록하고 나머지는 계속 진행
+                for done, (entry, path, source_type) in enumerate(pending, 1):
+                    try:
+                        for chunk in self._iter_chunks(path):
+                            entry["chunks"] += 1
+                            yield chunk
+                        entry["status"] = "success" if entry["chunks"] else "failed"
+                        if not entry["chunks"]:
+                            entry["message"] = "파일에서 문서를 로드할 수 없습니다."
+                    except Exception as e:
+                        logger.error(f"파일 파싱 실패: {path} - {str(e)}")
+                        entry.update(status="failed", message=str(e))
+                    if on_progress is not None:
+                        on_progress(done, len(pending), entry["file"])
             
-        except Exception as e:
-            logger.error(f"ETF 데이터 업데이트 실패: {str(e)}")
-            return False
+            try:
+                # 추가/삭제되는 샤드만 쓰기 가능하게 읽음 (서빙 중인 샤드는 저장 후 바뀐 것만 다시 로드)
+                writer = self._open_writer(self.layout)
+                self._load_last_update_times()
+                
+                # Vector DB 업데이트 (페이지 단위 파싱 → 파일 경계를 넘는 배치 임베딩)
+                added = self._add_in_batches(writer, tagged_chunks())
+                
+                # 최신 버전이 인덱스에 있는(이번에 수집에 성공한 경우 포함) 이전 버전만 삭제
+                available = indexed | {entry["file"] for entry, _, _ in pending if entry["status"] == "success"}
+                stale = [
+                    version for version in stale
+                    if os.path.basename(latest[version.fund_key].source) in available
+                ]
+                evicted = self._evict_sources(writer, [version.source for version in stale])
+                if evicted:
+                    logger.info(f"이전 버전 투자설명서 벡터 {evicted}개 삭제: {len(stale)}개 파일")
+                
+                if added or evicted:
+                    # 업데이트 상태 저장 (인덱스 저장은 마지막에 한 번만 수행)
+                    for entry, path, source_type in pending:
+                        if entry["status"] != "success":
+                            continue
+                        self.last_update[path] = os.path.getmtime(path)
+                        if entry["content_hash"]:
+                            content_hashes[entry["content_hash"]] = {
+                                "file": entry["file"],
+                                "chunks": entry["chunks"],
+                                "ingested_at": datetime.now().isoformat()
+                            }
+                    stale_files = {os.path.basename(version.source) for version in stale}
+                    content_hashes = {
+                        content_hash: info for content_hash, info in content_hashes.items()
+                        if info.get("file") not in stale_files
+                    }
+                    self._save_content_hashes(content_hashes)
+                    self._persist(writer, self.layout)
+                    # 인덱스 저장 후 이전 버전 파일 보관
+                    for version in stale:
+                        self._archive_prospectus(version.source)
+                    self._save_last_update_times()
+            finally:
+                # 실패 여부와 관계없이 디스크의 서빙용 인덱스와 다시 맞춤
+                self._reload()
+        
+        elapsed = time.perf_counter() - started
+        for entry, path, source_type in pending:
+            if entry["status"] == "success":
+                INGESTED_CHUNKS.labels(source_type=source_type).inc(entry["chunks"])
+                INGESTED_BYTES.labels(source_type=source_type).inc(os.path.getsize(path))
+        source_label = "batch" if len(sources) > 1 or not pending else pending[0][2]
+        INGESTION_DURATION.labels(source_type=source_label).observe(elapsed)
+        logger.info(
+            f"ETF 데이터 일괄 업데이트 완료: {sum(entry['chunks'] for entry in report)}개 문서 추가 "
+            f"({elapsed:.1f}s)"
+        )
+        return report
 
 def check_openai_api_key() -> bool:
     """OpenAI API 키의 유효성을 확인합니다."""
     try:
+        from langchain_openai import OpenAIEmbeddings
         # 간단한 테스트 쿼리를 통해 API 키 유효성 확인
-        test_embeddings = OpenAIEmbeddings(
-            model=EMBEDDING_MODEL,
-            openai_api_key=OPENAI_API_KEY
+        test_embeddings = ScheduledEmbeddings(
+            OpenAIEmbeddings(
+                model=EMBEDDING_MODEL,
+                openai_api_key=OPENAI_API_KEY
+            ),
+            model_scheduler
         )
         test_embeddings.embed_query("test")
         return True
@@ -234,28 +834,336 @@ def check_openai_api_key() -> bool:
         logger.error(f"OpenAI API 키 확인 실패: {str(e)}")
         return False
 
-# 전역 변수로 vector_db 인스턴스 생성
-vector_db = ETFVectorDB()
+class VectorSearchUnavailableError(Exception):
+    """검색 서비스에 연결할 수 없거나 시간 안에 응답을 받지 못한 경우"""
+
 
-# Initialize the vector DB manager
-try:
-    logger.info("ETF Vector DB 관리자 초기화 시작")
-    vector_db_manager = ETFVectorDB()
-    logger.info("ETF Vector DB 관리자 초기화 완료")
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """Unix 도메인 소켓으로 연결하는 HTTP 연결"""
+
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class RemoteVectorSearch:
+    """
+    별도 프로세스의 검색 서비스(services/vector_search_service.py) 클라이언트입니다.
+
+    동시에 들어온 쿼리를 최대 VECTOR_SEARCH_BATCH_WINDOW_MS 동안 모아 한 번의 요청으로 보내므로
+    서비스는 쿼리 임베딩과 인덱스 검색을 묶어서 처리합니다. 요청은 keep-alive 연결 풀을 재사용하고
+    (끊긴 연결은 한 번 새로 연결하여 재시도), 응답을 VECTOR_SEARCH_TIMEOUT_SECONDS 안에 받지 못하면
+    VectorSearchUnavailableError를 발생시킵니다. ETFVectorDB와 같은 similarity_search/shard_stats/generation을 제공합니다.
+    """
+
+    def __init__(
+        self,
+        url: str = VECTOR_SEARCH_SERVICE_URL,
+        timeout: float = VECTOR_SEARCH_TIMEOUT_SECONDS,
+        batch_window: float = VECTOR_SEARCH_BATCH_WINDOW_MS / 1000,
+        max_batch: int = VECTOR_SEARCH_MAX_BATCH,
+        connections: int = VECTOR_SEARCH_CONNECTIONS
+    ):
+        parts = urlsplit(url)
+        if parts.scheme not in ("unix", "http"):
+            raise ValueError(f"지원하지 않는 검색 서비스 주소: {url} (unix:///경로 또는 http://호스트:포트)")
+        self.url = url
+        self._parts = parts
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.max_batch = max(1, max_batch)
+        self.generation = None
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._pending: "queue.Queue[Tuple[str, int, Optional[List[str]], Future]]" = queue.Queue()
+        # 묶음 요청을 동시에 보내는 스레드 (스레드 수 = 최대 동시 요청 수 = 최대 연결 수)
+        self._senders = ThreadPoolExecutor(max_workers=max(1, connections), thread_name_prefix="vector-search-client")
+        self._dispatcher = threading.Thread(target=self._dispatch, name="vector-search-batcher", daemon=True)
+        self._dispatcher.start()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._parts.scheme == "unix":
+            return _UnixHTTPConnection(self._parts.path, self.timeout)
+        return http.client.HTTPConnection(self._parts.hostname, self._parts.port or 80, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """연결 풀의 연결로 JSON 요청을 보냅니다. (재사용한 연결이 끊겨 있으면 새 연결로 한 번 재시도)"""
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            try:
+                # 재시도는 항상 새 연결로
+                connection, reused = (self._idle.get_nowait(), True) if attempt == 0 else (self._connect(), False)
+            except queue.Empty:
+                connection, reused = self._connect(), False
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                if reused and attempt == 0 and not isinstance(e, socket.timeout):
+                    continue
+                raise VectorSearchUnavailableError(f"검색 서비스 요청 실패 ({self.url}{path}): {type(e).__name__}: {str(e)}") from e
+            if response.will_close:
+                connection.close()
+            else:
+                self._idle.put(connection)
+            if response.status != 200:
+                raise VectorSearchUnavailableError(
+                    f"검색 서비스 오류 ({self.url}{path}): {response.status} {data[:200].decode('utf-8', 'replace')}"
+                )
+            return json.loads(data)
+
+    def _dispatch(self):
+        """대기 중인 쿼리를 묶음 크기 또는 대기 시간 한도까지 모아 전송 스레드로 넘깁니다."""
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch: List[Tuple[str, int, Optional[List[str]], Future]]):
+        # 호출자가 이미 타임아웃으로 포기한 쿼리는 보내지 않음
+        batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            response = self._request("POST", "/search", {
+                "queries": [{"query": query, "k": k, "shards": shards} for query, k, shards, _ in batch]
+            })
+            self.generation = response.get("generation")
+            for (*_, future), hits in zip(batch, response["results"]):
+                future.set_result([
+                    Document(id=hit["id"], page_content=hit["page_content"], metadata=hit["metadata"]) for hit in hits
+                ])
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def similarity_search(self, query: str, k: int = 4, shards: Optional[List[str]] = None) -> List[Document]:
+        """쿼리를 다음 묶음 요청에 넣고 결과를 기다립니다."""
+        future: Future = Future()
+        with VECTOR_SEARCH_LATENCY.time():
+            self._pending.put((query, k, shards, future))
+            try:
+                return future.result(timeout=self.timeout + self.batch_window)
+            except FutureTimeoutError:
+                future.cancel()
+                raise VectorSearchUnavailableError(f"검색 서비스 응답 시간 초과 ({self.timeout}s): {self.url}")
+
+    def shard_stats(self) -> Dict[str, Any]:
+        return self._request("GET", "/stats")
+
+    def health(self) -> Dict[str, Any]:
+        return self._request("GET", "/health")
+
+
+def _create_vector_search() -> Any:
+    """VECTOR_SEARCH_MODE에 맞는 검색 객체 (inprocess: 이 프로세스의 vector_db, remote: 검색 서비스 클라이언트)"""
+    if VECTOR_SEARCH_MODE == "remote":
+        # 생성자는 연결하지 않으므로 서비스가 아직 준비되지 않아도 클라이언트(스레드/연결 풀)는 한 번만 생성
+        # 서비스 연결은 준비 상태를 확인할 때마다 확인 (vector_search_service)
+        return RemoteVectorSearch()
+    if VECTOR_SEARCH_MODE != "inprocess":
+        raise ValueError(f"지원하지 않는 VECTOR_SEARCH_MODE: {VECTOR_SEARCH_MODE} (inprocess 또는 remote)")
+    return vector_db.get()
+
+# 서비스 리소스는 처음 사용할 때 또는 서버 시작 후 백그라운드 워밍업(services/warmup.py)에서 생성
+# 서빙과 업데이트가 같은 인덱스를 사용하도록 인스턴스를 공유 (프로세스당 인덱스 1벌)
+# remote 모드에서는 검색을 검색 서비스가 처리하므로 인덱스는 지식 업데이트 시에만 로드
+vector_db = LazyResource("vector_db", ETFVectorDB, warm=VECTOR_SEARCH_MODE != "remote")
+vector_db_manager = vector_db
+# 검색 요청 경로 (inprocess: vector_db, remote: RemoteVectorSearch)
+vector_search = LazyResource("vector_search", _create_vector_search)
+if VECTOR_SEARCH_MODE == "remote":
+    # 검색 서비스가 늦게 시작하거나 실행 중에 중단되어도 준비 상태에 반영되도록 요청마다 확인 (클라이언트는 재사용)
+    register_check("vector_search_service", lambda: vector_search.health())
+# 메모리 게이지: 이 프로세스에 로드된 인덱스/docstore만 (아직 로드하지 않았으면 건너뜀)
+register_memory_source("vector_index", lambda: vector_db.index_usage() if vector_db.ready else {})
+register_memory_source("docstore", lambda: vector_db.docstore_usage() if vector_db.ready else {})
+
+# 추천/리밸런싱 섹션/수정 요청은 작업별 모델 라우팅(services/model_router.py)으로 호출
+register("model_router", model_router.warm_up)
+
+JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+async def _invoke_model(model: Any, prompt: str, config: Optional[Dict[str, Any]] = None) -> Any:
+    """모델 호출 스케줄러의 슬롯을 획득한 뒤 LLM을 호출합니다. (슬롯 대기 시간도 요청 시간 예산에 포함됨)"""
+    async with model_scheduler.slot():
+        return await model.ainvoke(prompt, config=config)
+
+def _weight_by_profile(
+    docs: List[Document],
+    risk_tolerance: str,
+    investment_level: str,
+    risk_weights: Dict[str, float],
+    investment_weights: Dict[str, float],
+    top_k: int = 3
+) -> List[Document]:
+    """위험 감내도와 투자액에 따른 가중치를 적용하여 상위 top_k개 청크를 선택합니다."""
+    weighted_docs = []
+    for doc in docs:
+        # ETF의 위험도와 고객의 위험 감내도 매칭
+        etf_risk_level = doc.metadata.get('risk_level', '중간')
+        risk_match = 1.0 if etf_risk_level == risk_tolerance else 0.5
+        
+        # ETF의 수수료와 투자액 매칭
+        expense_ratio = float(doc.metadata.get('expense_ratio', 0))
+        expense_match = 1.0 if expense_ratio < 0.5 else 0.5
+        
+        # 최종 가중치 계산
+        weight = (
+            risk_weights.get(risk_tolerance, 0.5) * risk_match +
+            investment_weights.get(investment_level, 0.5) * expense_match
+        ) / 2
+        
+        weighted_docs.append((doc, weight))
+    
+    # 가중치에 따라 정렬
+    weighted_docs.sort(key=lambda x: x[1], reverse=True)
+    return [doc for doc, _ in weighted_docs[:top_k]]
+
+def _catalog_candidates(docs: List[Document], minimum: int = 5) -> List[Dict[str, Any]]:
+    """검색된 문서에서 카탈로그에 존재하는 추천 후보 ETF를 추출합니다."""
+    candidates = {}
+    for doc in docs:
+        code = etf_catalog.normalize_code(doc.metadata.get('etf_code'))
+        if code:
+            candidates[code] = etf_catalog.get(code)
+        for entry in etf_catalog.match_names(f"{doc.metadata.get('source', '')} {doc.page_content}"):
+            candidates.setdefault(entry['etf_code'], entry)
+    # 후보가 부족하면 순자산총액 상위 ETF로 보완
+    if len(candidates) < minimum:
+        for entry in etf_catalog.top_by_aum(minimum - len(candidates), exclude=set(candidates)):
+            candidates[entry['etf_code']] = entry
+    return list(candidates.values())
+
+def _validate_recommendation_codes(draft: ETFRecommendationDraft) -> List[str]:
+    """추천 ETF 코드가 카탈로그에 존재하고 서로 다른지 검사하여 오류 목록을 반환합니다."""
+    errors = []
+    seen = set()
+    for i, pick in enumerate(draft.recommendations):
+        code = etf_catalog.normalize_code(pick.etf_code)
+        if code is None:
+            errors.append(f"recommendations[{i}].etf_code '{pick.etf_code}'는 ETF 카탈로그에 없는 코드입니다.")
+        elif code in seen:
+            errors.append(f"recommendations[{i}].etf_code '{pick.etf_code}'가 중복되었습니다.")
+        else:
+            pick.etf_code = code
+            seen.add(code)
+    return errors
+
+async def generate_validated_json(
+    prompt: str,
+    schema: Type[BaseModel],
+    validator: Optional[Callable[[Any], List[str]]] = None,
+    repair_hint: str = "",
+    operation: str = "recommendation"
+) -> Any:
+    """
+    LLM을 JSON 출력 모드로 호출하고 스키마로 검증합니다.
     
-    # Initialize ChatOpenAI
-    logger.info("ChatOpenAI 초기화 시작")
-    llm = ChatOpenAI(
-        model=OPENAI_MODEL,
-        temperature=0,
-        openai_api_key=OPENAI_API_KEY
-    )
-    logger.info("ChatOpenAI 초기화 완료")
+    검증에 실패하면 전체를 다시 생성하지 않고, 잘못된 JSON과 오류 목록만 전달하는
+    짧은 수정(repair) 요청을 한 번 수행합니다. 수정 후에도 실패하면 라우트의 다음(상위) 모델로
+    처음부터 다시 생성합니다.
+    
+    Args:
+        prompt: LLM에 보내는 프롬프트 (JSON 응답을 요구해야 함)
+        schema: 응답을 검증할 pydantic 모델
+        validator: 스키마 검증 이후 추가 검사를 수행하고 오류 메시지 목록을 반환하는 함수
+        repair_hint: 수정 요청 시 함께 전달할 참고 정보
+        operation: 모델 라우팅 작업 이름 (MODEL_ROUTES)
+        
+    Returns:
+        schema 인스턴스
+        
+    Raises:
+        LLMOutputValidationError: 라우트의 마지막 모델까지 수정 후에도 검증에 실패한 경우
+        DeadlineExceeded: 남은 요청 시간 예산이 LLM 호출에 부족한 경우
+        ModelOverloadedError: 모델 호출 대기열이 가득 찬 경우
+    """
+    def validate(raw: str):
+        try:
+            parsed = schema.model_validate_json(raw)
+        except ValidationError as e:
+            return None, [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()]
+        errors = validator(parsed) if validator else []
+        return (parsed, []) if not errors else (None, errors)
     
-    logger.info("서비스 초기화 완료")
-except Exception as e:
-    logger.error(f"서비스 초기화 실패: {str(e)}")
-    raise
+    async def generate(model: Any, config: Dict[str, Any]):
+        response = await run_with_deadline(
+            _invoke_model(model.bind(response_format=JSON_RESPONSE_FORMAT), prompt, config),
+            "llm_json",
+            LLM_MIN_BUDGET_SECONDS
+        )
+        parsed, errors = validate(response.content)
+        if parsed is not None:
+            return parsed, []
+        
+        logger.warning(f"LLM 응답 검증 실패, 수정 요청: {errors}")
+        repair_prompt = f"""
+        다음 JSON이 스키마 검증에 실패했습니다. 오류를 수정한 JSON만 응답해주세요.
+        
+        [JSON]
+        {response.content}
+        
+        [오류]
+        {chr(10).join(f"- {error}" for error in errors)}
+        
+        [JSON 스키마]
+        {json.dumps(schema.model_json_schema(), ensure_ascii=False)}
+        
+        {repair_hint}
+        """
+        
+        async def repair(repair_model: Any, repair_config: Dict[str, Any]):
+            repaired = await run_with_deadline(
+                _invoke_model(repair_model.bind(response_format=JSON_RESPONSE_FORMAT), repair_prompt, repair_config),
+                "llm_repair",
+                LLM_MIN_BUDGET_SECONDS
+            )
+            return validate(repaired.content)
+        
+        try:
+            with observe_stage("llm_repair"):
+                return await model_router.run("repair", repair, validate=lambda result: result[1])
+        except LLMOutputValidationError:
+            # 수정 요청으로도 고치지 못하면 상위 모델로 승격
+            return None, errors
+    
+    parsed, _ = await model_router.run(operation, generate, validate=lambda result: result[1])
+    return parsed
+
+def _add_portfolio_fields(response: Dict[str, Any], etfs_owned: Optional[List[str]]) -> Dict[str, Any]:
+    """ETF 보유 고객의 추천 결과에 포트폴리오 관련 안내를 추가합니다."""
+    if etfs_owned:
+        response.update({
+            "portfolio_analysis": "현재 포트폴리오 분석 결과를 기반으로 한 리밸런싱이 필요합니다.",
+            "rebalancing_needed": True,
+            "rebalancing_suggestions": [
+                "현재 포트폴리오의 리스크를 줄이기 위해 일부 ETF를 매도하고 새로운 ETF를 매수하는 것을 고려해보세요.",
+                "추천된 ETF들을 현재 포트폴리오에 추가하여 분산 투자를 강화하세요."
+            ]
+        })
+    return response
 
 @token_monitor.track_usage
 async def recommend_etf(
@@ -263,22 +1171,44 @@ async def recommend_etf(
     risk_tolerance: str,
     age: int,
     financial_status: Dict[str, Any],
-    etfs_owned: Optional[str] = None
+    etfs_owned: Optional[List[str]] = None,
+    investment_tendency: Optional[str] = None,
+    investment_horizon: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     고객 프로필에 기반한 ETF 추천을 생성합니다.
     
+    프로필이 충분히 비슷한(SIMILARITY_DISTANCE_THRESHOLD 이내) 고객의 최근 추천이 있으면
+    LLM을 호출하지 않고 그 추천을 재사용합니다(reused=True).
+    
     Args:
         customer_id: 고객 ID
         risk_tolerance: 위험 감내도
         age: 나이
         financial_status: 재무 상태 (수입, 저축, 월 투자액)
         etfs_owned: 현재 보유 중인 ETF 목록 (선택적)
+        investment_tendency: 투자 성향 (유사 고객 판단에 사용, 선택적)
+        investment_horizon: 투자 기간 (유사 고객 판단에 사용, 선택적)
         
     Returns:
-        Dict[str, Any]: ETF 추천 결과
+        Dict[str, Any]: ETF 추천 결과 (시간 예산이 부족하면 카탈로그 기반 추천, degraded=True)
     """
+    owned_codes = {entry['etf_code'] for entry in etf_catalog.match_names(",".join(etfs_owned or []))}
     try:
+        # 비슷한 프로필의 고객에게 최근 생성한 추천이 있으면 재사용
+        profile_vector = None
+        if SIMILARITY_REUSE_ENABLED:
+            profile_vector = vectorize_profile(
+                age, risk_tolerance, financial_status, investment_tendency, investment_horizon, etfs_owned
+            )
+            match = customer_index.lookup(profile_vector, exclude_codes=owned_codes)
+            if match:
+                response, distance = match
+                logger.info(f"유사 고객 추천 재사용: customer_id={customer_id}, distance={distance:.4f}")
+                response["reused"] = True
+                audit_log.note(model="customer_similarity")
+                return ETFRecommendation(**_add_portfolio_fields(response, etfs_owned)).model_dump(exclude_none=True)
+        
         # 위험 감내도와 월 투자액을 강조하는 쿼리 생성
         query = f"""
         고객님의 프로필을 기반으로 ETF를 추천해주세요.
@@ -293,7 +1223,7 @@ async def recommend_etf(
         """
         
         if etfs_owned:
-            query += f"\n현재 보유 ETF: {etfs_owned}"
+            query += f"\n현재 보유 ETF: {', '.join(etfs_owned)}"
         
         # 위험 감내도에 따른 가중치 부여
         risk_weights = {
@@ -318,8 +1248,19 @@ async def recommend_etf(
         else:
             investment_level = "높음"
         
-        # Vector DB에서 관련 ETF 검색 (상위 5개)
-        docs = vector_db.vectordb.similarity_search(query, k=5)
+        # Vector DB에서 관련 ETF 검색 (상위 5개, 재순위화를 켜면 RERANK_CANDIDATES개)
+        # 자산군 샤드 구성이면 위험 감내도에 맞는 샤드만 검색 (검색 서비스도 같은 설정으로 샤드를 구성)
+        # 쿼리 임베딩 호출이 이벤트 루프를 막지 않도록 스레드에서 실행
+        report_progress(0.2, "관련 ETF 문서를 검색하고 있습니다.")
+        shards = query_shards(layout_name(VECTOR_SHARD_STRATEGY, VECTOR_HASH_SHARDS), risk_tolerance)
+        with observe_stage("retrieval"):
+            docs = await run_with_deadline(
+                asyncio.to_thread(
+                    vector_search.similarity_search, query, RERANK_CANDIDATES if reranker.enabled else 5, shards
+                ),
+                "retrieval",
+                RETRIEVAL_MIN_BUDGET_SECONDS
+            )
         
         if not docs:
             logger.warning(f"고객 ID {customer_id}에 대한 ETF 추천 결과가 없습니다.")
@@ -328,28 +1269,22 @@ async def recommend_etf(
                 "reasons": ["죄송합니다. 현재 고객님의 프로필에 맞는 ETF를 찾을 수 없습니다."]
             }
         
-        # 위험 감내도와 투자액에 따른 가중치 적용
-        weighted_docs = []
-        for doc in docs:
-            # ETF의 위험도와 고객의 위험 감내도 매칭
-            etf_risk_level = doc.metadata.get('risk_level', '중간')
-            risk_match = 1.0 if etf_risk_level == risk_tolerance else 0.5
-            
-            # ETF의 수수료와 투자액 매칭
-            expense_ratio = float(doc.metadata.get('expense_ratio', 0))
-            expense_match = 1.0 if expense_ratio < 0.5 else 0.5
-            
-            # 최종 가중치 계산
-            weight = (
-                risk_weights.get(risk_tolerance, 0.5) * risk_match +
-                investment_weights.get(investment_level, 0.5) * expense_match
-            ) / 2
-            
-            weighted_docs.append((doc, weight))
+        # cross-encoder 재순위화 (시간 예산을 넘거나 모델이 준비되지 않았으면 None → 기존 가중치 방식)
+        reranked = None
+        if reranker.enabled:
+            with observe_stage("rerank"):
+                reranked = await asyncio.to_thread(
+                    reranker.rerank, query, docs, RERANK_TOP_K, LLM_MIN_BUDGET_SECONDS, vector_search.generation
+                )
+        if reranked is not None:
+            docs = reranked
+        else:
+            docs = _weight_by_profile(docs[:5], risk_tolerance, investment_level, risk_weights, investment_weights)
+        audit_log.note(chunk_ids=[doc.id for doc in docs])
         
-        # 가중치에 따라 정렬
-        weighted_docs.sort(key=lambda x: x[1], reverse=True)
-        docs = [doc for doc, _ in weighted_docs[:3]]  # 상위 3개 선택
+        # 추천 후보: 검색된 문서의 ETF 코드 + 문서 출처/본문에 이름이 등장하는 카탈로그 ETF
+        candidates = _catalog_candidates(docs)
+        candidate_list = "\n".join(f"- {c['etf_code']} - {c['etf_name']}" for c in candidates)
         
         # OpenAI에 추천 요청
         etf_info = "\n".join([doc.page_content for doc in docs])
@@ -367,103 +1302,132 @@ async def recommend_etf(
         ETF 정보:
         {etf_info}
         
-        다음 형식으로 정확히 응답해주세요. 3개의 ETF와 3개의 이유를 모두 포함해야 합니다:
+        추천 가능한 ETF 목록 (반드시 이 목록의 코드 중에서 선택):
+        {candidate_list}
         
-        [추천 ETF]
-        1. ETF 코드 - ETF 이름
-        2. ETF 코드 - ETF 이름
-        3. ETF 코드 - ETF 이름
+        다음 JSON 형식으로만 응답해주세요:
+        {{"recommendations": [{{"etf_code": "ETF 코드", "etf_name": "ETF 이름", "reason": "위험 감내도와 월 투자액을 고려한 추천 이유"}}]}}
         
-        [추천 이유]
-        1. 첫 번째 ETF의 추천 이유 (위험 감내도와 월 투자액을 고려하여 설명)
-        2. 두 번째 ETF의 추천 이유 (위험 감내도와 월 투자액을 고려하여 설명)
-        3. 세 번째 ETF의 추천 이유 (위험 감내도와 월 투자액을 고려하여 설명)
-        
-        중요: 정확히 3개의 ETF와 3개의 이유를 제공해주세요. 더 많거나 적으면 안됩니다.
+        중요: recommendations에는 서로 다른 ETF 정확히 3개를 포함해야 합니다.
         """
         
-        # OpenAI API 호출
-        response = await llm.ainvoke(prompt)
-        content = response.content
-        
-        # 응답 파싱
-        recommendations = []
-        reasons = []
+        report_progress(0.5, "ETF 추천을 생성하고 있습니다.")
+        with observe_stage("llm_recommendation"):
+            draft = await generate_validated_json(
+                prompt,
+                ETFRecommendationDraft,
+                validator=_validate_recommendation_codes,
+                repair_hint=f"추천 가능한 ETF 목록:\n{candidate_list}"
+            )
         
-        # 응답을 줄 단위로 분리
-        lines = content.split('\n')
-        current_section = None
+        picks = [etf_catalog.get(pick.etf_code) for pick in draft.recommendations]
         
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            if line == '[추천 ETF]':
-                current_section = 'recommendations'
-                continue
-            elif line == '[추천 이유]':
-                current_section = 'reasons'
-                continue
-            
-            if current_section == 'recommendations' and line[0].isdigit():
-                # "1. ETF 코드 - ETF 이름" 형식에서 실제 내용만 추출
-                recommendation = line.split('.', 1)[1].strip()
-                recommendations.append(recommendation)
-            elif current_section == 'reasons' and line[0].isdigit():
-                # "1. 추천 이유" 형식에서 실제 내용만 추출
-                reason = line.split('.', 1)[1].strip()
-                reasons.append(reason)
-        
-        # 정확히 3개의 추천과 이유가 있는지 확인
-        if len(recommendations) != 3 or len(reasons) != 3:
-            logger.warning(f"고객 ID {customer_id}에 대한 ETF 추천이 3개가 아닙니다. (추천: {len(recommendations)}, 이유: {len(reasons)})")
-            # 부족한 경우 기본 추천 추가
-            while len(recommendations) < 3:
-                recommendations.append("추천 정보를 준비 중입니다.")
-            while len(reasons) < 3:
-                reasons.append("추천 이유를 준비 중입니다.")
-        
-        # 응답 구성
+        # 응답 구성 (ETF 이름은 카탈로그 기준으로 표기)
         response = {
-            "recommendations": recommendations[:3],  # 최대 3개만 반환
-            "reasons": reasons[:3]  # 최대 3개만 반환
+            "recommendations": [f"{catalog['etf_code']} - {catalog['etf_name']}" for catalog in picks],
+            "reasons": [pick.reason for pick in draft.recommendations]
         }
         
+        
+        # 이후 비슷한 프로필의 고객이 재사용할 수 있도록 등록 (LLM이 생성한 추천만 등록)
+        if profile_vector is not None:
+            customer_index.add(profile_vector, response)
+        
         # ETF 보유 고객의 경우 추가 정보 포함
-        if etfs_owned:
-            response.update({
-                "portfolio_analysis": "현재 포트폴리오 분석 결과를 기반으로 한 리밸런싱이 필요합니다.",
-                "rebalancing_needed": True,
-                "rebalancing_suggestions": [
-                    "현재 포트폴리오의 리스크를 줄이기 위해 일부 ETF를 매도하고 새로운 ETF를 매수하는 것을 고려해보세요.",
-                    "추천된 ETF들을 현재 포트폴리오에 추가하여 분산 투자를 강화하세요."
-                ]
-            })
+        return ETFRecommendation(**_add_portfolio_fields(response, etfs_owned)).model_dump(exclude_none=True)
         
-        return response
+    except (DeadlineExceeded, LLMOutputValidationError, VectorSearchUnavailableError) as e:
+        logger.warning(f"카탈로그 기반 추천으로 대체: customer_id={customer_id}, 사유={str(e)}")
+        return recommend_from_catalog(risk_tolerance, financial_status, exclude=owned_codes)
         
     except Exception as e:
         logger.error(f"ETF 추천 중 오류 발생: {str(e)}")
         raise
 
-async def query_llm(prompt: str) -> str:
-    """
-    OpenAI API를 사용하여 LLM에 쿼리를 보내고 응답을 받습니다.
+async def _generate_text_section(operation: str, prompt: str) -> str:
+    """자유 형식 섹션을 라우팅된 모델로 생성합니다. (호출이 실패하거나 빈 응답이면 다음 모델로 승격)"""
+    async def call(model: Any, config: Dict[str, Any]) -> str:
+        response = await run_with_deadline(_invoke_model(model, prompt, config), "llm_query", LLM_MIN_BUDGET_SECONDS)
+        return response.content.strip()
     
-    Args:
-        prompt: LLM에 보내는 프롬프트
-        
-    Returns:
-        str: LLM의 응답
-    """
     try:
-        response = await llm.ainvoke(prompt)
-        return response.content
+        return await model_router.run(operation, call, validate=lambda text: [] if text else ["빈 응답"])
+    except (DeadlineExceeded, ModelOverloadedError):
+        raise
     except Exception as e:
         logger.error(f"LLM 쿼리 중 오류 발생: {str(e)}")
         return "죄송합니다. 현재 서비스에 일시적인 문제가 있습니다. 잠시 후 다시 시도해주세요."
 
+REBALANCE_STYLE_GUIDE = """
+        설명 시 다음을 유의해주세요:
+        - 전문 용어 대신 쉬운 말을 사용
+        - 구어체로 친근하게 설명
+        - 구체적인 예시를 들어 설명
+        - 긍정적이고 격려하는 톤으로 작성
+        - 섹션 제목 없이 본문만 작성
+"""
+
+async def _generate_performance_section(profile: str) -> str:
+    """[1. 포트폴리오 성과 분석] 섹션을 생성합니다."""
+    prompt = f"""
+        {profile}
+        
+        포트폴리오 성과 분석을 작성해주세요. 다음 내용을 쉽고 친절하게 설명해주세요:
+        1. 위의 가격 데이터 기반 수치를 인용하여 각 ETF의 최근 성과(수익률, 변동성, 최대 낙폭)와 특징을 알기 쉽게 설명
+        2. 보유 ETF 간 상관계수를 참고하여 현재 포트폴리오가 얼마나 잘 분산되어 있는지 설명
+        3. 고객님의 상황(나이, 위험 감내도, 재무 상태)에 맞는지 평가
+        {REBALANCE_STYLE_GUIDE}
+        """
+    with observe_stage("llm_rebalance_performance"):
+        return await _generate_text_section("rebalance_performance", prompt)
+
+async def _generate_necessity_section(profile: str) -> RebalanceNecessity:
+    """[2. 리밸런싱 필요성] 섹션을 구조화된 결과(필요 여부 + 설명)로 생성합니다. (실패하면 LLMOutputValidationError)"""
+    prompt = f"""
+        {profile}
+        
+        현재 포트폴리오의 리밸런싱이 필요한지 판단해주세요.
+        - rebalancing_needed: 리밸런싱이 필요하면 true, 아니면 false
+        - analysis: 리밸런싱이 필요한 이유 또는 필요하지 않은 이유와 고객님의 상황에 맞는 조언
+        {REBALANCE_STYLE_GUIDE}
+        """
+    async def call(model: Any, config: Dict[str, Any]) -> RebalanceNecessity:
+        # 구조화된 출력을 파싱하지 못하면 예외가 발생하여 다음 모델로 승격
+        return await run_with_deadline(
+            _invoke_model(model.with_structured_output(RebalanceNecessity), prompt, config),
+            "llm_rebalance_necessity",
+            LLM_MIN_BUDGET_SECONDS
+        )
+    
+    try:
+        with observe_stage("llm_rebalance_necessity"):
+            return await model_router.run(
+                "rebalance_necessity",
+                call,
+                validate=lambda result: [] if result and result.analysis.strip() else ["빈 분석"]
+            )
+    except (DeadlineExceeded, ModelOverloadedError, LLMOutputValidationError):
+        raise
+    except Exception as e:
+        # 필요 여부를 임의로 정하지 않고 카탈로그 기반 리포트(degraded)로 대체
+        logger.error(f"리밸런싱 필요성 분석 중 오류 발생: {str(e)}")
+        raise LLMOutputValidationError(f"rebalance_necessity 호출 실패: {type(e).__name__}: {str(e)}") from e
+
+async def _generate_suggestions_section(profile: str) -> str:
+    """[3. 리밸런싱 제안] 섹션을 생성합니다."""
+    prompt = f"""
+        {profile}
+        
+        리밸런싱 제안을 작성해주세요. 다음 내용을 쉽고 친절하게 설명해주세요:
+        1. 포트폴리오 조정 전략을 구체적으로 설명
+        2. 각 ETF의 적정 비중을 제안
+        3. 매수/매도가 필요한 경우 구체적인 제안
+        4. 포트폴리오 조정 시기와 주기에 대한 권장사항
+        {REBALANCE_STYLE_GUIDE}
+        """
+    with observe_stage("llm_rebalance_suggestions"):
+        return await _generate_text_section("rebalance_suggestions", prompt)
+
 @token_monitor.track_usage
 async def generate_rebalance_report(
     customer_id: str,
@@ -475,6 +1439,11 @@ async def generate_rebalance_report(
     """
     고객의 ETF 포트폴리오에 대한 리밸런싱 리포트를 생성합니다.
     
+    세 섹션(성과 분석, 리밸런싱 필요성, 리밸런싱 제안)은 서로 독립적이므로
+    각각 출력 토큰 상한을 둔 별도의 LLM 호출로 동시에 생성합니다.
+    보유 ETF의 수익률/변동성/최대 낙폭/상관계수는 가격 이력으로 미리 계산하여 프롬프트에 넣으므로
+    LLM은 수치를 만들어내지 않고 설명만 합니다. (계산 결과는 portfolio_metrics로 함께 반환)
+    
     Args:
         customer_id: 고객 ID
         etfs_owned: 현재 보유 중인 ETF 목록
@@ -483,12 +1452,18 @@ async def generate_rebalance_report(
         financial_status: 고객의 재무 상태 (수입, 저축 등)
     
     Returns:
-        Dict[str, Any]: 리밸런싱 리포트
+        Dict[str, Any]: 리밸런싱 리포트 (시간 예산이 부족하거나 리밸런싱 필요 여부를 판단하지 못하면
+            카탈로그 기반 리포트, degraded=True)
     """
     try:
-        # 통합된 리밸런싱 리포트 쿼리
-        rebalance_query = f"""
-        안녕하세요! {age}세의 고객님의 ETF 포트폴리오를 종합적으로 분석해드리겠습니다.
+        # 보유 ETF 성과 지표 (가격 이력 mmap 배열에서 벡터 연산으로 계산)
+        with observe_stage("portfolio_analytics"):
+            analysis = await asyncio.to_thread(analyze_portfolio, etfs_owned)
+        audit_log.note_inputs(price_as_of=analysis["as_of"], portfolio_metrics=analysis["portfolio"])
+        
+        # 모든 섹션이 공유하는 고객 정보
+        profile = f"""
+        안녕하세요! {age}세의 고객님의 ETF 포트폴리오를 분석해드리겠습니다.
         
         고객님의 투자 성향:
         - 나이: {age}세
@@ -497,65 +1472,18 @@ async def generate_rebalance_report(
         
         현재 보유하신 ETF: {', '.join(etfs_owned)}
         
-        다음 세 가지 섹션을 각각 독립적으로 상세히 분석해주세요:
-        
-        [1. 포트폴리오 성과 분석]
-        다음 내용을 쉽고 친절하게 설명해주세요:
-        1. 각 ETF의 최근 1년간 성과와 특징을 알기 쉽게 설명
-        2. 현재 포트폴리오가 얼마나 잘 분산되어 있는지 설명
-        3. 고객님의 상황(나이, 위험 감내도, 재무 상태)에 맞는지 평가
-        
-        [2. 리밸런싱 필요성]
-        다음 내용을 쉽고 친절하게 설명해주세요:
-        1. 현재 포트폴리오의 리밸런싱이 필요한지 여부
-        2. 리밸런싱이 필요한 이유 또는 필요하지 않은 이유
-        3. 고객님의 상황에 맞는 조언
-        
-        [3. 리밸런싱 제안]
-        다음 내용을 쉽고 친절하게 설명해주세요:
-        1. 포트폴리오 조정 전략을 구체적으로 설명
-        2. 각 ETF의 적정 비중을 제안
-        3. 매수/매도가 필요한 경우 구체적인 제안
-        4. 포트폴리오 조정 시기와 주기에 대한 권장사항
-        
-        각 섹션의 설명 시 다음을 유의해주세요:
-        - 전문 용어 대신 쉬운 말을 사용
-        - 구어체로 친근하게 설명
-        - 구체적인 예시를 들어 설명
-        - 긍정적이고 격려하는 톤으로 작성
-        - 각 섹션을 명확하게 구분하여 작성
+        {format_facts(analysis)}
         """
         
-        # 통합된 리포트 생성
-        full_report = await query_llm(rebalance_query)
-        
-        # 리포트를 섹션별로 분리
-        sections = full_report.split('\n\n')
-        performance_analysis = ""
-        rebalancing_analysis = ""
-        suggestions = ""
-        
-        current_section = None
-        for section in sections:
-            if "[1. 포트폴리오 성과 분석]" in section:
-                current_section = "performance"
-                performance_analysis = section.split("[1. 포트폴리오 성과 분석]")[1].strip()
-            elif "[2. 리밸런싱 필요성]" in section:
-                current_section = "rebalancing"
-                rebalancing_analysis = section.split("[2. 리밸런싱 필요성]")[1].strip()
-            elif "[3. 리밸런싱 제안]" in section:
-                current_section = "suggestions"
-                suggestions = section.split("[3. 리밸런싱 제안]")[1].strip()
-            elif current_section:
-                if current_section == "performance":
-                    performance_analysis += "\n\n" + section
-                elif current_section == "rebalancing":
-                    rebalancing_analysis += "\n\n" + section
-                elif current_section == "suggestions":
-                    suggestions += "\n\n" + section
-        
-        # 리밸런싱 필요 여부 판단
-        rebalancing_needed = "필요하다" in rebalancing_analysis or "권장된다" in rebalancing_analysis
+        # 세 섹션을 동시에 생성 (전체 지연시간 = 가장 긴 섹션의 지연시간)
+        report_progress(0.4, "리밸런싱 리포트를 생성하고 있습니다.")
+        with observe_stage("llm_rebalance_report"):
+            performance_analysis, necessity, suggestions = await asyncio.gather(
+                _generate_performance_section(profile),
+                _generate_necessity_section(profile),
+                _generate_suggestions_section(profile)
+            )
+        rebalancing_analysis = necessity.analysis.strip()
         
         # 종합 리포트 생성
         report = f"""
@@ -572,13 +1500,19 @@ async def generate_rebalance_report(
         {suggestions}
         """
         
-        return {
-            "report": report,
-            "performance_analysis": performance_analysis,
-            "rebalancing_needed": rebalancing_needed,
-            "suggestions": suggestions
-        }
+        return RebalanceReport(
+            report=report,
+            performance_analysis=performance_analysis,
+            rebalancing_needed=necessity.rebalancing_needed,
+            suggestions=suggestions,
+            rebalancing_analysis=rebalancing_analysis,
+            portfolio_metrics=analysis
+        ).model_dump()
+        
+    except (DeadlineExceeded, LLMOutputValidationError) as e:
+        logger.warning(f"카탈로그 기반 리밸런싱 리포트로 대체: customer_id={customer_id}, 사유={str(e)}")
+        return rebalance_from_catalog(customer_id, etfs_owned, risk_tolerance, age, financial_status)
         
     except Exception as e:
         logger.error(f"리밸런싱 리포트 생성 중 오류 발생: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from fastapi import HTTPException
+from config import JOB_DB_PATH, JOB_RETENTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 작업 상태
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# 현재 실행 중인 작업 ID (서비스 계층의 report_progress()가 진행률을 기록할 대상)
+_current_job: ContextVar[Optional[str]] = ContextVar("current_job", default=None)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def report_progress(fraction: float, message: str):
+    """
+    현재 작업의 진행률(0~1)과 단계 메시지를 기록합니다.
+    백그라운드 작업으로 실행 중이 아니면(동기 API 호출) 아무것도 하지 않습니다.
+    """
+    job_id = _current_job.get()
+    if job_id is not None:
+        job_store.update(job_id, progress=fraction, message=message)
+
+
+class JobStore:
+    """
+    오래 걸리는 분석/지식 업데이트 요청을 백그라운드 작업으로 실행하고 상태를 보관합니다.
+
+    클라이언트는 작업을 제출한 뒤 즉시 job_id를 받고 GET /jobs/{job_id}로 진행률과 결과를 조회합니다.
+    여러 워커가 같은 파일을 공유하므로(SQLite WAL) 작업을 실행한 워커와 다른 워커로 조회해도 됩니다.
+    같은 키(예: 같은 고객의 분석)로 진행 중인 작업이 있으면 새 작업을 만들지 않고 기존 작업을 반환하여,
+    클라이언트 재시도/재실행으로 같은 요청이 중복 실행되지 않도록 합니다.
+    """
+
+    def __init__(self, db_path: str = JOB_DB_PATH, retention_seconds: int = JOB_RETENTION_SECONDS):
+        self.db_path = db_path
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._initialized = False
+        self._create_lock = threading.Lock()
+        # 실행 중인 asyncio 작업 (가비지 컬렉션으로 취소되지 않도록 참조 유지)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 연결은 스레드 간에 공유할 수 없으므로 스레드별로 생성
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        if not self._initialized:
+            with conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        job_id TEXT PRIMARY KEY,
+                        kind TEXT NOT NULL,
+                        dedupe_key TEXT,
+                        status TEXT NOT NULL,
+                        progress REAL NOT NULL DEFAULT 0,
+                        message TEXT,
+                        result TEXT,
+                        error TEXT,
+                        status_code INTEGER,
+                        owner_pid INTEGER,
+                        created_at REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key_status ON jobs(dedupe_key, status)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs(updated_at)")
+            self._initialized = True
+        return conn
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job.pop("owner_pid", None)
+        job.pop("dedupe_key", None)
+        return job
+
+    def _fail_orphan(self, row: sqlite3.Row) -> bool:
+        """실행하던 워커가 종료되어 끝나지 못한 작업을 실패로 표시합니다."""
+        if row["status"] in ACTIVE_STATUSES and row["owner_pid"] and not _pid_alive(row["owner_pid"]):
+            self.update(row["job_id"], status=FAILED, error="작업을 실행하던 서버 프로세스가 종료되었습니다. 다시 요청해주세요.")
+            return True
+        return False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """작업 상태를 반환합니다. 없으면 None."""
+        conn = self._connection()
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is not None and self._fail_orphan(row):
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def update(
+        self,
+        job_id: str,
+        status: Optional[str] = None,
+        progress: Optional[float] = None,
+        message: Optional[str] = None,
+        result: Any = None,
+        error: Optional[str] = None,
+        status_code: Optional[int] = None
+    ):
+        fields = {"updated_at": time.time()}
+        if status is not None:
+            fields["status"] = status
+        if progress is not None:
+            fields["progress"] = round(min(max(progress, 0.0), 1.0), 3)
+        if message is not None:
+            fields["message"] = message
+        if result is not None:
+            fields["result"] = json.dumps(result, ensure_ascii=False, default=str)
+        if error is not None:
+            fields["error"] = error
+        if status_code is not None:
+            fields["status_code"] = status_code
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        conn = self._connection()
+        with conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def _purge_expired(self, conn: sqlite3.Connection):
+        cutoff = time.time() - self.retention_seconds
+        conn.execute(
+            f"DELETE FROM jobs WHERE updated_at < ? AND status NOT IN ({', '.join('?' * len(ACTIVE_STATUSES))})",
+            (cutoff, *ACTIVE_STATUSES)
+        )
+
+    def _create(self, kind: str, dedupe_key: Optional[str]) -> Dict[str, Any]:
+        """새 작업을 만듭니다. 같은 키로 진행 중인 작업이 있으면 그 작업을 반환합니다(created=False)."""
+        with self._create_lock:
+            conn = self._connection()
+            with conn:
+                # 다른 워커와 동시에 제출해도 한 작업만 만들어지도록 쓰기 트랜잭션 안에서 확인
+                conn.execute("BEGIN IMMEDIATE")
+                self._purge_expired(conn)
+                if dedupe_key is not None:
+                    row = conn.execute(
+                        f"SELECT * FROM jobs WHERE dedupe_key = ? AND status IN ({', '.join('?' * len(ACTIVE_STATUSES))}) "
+                        "ORDER BY created_at DESC LIMIT 1",
+                        (dedupe_key, *ACTIVE_STATUSES)
+                    ).fetchone()
+                    if row is not None and not (row["owner_pid"] and not _pid_alive(row["owner_pid"])):
+                        return {**self._to_dict(row), "created": False}
+                now = time.time()
+                job_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (job_id, kind, dedupe_key, status, progress, owner_pid, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+                    (job_id, kind, dedupe_key, QUEUED, os.getpid(), now, now)
+                )
+        return {**self.get(job_id), "created": True}
+
+    async def _run(self, job_id: str, work: Callable[[], Awaitable[Any]]):
+        token = _current_job.set(job_id)
+        try:
+            self.update(job_id, status=RUNNING, message="작업을 시작했습니다.")
+            result = await work()
+            self.update(job_id, status=SUCCEEDED, progress=1.0, message="완료", result=result)
+        except HTTPException as e:
+            self.update(job_id, status=FAILED, error=str(e.detail), status_code=e.status_code)
+        except Exception as e:
+            logger.error(f"백그라운드 작업 실패: {job_id} - {str(e)}")
+            self.update(job_id, status=FAILED, error=str(e), status_code=getattr(e, "status_code", 500))
+        finally:
+            _current_job.reset(token)
+
+    def submit(
+        self,
+        kind: str,
+        work: Callable[[], Awaitable[Any]],
+        dedupe_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        work()를 현재 이벤트 루프의 백그라운드 작업으로 실행하고 작업 정보를 반환합니다.
+
+        Args:
+            kind: 작업 종류 (customer_etf_analysis, knowledge_update 등)
+            work: 결과(JSON 직렬화 가능)를 반환하는 코루틴 함수
+            dedupe_key: 같은 키로 진행 중인 작업이 있으면 새로 실행하지 않고 기존 작업을 반환
+        """
+        job = self._create(kind, dedupe_key)
+        if job["created"]:
+            task = asyncio.get_running_loop().create_task(self._run(job["job_id"], work))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return job
+
+
+# 싱글톤 인스턴스 (프로세스 단위, 저장소는 워커 간 공유)
+job_store = JobStore()
@@ -0,0 +1,142 @@
+import time
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from config import MODEL_ROUTES, OPENAI_API_KEY, REBALANCE_SECTION_MAX_TOKENS, REPAIR_MAX_TOKENS
+from monitoring.token_monitor import token_monitor
+from services.deadline import DeadlineExceeded
+from services.model_scheduler import ModelOverloadedError
+from services import audit_log
+from monitoring.memory_diagnostics import register_memory_source
+
+logger = logging.getLogger(__name__)
+
+# 시도 결과
+ACCEPTED = "accepted"
+ESCALATED = "escalated"
+FAILED = "failed"
+
+# 작업별 최대 출력 토큰 (없으면 모델 기본값)
+ROUTE_MAX_TOKENS: Dict[str, Optional[int]] = {
+    "rebalance_performance": REBALANCE_SECTION_MAX_TOKENS["performance"],
+    "rebalance_necessity": REBALANCE_SECTION_MAX_TOKENS["necessity"],
+    "rebalance_suggestions": REBALANCE_SECTION_MAX_TOKENS["suggestions"],
+    "repair": REPAIR_MAX_TOKENS,
+}
+
+
+class LLMOutputValidationError(Exception):
+    """LLM 응답이 라우트의 마지막 모델까지 검증을 통과하지 못한 경우"""
+
+
+def create_chat_model(model: str, max_tokens: Optional[int] = None) -> Any:
+    """ChatOpenAI 인스턴스를 생성합니다. (langchain_openai는 처음 생성할 때 import)"""
+    from langchain_openai import ChatOpenAI
+    kwargs = {"max_tokens": max_tokens} if max_tokens else {}
+    return ChatOpenAI(
+        model=model,
+        temperature=0,
+        openai_api_key=OPENAI_API_KEY,
+        **kwargs
+    )
+
+
+class ModelRouter:
+    """
+    작업(operation)별로 모델을 선택하는 라우팅 계층입니다.
+
+    MODEL_ROUTES의 모델 목록을 앞에서부터(저렴하고 빠른 모델 먼저) 시도하고, 응답 검증에 실패하거나
+    호출이 실패한 경우에만 다음 모델로 승격합니다. 대부분의 일반적인 요청은 첫 번째 모델에서 끝나므로
+    지연시간과 비용이 줄어듭니다. 시도마다 결과(accepted/escalated/failed), 지연시간, 토큰 수, 비용을
+    token_monitor로 기록합니다. 요청 시간 예산 부족(DeadlineExceeded)과 대기열 초과(ModelOverloadedError)는
+    승격하지 않고 바로 전파합니다.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, List[str]] = MODEL_ROUTES,
+        max_tokens: Dict[str, Optional[int]] = ROUTE_MAX_TOKENS,
+        factory: Callable[[str, Optional[int]], Any] = create_chat_model
+    ):
+        self.routes = {operation: list(models) for operation, models in routes.items() if models}
+        self.max_tokens = max_tokens
+        self._factory = factory
+        self._models: Dict[Tuple[str, Optional[int]], Any] = {}
+        self._lock = threading.Lock()
+
+    def models(self, operation: str) -> List[str]:
+        if operation not in self.routes:
+            raise ValueError(f"라우팅이 설정되지 않은 작업: {operation}")
+        return self.routes[operation]
+
+    def model(self, operation: str, model_name: str) -> Any:
+        """작업에 맞는 출력 토큰 상한을 둔 모델 인스턴스 (모델/상한 조합별로 한 번만 생성)"""
+        key = (model_name, self.max_tokens.get(operation))
+        instance = self._models.get(key)
+        if instance is None:
+            with self._lock:
+                instance = self._models.get(key)
+                if instance is None:
+                    instance = self._factory(*key)
+                    self._models[key] = instance
+        return instance
+
+    def warm_up(self):
+        """각 작업의 첫 번째 모델을 미리 생성합니다. (승격용 모델은 처음 승격할 때 생성)"""
+        for operation in self.routes:
+            self.model(operation, self.models(operation)[0])
+
+    async def run(
+        self,
+        operation: str,
+        call: Callable[[Any, Dict[str, Any]], Awaitable[Any]],
+        validate: Optional[Callable[[Any], List[str]]] = None
+    ) -> Any:
+        """
+        작업을 라우트의 모델 순서대로 시도하여 검증을 통과한 첫 결과를 반환합니다.
+
+        Args:
+            operation: MODEL_ROUTES의 작업 이름
+            call: (모델, 호출 config) → 결과. config는 모델 호출(ainvoke)에 그대로 전달해야
+                시도별 토큰 수와 비용이 기록됩니다.
+            validate: 결과 → 오류 메시지 목록 (비어 있으면 통과)
+
+        Raises:
+            LLMOutputValidationError: 마지막 모델의 결과도 검증에 실패한 경우
+            마지막 모델 호출에서 발생한 예외, DeadlineExceeded, ModelOverloadedError
+        """
+        from langchain_community.callbacks.openai_info import OpenAICallbackHandler
+
+        models = self.models(operation)
+        for position, model_name in enumerate(models):
+            last = position == len(models) - 1
+            # 요청 단위 합계(track_usage)와 별도로 이번 시도의 토큰/비용만 집계
+            usage = OpenAICallbackHandler()
+            started = time.perf_counter()
+            error: Optional[Exception] = None
+            try:
+                result = await call(self.model(operation, model_name), {"callbacks": [usage]})
+                errors = validate(result) if validate else []
+            except (DeadlineExceeded, ModelOverloadedError):
+                raise
+            except LLMOutputValidationError as e:
+                error, errors = e, [str(e)]
+            except Exception as e:
+                error, errors = e, [f"{type(e).__name__}: {str(e)}"]
+            outcome = ACCEPTED if not errors else (FAILED if last else ESCALATED)
+            token_monitor.record_route_call(
+                operation, model_name, outcome, time.perf_counter() - started, usage.total_tokens, usage.total_cost
+            )
+            if not errors:
+                audit_log.note_model(model_name)
+                return result
+            if last:
+                if error is not None and not isinstance(error, LLMOutputValidationError):
+                    raise error
+                raise LLMOutputValidationError(f"{operation} 응답 검증 실패 ({model_name}): {errors}")
+            logger.warning(f"{operation}: {model_name} 결과 검증 실패, {models[position + 1]}(으)로 승격 - {errors}")
+
+
+# 싱글톤 인스턴스 (프로세스 단위)
+model_router = ModelRouter()
+register_memory_source("model_router_clients", lambda: {"items": len(model_router._models)})
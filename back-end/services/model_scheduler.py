@@ -0,0 +1,261 @@
+import math
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional
+from config import MODEL_MAX_CONCURRENCY, MODEL_INTERACTIVE_RESERVED, MODEL_QUEUE_LIMITS
+from services.deadline import DeadlineExceeded, remaining_budget
+from monitoring.metrics import MODEL_CALLS_IN_FLIGHT, MODEL_CALLS_SHED, MODEL_QUEUE_DEPTH, MODEL_QUEUE_WAIT
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# 우선순위 클래스 (앞쪽일수록 먼저 슬롯을 받음)
+INTERACTIVE = "interactive"
+BATCH = "batch"
+MAINTENANCE = "maintenance"
+PRIORITY_CLASSES = (INTERACTIVE, BATCH, MAINTENANCE)
+
+_current_priority: ContextVar[str] = ContextVar("model_call_priority", default=INTERACTIVE)
+
+
+class ModelOverloadedError(Exception):
+    """우선순위 클래스의 대기열이 가득 차 모델 호출을 받을 수 없는 경우"""
+
+    def __init__(self, priority: str, retry_after: int):
+        super().__init__(f"{priority} 모델 호출 대기열이 가득 찼습니다. {retry_after}초 후 다시 시도해주세요.")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+@contextmanager
+def priority_class(priority: str):
+    """블록 안에서 실행되는 모델 호출의 우선순위 클래스를 지정합니다."""
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"알 수 없는 우선순위 클래스: {priority}")
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def with_priority(priority: str, func: Callable) -> Callable:
+    """
+    함수를 지정한 우선순위 클래스로 실행하는 래퍼를 반환합니다.
+    run_in_threadpool 등으로 다른 스레드에서 실행할 함수에 사용합니다.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with priority_class(priority):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued_at", "granted", "_notify")
+
+    def __init__(self, priority: str, notify: Callable[[], None]):
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self._notify = notify
+
+    def grant(self):
+        self.granted = True
+        self._notify()
+
+
+class ModelCallScheduler:
+    """
+    OpenAI로 나가는 모델 호출(LLM, 임베딩)의 동시 실행 수를 제한하는 우선순위 스케줄러입니다.
+
+    - 슬롯이 비면 interactive > batch > maintenance 순서로, 같은 클래스 안에서는 FIFO로 배정합니다.
+    - batch/maintenance 작업은 interactive 전용 예약 슬롯을 사용할 수 없으므로
+      백그라운드 작업이 몰려도 인터랙티브 요청이 바로 실행될 여지가 남습니다.
+    - 클래스별 대기열이 가득 차면 ModelOverloadedError로 즉시 거절합니다(load shedding).
+
+    이벤트 루프의 코루틴(slot)과 스레드풀/스케줄러 스레드의 동기 코드(slot_sync)가
+    같은 슬롯 풀을 공유합니다.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = MODEL_MAX_CONCURRENCY,
+        interactive_reserved: int = MODEL_INTERACTIVE_RESERVED,
+        queue_limits: Optional[Dict[str, int]] = None
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.background_concurrency = max(1, self.max_concurrency - max(0, interactive_reserved))
+        self.queue_limits = dict(queue_limits or MODEL_QUEUE_LIMITS)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._active_by_class = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._queues: Dict[str, Deque[_Waiter]] = {priority: deque() for priority in PRIORITY_CLASSES}
+        # 슬롯 점유 시간의 지수 이동 평균 (Retry-After 추정용)
+        self._avg_service_time = 1.0
+
+    def _limit_for(self, priority: str) -> int:
+        return self.max_concurrency if priority == INTERACTIVE else self.background_concurrency
+
+    def _has_priority_waiters(self, priority: str) -> bool:
+        """priority보다 높거나 같은 클래스에 대기 중인 호출이 있는지 확인합니다."""
+        for cls in PRIORITY_CLASSES:
+            if self._queues[cls]:
+                return True
+            if cls == priority:
+                return False
+        return False
+
+    def _take_slot(self, priority: str):
+        self._active += 1
+        self._active_by_class[priority] += 1
+        MODEL_CALLS_IN_FLIGHT.labels(priority=priority).inc()
+
+    def _retry_after(self, priority: str) -> int:
+        backlog = sum(len(self._queues[cls]) for cls in PRIORITY_CLASSES[:PRIORITY_CLASSES.index(priority) + 1])
+        return max(1, math.ceil(backlog * self._avg_service_time / self._limit_for(priority)))
+
+    def _enqueue(self, priority: str, notify: Callable[[], None]) -> Optional[_Waiter]:
+        """슬롯을 바로 얻으면 None, 대기해야 하면 대기열에 등록된 waiter를 반환합니다."""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"알 수 없는 우선순위 클래스: {priority}")
+        with self._lock:
+            if self._active < self._limit_for(priority) and not self._has_priority_waiters(priority):
+                self._take_slot(priority)
+                MODEL_QUEUE_WAIT.labels(priority=priority).observe(0)
+                return None
+            if len(self._queues[priority]) >= self.queue_limits.get(priority, 0):
+                MODEL_CALLS_SHED.labels(priority=priority).inc()
+                raise ModelOverloadedError(priority, self._retry_after(priority))
+            waiter = _Waiter(priority, notify)
+            self._queues[priority].append(waiter)
+            MODEL_QUEUE_DEPTH.labels(priority=priority).inc()
+            return waiter
+
+    def _dispatch(self):
+        """빈 슬롯을 우선순위가 높은 대기 호출부터 배정합니다. (lock 보유 상태에서 호출)"""
+        for priority in PRIORITY_CLASSES:
+            queue = self._queues[priority]
+            while queue and self._active < self._limit_for(priority):
+                waiter = queue.popleft()
+                MODEL_QUEUE_DEPTH.labels(priority=priority).dec()
+                MODEL_QUEUE_WAIT.labels(priority=priority).observe(time.monotonic() - waiter.enqueued_at)
+                self._take_slot(priority)
+                waiter.grant()
+
+    def _release(self, priority: str, held_for: Optional[float] = None):
+        with self._lock:
+            self._active -= 1
+            self._active_by_class[priority] -= 1
+            MODEL_CALLS_IN_FLIGHT.labels(priority=priority).dec()
+            if held_for is not None:
+                self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * held_for
+            self._dispatch()
+
+    def _abandon(self, waiter: _Waiter):
+        """대기를 포기한 호출을 정리합니다. 이미 슬롯을 배정받았다면 반납합니다."""
+        with self._lock:
+            if not waiter.granted:
+                self._queues[waiter.priority].remove(waiter)
+                MODEL_QUEUE_DEPTH.labels(priority=waiter.priority).dec()
+                return
+        self._release(waiter.priority)
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None):
+        """코루틴에서 모델 호출 슬롯을 획득합니다."""
+        priority = priority or _current_priority.get()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._enqueue(priority, notify)
+        if waiter is not None:
+            try:
+                await future
+            except BaseException:
+                # deadline 초과 등으로 취소된 경우
+                self._abandon(waiter)
+                raise
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(priority, time.monotonic() - start)
+
+    @contextmanager
+    def slot_sync(self, priority: Optional[str] = None, timeout: Optional[float] = None):
+        """스레드에서 모델 호출 슬롯을 획득합니다. timeout 안에 슬롯을 얻지 못하면 TimeoutError."""
+        priority = priority or _current_priority.get()
+        event = threading.Event()
+        waiter = self._enqueue(priority, event.set)
+        if waiter is not None and not event.wait(timeout):
+            self._abandon(waiter)
+            raise TimeoutError(f"{priority} 모델 호출 슬롯 대기 시간 초과")
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(priority, time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """우선순위 클래스별 대기/실행 중인 호출 수를 반환합니다."""
+        with self._lock:
+            return {
+                priority: {"queued": len(self._queues[priority]), "in_flight": self._active_by_class[priority]}
+                for priority in PRIORITY_CLASSES
+            }
+
+
+class ScheduledEmbeddings:
+    """
+    임베딩 호출이 ModelCallScheduler의 슬롯을 거치도록 감싸는 래퍼
+    (Embeddings 인터페이스와 같은 메서드를 제공. langchain_core.embeddings를 상속하면
+    import 시 langsmith까지 로드되어 서버 시작이 느려지므로 상속하지 않음)
+    """
+
+    def __init__(self, embeddings: "Embeddings", scheduler: ModelCallScheduler):
+        self.embeddings = embeddings
+        self.scheduler = scheduler
+
+    @contextmanager
+    def _slot_sync(self):
+        # asyncio.to_thread로 전파된 요청 deadline까지만 대기 (deadline 이후 스레드가 대기열에 남지 않도록)
+        # 슬롯 대기 시간 초과만 DeadlineExceeded로 바꾸고, 임베딩 호출 자체의 TimeoutError는 그대로 전파
+        slot = ExitStack()
+        try:
+            slot.enter_context(self.scheduler.slot_sync(timeout=remaining_budget()))
+        except TimeoutError as e:
+            raise DeadlineExceeded(f"embedding: {str(e)}") from e
+        with slot:
+            yield
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._slot_sync():
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._slot_sync():
+            return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        async with self.scheduler.slot():
+            return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        async with self.scheduler.slot():
+            return await self.embeddings.aembed_query(text)
+
+
+# 싱글톤 인스턴스 (프로세스 단위)
+model_scheduler = ModelCallScheduler()
@@ -0,0 +1,342 @@
+"""
+보유 ETF의 가격 이력으로 성과 지표(수익률, 변동성, 최대 낙폭, 상관/공분산)를 계산합니다.
+
+모든 계산은 날짜 × ETF(또는 날짜 × 포트폴리오) 행렬 단위로 벡터화되어 있어, 한 고객의 포트폴리오와
+전체 고객의 포트폴리오(배치 모드)를 같은 함수로 계산합니다. 리밸런싱 리포트는 이 수치를 프롬프트에 넣어
+LLM이 수치를 만들어내지 않고 설명만 하도록 합니다.
+
+배치 모드 실행 (back-end 디렉토리에서):
+    python -m services.portfolio_analytics --customers data/customer/customer_data.csv --output portfolio_metrics.parquet
+"""
+import math
+import logging
+import warnings
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config import PRICE_FIELD, PRICE_LOOKBACK_DAYS
+from services.etf_catalog import etf_catalog
+from services.price_store import normalize_code, price_store
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+# 배치 모드에서 한 번에 계산하는 포트폴리오 수 (날짜 × 포트폴리오 행렬 크기 제한)
+BATCH_CHUNK_SIZE = 50000
+
+
+def forward_fill(prices: np.ndarray) -> np.ndarray:
+    """휴장 등으로 빠진 가격을 직전 가격으로 채웁니다. (첫 가격 이전은 NaN 유지)"""
+    if not prices.size:
+        return prices
+    valid = ~np.isnan(prices)
+    index = np.where(valid, np.arange(prices.shape[0])[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    return prices[index, np.arange(prices.shape[1])]
+
+
+def daily_returns(prices: np.ndarray) -> np.ndarray:
+    """일별 수익률 행렬 (날짜 - 1) × 열. 전일 또는 당일 가격이 없으면 NaN."""
+    filled = forward_fill(prices)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return filled[1:] / filled[:-1] - 1.0
+
+
+def series_metrics(returns: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    일별 수익률 행렬(날짜 × 열)의 열별 누적 수익률, 연환산 변동성, 최대 낙폭, 관측일 수를 계산합니다.
+    관측일이 없는 열은 NaN입니다.
+    """
+    present = ~np.isnan(returns)
+    observations = present.sum(axis=0)
+    wealth = np.cumprod(1.0 + np.where(present, returns, 0.0), axis=0)
+    if wealth.shape[0]:
+        # 시작 자산(1.0)도 고점에 포함
+        peak = np.maximum(np.maximum.accumulate(wealth, axis=0), 1.0)
+        total_return = wealth[-1] - 1.0
+        max_drawdown = (wealth / peak - 1.0).min(axis=0)
+    else:
+        total_return = max_drawdown = np.zeros(returns.shape[1])
+    with warnings.catch_warnings():
+        # 관측일이 부족한 열의 경고는 무시 (아래에서 NaN으로 처리)
+        warnings.simplefilter("ignore", RuntimeWarning)
+        volatility = np.nanstd(returns, axis=0, ddof=1) * math.sqrt(TRADING_DAYS)
+    missing = observations == 0
+    total_return = np.where(missing, np.nan, total_return)
+    max_drawdown = np.where(missing, np.nan, max_drawdown)
+    volatility = np.where(observations < 2, np.nan, volatility)
+    return {
+        "return": total_return,
+        "volatility": volatility,
+        "max_drawdown": max_drawdown,
+        "observations": observations,
+    }
+
+
+def covariance_matrix(returns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    일별 수익률 행렬(날짜 × 열)의 연환산 공분산 행렬과 상관계수 행렬을 계산합니다.
+    상장일이 달라 기간이 다른 ETF도 비교할 수 있도록 두 ETF 모두 수익률이 있는 날만 사용합니다. (pairwise)
+    """
+    present = ~np.isnan(returns)
+    mask = present.astype(np.float64)
+    values = np.where(present, returns, 0.0)
+    pairs = mask.T @ mask
+    # sums[i, j]: j의 수익률이 있는 날의 i 수익률 합
+    sums = values.T @ mask
+    squares = (values * values).T @ mask
+    products = values.T @ values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = (products - sums * sums.T / pairs) / (pairs - 1)
+        variance = (squares - sums * sums / pairs) / (pairs - 1)
+        correlation = covariance / np.sqrt(variance * variance.T)
+    insufficient = pairs < 2
+    covariance[insufficient] = np.nan
+    correlation[insufficient] = np.nan
+    np.fill_diagonal(correlation, np.where(np.diag(insufficient), np.nan, 1.0))
+    return covariance * TRADING_DAYS, np.clip(correlation, -1.0, 1.0)
+
+
+def portfolio_returns(returns: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    포트폴리오별 일별 수익률 (날짜 × 포트폴리오).
+    weights는 포트폴리오 × 열 비중 행렬이며, 가격이 없는 날은 그날 가격이 있는 ETF끼리 비중을 다시 나눕니다.
+    """
+    present = ~np.isnan(returns)
+    covered = present.astype(np.float64) @ weights.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = (np.where(present, returns, 0.0) @ weights.T) / covered
+    result[covered <= 0] = np.nan
+    return result
+
+
+def average_correlation(correlation: np.ndarray, holdings: np.ndarray) -> np.ndarray:
+    """포트폴리오별(holdings: 포트폴리오 × 열 0/1 행렬) 보유 ETF 간 평균 상관계수 (2개 미만이면 NaN)"""
+    known = ~np.isnan(correlation)
+    values = np.where(known, correlation, 0.0)
+    pair_sums = ((holdings @ values) * holdings).sum(axis=1) - holdings @ np.diag(values)
+    pair_counts = ((holdings @ known.astype(np.float64)) * holdings).sum(axis=1) - holdings @ np.diag(known).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(pair_counts > 0, pair_sums / pair_counts, np.nan)
+
+
+def _number(value: Any, digits: int = 6) -> Optional[float]:
+    """JSON 응답용 숫자 (NaN/inf는 None)"""
+    value = float(value)
+    return round(value, digits) if math.isfinite(value) else None
+
+
+def resolve_holdings(holdings: Iterable[str]) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    보유 ETF 표기(코드 또는 이름)를 (코드, 이름) 목록으로 변환합니다.
+    카탈로그 코드/이름, 가격 이력 파일의 etf_name 순서로 찾고, 찾지 못한 표기는 따로 반환합니다.
+    """
+    resolved: Dict[str, str] = {}
+    unmatched = []
+    for holding in holdings:
+        holding = str(holding).strip()
+        if not holding:
+            continue
+        code = etf_catalog.normalize_code(holding)
+        if code is None:
+            matches = etf_catalog.match_names(holding)
+            code = matches[0]["etf_code"] if matches else None
+        if code is None:
+            code = price_store.code_for_name(holding) or (normalize_code(holding) if price_store.has(holding) else None)
+        if code is None:
+            unmatched.append(holding)
+            continue
+        record = etf_catalog.get(code)
+        resolved.setdefault(code, record["etf_name"] if record else (price_store.name(code) or holding))
+    return list(resolved.items()), unmatched
+
+
+def analyze_portfolio(
+    holdings: List[str],
+    lookback: int = PRICE_LOOKBACK_DAYS,
+    field: str = PRICE_FIELD
+) -> Dict[str, Any]:
+    """
+    한 고객의 보유 ETF(동일 비중)에 대한 성과 지표를 계산합니다.
+
+    Returns:
+        available(가격 이력 유무), 기간, ETF별 지표, 포트폴리오 지표, 상관/공분산 행렬,
+        찾지 못한 ETF(unmatched)와 가격 이력이 없는 ETF(missing_prices)
+    """
+    resolved, unmatched = resolve_holdings(holdings)
+    names = dict(resolved)
+    dates, prices, codes = price_store.window(list(names), field=field, days=lookback)
+    result: Dict[str, Any] = {
+        "available": False,
+        "field": field,
+        "start": None,
+        "as_of": price_store.as_of,
+        "holdings": [],
+        "portfolio": None,
+        "correlation": None,
+        "covariance": None,
+        "unmatched": unmatched,
+        "missing_prices": [names[code] for code in names if code not in codes],
+    }
+    returns = daily_returns(prices)
+    if not codes or not returns.shape[0]:
+        return result
+
+    metrics = series_metrics(returns)
+    covariance, correlation = covariance_matrix(returns)
+    weights = np.full((1, len(codes)), 1.0 / len(codes))
+    portfolio = series_metrics(portfolio_returns(returns, weights))
+    result.update(
+        available=True,
+        start=str(dates[0]),
+        as_of=str(dates[-1]),
+        holdings=[
+            {
+                "etf_code": code,
+                "etf_name": names[code],
+                "return": _number(metrics["return"][i]),
+                "volatility": _number(metrics["volatility"][i]),
+                "max_drawdown": _number(metrics["max_drawdown"][i]),
+                "observations": int(metrics["observations"][i]),
+            }
+            for i, code in enumerate(codes)
+        ],
+        portfolio={
+            "weights": {code: _number(weight) for code, weight in zip(codes, weights[0])},
+            "return": _number(portfolio["return"][0]),
+            "volatility": _number(portfolio["volatility"][0]),
+            "max_drawdown": _number(portfolio["max_drawdown"][0]),
+            "average_correlation": _number(average_correlation(correlation, np.ones((1, len(codes))))[0]),
+        },
+        correlation={"codes": codes, "matrix": [[_number(value) for value in row] for row in correlation]},
+        covariance={"codes": codes, "matrix": [[_number(value) for value in row] for row in covariance]},
+    )
+    return result
+
+
+def analyze_portfolios(
+    portfolios: List[List[str]],
+    lookback: int = PRICE_LOOKBACK_DAYS,
+    field: str = PRICE_FIELD,
+    chunk_size: int = BATCH_CHUNK_SIZE
+) -> Dict[str, np.ndarray]:
+    """
+    여러 고객의 포트폴리오(동일 비중) 지표를 한 번에 계산합니다. (배치 모드)
+
+    전체 보유 ETF의 수익률 행렬과 상관계수 행렬은 한 번만 계산하고, 포트폴리오 수익률은 보유 구성별로
+    (날짜 × ETF) @ (ETF × 포트폴리오) 행렬 곱으로 chunk_size개씩 계산합니다.
+
+    Returns:
+        포트폴리오 순서의 배열: holdings(보유 수), priced(가격 이력이 있는 보유 수), return, volatility,
+        max_drawdown, average_correlation
+    """
+    # 같은 ETF 표기는 한 번만 코드로 변환
+    tokens = {str(holding).strip() for holdings in portfolios for holding in holdings}
+    code_for = {token: codes[0][0] for token in tokens if (codes := resolve_holdings([token])[0])}
+    resolved = [
+        list(dict.fromkeys(code_for[token] for token in map(str.strip, map(str, holdings)) if token in code_for))
+        for holdings in portfolios
+    ]
+    universe = sorted({code for codes in resolved for code in codes})
+    _, prices, codes = price_store.window(universe, field=field, days=lookback)
+    column = {code: i for i, code in enumerate(codes)}
+    returns = daily_returns(prices)
+    _, correlation = covariance_matrix(returns)
+
+    # 가격 이력이 있는 ETF 구성이 같은 포트폴리오는 한 번만 계산 (고객 수보다 구성 수가 훨씬 적음)
+    groups: Dict[Tuple[int, ...], int] = {}
+    group_of = np.array(
+        [groups.setdefault(tuple(sorted(column[code] for code in codes if code in column)), len(groups)) for codes in resolved],
+        dtype=np.int64
+    )
+    keys = list(groups)
+    metrics = {name: np.full(len(keys), np.nan) for name in ("return", "volatility", "max_drawdown", "average_correlation")}
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        end = start + len(chunk)
+        if not returns.shape[0] or not len(codes):
+            break
+        held = np.zeros((len(chunk), len(codes)))
+        held[
+            [row for row, key in enumerate(chunk) for _ in key],
+            [position for key in chunk for position in key]
+        ] = 1.0
+        priced = held.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weights = np.where(priced > 0, held / priced, 0.0)
+        chunk_metrics = series_metrics(portfolio_returns(returns, weights))
+        for name in ("return", "volatility", "max_drawdown"):
+            metrics[name][start:end] = chunk_metrics[name]
+        metrics["average_correlation"][start:end] = average_correlation(correlation, held)
+    return {
+        "holdings": np.array([len(codes) for codes in resolved], dtype=np.int64),
+        "priced": np.array([len(key) for key in keys], dtype=np.int64)[group_of] if keys else np.zeros(0, dtype=np.int64),
+        **{name: values[group_of] for name, values in metrics.items()},
+    }
+
+
+def _percent(value: Optional[float]) -> str:
+    return f"{value * 100:+.1f}%" if value is not None else "데이터 없음"
+
+
+def format_facts(analysis: Dict[str, Any]) -> str:
+    """리밸런싱 프롬프트에 넣을 가격 데이터 기반 수치 요약"""
+    lines = ["[가격 데이터 기반 수치]"]
+    if not analysis["available"]:
+        lines.append("- 보유 ETF의 가격 데이터가 없어 수익률/변동성 수치를 제공할 수 없습니다.")
+        lines.append("- 수익률, 변동성 등 구체적인 수치를 추정하거나 만들어내지 말고 데이터가 없다고 안내해주세요.")
+        return "\n        ".join(lines)
+    lines.append(f"- 기간: {analysis['start']} ~ {analysis['as_of']} ({'종가' if analysis['field'] == 'close' else '기준가'} 기준)")
+    for item in analysis["holdings"]:
+        volatility = f"{item['volatility'] * 100:.1f}%" if item["volatility"] is not None else "데이터 없음"
+        lines.append(
+            f"- {item['etf_name']}({item['etf_code']}): 수익률 {_percent(item['return'])}, "
+            f"연환산 변동성 {volatility}, 최대 낙폭 {_percent(item['max_drawdown'])}"
+        )
+    portfolio = analysis["portfolio"]
+    volatility = f"{portfolio['volatility'] * 100:.1f}%" if portfolio["volatility"] is not None else "데이터 없음"
+    lines.append(
+        f"- 포트폴리오(동일 비중): 수익률 {_percent(portfolio['return'])}, 연환산 변동성 {volatility}, "
+        f"최대 낙폭 {_percent(portfolio['max_drawdown'])}"
+    )
+    if portfolio["average_correlation"] is not None:
+        lines.append(f"- 보유 ETF 간 평균 상관계수: {portfolio['average_correlation']:.2f} (1에 가까울수록 함께 움직임)")
+    missing = analysis["unmatched"] + analysis["missing_prices"]
+    if missing:
+        lines.append(f"- 가격 데이터 없음: {', '.join(missing)}")
+    lines.append("- 수익률, 변동성 등 수치는 위 값만 인용하고 새로 만들어내지 마세요.")
+    return "\n        ".join(lines)
+
+
+def main():
+    import argparse
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="전체 고객 포트폴리오의 성과 지표를 계산합니다.")
+    parser.add_argument("--customers", required=True, help="고객 데이터 파일 (CSV 또는 Parquet, customer_id/current_etf_holdings 컬럼)")
+    parser.add_argument("--output", required=True, help="결과 파일 (.csv 또는 .parquet)")
+    parser.add_argument("--lookback", type=int, default=PRICE_LOOKBACK_DAYS, help="계산 기간(거래일)")
+    parser.add_argument("--field", choices=("close", "nav"), default=PRICE_FIELD, help="사용할 가격")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    columns = ["customer_id", "current_etf_holdings"]
+    if args.customers.endswith(".parquet"):
+        customers = pd.read_parquet(args.customers, columns=columns)
+    else:
+        customers = pd.read_csv(args.customers, usecols=columns)
+    portfolios = [
+        holdings.split(",") if isinstance(holdings, str) and holdings else []
+        for holdings in customers["current_etf_holdings"]
+    ]
+    metrics = analyze_portfolios(portfolios, lookback=args.lookback, field=args.field)
+    output = pd.DataFrame({"customer_id": customers["customer_id"], **metrics})
+    output.insert(1, "as_of", price_store.as_of)
+    if args.output.endswith(".parquet"):
+        output.to_parquet(args.output, index=False)
+    else:
+        output.to_csv(args.output, index=False)
+    logger.info(f"포트폴리오 지표 계산 완료: {len(output)}명 → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
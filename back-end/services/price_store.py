@@ -0,0 +1,247 @@
+import os
+import re
+import glob
+import json
+import shutil
+import hashlib
+import logging
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from config import LOCK_DIR, PRICE_HISTORY_PATH
+from services.process_sync import InterProcessLock
+from services.warmup import register
+from monitoring.memory_diagnostics import register_memory_source
+
+logger = logging.getLogger(__name__)
+
+# 가격 컬럼 (close: 종가, nav: 기준가)
+PRICE_FIELDS = ("close", "nav")
+REQUIRED_COLUMNS = ("date", "etf_code")
+SOURCE_PATTERNS = ("*.csv", "*.parquet")
+# 변환된 배열 저장 위치 (원본 파일 목록/크기/수정 시각의 해시별 디렉토리)
+STORE_DIR = ".store"
+META_FILE = "meta.json"
+DATES_FILE = "dates.npy"
+
+
+def normalize_code(code: Any) -> str:
+    """'091160', 'a091160' 등의 표기를 카탈로그 형식('A091160')으로 변환합니다."""
+    code = str(code or "").strip().upper()
+    return f"A{code}" if re.fullmatch(r"\d{6}", code) else code
+
+
+def _normalize_name(name: Any) -> str:
+    return re.sub(r"\s+", "", str(name or "")).upper()
+
+
+class PriceHistoryStore:
+    """
+    ETF별 일별 가격(종가/기준가) 이력 저장소입니다.
+
+    PRICE_HISTORY_PATH의 CSV/Parquet 파일(긴 형식: date, etf_code, close, nav, etf_name(선택))을
+    날짜 × ETF 코드 행렬로 변환하여 .npy 파일로 저장하고 읽기 전용 mmap으로 로드합니다.
+    여러 워커가 같은 페이지 캐시를 공유하며, 원본 파일이 바뀌면 다음 조회 시 한 워커만 다시 변환합니다.
+    가격이 없는 날(상장 전, 휴장)은 NaN입니다.
+    """
+
+    def __init__(self, source_path: str = PRICE_HISTORY_PATH):
+        self.source_path = source_path
+        self._lock = threading.Lock()
+        self._signature: Optional[str] = None
+        self._dates = np.empty(0, dtype="datetime64[D]")
+        self._codes: List[str] = []
+        self._columns: Dict[str, int] = {}
+        self._names: Dict[str, str] = {}
+        self._code_by_name: Dict[str, str] = {}
+        self._prices: Dict[str, np.ndarray] = {}
+
+    def _sources(self) -> List[str]:
+        if not os.path.isdir(self.source_path):
+            return []
+        return sorted(
+            path for pattern in SOURCE_PATTERNS
+            for path in glob.glob(os.path.join(self.source_path, pattern))
+        )
+
+    def _source_signature(self, sources: List[str]) -> Optional[str]:
+        """원본 파일 목록/크기/수정 시각의 해시 (원본이 없으면 None)"""
+        if not sources:
+            return None
+        digest = hashlib.sha256()
+        for path in sources:
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def _ensure_loaded(self):
+        sources = self._sources()
+        signature = self._source_signature(sources)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            if signature is None:
+                self._set_arrays(np.empty(0, dtype="datetime64[D]"), [], {}, {})
+                self._signature = None
+                logger.warning(f"가격 이력 파일이 없음: {self.source_path}")
+                return
+            store_path = os.path.join(self.source_path, STORE_DIR, signature)
+            if not os.path.exists(os.path.join(store_path, META_FILE)):
+                with InterProcessLock(os.path.join(LOCK_DIR, "price_store.lock")):
+                    # 다른 워커가 먼저 변환했을 수 있으므로 잠금 획득 후 다시 확인
+                    if not os.path.exists(os.path.join(store_path, META_FILE)):
+                        self._build(sources, store_path)
+            self._load(store_path)
+            self._signature = signature
+
+    def _build(self, sources: List[str], store_path: str):
+        """원본 파일을 날짜 × ETF 코드 행렬로 변환하여 저장합니다."""
+        import pandas as pd
+        frames = []
+        for path in sources:
+            try:
+                if path.endswith(".parquet"):
+                    frame = pd.read_parquet(path)
+                else:
+                    frame = pd.read_csv(path, dtype={"etf_code": str}, encoding="utf-8-sig")
+            except Exception as e:
+                logger.error(f"가격 이력 파일 로드 실패: {path} - {str(e)}")
+                continue
+            missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+            if missing or not any(field in frame.columns for field in PRICE_FIELDS):
+                logger.warning(f"가격 이력 파일 건너뜀 (필수 컬럼 없음: {missing or PRICE_FIELDS}): {path}")
+                continue
+            frames.append(frame[[
+                column for column in (*REQUIRED_COLUMNS, *PRICE_FIELDS, "etf_name") if column in frame.columns
+            ]])
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[*REQUIRED_COLUMNS, *PRICE_FIELDS])
+        df["etf_code"] = df["etf_code"].map(normalize_code)
+        df["date"] = pd.to_datetime(df["date"]).dt.normalize()
+        # 같은 날짜/코드가 여러 파일에 있으면 나중 파일의 값을 사용
+        df = df.drop_duplicates(["date", "etf_code"], keep="last")
+
+        dates = np.sort(df["date"].unique()).astype("datetime64[D]")
+        codes = sorted(df["etf_code"].unique())
+        rows = np.searchsorted(dates, df["date"].values.astype("datetime64[D]"))
+        columns = pd.Categorical(df["etf_code"], categories=codes).codes
+
+        tmp_path = f"{store_path}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, DATES_FILE), dates)
+        fields = []
+        for field in PRICE_FIELDS:
+            if field not in df.columns:
+                continue
+            matrix = np.full((len(dates), len(codes)), np.nan, dtype=np.float64)
+            values = pd.to_numeric(df[field], errors="coerce").to_numpy(dtype=np.float64, copy=True)
+            # 0 이하의 가격은 잘못된 값으로 보고 제외
+            values[values <= 0] = np.nan
+            matrix[rows, columns] = values
+            np.save(os.path.join(tmp_path, f"{field}.npy"), matrix)
+            fields.append(field)
+        names = {}
+        if "etf_name" in df.columns:
+            named = df.dropna(subset=["etf_name"]).drop_duplicates("etf_code", keep="last")
+            names = dict(zip(named["etf_code"], named["etf_name"].astype(str).str.strip()))
+        with open(os.path.join(tmp_path, META_FILE), "w") as f:
+            json.dump(
+                {"codes": codes, "fields": fields, "names": names, "sources": [os.path.basename(path) for path in sources]},
+                f,
+                ensure_ascii=False
+            )
+        os.rename(tmp_path, store_path)
+        # 이전 원본으로 변환한 배열 삭제 (이미 mmap으로 연 워커는 파일이 삭제되어도 계속 읽을 수 있음)
+        for stale in glob.glob(os.path.join(os.path.dirname(store_path), "*")):
+            if stale != store_path:
+                shutil.rmtree(stale, ignore_errors=True)
+        logger.info(f"가격 이력 변환 완료: {len(dates)}일 × {len(codes)}개 ETF ({len(df)}행, {len(sources)}개 파일)")
+
+    def _load(self, store_path: str):
+        with open(os.path.join(store_path, META_FILE), "r") as f:
+            meta = json.load(f)
+        dates = np.load(os.path.join(store_path, DATES_FILE))
+        prices = {
+            field: np.load(os.path.join(store_path, f"{field}.npy"), mmap_mode="r")
+            for field in meta["fields"]
+        }
+        self._set_arrays(dates, meta["codes"], meta.get("names", {}), prices)
+        logger.info(f"가격 이력 로드 완료: {len(dates)}일 × {len(meta['codes'])}개 ETF (mmap)")
+
+    def _set_arrays(self, dates: np.ndarray, codes: List[str], names: Dict[str, str], prices: Dict[str, np.ndarray]):
+        self._dates = dates
+        self._codes = codes
+        self._columns = {code: column for column, code in enumerate(codes)}
+        self._names = names
+        self._code_by_name = {_normalize_name(name): code for code, name in names.items()}
+        self._prices = prices
+
+    def load(self) -> Dict[str, Any]:
+        """가격 이력을 로드(필요하면 변환)하고 요약 정보를 반환합니다."""
+        self._ensure_loaded()
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "codes": len(self._codes),
+            "days": len(self._dates),
+            "fields": list(self._prices),
+            "start": str(self._dates[0]) if len(self._dates) else None,
+            "as_of": str(self._dates[-1]) if len(self._dates) else None,
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        return {
+            "items": len(self._dates) * len(self._codes),
+            "bytes": sum(prices.nbytes for prices in self._prices.values()) + self._dates.nbytes,
+        }
+
+    @property
+    def as_of(self) -> Optional[str]:
+        """마지막 가격 날짜 (YYYY-MM-DD)"""
+        self._ensure_loaded()
+        return str(self._dates[-1]) if len(self._dates) else None
+
+    def has(self, code: str) -> bool:
+        self._ensure_loaded()
+        return normalize_code(code) in self._columns
+
+    def code_for_name(self, name: str) -> Optional[str]:
+        """가격 이력 파일의 etf_name으로 ETF 코드를 찾습니다. (공백/대소문자 무시)"""
+        self._ensure_loaded()
+        return self._code_by_name.get(_normalize_name(name))
+
+    def name(self, code: str) -> Optional[str]:
+        self._ensure_loaded()
+        return self._names.get(normalize_code(code))
+
+    def window(
+        self,
+        codes: List[str],
+        field: str = "close",
+        days: int = 252
+    ) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        최근 days 거래일(수익률 계산을 위해 days + 1행)의 가격 행렬을 반환합니다.
+
+        Returns:
+            (날짜 배열, 가격 행렬(날짜 × 코드), 가격 이력이 있는 코드 목록 - 행렬의 열 순서)
+        """
+        self._ensure_loaded()
+        prices = self._prices.get(field)
+        present = [code for code in dict.fromkeys(normalize_code(code) for code in codes) if code in self._columns]
+        if prices is None or not present:
+            return np.empty(0, dtype="datetime64[D]"), np.empty((0, len(present))), present
+        start = max(len(self._dates) - days - 1, 0)
+        columns = [self._columns[code] for code in present]
+        # mmap 배열에서 필요한 구간/열만 메모리로 복사
+        return self._dates[start:], np.asarray(prices[start:, columns], dtype=np.float64), present
+
+
+# 싱글톤 인스턴스 (프로세스 단위, 변환된 배열 파일은 워커 간 공유)
+price_store = PriceHistoryStore()
+register("price_store", price_store.load)
+# 가격 배열은 mmap이므로 bytes는 RSS가 아닌 매핑 크기 (접근한 페이지만 RSS에 포함)
+register_memory_source("price_history", price_store.memory_usage)
@@ -0,0 +1,89 @@
+import os
+import fcntl
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InterProcessLock:
+    """
+    flock 기반의 프로세스 간 잠금입니다.
+
+    uvicorn --workers N 으로 실행되는 워커들이 같은 data 디렉토리를
+    공유하므로, 인덱스 파일 교체나 쓰기 작업은 이 잠금으로 직렬화합니다.
+    """
+
+    def __init__(self, lock_path: str, shared: bool = False):
+        self.lock_path = lock_path
+        self.shared = shared
+        self._fd: Optional[int] = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """잠금을 획득합니다. blocking=False 이면 즉시 획득 여부를 반환합니다."""
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        flags = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        """잠금을 해제합니다."""
+        if self._fd is None:
+            return
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class LeaderLease:
+    """
+    여러 워커 중 하나만 리더가 되도록 하는 파일 잠금 기반 리스입니다.
+
+    리더는 프로세스가 살아있는 동안 잠금을 유지하며, 프로세스가 종료되면
+    커널이 잠금을 해제하므로 대기 중인 다른 워커가 다음 시도에서 리더가 됩니다.
+    """
+
+    def __init__(self, lock_path: str):
+        self._lock = InterProcessLock(lock_path)
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock.locked
+
+    def try_acquire(self) -> bool:
+        """리더 리스 획득을 시도합니다. 이미 리더라면 True를 반환합니다."""
+        if self._lock.locked:
+            return True
+        acquired = self._lock.acquire(blocking=False)
+        if acquired:
+            # 디버깅을 위해 현재 리더의 PID를 기록
+            os.ftruncate(self._lock._fd, 0)
+            os.write(self._lock._fd, str(os.getpid()).encode())
+            logger.info(f"리더 리스 획득: pid={os.getpid()}")
+        return acquired
+
+    def release(self):
+        """리더 리스를 반납합니다."""
+        if self._lock.locked:
+            self._lock.release()
+            logger.info(f"리더 리스 반납: pid={os.getpid()}")
@@ -0,0 +1,144 @@
+import os
+import re
+import logging
+from dataclasses import asdict, dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# /update-etf-knowledge 를 거쳐 다시 올라온 사본에 붙는 접두어
+UPLOAD_PREFIX = "업로드_"
+# 파일명 충돌 시 업로드 저장 단계에서 붙는 내용 해시 접두어: '1a2b3c4d_'
+HASH_PREFIX = re.compile(r"^[0-9a-f]{8}_(?=업로드_|(?:간이)?투자설명서)")
+# 문서 종류 접두어: '간이투자설명서(ETF)_', '간이투자설명서_', '투자설명서_'
+DOC_TYPE_PREFIX = re.compile(r"^(?:간이)?투자설명서(?:\(ETF\))?_")
+# 파일명 끝의 효력발생일: '(2025년04월09일)'
+FILENAME_DATE = re.compile(r"\((\d{4})년\s*(\d{1,2})월\s*(\d{1,2})일\)\s*$")
+# 문서 머리말: '[펀드코드 : C5424]', '작성기준일 : 2025.04.02'
+HEADER_FUND_CODE = re.compile(r"펀드코드\s*[:：]\s*([A-Z0-9]+)")
+# 펀드명 바로 뒤에 괄호로 표기한 경우: '…투자신탁[주식]( DP561)'
+HEADER_FUND_CODE_SUFFIX = re.compile(r"투자신탁\S*?\(\s*([A-Z][A-Z0-9]{4})\s*\)")
+HEADER_BASE_DATE = re.compile(r"작성기준일\s*[:：]\s*(\d{4})\s*[.\-/]\s*(\d{1,2})\s*[.\-/]\s*(\d{1,2})")
+
+
+@dataclass
+class ProspectusVersion:
+    """투자설명서 파일 하나의 펀드 식별 정보와 버전(날짜) 정보"""
+    source: str
+    fund_name: str
+    fund_code: Optional[str]
+    effective_date: Optional[str]  # 파일명의 효력발생일 (YYYY-MM-DD)
+    base_date: Optional[str]  # 머리말의 작성기준일 (YYYY-MM-DD)
+    mtime: float = 0.0
+
+    @property
+    def fund_key(self) -> str:
+        """같은 펀드의 여러 버전을 묶는 키. 펀드코드가 있으면 펀드코드, 없으면 정규화된 펀드명."""
+        return f"code:{self.fund_code}" if self.fund_code else f"name:{normalize_fund_name(self.fund_name)}"
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _iso_date(year: str, month: str, day: str) -> Optional[str]:
+    try:
+        return date(int(year), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def normalize_fund_name(name: str) -> str:
+    """공백, 대괄호를 제거하고 대문자로 변환합니다. ('…투자신탁[채권]'과 '…투자신탁채권'을 같은 이름으로 취급)"""
+    return re.sub(r"[\s\[\]]", "", name).upper()
+
+
+def parse_filename(filename: str) -> Tuple[str, Optional[str]]:
+    """
+    투자설명서 파일명에서 펀드명과 효력발생일을 추출합니다.
+
+    예: '업로드_간이투자설명서(ETF)_신한SOL K방산증권상장지수투자신탁[주식](2025년04월09일).pdf'
+        → ('신한SOL K방산증권상장지수투자신탁[주식]', '2025-04-09')
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0].strip()
+    # 해시 접두어와 업로드 접두어는 어떤 순서로든 여러 번 붙을 수 있음 ('1a2b3c4d_업로드_…')
+    while True:
+        stripped = HASH_PREFIX.sub("", stem)
+        if stripped.startswith(UPLOAD_PREFIX):
+            stripped = stripped[len(UPLOAD_PREFIX):]
+        if stripped == stem:
+            break
+        stem = stripped
+    stem = DOC_TYPE_PREFIX.sub("", stem)
+    effective_date = None
+    match = FILENAME_DATE.search(stem)
+    if match:
+        effective_date = _iso_date(*match.groups())
+        stem = stem[:match.start()]
+    return stem.strip(), effective_date
+
+
+def parse_header(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """문서 첫 페이지 머리말에서 펀드코드와 작성기준일을 추출합니다."""
+    code_match = HEADER_FUND_CODE.search(text) or HEADER_FUND_CODE_SUFFIX.search(text)
+    date_match = HEADER_BASE_DATE.search(text)
+    return (
+        code_match.group(1) if code_match else None,
+        _iso_date(*date_match.groups()) if date_match else None
+    )
+
+
+def read_version(path: str) -> ProspectusVersion:
+    """파일명과 첫 페이지 머리말을 함께 읽어 투자설명서 버전 정보를 생성합니다."""
+    fund_name, effective_date = parse_filename(path)
+    fund_code, base_date = None, None
+    try:
+        from langchain_community.document_loaders import PyMuPDFLoader
+        first_page = next(iter(PyMuPDFLoader(path).lazy_load()), None)
+        if first_page is not None:
+            fund_code, base_date = parse_header(first_page.page_content[:2000])
+    except Exception as e:
+        logger.warning(f"투자설명서 머리말 읽기 실패: {path} - {str(e)}")
+    return ProspectusVersion(
+        source=path,
+        fund_name=fund_name,
+        fund_code=fund_code,
+        effective_date=effective_date,
+        base_date=base_date,
+        mtime=os.path.getmtime(path)
+    )
+
+
+def select_latest(
+    versions: Iterable[ProspectusVersion],
+    prefer: Optional[Set[str]] = None
+) -> Tuple[Dict[str, ProspectusVersion], List[ProspectusVersion]]:
+    """
+    펀드별 최신 버전과 대체된(superseded) 버전 목록을 반환합니다.
+
+    효력발생일 → 작성기준일 순으로 비교하고, 날짜가 같으면 prefer(이미 인덱스에 수집된 파일명)에
+    포함된 파일, 업로드 사본이 아닌 파일 순으로 남겨 같은 버전을 다시 임베딩하지 않도록 합니다.
+    """
+    prefer = prefer or set()
+    latest: Dict[str, ProspectusVersion] = {}
+    superseded: List[ProspectusVersion] = []
+
+    def rank(version: ProspectusVersion):
+        return (
+            version.effective_date or version.base_date or "",
+            version.base_date or "",
+            os.path.basename(version.source) in prefer,
+            not os.path.basename(version.source).startswith(UPLOAD_PREFIX),
+            version.mtime
+        )
+
+    for version in versions:
+        current = latest.get(version.fund_key)
+        if current is None:
+            latest[version.fund_key] = version
+        elif rank(version) > rank(current):
+            superseded.append(current)
+            latest[version.fund_key] = version
+        else:
+            superseded.append(version)
+    return latest, superseded
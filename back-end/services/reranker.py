@@ -0,0 +1,227 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from config import (
+    RERANK_BATCH_SIZE,
+    RERANK_BUDGET_MS,
+    RERANK_CACHE_SIZE,
+    RERANK_ENABLED,
+    RERANK_MODEL,
+)
+from services.deadline import remaining_budget
+from monitoring.metrics import CACHE_REQUESTS, RERANK_SKIPPED
+from monitoring.memory_diagnostics import register_memory_source
+
+logger = logging.getLogger(__name__)
+
+
+def _chunk_id(doc: Document) -> str:
+    """청크 식별자. 벡터 ID가 있으면 벡터 ID, 없으면 본문 해시."""
+    if doc.id:
+        return doc.id
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+class CrossEncoderReranker:
+    """
+    로컬 CPU cross-encoder로 검색 후보 청크를 재순위화합니다.
+
+    - sentence-transformers와 모델은 처음 사용할 때 백그라운드 스레드에서 로드하며,
+      로딩이 끝나기 전이나 패키지가 없으면 재순위화를 건너뜁니다.
+    - 점수는 (쿼리 해시, 청크 ID) 키로 LRU 캐시에 보관하고 캐시에 없는 쌍만 배치로 추론합니다.
+    - 쌍 하나당 추론 시간의 이동 평균으로 비용을 예측하여 시간 예산을 넘을 것 같으면
+      추론을 시작하지 않고, 배치 사이에도 예산을 확인합니다.
+    건너뛴 경우 rerank()는 None을 반환하고 호출자는 기존 순서를 사용합니다.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        enabled: bool = RERANK_ENABLED,
+        batch_size: int = RERANK_BATCH_SIZE,
+        budget_ms: float = RERANK_BUDGET_MS,
+        cache_size: int = RERANK_CACHE_SIZE
+    ):
+        self.model_name = model_name
+        self.enabled = enabled
+        self.batch_size = max(1, batch_size)
+        self.budget_seconds = budget_ms / 1000
+        self.cache_size = max(0, cache_size)
+        self._model = None
+        self._loading = False
+        self._unavailable = False
+        self._load_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._generation = None
+        # 쌍 하나당 추론 시간의 지수 이동 평균 (모델 로드 직후 보정 배치로 초기화)
+        self._seconds_per_pair: Optional[float] = None
+
+    def _load_model(self):
+        try:
+            # torch를 포함한 무거운 의존성이므로 재순위화를 켠 경우에만 import
+            from sentence_transformers import CrossEncoder
+            started = time.perf_counter()
+            model = CrossEncoder(self.model_name, device="cpu")
+            loaded = time.perf_counter()
+            # 보정 배치: 첫 추론의 초기화 비용을 요청 경로 밖에서 치르고 쌍당 추론 시간을 측정
+            model.predict([("ETF 추천", "ETF 투자설명서")] * self.batch_size, batch_size=self.batch_size, show_progress_bar=False)
+            self._seconds_per_pair = (time.perf_counter() - loaded) / self.batch_size
+            logger.info(
+                f"재순위화 모델 로드 완료: {self.model_name} ({loaded - started:.1f}s, "
+                f"쌍당 {self._seconds_per_pair * 1000:.2f}ms)"
+            )
+            self._model = model
+        except Exception as e:
+            logger.warning(f"재순위화 모델을 사용할 수 없어 재순위화를 비활성화합니다: {self.model_name} - {str(e)}")
+            self._unavailable = True
+        finally:
+            self._loading = False
+
+    def _ensure_model(self) -> bool:
+        """모델이 준비되었으면 True. 아직 로드하지 않았다면 백그라운드 로딩을 시작합니다."""
+        if self._model is not None:
+            return True
+        if self._unavailable:
+            return False
+        with self._load_lock:
+            if self._model is None and not self._loading and not self._unavailable:
+                self._loading = True
+                threading.Thread(target=self._load_model, name="reranker-loader", daemon=True).start()
+        return False
+
+    def warm_up(self):
+        """모델 로딩을 미리 시작합니다. (재순위화가 꺼져 있으면 아무것도 하지 않음)"""
+        if self.enabled:
+            self._ensure_model()
+
+    def _skip(self, reason: str) -> None:
+        RERANK_SKIPPED.labels(reason=reason).inc()
+        return None
+
+    def _budget(self, reserve: float) -> float:
+        """재순위화에 쓸 수 있는 시간(초). 요청 deadline이 있으면 후속 단계(reserve)를 위한 시간을 남깁니다."""
+        budget = self.budget_seconds
+        remaining = remaining_budget()
+        if remaining is not None:
+            budget = min(budget, remaining - reserve)
+        return budget
+
+    def _cached_scores(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], float]:
+        with self._cache_lock:
+            found = {}
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+        hits = len(found)
+        if hits:
+            CACHE_REQUESTS.labels(cache="rerank", result="hit").inc(hits)
+        if len(keys) - hits:
+            CACHE_REQUESTS.labels(cache="rerank", result="miss").inc(len(keys) - hits)
+        return found
+
+    def _store_scores(self, scores: Dict[Tuple[str, str], float]):
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache.update(scores)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _sync_generation(self, generation: Optional[str]):
+        """인덱스가 교체되면 같은 청크 ID가 다른 본문을 가리킬 수 있으므로 캐시를 비웁니다."""
+        if generation is None or generation == self._generation:
+            return
+        with self._cache_lock:
+            if generation != self._generation:
+                self._cache.clear()
+                self._generation = generation
+
+    def rerank(
+        self,
+        query: str,
+        docs: List[Document],
+        top_k: int,
+        reserve: float = 0.0,
+        generation: Optional[str] = None
+    ) -> Optional[List[Document]]:
+        """
+        후보 청크를 쿼리와의 관련도 점수순으로 정렬하여 상위 top_k개를 반환합니다.
+
+        Args:
+            query: 검색 쿼리
+            docs: 검색 후보 청크
+            top_k: 반환할 청크 수
+            reserve: 요청 deadline에서 재순위화 이후 단계를 위해 남겨둘 시간(초)
+            generation: 인덱스 세대 (바뀌면 점수 캐시를 비움)
+
+        Returns:
+            재순위화된 청크 목록. 재순위화를 건너뛴 경우 None.
+        """
+        if not self.enabled or not docs:
+            return None
+        if not self._ensure_model():
+            return self._skip("unavailable" if self._unavailable else "loading")
+
+        started = time.perf_counter()
+        budget = self._budget(reserve)
+        self._sync_generation(generation)
+        query_hash = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        keys = [(query_hash, _chunk_id(doc)) for doc in docs]
+        scores = self._cached_scores(keys)
+
+        pending = [i for i, key in enumerate(keys) if key not in scores]
+        if pending and len(pending) * self._seconds_per_pair > budget:
+            logger.info(
+                f"재순위화 건너뜀: 예상 {len(pending) * self._seconds_per_pair * 1000:.0f}ms > 예산 {max(budget, 0) * 1000:.0f}ms"
+            )
+            return self._skip("budget")
+
+        new_scores = {}
+        for offset in range(0, len(pending), self.batch_size):
+            batch = pending[offset:offset + self.batch_size]
+            batch_started = time.perf_counter()
+            predicted = self._model.predict(
+                [(query, docs[i].page_content) for i in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False
+            )
+            elapsed = time.perf_counter() - batch_started
+            self._seconds_per_pair = 0.8 * self._seconds_per_pair + 0.2 * (elapsed / len(batch))
+            for i, score in zip(batch, predicted):
+                new_scores[keys[i]] = float(score)
+            remaining_pairs = len(pending) - offset - len(batch)
+            if remaining_pairs and (
+                time.perf_counter() - started + remaining_pairs * self._seconds_per_pair > budget
+            ):
+                # 이미 계산한 점수는 다음 요청에서 재사용할 수 있도록 캐시에 남김
+                self._store_scores(new_scores)
+                return self._skip("budget")
+
+        self._store_scores(new_scores)
+        scores.update(new_scores)
+        ranked = sorted(range(len(docs)), key=lambda i: scores[keys[i]], reverse=True)
+        return [docs[i] for i in ranked[:top_k]]
+
+    def stats(self) -> Dict:
+        """재순위화 상태와 캐시 크기를 반환합니다."""
+        with self._cache_lock:
+            cache_entries = len(self._cache)
+        return {
+            "enabled": self.enabled,
+            "model": self.model_name,
+            "ready": self._model is not None,
+            "unavailable": self._unavailable,
+            "cache_entries": cache_entries,
+            "ms_per_pair": round(self._seconds_per_pair * 1000, 3) if self._seconds_per_pair is not None else None,
+        }
+
+
+# 싱글톤 인스턴스 (프로세스 단위)
+reranker = CrossEncoderReranker()
+register_memory_source("rerank_score_cache", lambda: {"items": len(reranker._cache)})
@@ -0,0 +1,187 @@
+import os
+import re
+import uuid
+import hashlib
+import logging
+import zipfile
+from dataclasses import dataclass
+from typing import List
+from fastapi import UploadFile
+from config import DOCS_PATH, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE, BULK_MAX_FILES, BULK_MAX_TOTAL_BYTES
+
+logger = logging.getLogger(__name__)
+
+# 업로드 중인 파일을 임시로 저장하는 디렉토리 (DirectoryLoader의 **/*.pdf 패턴에 걸리지 않도록 확장자 .part 사용)
+INCOMING_PATH = os.path.join(DOCS_PATH, ".incoming")
+
+
+class UploadTooLargeError(Exception):
+    """업로드 파일이 허용 크기를 초과한 경우"""
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    filename: str
+    content_hash: str
+    size: int
+    # commit_upload가 문서 디렉토리에 새로 만든 파일인지 (같은 이름/내용의 기존 파일을 대체했으면 False)
+    created: bool = False
+
+
+def safe_filename(filename: str) -> str:
+    """클라이언트가 보낸 파일명에서 경로 구성요소와 제어 문자를 제거합니다."""
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    name = re.sub(r'[\x00-\x1f]', '', name).strip().lstrip('.')
+    return name or f"upload-{uuid.uuid4().hex}.pdf"
+
+
+async def stream_upload_to_disk(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """
+    업로드 파일을 청크 단위로 임시 파일에 기록하면서 SHA-256 해시를 계산합니다.
+
+    Args:
+        upload: 업로드된 파일
+        max_bytes: 허용되는 최대 파일 크기
+
+    Returns:
+        StoredUpload: 임시 파일 경로, 정규화된 파일명, 내용 해시, 크기
+
+    Raises:
+        UploadTooLargeError: 파일 크기가 max_bytes를 초과한 경우
+    """
+    os.makedirs(INCOMING_PATH, exist_ok=True)
+    tmp_path = os.path.join(INCOMING_PATH, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as buffer:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"업로드 파일이 최대 크기({max_bytes // (1024 * 1024)}MB)를 초과했습니다."
+                    )
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        discard_upload(tmp_path)
+        raise
+    return StoredUpload(
+        path=tmp_path,
+        filename=safe_filename(upload.filename),
+        content_hash=digest.hexdigest(),
+        size=size
+    )
+
+
+def _zip_member_name(info: zipfile.ZipInfo) -> str:
+    """
+    ZIP 항목의 파일명을 복원합니다.
+    UTF-8 플래그가 없는 항목은 Windows 탐색기에서 만든 CP949 파일명일 가능성이 높습니다.
+    """
+    name = info.filename
+    if not info.flag_bits & 0x800:
+        try:
+            name = name.encode('cp437').decode('cp949')
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            pass
+    return safe_filename(name)
+
+
+def extract_pdfs_from_zip(stored: StoredUpload) -> List[StoredUpload]:
+    """
+    ZIP 파일에서 PDF 항목만 청크 단위로 추출하면서 해시를 계산합니다.
+    압축 해제 크기와 항목 수를 제한하여 압축 폭탄과 경로 조작(zip slip)을 방지합니다.
+
+    Args:
+        stored: 업로드된 ZIP 파일
+
+    Returns:
+        List[StoredUpload]: 추출된 PDF 파일 목록
+
+    Raises:
+        UploadTooLargeError: 항목 수나 압축 해제 크기가 제한을 초과한 경우
+        zipfile.BadZipFile: 올바른 ZIP 파일이 아닌 경우
+    """
+    extracted = []
+    total = 0
+    try:
+        with zipfile.ZipFile(stored.path) as archive:
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith('.pdf')
+                and not os.path.basename(info.filename).startswith('._')  # macOS 메타데이터 제외
+            ]
+            if len(members) > BULK_MAX_FILES:
+                raise UploadTooLargeError(f"ZIP 파일에 포함된 PDF가 최대 개수({BULK_MAX_FILES}개)를 초과했습니다.")
+            for info in members:
+                tmp_path = os.path.join(INCOMING_PATH, f"{uuid.uuid4().hex}.part")
+                digest = hashlib.sha256()
+                size = 0
+                with archive.open(info) as source, open(tmp_path, "wb") as buffer:
+                    extracted.append(StoredUpload(path=tmp_path, filename=_zip_member_name(info), content_hash="", size=0))
+                    while True:
+                        chunk = source.read(UPLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        size += len(chunk)
+                        total += len(chunk)
+                        # 헤더에 기록된 크기는 조작될 수 있으므로 실제 해제된 바이트 수로 검사
+                        if size > MAX_UPLOAD_BYTES or total > BULK_MAX_TOTAL_BYTES:
+                            raise UploadTooLargeError("ZIP 파일의 압축 해제 크기가 허용 범위를 초과했습니다.")
+                        digest.update(chunk)
+                        buffer.write(chunk)
+                extracted[-1].content_hash = digest.hexdigest()
+                extracted[-1].size = size
+    except BaseException:
+        for item in extracted:
+            discard_upload(item.path)
+        raise
+    finally:
+        discard_upload(stored.path)
+    return extracted
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def commit_upload(stored: StoredUpload) -> str:
+    """
+    임시 파일을 문서 디렉토리로 옮기고 최종 경로를 반환합니다.
+    같은 이름의 다른 내용 파일이 이미 있으면 덮어쓰지 않고 파일명 앞에 내용 해시를 붙입니다.
+    (기존 파일의 벡터가 같은 source로 남아 삭제된 파일의 청크를 검색하게 되는 것을 방지)
+    """
+    final_path = os.path.join(DOCS_PATH, stored.filename)
+    if os.path.exists(final_path) and _file_sha256(final_path) != stored.content_hash:
+        stored.filename = f"{stored.content_hash[:8]}_{stored.filename}"
+        final_path = os.path.join(DOCS_PATH, stored.filename)
+    stored.created = not os.path.exists(final_path)
+    os.replace(stored.path, final_path)
+    stored.path = final_path
+    return final_path
+
+
+def discard_upload(path: str):
+    """임시 업로드 파일을 삭제합니다."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def rollback_upload(stored: StoredUpload):
+    """
+    수집하지 못한 업로드 파일을 삭제합니다.
+    임시 파일과 commit_upload가 새로 만든 문서 파일만 삭제하고, 같은 내용으로 이미 있던 문서 파일은 남깁니다.
+    """
+    if stored.path.endswith('.part') or stored.created:
+        discard_upload(stored.path)
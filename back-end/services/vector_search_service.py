@@ -0,0 +1,125 @@
+"""
+벡터 검색 서비스 (API 서버와 별도로 실행하는 프로세스)
+
+FAISS 인덱스를 이 프로세스만 로드하고, API 서버(VECTOR_SEARCH_MODE=remote)의 RemoteVectorSearch가
+묶어서 보낸 쿼리를 한 번의 임베딩 호출과 샤드별 한 번의 인덱스 검색으로 처리합니다.
+지식 업데이트는 API 서버가 기존처럼 인덱스 파일에 기록하며, 이 서비스는 세대 값이 바뀐 샤드만 다시 로드합니다.
+
+사용법 (back-end 디렉토리에서):
+    python -m services.vector_search_service                               # VECTOR_SEARCH_SERVICE_URL (기본 unix 소켓)
+    python -m services.vector_search_service --url http://127.0.0.1:8765
+"""
+import os
+import socket
+import logging
+import argparse
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from config import VECTOR_SEARCH_MAX_BATCH, VECTOR_SEARCH_SERVICE_URL
+from monitoring.metrics import metrics_endpoint, metrics_middleware
+from services.etf_service import vector_db
+
+logger = logging.getLogger(__name__)
+
+
+class SearchQuery(BaseModel):
+    query: str
+    k: int = Field(4, ge=1, le=200)
+    shards: Optional[List[str]] = None
+
+
+class SearchRequest(BaseModel):
+    # 클라이언트 묶음 크기보다 큰 요청은 여러 번 보내도록 제한
+    queries: List[SearchQuery] = Field(..., max_length=max(VECTOR_SEARCH_MAX_BATCH, 1) * 4)
+
+
+def search_batch(queries: List[SearchQuery]) -> List[List[Dict[str, Any]]]:
+    """검색 대상 샤드가 같은 쿼리끼리 묶어 한 번에 검색하고, 쿼리별로 요청한 k개만 남깁니다."""
+    groups: Dict[Optional[tuple], List[int]] = {}
+    for position, query in enumerate(queries):
+        groups.setdefault(tuple(query.shards) if query.shards is not None else None, []).append(position)
+    results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+    for shards, positions in groups.items():
+        k = max(queries[position].k for position in positions)
+        hits = vector_db.similarity_search_batch(
+            [queries[position].query for position in positions],
+            k=k,
+            shards=list(shards) if shards is not None else None
+        )
+        for position, query_hits in zip(positions, hits):
+            results[position] = [
+                {"id": doc.id, "page_content": doc.page_content, "metadata": doc.metadata, "score": score}
+                for doc, score in query_hits[:queries[position].k]
+            ]
+    return results
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 인덱스를 로드한 뒤 요청을 받음
+    await run_in_threadpool(vector_db.get)
+    logger.info(f"벡터 검색 서비스 준비 완료: {vector_db.vectordb.ntotal}개 벡터")
+    yield
+
+
+app = FastAPI(title="ETF Vector Search Service", lifespan=lifespan)
+app.middleware("http")(metrics_middleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+
+@app.post("/search")
+def search(request: SearchRequest):
+    """묶음 kNN 검색: 쿼리 순서대로 (문서, L2 거리) 목록을 반환합니다."""
+    results = search_batch(request.queries)
+    return {"generation": vector_db.generation, "results": results}
+
+
+@app.get("/stats")
+def stats():
+    return vector_db.shard_stats()
+
+
+@app.get("/health")
+def health():
+    return {"status": "healthy", "generation": vector_db.generation, "vectors": vector_db.vectordb.ntotal}
+
+
+def _remove_stale_socket(path: str):
+    """이전 실행이 남긴 소켓 파일을 지웁니다. (다른 프로세스가 사용 중이면 오류)"""
+    if not os.path.exists(path):
+        return
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        os.remove(path)
+        return
+    finally:
+        sock.close()
+    raise SystemExit(f"검색 서비스가 이미 실행 중입니다: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ETF 벡터 검색 서비스")
+    parser.add_argument("--url", default=VECTOR_SEARCH_SERVICE_URL, help="unix:///경로 또는 http://호스트:포트")
+    args = parser.parse_args()
+
+    import uvicorn
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parts = urlsplit(args.url)
+    if parts.scheme == "unix":
+        os.makedirs(os.path.dirname(parts.path), exist_ok=True)
+        _remove_stale_socket(parts.path)
+        uvicorn.run(app, uds=parts.path)
+    elif parts.scheme == "http":
+        uvicorn.run(app, host=parts.hostname, port=parts.port or 80)
+    else:
+        raise SystemExit(f"지원하지 않는 주소: {args.url} (unix:///경로 또는 http://호스트:포트)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import os
+import re
+import zlib
+from typing import Callable, List, Optional
+from langchain_core.documents import Document
+from services.etf_catalog import etf_catalog
+from services.catalog_recommender import RISK_ALIASES
+
+# 샤딩 방식
+ASSET_CLASS = "asset_class"
+HASH = "hash"
+
+# 자산군 샤드 (자산군을 알 수 없는 청크는 other)
+EQUITY = "equity"
+BOND = "bond"
+MIXED = "mixed"
+ALTERNATIVE = "alternative"
+OTHER = "other"
+
+# 추천 검색에서 위험 감내도별로 검색할 자산군 샤드 (없으면 전체 샤드)
+# 카탈로그의 대부분(약 89%)이 주식형이고 위험 감내도와 관계없이 추천 후보가 되므로 equity와
+# 자산군을 알 수 없는 other는 항상 포함하고, 해당 위험 감내도의 추천 대상이 아닌 샤드만 제외
+# (Low는 분배율 가중치가 높아 리츠 등 alternative도 후보이므로 전체 샤드 검색)
+RISK_SHARDS = {
+    # 채권/혼합형 투자설명서는 성장성 위주의 High 프로필에서 제외
+    "High": (EQUITY, ALTERNATIVE, OTHER),
+}
+
+# 투자설명서 파일명의 펀드 유형 표기 (예: ...상장지수투자신탁[채권혼합-파생형](2025년04월18일).pdf)
+_FUND_TYPE_PATTERN = re.compile(r"\[([^\]]+)\]")
+
+
+def layout_name(strategy: str, hash_shards: int) -> str:
+    """샤드 구성 이름 (구성이 바뀌면 다른 디렉토리에 새로 빌드)"""
+    if strategy == ASSET_CLASS:
+        return ASSET_CLASS
+    if strategy == HASH:
+        return f"{HASH}{hash_shards}"
+    raise ValueError(f"지원하지 않는 샤딩 방식: {strategy} ({ASSET_CLASS} 또는 {HASH})")
+
+
+def asset_class_shard(label: Optional[str]) -> Optional[str]:
+    """자산 분류(카탈로그 asset_large 또는 투자설명서 펀드 유형)를 샤드 이름으로 변환합니다."""
+    if not label:
+        return None
+    label = label.strip()
+    if "혼합" in label:
+        return MIXED
+    if label.startswith("주식"):
+        return EQUITY
+    if label.startswith("채권"):
+        return BOND
+    return ALTERNATIVE
+
+
+def _asset_class_label(doc: Document) -> Optional[str]:
+    metadata = doc.metadata
+    if metadata.get("asset_class"):
+        return metadata["asset_class"]
+    # asset_class 메타데이터가 없는 이전 CSV 청크는 카탈로그에서 조회
+    if metadata.get("etf_code"):
+        record = etf_catalog.get(str(metadata["etf_code"]))
+        if record and record.get("asset_large"):
+            return record["asset_large"]
+    match = _FUND_TYPE_PATTERN.search(os.path.basename(str(metadata.get("source") or "")))
+    return match.group(1) if match else None
+
+
+def route_by_asset_class(doc: Document) -> str:
+    return asset_class_shard(_asset_class_label(doc)) or OTHER
+
+
+def hash_router(shards: int) -> Callable[[Document], str]:
+    """청크 내용의 해시로 shards개 샤드에 고르게 나눕니다."""
+    def route(doc: Document) -> str:
+        key = f"{os.path.basename(str(doc.metadata.get('source') or ''))}\n{doc.page_content}"
+        return f"{HASH}-{zlib.crc32(key.encode('utf-8')) % shards:02d}"
+    return route
+
+
+def shard_router(layout: str) -> Callable[[Document], str]:
+    """샤드 구성 이름에 맞는 라우팅 함수(문서 → 샤드 이름)를 반환합니다."""
+    if layout == ASSET_CLASS:
+        return route_by_asset_class
+    if layout.startswith(HASH) and layout[len(HASH):].isdigit() and int(layout[len(HASH):]) > 0:
+        return hash_router(int(layout[len(HASH):]))
+    raise ValueError(f"알 수 없는 샤드 구성: {layout}")
+
+
+def query_shards(layout: str, risk_tolerance: Optional[str]) -> Optional[List[str]]:
+    """
+    추천 검색에서 고객의 위험 감내도에 맞는 샤드 목록을 반환합니다.
+    asset_class 구성이 아니거나(hash 샤드는 내용과 무관하게 나뉨) 제외할 샤드가 없으면 None(전체 샤드)입니다.
+    """
+    if layout != ASSET_CLASS:
+        return None
+    risk_tolerance = str(risk_tolerance or "").strip()
+    shards = RISK_SHARDS.get(RISK_ALIASES.get(risk_tolerance, risk_tolerance))
+    return list(shards) if shards else None
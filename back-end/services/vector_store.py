@@ -0,0 +1,408 @@
+import os
+import json
+import heapq
+import sqlite3
+import logging
+import threading
+import time
+import numpy as np
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+
+if TYPE_CHECKING:
+    from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+
+
+def dependable_faiss_import() -> Any:
+    """faiss는 인덱스를 처음 읽거나 만들 때 import 합니다. (AVX2 빌드가 없으면 기본 빌드 사용)"""
+    from langchain_community.vectorstores.faiss import dependable_faiss_import as _faiss_import
+    return _faiss_import()
+
+
+class SQLiteDocstore:
+    """
+    벡터 ID를 키로 청크 본문과 메타데이터를 저장하는 SQLite 문서 저장소입니다.
+
+    pickle로 전체 docstore를 메모리에 올리는 대신, 검색 결과 상위 k개에 해당하는
+    청크만 필요할 때 조회합니다. WAL 모드를 사용하므로 여러 워커가 동시에 읽는
+    중에도 쓰기 워커가 행을 추가할 수 있습니다.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    vector_id INTEGER PRIMARY KEY,
+                    source TEXT,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 연결은 스레드 간에 공유할 수 없으므로 스레드별로 생성
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def add(self, vector_ids: Iterable[int], documents: Iterable[Document]):
+        """청크를 추가합니다."""
+        rows = [
+            (
+                int(vector_id),
+                doc.metadata.get("source"),
+                doc.page_content,
+                json.dumps(doc.metadata, ensure_ascii=False, default=str)
+            )
+            for vector_id, doc in zip(vector_ids, documents)
+        ]
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks (vector_id, source, content, metadata) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def get(self, vector_ids: List[int]) -> Dict[int, Document]:
+        """벡터 ID 목록에 해당하는 청크를 조회합니다."""
+        if not vector_ids:
+            return {}
+        placeholders = ",".join("?" * len(vector_ids))
+        rows = self._connection().execute(
+            f"SELECT vector_id, content, metadata FROM chunks WHERE vector_id IN ({placeholders})",
+            [int(vector_id) for vector_id in vector_ids]
+        ).fetchall()
+        return {
+            vector_id: Document(id=str(vector_id), page_content=content, metadata=json.loads(metadata))
+            for vector_id, content, metadata in rows
+        }
+
+    def delete(self, vector_ids: List[int]):
+        """청크를 삭제합니다."""
+        with self._connection() as conn:
+            conn.executemany("DELETE FROM chunks WHERE vector_id = ?", [(int(v),) for v in vector_ids])
+
+    def delete_after(self, vector_id: int):
+        """지정된 ID보다 큰 청크(저장되지 않은 이전 쓰기 작업의 잔여 행)를 삭제합니다."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM chunks WHERE vector_id > ?", (int(vector_id),))
+
+    def ids_for_source(self, source: str) -> List[int]:
+        """특정 원본 파일에서 생성된 청크의 벡터 ID 목록을 반환합니다."""
+        rows = self._connection().execute("SELECT vector_id FROM chunks WHERE source = ?", (source,)).fetchall()
+        return [row[0] for row in rows]
+
+    def sources(self) -> List[str]:
+        """청크가 저장된 원본 파일 목록을 반환합니다."""
+        rows = self._connection().execute("SELECT DISTINCT source FROM chunks WHERE source IS NOT NULL").fetchall()
+        return [row[0] for row in rows]
+
+    def ids(self) -> List[int]:
+        rows = self._connection().execute("SELECT vector_id FROM chunks").fetchall()
+        return [row[0] for row in rows]
+
+    def max_id(self) -> int:
+        row = self._connection().execute("SELECT MAX(vector_id) FROM chunks").fetchone()
+        return row[0] if row[0] is not None else -1
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class ETFVectorStore:
+    """
+    FAISS 인덱스(IndexIDMap2) + SQLite docstore 로 구성된 벡터 저장소입니다.
+
+    인덱스는 안정적인 64비트 벡터 ID를 사용하므로 문서를 삭제해도 다른 벡터의 ID가
+    바뀌지 않으며, 서빙용 인덱스는 읽기 전용 mmap으로 로드할 수 있습니다.
+    """
+
+    def __init__(self, embeddings: "Embeddings", index: Any, docstore: SQLiteDocstore):
+        self.embeddings = embeddings
+        self.index = index
+        self.docstore = docstore
+
+    @classmethod
+    def create(cls, embeddings: "Embeddings", folder_path: str) -> "ETFVectorStore":
+        """빈 저장소를 생성합니다. 인덱스 차원은 첫 문서 추가 시 결정됩니다."""
+        return cls(embeddings, None, SQLiteDocstore(os.path.join(folder_path, DOCSTORE_FILE)))
+
+    @classmethod
+    def load(cls, embeddings: "Embeddings", folder_path: str, mmap: bool = True) -> "ETFVectorStore":
+        """디스크의 인덱스를 로드합니다. 청크 본문은 검색 시점에 docstore에서 조회합니다."""
+        faiss = dependable_faiss_import()
+        index_file = os.path.join(folder_path, INDEX_FILE)
+        if mmap:
+            try:
+                index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError as e:
+                logger.warning(f"mmap 인덱스 로드 실패, 일반 로드로 대체: {str(e)}")
+                index = faiss.read_index(index_file)
+        else:
+            index = faiss.read_index(index_file)
+        return cls(embeddings, index, SQLiteDocstore(os.path.join(folder_path, DOCSTORE_FILE)))
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
+
+    def max_vector_id(self) -> int:
+        """인덱스에 포함된 가장 큰 벡터 ID를 반환합니다."""
+        if not self.ntotal:
+            return -1
+        faiss = dependable_faiss_import()
+        return int(faiss.vector_to_array(self.index.id_map).max())
+
+    def save(self, folder_path: str):
+        """인덱스를 저장합니다. (docstore는 추가 시점에 이미 기록됨)"""
+        faiss = dependable_faiss_import()
+        faiss.write_index(self.index, os.path.join(folder_path, INDEX_FILE))
+
+    def add_documents(self, documents: List[Document]) -> List[int]:
+        """문서를 임베딩하여 인덱스와 docstore에 추가하고 부여된 벡터 ID를 반환합니다."""
+        if not documents:
+            return []
+        vectors = np.asarray(
+            self.embeddings.embed_documents([doc.page_content for doc in documents]),
+            dtype=np.float32
+        )
+        return self.add_embeddings(vectors, documents)
+
+    def add_embeddings(
+        self,
+        vectors: np.ndarray,
+        documents: List[Document],
+        vector_ids: Optional[np.ndarray] = None
+    ) -> List[int]:
+        """이미 계산된 임베딩을 문서와 함께 추가합니다. (vector_ids를 지정하지 않으면 새 ID 부여)"""
+        if self.index is None:
+            faiss = dependable_faiss_import()
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+        if vector_ids is None:
+            start = max(self.max_vector_id(), self.docstore.max_id()) + 1
+            vector_ids = np.arange(start, start + len(documents), dtype=np.int64)
+        else:
+            vector_ids = np.asarray(vector_ids, dtype=np.int64)
+        # docstore 행을 먼저 기록해야 인덱스에 보이는 ID는 항상 본문이 존재함
+        self.docstore.add(vector_ids.tolist(), documents)
+        self.index.add_with_ids(vectors, vector_ids)
+        return vector_ids.tolist()
+
+    def delete(self, vector_ids: List[int]) -> int:
+        """벡터와 청크를 삭제하고 삭제된 벡터 수를 반환합니다."""
+        if not vector_ids:
+            return 0
+        removed = self.index.remove_ids(np.asarray(vector_ids, dtype=np.int64))
+        self.docstore.delete(vector_ids)
+        return int(removed)
+
+    def export(self, batch_size: int = 4096) -> Iterator[Tuple[np.ndarray, np.ndarray, List[Document]]]:
+        """
+        인덱스의 벡터를 (벡터 ID, 벡터, 문서) 배치로 복원합니다.
+        IndexIDMap2에서 벡터를 재구성하므로 다시 임베딩하지 않으며, docstore에 본문이 없는 벡터는 건너뜁니다.
+        """
+        if not self.ntotal:
+            return
+        faiss = dependable_faiss_import()
+        all_ids = faiss.vector_to_array(self.index.id_map)
+        for start in range(0, len(all_ids), batch_size):
+            batch_ids = all_ids[start:start + batch_size]
+            vectors = self.index.index.reconstruct_n(start, len(batch_ids))
+            docs = self.docstore.get(batch_ids.tolist())
+            keep = [i for i, vector_id in enumerate(batch_ids) if int(vector_id) in docs]
+            yield batch_ids[keep], vectors[keep], [docs[int(batch_ids[i])] for i in keep]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        """임베딩 벡터로 검색하여 (문서, L2 거리) 목록을 반환합니다."""
+        return self.similarity_search_with_score_by_vectors(np.asarray([embedding], dtype=np.float32), k=k)[0]
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: np.ndarray,
+        k: int = 4
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        여러 임베딩 벡터를 한 번의 인덱스 검색으로 조회하여 벡터별 (문서, L2 거리) 목록을 반환합니다.
+        docstore도 전체 결과의 ID를 한 번에 조회합니다.
+        """
+        if not self.ntotal:
+            return [[] for _ in range(len(embeddings))]
+        scores, ids = self.index.search(np.asarray(embeddings, dtype=np.float32), k)
+        rows = [
+            [(int(i), float(score)) for i, score in zip(row_ids, row_scores) if i != -1]
+            for row_ids, row_scores in zip(ids, scores)
+        ]
+        docs = self.docstore.get(sorted({i for hits in rows for i, _ in hits}))
+        # 다른 워커가 방금 삭제한 청크는 건너뜀 (여러 쿼리에 같은 청크가 나오면 쿼리별로 복사)
+        return [[(docs[i].model_copy(), score) for i, score in hits if i in docs] for hits in rows]
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embeddings.embed_query(query), k=k)
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+
+class ShardedVectorStore:
+    """
+    여러 ETFVectorStore(샤드)를 하나의 저장소처럼 사용하는 벡터 저장소입니다.
+
+    문서는 route(문서 → 샤드 이름)에 따라 한 샤드에만 저장되고, 샤드마다 인덱스와 docstore가 따로 있어
+    샤드 단위로 만들고 저장하고 다시 빌드할 수 있습니다. 검색은 대상 샤드에 스레드풀로 동시에 요청하고
+    (FAISS 검색은 GIL을 해제) L2 거리 기준으로 병합합니다. 반환 문서의 id는 "샤드:벡터 ID" 형식입니다.
+
+    open_shard를 지정하면 아직 열리지 않은 샤드에 처음 쓸 때 open_shard(이름)으로 열어 사용합니다.
+    (쓰기 작업은 실제로 변경되는 샤드만 쓰기 가능하게 읽고 저장)
+    """
+
+    def __init__(
+        self,
+        embeddings: "Embeddings",
+        shards: Dict[str, ETFVectorStore],
+        route: Callable[[Document], str],
+        executor: Optional[Executor] = None,
+        open_shard: Optional[Callable[[str], ETFVectorStore]] = None,
+        on_search: Optional[Callable[[str, float], None]] = None
+    ):
+        self.embeddings = embeddings
+        self.shards = shards
+        self.route = route
+        self.executor = executor
+        self._open_shard = open_shard
+        self._on_search = on_search
+
+    @property
+    def ntotal(self) -> int:
+        return sum(store.ntotal for store in self.shards.values())
+
+    def shard(self, name: str) -> ETFVectorStore:
+        store = self.shards.get(name)
+        if store is None:
+            if self._open_shard is None:
+                raise KeyError(f"샤드가 없습니다: {name}")
+            store = self.shards[name] = self._open_shard(name)
+        return store
+
+    def sources(self) -> List[str]:
+        """모든 샤드에 청크가 저장된 원본 파일 목록을 반환합니다."""
+        return sorted({source for store in self.shards.values() for source in store.docstore.sources()})
+
+    def add_documents(self, documents: List[Document]) -> Dict[str, List[int]]:
+        """문서를 한 번에 임베딩한 뒤 샤드별로 나누어 추가하고 샤드별 벡터 ID를 반환합니다."""
+        if not documents:
+            return {}
+        vectors = np.asarray(
+            self.embeddings.embed_documents([doc.page_content for doc in documents]),
+            dtype=np.float32
+        )
+        return self.add_embeddings(vectors, documents)
+
+    def add_embeddings(self, vectors: np.ndarray, documents: List[Document]) -> Dict[str, List[int]]:
+        """이미 계산된 임베딩을 문서의 샤드로 나누어 추가합니다."""
+        positions: Dict[str, List[int]] = {}
+        for position, doc in enumerate(documents):
+            positions.setdefault(self.route(doc), []).append(position)
+        return {
+            name: self.shard(name).add_embeddings(vectors[indices], [documents[i] for i in indices])
+            for name, indices in positions.items()
+        }
+
+    def _search_shard(self, name: str, embeddings: np.ndarray, k: int) -> List[List[Tuple[Document, float]]]:
+        started = time.perf_counter()
+        results = self.shards[name].similarity_search_with_score_by_vectors(embeddings, k=k)
+        if self._on_search is not None:
+            self._on_search(name, time.perf_counter() - started)
+        for hits in results:
+            for doc, _ in hits:
+                doc.id = f"{name}:{doc.id}"
+        return results
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        shards: Optional[Iterable[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        """대상 샤드(기본: 전체)를 동시에 검색하여 L2 거리가 가까운 k개를 반환합니다."""
+        return self.similarity_search_with_score_by_vectors(
+            np.asarray([embedding], dtype=np.float32), k=k, shards=shards
+        )[0]
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: np.ndarray,
+        k: int = 4,
+        shards: Optional[Iterable[str]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """여러 벡터를 샤드마다 한 번의 검색으로 조회하고, 벡터별로 L2 거리가 가까운 k개를 병합합니다."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        names = [
+            name for name in (self.shards if shards is None else shards)
+            if name in self.shards and self.shards[name].ntotal
+        ]
+        if len(names) > 1 and self.executor is not None:
+            results = list(self.executor.map(lambda name: self._search_shard(name, embeddings, k), names))
+        else:
+            results = [self._search_shard(name, embeddings, k) for name in names]
+        return [
+            heapq.nsmallest(k, (hit for shard_results in results for hit in shard_results[row]), key=lambda hit: hit[1])
+            for row in range(len(embeddings))
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        shards: Optional[Iterable[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embeddings.embed_query(query), k=k, shards=shards)
+
+    def similarity_search(self, query: str, k: int = 4, shards: Optional[Iterable[str]] = None) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, shards=shards)]
+
+
+def migrate_pickled_faiss(embeddings: "Embeddings", folder_path: str) -> Optional[ETFVectorStore]:
+    """
+    LangChain FAISS.save_local 형식(index.faiss + index.pkl)을 IndexIDMap2 + SQLite 형식으로 변환합니다.
+    이 서비스가 직접 생성한 로컬 파일만 대상으로 하는 일회성 변환이며,
+    반환된 저장소의 인덱스 저장과 index.pkl 정리는 호출자가 수행합니다.
+    """
+    import pickle
+    faiss = dependable_faiss_import()
+    pkl_file = os.path.join(folder_path, "index.pkl")
+    index_file = os.path.join(folder_path, INDEX_FILE)
+    if not (os.path.exists(pkl_file) and os.path.exists(index_file)):
+        return None
+
+    logger.info("pickle 형식의 Vector DB를 SQLite docstore 형식으로 변환 시작")
+    legacy_index = faiss.read_index(index_file)
+    with open(pkl_file, "rb") as f:
+        legacy_docstore, index_to_docstore_id = pickle.load(f)
+
+    store = ETFVectorStore.create(embeddings, folder_path)
+    # 이전에 중단된 변환의 잔여 행 제거
+    store.docstore.delete_after(-1)
+    vectors = legacy_index.reconstruct_n(0, legacy_index.ntotal)
+    documents = [legacy_docstore.search(index_to_docstore_id[i]) for i in range(legacy_index.ntotal)]
+    store.add_embeddings(np.asarray(vectors, dtype=np.float32), documents)
+    logger.info(f"Vector DB 변환 완료: {store.ntotal}개 벡터")
+    return store
@@ -0,0 +1,123 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 생성 순서대로 등록된 지연 초기화 리소스 (백그라운드 워밍업 대상)
+_resources: List["LazyResource"] = []
+_warmup_thread: Optional[threading.Thread] = None
+# 준비 상태를 확인할 때마다 호출하는 외부 의존성 확인 (이름 → 확인 함수, 준비되지 않았으면 예외)
+_checks: Dict[str, Callable[[], Any]] = {}
+
+
+class LazyResource(Generic[T]):
+    """
+    처음 사용할 때(또는 백그라운드 워밍업 시) 생성되는 리소스입니다.
+
+    모듈 import 시점에는 factory를 호출하지 않으므로 서버가 바로 헬스 체크를 받을 수 있고,
+    속성 접근은 생성된 객체로 그대로 전달되어 기존 호출 코드(vector_db.similarity_search 등)를
+    바꿀 필요가 없습니다. 생성에 실패하면 다음 사용 시 다시 시도합니다.
+    warm=False이면 워밍업/준비 상태 확인 대상에서 제외하고 처음 사용할 때만 생성합니다.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T], warm: bool = True):
+        self.name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        self.init_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        if warm:
+            _resources.append(self)
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> T:
+        """리소스를 반환합니다. 아직 생성되지 않았다면 생성합니다. (동시 호출 시 한 번만 생성)"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                started = time.perf_counter()
+                try:
+                    self._instance = self._factory()
+                    self.error = None
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                finally:
+                    self.init_seconds = time.perf_counter() - started
+                logger.info(f"{self.name} 초기화 완료 ({self.init_seconds:.2f}s)")
+            return self._instance
+
+    def __getattr__(self, item: str) -> Any:
+        # 인스턴스 속성(_instance 등)은 __init__에서 설정되므로 여기로 오지 않음
+        return getattr(self.get(), item)
+
+
+def register(name: str, func: Callable[[], Any]) -> LazyResource:
+    """반환값이 필요 없는 준비 작업(캐시 적재, 모듈 import 등)을 워밍업 대상으로 등록합니다."""
+    return LazyResource(name, lambda: func() or True)
+
+
+def register_check(name: str, func: Callable[[], Any]):
+    """
+    준비된 뒤에도 상태가 바뀔 수 있는 외부 의존성(별도 프로세스의 서비스 등)을 준비 상태 확인 대상으로 등록합니다.
+    LazyResource와 달리 결과를 저장하지 않고 준비 상태를 확인할 때마다 func를 호출합니다.
+    """
+    _checks[name] = func
+
+
+def _run_check(func: Callable[[], Any]) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        func()
+        error = None
+    except Exception as e:
+        error = str(e)
+    return {"ready": error is None, "check_seconds": round(time.perf_counter() - started, 3), "error": error}
+
+
+def warm_up() -> Dict[str, Dict[str, Any]]:
+    """등록된 리소스를 순서대로 생성합니다. 실패한 리소스는 기록만 하고 다음 리소스로 넘어갑니다."""
+    for resource in list(_resources):
+        try:
+            resource.get()
+        except Exception as e:
+            logger.error(f"{resource.name} 워밍업 실패: {str(e)}")
+    return readiness()
+
+
+def start_background_warmup() -> threading.Thread:
+    """리소스 워밍업을 백그라운드 스레드에서 시작합니다. (이미 시작했다면 기존 스레드 반환)"""
+    global _warmup_thread
+    if _warmup_thread is None or not _warmup_thread.is_alive():
+        _warmup_thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+        _warmup_thread.start()
+    return _warmup_thread
+
+
+def readiness() -> Dict[str, Dict[str, Any]]:
+    """리소스별 준비 상태, 초기화 시간, 오류와 외부 의존성 확인 결과를 반환합니다."""
+    status = {
+        resource.name: {
+            "ready": resource.ready,
+            "init_seconds": round(resource.init_seconds, 3) if resource.init_seconds is not None else None,
+            "error": resource.error,
+        }
+        for resource in _resources
+    }
+    status.update({name: _run_check(func) for name, func in list(_checks.items())})
+    return status
+
+
+def is_ready(status: Optional[Dict[str, Dict[str, Any]]] = None) -> bool:
+    """모든 리소스와 외부 의존성이 준비되었는지 확인합니다. (readiness() 결과를 넘기면 다시 확인하지 않음)"""
+    return all(entry["ready"] for entry in (status if status is not None else readiness()).values())
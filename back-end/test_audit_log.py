@@ -0,0 +1,117 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+import pytest
+from services import audit_log as audit
+from services.audit_log import REBALANCE, RECOMMENDATION, AuditLog
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = AuditLog(db_path=str(tmp_path / "audit" / "audit.sqlite"), flush_interval=0.02, batch_size=50, enabled=True)
+    yield log
+    log.close()
+
+
+def _entry(customer_id, created_at, kind=RECOMMENDATION):
+    return {"created_at": created_at, "kind": kind, "customer_id": customer_id, "result": {"ok": True}}
+
+
+def test_records_are_flushed_in_batches(log):
+    for i in range(5):
+        log.record({"kind": RECOMMENDATION, "customer_id": "C1", "inputs": {"i": i}, "chunk_ids": [i], "degraded": 0})
+    log.close()
+    records = log.query(customer_id="C1")
+    assert len(records) == 5
+    assert sorted(record["inputs"]["i"] for record in records) == list(range(5))
+    assert all(record["degraded"] is False for record in records)
+    assert isinstance(records[0]["chunk_ids"], list)
+
+
+def test_disabled_log_records_nothing(tmp_path):
+    log = AuditLog(db_path=str(tmp_path / "audit.sqlite"), enabled=False)
+    log.record({"kind": RECOMMENDATION, "customer_id": "C1"})
+    assert log._writer is None
+    assert log.query() == []
+
+
+def test_records_are_append_only(log):
+    log.record({"kind": RECOMMENDATION, "customer_id": "C1"})
+    log.close()
+    conn = log._connection()
+    for statement in ("UPDATE audit_records SET customer_id = 'C2'", "DELETE FROM audit_records"):
+        with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+            with conn:
+                conn.execute(statement)
+    assert len(log.query()) == 1
+
+
+def test_query_filters_by_customer_kind_and_time(log):
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i, (customer_id, kind) in enumerate((("C1", RECOMMENDATION), ("C1", REBALANCE), ("C2", RECOMMENDATION))):
+        log.record(_entry(customer_id, (base + timedelta(hours=i)).isoformat(timespec="milliseconds"), kind))
+    log.close()
+    assert [r["kind"] for r in log.query(customer_id="C1")] == [REBALANCE, RECOMMENDATION]
+    assert [r["customer_id"] for r in log.query(kind=RECOMMENDATION)] == ["C2", "C1"]
+    # 시간대가 없는 시각은 UTC로 간주, end는 미포함
+    window = log.query(start=datetime(2026, 1, 1, 1), end=datetime(2026, 1, 1, 2))
+    assert [(r["customer_id"], r["kind"]) for r in window] == [("C1", REBALANCE)]
+    # 다른 시간대로 지정해도 같은 구간
+    kst = timezone(timedelta(hours=9))
+    assert log.query(start=datetime(2026, 1, 1, 10, tzinfo=kst), end=datetime(2026, 1, 1, 11, tzinfo=kst)) == window
+    assert len(log.query(limit=1, offset=1)) == 1
+
+
+def test_audited_records_result_and_service_notes(log):
+    async def handle():
+        async with log.audited(RECOMMENDATION, "C1", "/recommend-etf", {"age": 30}) as entry:
+            audit.note(chunk_ids=["1", "2"])
+            audit.note_inputs(risk_tolerance="High")
+            audit.note_model("gpt-4o-mini")
+            audit.note_model("gpt-4o")
+            audit.note_model("gpt-4o-mini")
+            audit.add_token_usage(10, 5, 15, 0.01)
+            audit.add_token_usage(1, 1, 2, 0.001)
+            entry["result"] = {"recommendations": [], "degraded": True}
+
+    asyncio.run(handle())
+    log.close()
+    (record,) = log.query()
+    assert record["inputs"] == {"age": 30, "risk_tolerance": "High"}
+    assert record["chunk_ids"] == ["1", "2"]
+    assert record["model"] == "gpt-4o-mini,gpt-4o"
+    assert (record["prompt_tokens"], record["completion_tokens"], record["total_tokens"]) == (11, 6, 17)
+    assert record["degraded"] is True and record["reused"] is False
+    assert record["latency_ms"] is not None
+
+
+def test_nested_audited_calls_share_one_record(log):
+    async def handle():
+        async with log.audited(RECOMMENDATION, "C1", "/customer-etf-analysis", {}) as outer:
+            async with log.audited(REBALANCE, "C1", "/rebalance-report", {}) as inner:
+                assert inner is outer
+                inner["result"] = {"report": "..."}
+
+    asyncio.run(handle())
+    log.close()
+    (record,) = log.query()
+    assert record["kind"] == REBALANCE
+    assert record["endpoint"] == "/customer-etf-analysis"
+
+
+def test_failed_requests_are_not_recorded(log):
+    async def handle():
+        async with log.audited(RECOMMENDATION, "C1", "/recommend-etf", {}):
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(handle())
+    log.close()
+    assert log.query() == []
+
+
+def test_notes_outside_audited_requests_are_ignored():
+    audit.note(model="catalog")
+    audit.note_inputs(age=1)
+    audit.note_model("gpt-4o")
+    audit.add_token_usage(1, 1, 2, 0.0)
@@ -0,0 +1,103 @@
+import pytest
+from services import catalog_recommender as recommender_module
+from services.catalog_recommender import (
+    CatalogRecommender,
+    _percentile_ranks,
+    _risk_key,
+    rebalance_from_catalog,
+    recommend_from_catalog,
+)
+
+ROWS = [
+    {"etf_code": "A000001", "etf_name": "SOL 200", "market_small": "코스피", "asset_small": "시장대표",
+     "aum": "900000000000", "total_expense": "0.05", "dividend_yield": "1.5"},
+    {"etf_code": "A000002", "etf_name": "SOL 200TR", "market_small": "코스피", "asset_small": "시장대표",
+     "aum": "800000000000", "total_expense": "0.05", "dividend_yield": "0"},
+    {"etf_code": "A000003", "etf_name": "SOL 미국S&P500", "market_small": "미국", "asset_small": "시장대표",
+     "aum": "700000000000", "total_expense": "0.07", "dividend_yield": "1.0"},
+    {"etf_code": "A000004", "etf_name": "SOL 레버리지", "market_small": "코스피", "asset_small": "레버리지",
+     "aum": "1000000000000", "total_expense": "0.6", "dividend_yield": "0"},
+    {"etf_code": "A000005", "etf_name": "SOL 고배당", "market_small": "코스피", "asset_small": "배당",
+     "aum": "100000000000", "total_expense": "0.3", "dividend_yield": "5.0"},
+    {"etf_code": "A000006", "etf_name": "SOL 인버스", "market_small": "코스피", "asset_small": "인버스",
+     "aum": "500000000000", "total_expense": "0.5", "dividend_yield": "0"},
+    {"etf_code": "A000007", "etf_name": "SOL 신규", "market_small": "미국", "asset_small": "테마",
+     "aum": "\\n", "total_expense": "0.1", "dividend_yield": "0"},
+]
+
+
+@pytest.fixture
+def catalog(make_catalog, monkeypatch):
+    catalog = make_catalog(ROWS)
+    monkeypatch.setattr(recommender_module, "etf_catalog", catalog)
+    monkeypatch.setattr(recommender_module, "catalog_recommender", CatalogRecommender())
+    return catalog
+
+
+def _codes(records):
+    return [record["etf_code"] for record in records]
+
+
+def test_percentile_ranks_ties_share_rank():
+    assert _percentile_ranks([3.0, 1.0, 3.0, 2.0]) == [2 / 3, 0.0, 2 / 3, 1 / 3]
+    assert _percentile_ranks([5.0]) == [1.0]
+
+
+def test_risk_key_aliases_and_default():
+    assert _risk_key("낮음") == "Low"
+    assert _risk_key("High") == "High"
+    assert _risk_key("unknown") == "Medium"
+    assert _risk_key(None) == "Medium"
+
+
+def test_rank_excludes_risky_products_and_missing_aum(catalog):
+    picks = _codes(CatalogRecommender().rank("Medium", monthly_investment=1000000, n=10))
+    assert "A000004" not in picks  # 레버리지
+    assert "A000006" not in picks  # 인버스
+    assert "A000007" not in picks  # 순자산 정보 없음
+    assert set(picks) == {"A000001", "A000002", "A000003", "A000005"}
+
+
+def test_rank_prefers_distinct_buckets(catalog):
+    picks = _codes(CatalogRecommender().rank("Medium", monthly_investment=1000000, n=3))
+    # A000002는 A000001과 같은 분류(코스피 시장대표)이므로 다른 분류가 먼저 선택됨
+    assert picks == ["A000001", "A000003", "A000005"]
+
+
+def test_rank_low_risk_weights_dividend(catalog):
+    recommender = CatalogRecommender()
+    exclude = {"A000001", "A000003"}
+    # 분배율이 높지만 규모가 작은 ETF는 낮은 위험 감내도에서만 우선
+    assert _codes(recommender.rank("Low", monthly_investment=1000000, exclude=exclude, n=1)) == ["A000005"]
+    assert _codes(recommender.rank("Medium", monthly_investment=1000000, exclude=exclude, n=1)) == ["A000002"]
+
+
+def test_rank_respects_exclude(catalog):
+    picks = _codes(CatalogRecommender().rank("Medium", monthly_investment=1000000, exclude={"A000001"}, n=3))
+    assert "A000001" not in picks
+
+
+def test_rank_is_deterministic(catalog):
+    recommender = CatalogRecommender()
+    assert recommender.rank("High", n=3) == recommender.rank("High", n=3)
+
+
+def test_recommend_from_catalog_is_degraded(catalog):
+    result = recommend_from_catalog("중간", {"monthly_investment": 1000000})
+    assert result["degraded"] is True
+    assert result["recommendations"] == ["A000001 - SOL 200", "A000003 - SOL 미국S&P500", "A000005 - SOL 고배당"]
+    assert len(result["reasons"]) == 3
+
+
+def test_rebalance_from_catalog_flags_concentration_and_risk(catalog):
+    report = rebalance_from_catalog("C1", ["SOL 레버리지"], "Low", 40, {"monthly_investment": 100000})
+    assert report["degraded"] is True
+    assert report["rebalancing_needed"] is True
+    assert "분산이 충분하지 않습니다" in report["rebalancing_analysis"]
+    assert "SOL 레버리지" in report["rebalancing_analysis"]
+    assert "A000004" not in report["suggestions"]
+
+
+def test_rebalance_from_catalog_unknown_holdings(catalog):
+    report = rebalance_from_catalog("C1", ["없는 ETF"], "Medium", 40, {})
+    assert "카탈로그에서 찾을 수 없는 보유 ETF 1개" in report["performance_analysis"]
@@ -0,0 +1,136 @@
+import random
+import pytest
+from services.customer_cohorts import CustomerCohorts, monthly_investment_band, UNKNOWN
+
+
+class FakeStore:
+    def __init__(self, records):
+        self.records = records
+        self.version = 1
+        self.listeners = []
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+        listener.on_reset(self.records)
+
+    def load(self):
+        return len(self.records)
+
+
+def _record(risk="Medium", tendency="안정형", horizon="장기", holdings="", monthly=400000, age=35, category="직장인"):
+    return {
+        "risk_tolerance": risk,
+        "investment_tendency": tendency,
+        "investment_horizon": horizon,
+        "has_etf": bool(holdings),
+        "current_etf_holdings": holdings,
+        "financial_status": {"monthly_investment": monthly, "category": category},
+        "age": age,
+    }
+
+
+def _random_record(rng):
+    return _record(
+        risk=rng.choice(["Low", "Medium", "High"]),
+        tendency=rng.choice(["안정형", "성장형", None]),
+        horizon=rng.choice(["단기", "장기"]),
+        holdings=rng.choice(["", "KODEX 200", "KODEX 200, TIGER 미국S&P500", "TIGER 미국S&P500,KODEX 200"]),
+        monthly=rng.choice([100000, 400000, 800000, 2000000, None]),
+        age=rng.choice([25, 37, 48, None]),
+    )
+
+
+def test_monthly_investment_band():
+    edges = [300000, 500000]
+    assert monthly_investment_band(100000, edges) == "30만원 미만"
+    assert monthly_investment_band(300000, edges) == "30만원~50만원"
+    assert monthly_investment_band(500000, edges) == "50만원 이상"
+    assert monthly_investment_band(None, edges) == UNKNOWN
+    assert monthly_investment_band("abc", edges) == UNKNOWN
+
+
+def test_incremental_changes_match_full_recompute():
+    rng = random.Random(7)
+    records = [_random_record(rng) for _ in range(50)]
+    cohorts = CustomerCohorts(store=FakeStore(list(records)))
+    cohorts.summary()
+    for _ in range(200):
+        action = rng.random()
+        if action < 0.2 and records:
+            cohorts.on_change(records.pop(rng.randrange(len(records))), None)
+        elif action < 0.4:
+            record = _random_record(rng)
+            records.append(record)
+            cohorts.on_change(None, record)
+        else:
+            position = rng.randrange(len(records))
+            record = _random_record(rng)
+            cohorts.on_change(records[position], record)
+            records[position] = record
+    expected = CustomerCohorts(store=FakeStore(records))
+
+    assert cohorts.summary() == expected.summary()
+    # 고객 수가 같은 항목의 순서는 추가 순서에 따라 다르므로 카운터로 비교
+    assert cohorts._etfs == expected._etfs
+    assert cohorts._combinations == expected._combinations
+    assert cohorts._buckets == expected._buckets
+    incremental, recomputed = cohorts.profile_buckets(), expected.profile_buckets()
+    incremental.pop("top_buckets"), recomputed.pop("top_buckets")
+    assert incremental == recomputed
+    for dimensions in (["risk_tolerance"], ["holder", "age_band"], ["risk_tolerance", "investment_horizon", "monthly_investment_band"]):
+        assert cohorts.group_by(dimensions) == expected.group_by(dimensions)
+    # 내부 카운터에 0이 남지 않음
+    assert all(count > 0 for count in cohorts._joint.values())
+    assert all(count > 0 for count in cohorts._bucket_sizes.values())
+
+
+def test_group_by_derived_from_joint_distribution():
+    records = [
+        _record(risk="Low", horizon="단기"),
+        _record(risk="Low", horizon="단기"),
+        _record(risk="High", horizon="장기", age=52),
+    ]
+    cohorts = CustomerCohorts(store=FakeStore(records))
+    result = cohorts.group_by(["age_band", "risk_tolerance", "investment_horizon"])
+    assert result["dimensions"] == ["risk_tolerance", "investment_horizon", "age_band"]
+    assert result["customers"] == 3
+    assert result["groups"] == [
+        {"risk_tolerance": "Low", "investment_horizon": "단기", "age_band": "30대", "count": 2},
+        {"risk_tolerance": "High", "investment_horizon": "장기", "age_band": "50대", "count": 1},
+    ]
+    # 변경 후에는 재사용하던 결과를 다시 계산
+    cohorts.on_change(None, _record(risk="High", horizon="장기", age=55))
+    assert cohorts.group_by(["risk_tolerance", "investment_horizon", "age_band"])["groups"][0]["count"] == 2
+
+    assert cohorts.group_by([])["groups"] == [{"count": 4}]
+
+
+def test_group_by_rejects_unknown_dimension():
+    cohorts = CustomerCohorts(store=FakeStore([]))
+    with pytest.raises(ValueError):
+        cohorts.group_by(["risk_tolerance", "city"])
+
+
+def test_holdings_and_profile_buckets():
+    records = [
+        _record(holdings="KODEX 200, TIGER 미국S&P500"),
+        _record(holdings="TIGER 미국S&P500,KODEX 200"),
+        _record(holdings="KODEX 200"),
+        _record(risk="High"),
+    ]
+    cohorts = CustomerCohorts(store=FakeStore(records))
+
+    holdings = cohorts.holdings()
+    assert holdings["etfs"] == [{"etf_name": "KODEX 200", "customers": 3}, {"etf_name": "TIGER 미국S&P500", "customers": 2}]
+    assert holdings["combinations"][0] == {"etfs": ["KODEX 200", "TIGER 미국S&P500"], "customers": 2}
+    summary = cohorts.summary()
+    assert (summary["holders"], summary["non_holders"]) == (3, 1)
+
+    buckets = cohorts.profile_buckets()
+    assert buckets["customers"] == 4
+    assert buckets["buckets"] == 3
+    assert buckets["singletons"] == 2
+    assert buckets["singleton_customers_ratio"] == 0.5
+    assert buckets["max_cache_hit_rate"] == 0.25
+    assert buckets["bucket_size_distribution"] == {"1": 2, "2": 1}
+    assert buckets["top_buckets"][0]["holdings"] == ["KODEX 200", "TIGER 미국S&P500"]
@@ -0,0 +1,96 @@
+import numpy as np
+from services import customer_similarity
+from services.customer_similarity import MAX_DISTANCE, CustomerSimilarityIndex, vectorize_profile
+
+FINANCIAL_STATUS = {"income": 50000000, "savings": 100000000, "monthly_investment": 1000000}
+
+
+def _profile(**overrides):
+    params = dict(
+        age=35,
+        risk_tolerance="Medium",
+        financial_status=FINANCIAL_STATUS,
+        investment_tendency="moderate",
+        investment_horizon="long",
+        holdings=None,
+    )
+    params.update(overrides)
+    return vectorize_profile(**params)
+
+
+def _recommendation(*codes):
+    return {"recommendations": [f"{code} - ETF {code}" for code in codes], "reasons": ["이유"] * len(codes)}
+
+
+def test_vectorize_profile_normalizes_features():
+    vector = _profile()
+    assert vector.shape == (len(customer_similarity.FEATURE_WEIGHTS),)
+    assert np.all(vector >= 0)
+    assert np.all(vector <= customer_similarity.FEATURE_WEIGHTS + 1e-6)
+    # 위험 감내도는 한국어/영어 표기가 같은 값
+    assert np.allclose(_profile(risk_tolerance="중간"), vector)
+    # 보유 ETF 순서와 공백은 결과에 영향 없음
+    assert np.allclose(_profile(holdings="SOL 200, SOL 미국S&P500"), _profile(holdings=["SOL미국S&P500", "SOL200"]))
+
+
+def test_lookup_reuses_within_threshold():
+    index = CustomerSimilarityIndex(capacity=10, ttl_seconds=3600, threshold=0.1)
+    index.add(_profile(), _recommendation("A1", "A2", "A3"))
+    match = index.lookup(_profile(age=37))
+    assert match is not None
+    payload, distance = match
+    assert payload["recommendations"][0] == "A1 - ETF A1"
+    assert 0 < distance <= 0.1
+
+
+def test_lookup_rejects_distant_profiles():
+    index = CustomerSimilarityIndex(capacity=10, ttl_seconds=3600, threshold=0.1)
+    index.add(_profile(), _recommendation("A1", "A2", "A3"))
+    assert index.lookup(_profile(risk_tolerance="High", age=70)) is None
+    stats = index.stats()
+    assert stats["lookups"] == 1 and stats["reuses"] == 0
+    assert stats["distance_distribution"]["within_threshold"] == 0.0
+
+
+def test_lookup_skips_recommendations_with_owned_etfs():
+    index = CustomerSimilarityIndex(capacity=10, ttl_seconds=3600, threshold=0.1)
+    index.add(_profile(), _recommendation("A1", "A2", "A3"))
+    index.add(_profile(age=36), _recommendation("B1", "B2", "B3"))
+    payload, _ = index.lookup(_profile(), exclude_codes={"A2"})
+    assert payload["recommendations"][0] == "B1 - ETF B1"
+
+
+def test_lookup_returns_copies():
+    index = CustomerSimilarityIndex(capacity=10, ttl_seconds=3600, threshold=0.1)
+    index.add(_profile(), _recommendation("A1"))
+    payload, _ = index.lookup(_profile())
+    payload["recommendations"].clear()
+    assert index.lookup(_profile())[0]["recommendations"] == ["A1 - ETF A1"]
+
+
+def test_ring_buffer_overwrites_oldest_entries():
+    index = CustomerSimilarityIndex(capacity=2, ttl_seconds=3600, threshold=1.0)
+    index.add(_profile(age=20), _recommendation("OLD"))
+    index.add(_profile(age=50), _recommendation("MID"))
+    index.add(_profile(age=80), _recommendation("NEW"))
+    codes = [payload["recommendations"][0] for payload, _ in index.knn(_profile(age=20), k=5)]
+    assert codes == ["MID - ETF MID", "NEW - ETF NEW"]
+    assert index.stats()["size"] == 2
+
+
+def test_expired_entries_are_ignored():
+    index = CustomerSimilarityIndex(capacity=10, ttl_seconds=0, threshold=1.0)
+    index.add(_profile(), _recommendation("A1"))
+    assert index.knn(_profile()) == []
+    assert index.lookup(_profile()) is None
+
+
+def test_knn_orders_by_normalized_distance():
+    index = CustomerSimilarityIndex(capacity=10, ttl_seconds=3600)
+    for age in (60, 30, 45):
+        index.add(_profile(age=age), _recommendation(str(age)))
+    results = index.knn(_profile(age=30), k=3)
+    assert [payload["recommendations"][0].split(" - ")[0] for payload, _ in results] == ["30", "45", "60"]
+    distances = [distance for _, distance in results]
+    assert distances[0] == 0.0
+    assert abs(distances[1] - (15 / 60) / MAX_DISTANCE) < 1e-5
@@ -0,0 +1,77 @@
+import asyncio
+import time
+import pytest
+from services.deadline import (
+    DeadlineExceeded,
+    current_deadline,
+    ensure_budget,
+    remaining_budget,
+    request_deadline,
+    run_with_deadline,
+)
+
+
+def test_no_deadline_by_default():
+    assert current_deadline() is None
+    assert remaining_budget() is None
+    ensure_budget(100.0, "stage")
+
+
+def test_nested_deadline_keeps_shorter_parent():
+    with request_deadline(1.0) as outer:
+        with request_deadline(10.0) as inner:
+            assert inner is outer
+        with request_deadline(0.5) as inner:
+            assert inner is not outer
+            assert remaining_budget() <= 0.5
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_ensure_budget_raises_when_insufficient():
+    with request_deadline(0.5):
+        ensure_budget(0.1, "retrieval")
+        with pytest.raises(DeadlineExceeded, match="retrieval"):
+            ensure_budget(1.0, "retrieval")
+
+
+def test_run_with_deadline_skips_when_budget_too_small():
+    started = []
+
+    async def work():
+        started.append(True)
+        return "done"
+
+    async def main():
+        with request_deadline(0.2):
+            return await run_with_deadline(work(), "llm", min_budget=1.0)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+    assert started == []
+
+
+def test_run_with_deadline_times_out():
+    async def main():
+        with request_deadline(0.05):
+            await run_with_deadline(asyncio.sleep(1.0), "llm")
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded, match="초과"):
+        asyncio.run(main())
+    assert time.monotonic() - started < 0.5
+
+
+def test_run_with_deadline_propagates_to_threads():
+    async def main():
+        with request_deadline(5.0):
+            return await run_with_deadline(asyncio.to_thread(remaining_budget), "retrieval")
+
+    assert 0 < asyncio.run(main()) <= 5.0
+
+
+def test_run_with_deadline_without_deadline_awaits_normally():
+    async def work():
+        return 42
+
+    assert asyncio.run(run_with_deadline(work(), "llm", min_budget=100.0)) == 42
@@ -0,0 +1,95 @@
+import pytest
+
+ROWS = [
+    {"etf_code": "A000001", "etf_name": "SOL 200", "asset_large": "주식", "market_large": "국내",
+     "theme": "ETF,시장대표", "total_expense": "0.05", "aum": "900", "dividend_yield": "1.5", "fiscal_month": "12"},
+    {"etf_code": "A000002", "etf_name": "SOL 국고채3년", "asset_large": "채권", "market_large": "국내",
+     "theme": "ETF,채권", "total_expense": "0.10", "aum": "300", "dividend_yield": "3.0"},
+    {"etf_code": "A000003", "etf_name": "SOL 미국S&P500", "asset_large": "주식", "market_large": "해외",
+     "theme": "ETF, 미국", "total_expense": "0.07", "aum": "700", "dividend_yield": "\\n"},
+    {"etf_code": "A000004", "etf_name": "SOL 금현물", "asset_large": "원자재", "market_large": "해외",
+     "theme": "", "total_expense": "0.30", "aum": "\\n", "dividend_yield": "0"},
+]
+
+
+@pytest.fixture
+def catalog(make_catalog):
+    return make_catalog(ROWS)
+
+
+def _codes(items):
+    return [item["etf_code"] for item in items]
+
+
+def test_query_defaults_to_aum_descending_with_missing_last(catalog):
+    total, items = catalog.query()
+    assert total == 4
+    assert _codes(items) == ["A000001", "A000003", "A000002", "A000004"]
+
+
+def test_query_ascending_keeps_missing_values_last(catalog):
+    _, items = catalog.query(sort="dividend_yield", descending=False)
+    assert _codes(items) == ["A000004", "A000001", "A000002", "A000003"]
+
+
+def test_query_filters_or_within_and_across(catalog):
+    total, items = catalog.query(filters={"asset_class": ["주식", "원자재"]})
+    assert total == 3
+    total, items = catalog.query(filters={"asset_class": ["주식", "원자재"], "market": ["해외"]})
+    assert (total, _codes(items)) == (2, ["A000003", "A000004"])
+    # 빈 값 목록은 필터로 취급하지 않음
+    assert catalog.query(filters={"market": [], "asset_class": [""]})[0] == 4
+    assert catalog.query(filters={"market": ["없는 시장"]})[0] == 0
+
+
+def test_query_theme_filter_matches_any_listed_theme(catalog):
+    _, items = catalog.query(filters={"theme": ["미국"]})
+    assert _codes(items) == ["A000003"]
+    _, items = catalog.query(filters={"theme": ["ETF"]}, sort="etf_code", descending=False)
+    assert _codes(items) == ["A000001", "A000002", "A000003"]
+
+
+def test_query_ranges_are_inclusive_and_exclude_missing(catalog):
+    _, items = catalog.query(ranges={"total_expense": (0.07, 0.10)}, sort="etf_code", descending=False)
+    assert _codes(items) == ["A000002", "A000003"]
+    _, items = catalog.query(ranges={"aum": (None, 500)})
+    assert _codes(items) == ["A000002"]
+    _, items = catalog.query(ranges={"dividend_yield": (0, None)}, sort="etf_code", descending=False)
+    assert _codes(items) == ["A000001", "A000002", "A000004"]
+    assert catalog.query(ranges={"aum": (None, None)})[0] == 4
+
+
+def test_query_pagination_and_projection(catalog):
+    total, items = catalog.query(offset=1, limit=2, fields=["etf_code", "aum"])
+    assert total == 4
+    assert items == [{"etf_code": "A000003", "aum": 700.0}, {"etf_code": "A000002", "aum": 300.0}]
+    assert catalog.query(offset=10)[1] == []
+
+
+def test_api_records_convert_types_and_blank_values(catalog):
+    _, (item,) = catalog.query(filters={"market": ["국내"]}, ranges={"aum": (800, None)})
+    assert item["total_expense"] == 0.05
+    assert item["fiscal_month"] == 12
+    assert item["theme"] == ["ETF", "시장대표"]
+    gold = catalog.get_api_record("000004")
+    assert gold["aum"] is None and gold["theme"] == [] and gold["fiscal_month"] is None
+    assert catalog.get_api_record("A999999") is None
+
+
+def test_query_results_are_copies(catalog):
+    _, items = catalog.query(limit=1)
+    items[0]["etf_name"] = "변경"
+    assert catalog.query(limit=1)[1][0]["etf_name"] == "SOL 200"
+
+
+def test_facets_count_values(catalog):
+    facets = catalog.facets()
+    assert facets["asset_class"] == {"주식": 2, "채권": 1, "원자재": 1}
+    assert facets["theme"]["ETF"] == 3
+
+
+def test_normalize_code_and_name_matching(catalog):
+    assert catalog.normalize_code("000001") == "A000001"
+    assert catalog.normalize_code("a000002") == "A000002"
+    assert catalog.normalize_code("123") is None
+    assert _codes(catalog.match_names("보유: SOL미국S&P500, SOL 200")) == ["A000003", "A000001"]
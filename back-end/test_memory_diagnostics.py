@@ -0,0 +1,59 @@
+import os
+import pytest
+from monitoring import memory_diagnostics
+from monitoring.memory_diagnostics import MemoryTracker, component_sizes, register_memory_source
+
+
+@pytest.fixture(autouse=True)
+def sources(monkeypatch):
+    monkeypatch.setattr(memory_diagnostics, "_sources", {})
+
+
+@pytest.fixture
+def tracker():
+    tracker = MemoryTracker(frames=1, max_snapshots=4)
+    tracker.start()
+    yield tracker
+    tracker.stop()
+
+
+def _allocate(cache):
+    cache.extend(bytearray(1024) for _ in range(2000))  # 할당 위치
+
+
+def test_diff_reports_growing_allocation_site(tracker):
+    cache = []
+    register_memory_source("cache", lambda: {"items": len(cache)})
+    base = tracker.snapshot(label="before")
+    _allocate(cache)
+    target = tracker.snapshot(label="after")
+
+    diff = tracker.diff(base["id"], target["id"])
+    top = diff["top_growth"][0]
+    assert top["location"] == [f"{os.path.abspath(__file__)}:{_allocate.__code__.co_firstlineno + 1}"]
+    assert top["size_diff_bytes"] >= 2000 * 1024
+    assert top["count_diff"] >= 2000
+    assert diff["traced_diff_bytes"] >= 2000 * 1024
+    assert diff["components"]["cache"]["items"] == {"before": 0, "after": 2000, "diff": 2000}
+    assert [entry["label"] for entry in tracker.snapshots()] == ["before", "after"]
+
+    with pytest.raises(ValueError):
+        tracker.diff(base["id"], key_type="function")
+    with pytest.raises(KeyError):
+        tracker.diff(999)
+
+
+def test_snapshot_requires_tracing():
+    with pytest.raises(RuntimeError):
+        MemoryTracker().snapshot()
+
+
+def test_component_sizes_skip_sources_that_are_not_ready():
+    loaded = {"ready": False}
+    register_memory_source("vector_index", lambda: {"items": 10, "bytes": 4096} if loaded["ready"] else {})
+    register_memory_source("broken", lambda: 1 / 0)
+    register_memory_source("docstore", lambda: {"items": 3})
+
+    assert component_sizes() == {"docstore": {"items": 3}}
+    loaded["ready"] = True
+    assert component_sizes() == {"vector_index": {"items": 10, "bytes": 4096}, "docstore": {"items": 3}}
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from pydantic import BaseModel
+from services import etf_service
+from services.deadline import DeadlineExceeded
+from services.model_router import LLMOutputValidationError, ModelRouter
+
+
+class Answer(BaseModel):
+    value: int
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeModel:
+    """모델 이름별로 정해진 응답(생성/수정 요청 구분)을 돌려주고 호출을 기록하는 모델"""
+
+    def __init__(self, name, responses, calls):
+        self.name = name
+        self.responses = responses
+        self.calls = calls
+
+    def bind(self, **kwargs):
+        return self
+
+    async def ainvoke(self, prompt, config=None):
+        kind = "repair" if "스키마 검증에 실패" in prompt else "generate"
+        self.calls.append((self.name, kind))
+        return _Response(self.responses[self.name][kind])
+
+
+def _router(routes, responses, calls):
+    return ModelRouter(routes=routes, max_tokens={}, factory=lambda name, max_tokens: FakeModel(name, responses, calls))
+
+
+def test_router_escalates_until_validation_passes():
+    calls = []
+    router = _router({"op": ["cheap", "strong"]}, {}, calls)
+
+    async def call(model, config):
+        calls.append(model.name)
+        return "" if model.name == "cheap" else "답변"
+
+    assert asyncio.run(router.run("op", call, validate=lambda text: [] if text else ["빈 응답"])) == "답변"
+    assert calls == ["cheap", "strong"]
+
+
+def test_router_raises_when_last_model_fails_validation():
+    router = _router({"op": ["cheap", "strong"]}, {}, [])
+
+    async def call(model, config):
+        return ""
+
+    with pytest.raises(LLMOutputValidationError):
+        asyncio.run(router.run("op", call, validate=lambda text: [] if text else ["빈 응답"]))
+
+
+def test_router_does_not_escalate_deadline_exceeded():
+    calls = []
+    router = _router({"op": ["cheap", "strong"]}, {}, calls)
+
+    async def call(model, config):
+        calls.append(model.name)
+        raise DeadlineExceeded("llm")
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(router.run("op", call))
+    assert calls == ["cheap"]
+
+
+ROUTES = {"recommendation": ["cheap", "strong"], "repair": ["cheap"]}
+
+
+def _generate(monkeypatch, responses, calls):
+    monkeypatch.setattr(etf_service, "model_router", _router(ROUTES, responses, calls))
+    return asyncio.run(etf_service.generate_validated_json(
+        "JSON으로 답해주세요.",
+        Answer,
+        validator=lambda parsed: [] if parsed.value > 0 else ["value: 양수여야 합니다"]
+    ))
+
+
+def test_validated_json_repairs_before_escalating(monkeypatch):
+    calls = []
+    responses = {"cheap": {"generate": '{"value": "x"}', "repair": '{"value": 3}'}}
+    assert _generate(monkeypatch, responses, calls) == Answer(value=3)
+    assert calls == [("cheap", "generate"), ("cheap", "repair")]
+
+
+def test_validated_json_escalates_when_repair_fails(monkeypatch):
+    calls = []
+    responses = {
+        "cheap": {"generate": '{"value": -1}', "repair": '{"value": 0}'},
+        "strong": {"generate": '{"value": 7}'},
+    }
+    assert _generate(monkeypatch, responses, calls) == Answer(value=7)
+    assert calls == [("cheap", "generate"), ("cheap", "repair"), ("strong", "generate")]
+
+
+def test_validated_json_raises_when_all_tiers_fail(monkeypatch):
+    calls = []
+    responses = {
+        "cheap": {"generate": "not json", "repair": "still not json"},
+        "strong": {"generate": '{"value": -5}'},
+    }
+    with pytest.raises(LLMOutputValidationError):
+        _generate(monkeypatch, responses, calls)
+    assert calls == [("cheap", "generate"), ("cheap", "repair"), ("strong", "generate"), ("cheap", "repair")]
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import time
+import pytest
+from services.deadline import DeadlineExceeded, request_deadline
+from services.model_scheduler import (
+    BATCH,
+    INTERACTIVE,
+    MAINTENANCE,
+    ModelCallScheduler,
+    ModelOverloadedError,
+    ScheduledEmbeddings,
+    priority_class,
+    with_priority,
+)
+
+
+def _scheduler(max_concurrency=1, interactive_reserved=0, limit=4):
+    return ModelCallScheduler(
+        max_concurrency=max_concurrency,
+        interactive_reserved=interactive_reserved,
+        queue_limits={INTERACTIVE: limit, BATCH: limit, MAINTENANCE: limit}
+    )
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "조건을 기다리는 중 시간 초과"
+        time.sleep(0.005)
+
+
+def test_slot_is_granted_immediately_when_free():
+    scheduler = _scheduler(max_concurrency=2)
+    with scheduler.slot_sync(BATCH):
+        assert scheduler.stats()[BATCH] == {"queued": 0, "in_flight": 1}
+    assert scheduler.stats()[BATCH] == {"queued": 0, "in_flight": 0}
+
+
+def test_waiters_are_served_by_priority_then_fifo():
+    scheduler = _scheduler(max_concurrency=1)
+    order = []
+    holder = scheduler.slot_sync(INTERACTIVE)
+    holder.__enter__()
+
+    def call(priority, name):
+        with scheduler.slot_sync(priority):
+            order.append(name)
+
+    threads = []
+    for priority, name in ((MAINTENANCE, "m1"), (BATCH, "b1"), (INTERACTIVE, "i1"), (BATCH, "b2"), (INTERACTIVE, "i2")):
+        thread = threading.Thread(target=call, args=(priority, name))
+        thread.start()
+        threads.append(thread)
+        _wait_until(lambda: scheduler.stats()[priority]["queued"] >= 1)
+    holder.__exit__(None, None, None)
+    for thread in threads:
+        thread.join(2.0)
+    assert order == ["i1", "i2", "b1", "b2", "m1"]
+
+
+def test_background_classes_cannot_use_reserved_slots():
+    scheduler = _scheduler(max_concurrency=2, interactive_reserved=1, limit=0)
+    with scheduler.slot_sync(BATCH):
+        # batch는 예약되지 않은 1개 슬롯만 사용할 수 있고 대기열 한도는 0이므로 즉시 거절
+        with pytest.raises(ModelOverloadedError):
+            with scheduler.slot_sync(BATCH):
+                pass
+        # interactive는 예약 슬롯을 사용
+        with scheduler.slot_sync(INTERACTIVE):
+            assert scheduler.stats()[INTERACTIVE]["in_flight"] == 1
+
+
+def test_full_queue_is_shed_with_retry_after():
+    scheduler = _scheduler(max_concurrency=1, limit=1)
+    holder = scheduler.slot_sync(BATCH)
+    holder.__enter__()
+    waiter = threading.Thread(target=lambda: scheduler.slot_sync(BATCH, timeout=2.0).__enter__())
+    waiter.start()
+    _wait_until(lambda: scheduler.stats()[BATCH]["queued"] == 1)
+    with pytest.raises(ModelOverloadedError) as excinfo:
+        with scheduler.slot_sync(BATCH):
+            pass
+    assert excinfo.value.priority == BATCH
+    # 대기 1건 × 평균 점유 시간 1초 / 슬롯 1개
+    assert excinfo.value.retry_after == 1
+    holder.__exit__(None, None, None)
+    waiter.join(2.0)
+
+
+def test_retry_after_grows_with_backlog():
+    scheduler = _scheduler(max_concurrency=1, limit=3)
+    scheduler._avg_service_time = 2.0
+    holder = scheduler.slot_sync(INTERACTIVE)
+    holder.__enter__()
+    for _ in range(3):
+        threading.Thread(target=lambda: scheduler.slot_sync(INTERACTIVE, timeout=0.5).__enter__(), daemon=True).start()
+    _wait_until(lambda: scheduler.stats()[INTERACTIVE]["queued"] == 3)
+    with pytest.raises(ModelOverloadedError) as excinfo:
+        with scheduler.slot_sync(INTERACTIVE):
+            pass
+    assert excinfo.value.retry_after == 6
+    holder.__exit__(None, None, None)
+
+
+def test_slot_sync_timeout_leaves_queue():
+    scheduler = _scheduler(max_concurrency=1)
+    with scheduler.slot_sync(INTERACTIVE):
+        with pytest.raises(TimeoutError):
+            with scheduler.slot_sync(INTERACTIVE, timeout=0.05):
+                pass
+        assert scheduler.stats()[INTERACTIVE]["queued"] == 0
+    assert scheduler.stats()[INTERACTIVE]["in_flight"] == 0
+
+
+def test_cancelled_async_waiter_is_removed():
+    scheduler = _scheduler(max_concurrency=1)
+
+    async def main():
+        with scheduler.slot_sync(INTERACTIVE):
+            async def wait_for_slot():
+                async with scheduler.slot(INTERACTIVE):
+                    pass
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(wait_for_slot(), timeout=0.05)
+            assert scheduler.stats()[INTERACTIVE]["queued"] == 0
+
+    asyncio.run(main())
+    assert scheduler.stats()[INTERACTIVE]["in_flight"] == 0
+
+
+def test_priority_context_is_used_by_default():
+    scheduler = _scheduler(max_concurrency=2)
+    with priority_class(MAINTENANCE):
+        with scheduler.slot_sync():
+            assert scheduler.stats()[MAINTENANCE]["in_flight"] == 1
+
+    def in_flight():
+        with scheduler.slot_sync():
+            return scheduler.stats()[BATCH]["in_flight"]
+
+    assert with_priority(BATCH, in_flight)() == 1
+    with pytest.raises(ValueError):
+        with priority_class("unknown"):
+            pass
+
+
+class _FakeEmbeddings:
+    def embed_query(self, text):
+        return [float(len(text))]
+
+    def embed_documents(self, texts):
+        return [[float(len(text))] for text in texts]
+
+
+def test_scheduled_embeddings_stop_waiting_at_request_deadline():
+    scheduler = _scheduler(max_concurrency=1)
+    embeddings = ScheduledEmbeddings(_FakeEmbeddings(), scheduler)
+    assert embeddings.embed_query("abc") == [3.0]
+    with scheduler.slot_sync(INTERACTIVE):
+        started = time.monotonic()
+        with request_deadline(0.05):
+            with pytest.raises(DeadlineExceeded):
+                embeddings.embed_documents(["a", "bb"])
+        assert time.monotonic() - started < 1.0
+        assert scheduler.stats()[INTERACTIVE]["queued"] == 0
+
+
+def test_scheduled_embeddings_keep_embedding_timeouts():
+    class _TimingOutEmbeddings(_FakeEmbeddings):
+        def embed_query(self, text):
+            raise TimeoutError("read timed out")
+
+    scheduler = _scheduler(max_concurrency=1)
+    embeddings = ScheduledEmbeddings(_TimingOutEmbeddings(), scheduler)
+    # 모델 호출의 타임아웃은 시간 예산 초과(카탈로그 대체)로 바뀌지 않음
+    with request_deadline(5.0):
+        with pytest.raises(TimeoutError) as excinfo:
+            embeddings.embed_query("abc")
+    assert not isinstance(excinfo.value, DeadlineExceeded)
+    assert scheduler.stats()[INTERACTIVE]["in_flight"] == 0
@@ -0,0 +1,137 @@
+import math
+import numpy as np
+import pytest
+from services import portfolio_analytics as analytics
+from services.portfolio_analytics import (
+    TRADING_DAYS,
+    average_correlation,
+    covariance_matrix,
+    daily_returns,
+    forward_fill,
+    format_facts,
+    portfolio_returns,
+    series_metrics,
+)
+from services.price_store import PriceHistoryStore
+
+nan = np.nan
+
+
+def test_forward_fill_keeps_leading_gaps():
+    prices = np.array([[nan, 10.0], [1.0, nan], [nan, nan], [2.0, 12.0]])
+    expected = np.array([[nan, 10.0], [1.0, 10.0], [1.0, 10.0], [2.0, 12.0]])
+    np.testing.assert_array_equal(forward_fill(prices), expected)
+
+
+def test_daily_returns_bridge_holidays():
+    prices = np.array([[100.0], [nan], [110.0]])
+    np.testing.assert_allclose(daily_returns(prices), [[0.0], [0.1]])
+
+
+def test_series_metrics_matches_direct_computation():
+    returns = np.array([[0.1, nan], [-0.2, 0.05], [0.05, nan], [0.1, 0.01]])
+    metrics = series_metrics(returns)
+    wealth = np.cumprod([1.1, 0.8, 1.05, 1.1])
+    assert metrics["return"][0] == pytest.approx(wealth[-1] - 1)
+    assert metrics["max_drawdown"][0] == pytest.approx(wealth[1] / wealth[0] - 1)
+    assert metrics["volatility"][0] == pytest.approx(np.std(returns[:, 0], ddof=1) * math.sqrt(TRADING_DAYS))
+    assert metrics["return"][1] == pytest.approx(1.05 * 1.01 - 1)
+    # 하락이 없으면 최대 낙폭 0
+    assert metrics["max_drawdown"][1] == 0.0
+    assert list(metrics["observations"]) == [4, 2]
+
+
+def test_series_metrics_insufficient_observations():
+    metrics = series_metrics(np.array([[nan, 0.1], [nan, nan]]))
+    assert np.isnan(metrics["return"][0]) and np.isnan(metrics["max_drawdown"][0])
+    assert np.isnan(metrics["volatility"][1])
+    assert metrics["return"][1] == pytest.approx(0.1)
+
+
+def test_covariance_matches_numpy_on_complete_data():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0, 0.01, size=(50, 3))
+    covariance, correlation = covariance_matrix(returns)
+    np.testing.assert_allclose(covariance, np.cov(returns, rowvar=False) * TRADING_DAYS)
+    np.testing.assert_allclose(correlation, np.corrcoef(returns, rowvar=False), atol=1e-12)
+
+
+def test_covariance_uses_pairwise_overlap():
+    rng = np.random.default_rng(1)
+    returns = rng.normal(0, 0.01, size=(30, 3))
+    returns[:10, 1] = nan  # 늦게 상장한 ETF
+    returns[:, 2] = nan
+    returns[-1, 2] = 0.01  # 관측일 1일
+    covariance, correlation = covariance_matrix(returns)
+    overlap = returns[10:, :2]
+    assert covariance[0, 1] == pytest.approx(np.cov(overlap, rowvar=False)[0, 1] * TRADING_DAYS)
+    assert correlation[0, 1] == pytest.approx(np.corrcoef(overlap, rowvar=False)[0, 1])
+    assert np.isnan(correlation[0, 2]) and np.isnan(correlation[2, 2])
+    assert correlation[0, 0] == 1.0
+
+
+def test_portfolio_returns_renormalize_missing_prices():
+    returns = np.array([[0.1, 0.3], [0.2, nan], [nan, nan]])
+    weights = np.array([[0.5, 0.5], [1.0, 0.0]])
+    result = portfolio_returns(returns, weights)
+    np.testing.assert_allclose(result[:2], [[0.2, 0.1], [0.2, 0.2]])
+    assert np.isnan(result[2]).all()
+
+
+def test_average_correlation_over_held_pairs():
+    correlation = np.array([[1.0, 0.2, 0.8], [0.2, 1.0, nan], [0.8, nan, 1.0]])
+    holdings = np.array([[1.0, 1.0, 1.0], [1.0, 0.0, 1.0], [1.0, 0.0, 0.0]])
+    result = average_correlation(correlation, holdings)
+    assert result[0] == pytest.approx(0.5)  # 알 수 없는 쌍(1, 2)은 제외
+    assert result[1] == pytest.approx(0.8)
+    assert np.isnan(result[2])
+
+
+def test_format_facts_without_prices_forbids_made_up_numbers():
+    facts = format_facts({"available": False})
+    assert "가격 데이터가 없어" in facts
+    assert "만들어내지" in facts
+
+
+@pytest.fixture
+def prices(tmp_path, make_catalog, monkeypatch):
+    rows = ["date,etf_code,etf_name,close"]
+    closes = {"A000001": [100, 110, 99, 121], "A000002": [50, 55, 60, 54], "A000003": [None, None, 20, 22]}
+    dates = ["2025-01-02", "2025-01-03", "2025-01-06", "2025-01-07"]
+    for code, series in closes.items():
+        for day, close in zip(dates, series):
+            if close is not None:
+                rows.append(f"{day},{code},ETF {code[-1]},{close}")
+    source = tmp_path / "prices"
+    source.mkdir()
+    (source / "prices.csv").write_text("\n".join(rows), encoding="utf-8")
+    monkeypatch.setattr(analytics, "price_store", PriceHistoryStore(str(source)))
+    monkeypatch.setattr(analytics, "etf_catalog", make_catalog([{"etf_code": "A000001", "etf_name": "SOL 200"}]))
+    return closes
+
+
+def test_analyze_portfolio(prices):
+    result = analytics.analyze_portfolio(["SOL 200", "000002", "ETF 3", "없는 ETF"], lookback=10)
+    assert result["available"] is True
+    assert (result["start"], result["as_of"]) == ("2025-01-02", "2025-01-07")
+    assert result["unmatched"] == ["없는 ETF"]
+    by_code = {item["etf_code"]: item for item in result["holdings"]}
+    assert by_code["A000001"]["etf_name"] == "SOL 200"
+    assert by_code["A000001"]["return"] == pytest.approx(0.21)
+    assert by_code["A000001"]["max_drawdown"] == pytest.approx(-0.1)
+    assert by_code["A000003"]["observations"] == 1
+    assert by_code["A000003"]["volatility"] is None
+    assert result["portfolio"]["weights"] == {code: pytest.approx(1 / 3) for code in ("A000001", "A000002", "A000003")}
+    assert "[가격 데이터 기반 수치]" in format_facts(result)
+
+
+def test_analyze_portfolios_matches_single_portfolio(prices):
+    portfolios = [["SOL 200", "000002"], ["000002", "SOL 200"], ["없는 ETF"], []]
+    batch = analytics.analyze_portfolios(portfolios, lookback=10, chunk_size=1)
+    single = analytics.analyze_portfolio(["SOL 200", "000002"], lookback=10)["portfolio"]
+    assert list(batch["holdings"]) == [2, 2, 0, 0]
+    assert list(batch["priced"]) == [2, 2, 0, 0]
+    for name in ("return", "volatility", "max_drawdown", "average_correlation"):
+        assert batch[name][0] == pytest.approx(single[name], abs=1e-6)
+        assert batch[name][1] == pytest.approx(single[name], abs=1e-6)
+        assert np.isnan(batch[name][2])
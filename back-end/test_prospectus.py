@@ -0,0 +1,78 @@
+from services.prospectus import ProspectusVersion, parse_filename, parse_header, select_latest
+
+FUND = "신한SOL K방산증권상장지수투자신탁[주식]"
+
+
+def _version(source, fund_name=FUND, fund_code=None, effective_date=None, base_date=None, mtime=0.0):
+    return ProspectusVersion(source, fund_name, fund_code, effective_date, base_date, mtime)
+
+
+def test_parse_filename_strips_prefixes_and_date():
+    assert parse_filename(f"/docs/간이투자설명서(ETF)_{FUND}(2025년04월09일).pdf") == (FUND, "2025-04-09")
+    assert parse_filename(f"투자설명서_{FUND}(2024년1월7일).pdf") == (FUND, "2024-01-07")
+    assert parse_filename(f"간이투자설명서_{FUND}.pdf") == (FUND, None)
+
+
+def test_parse_filename_strips_upload_and_hash_prefixes_in_any_order():
+    expected = (FUND, "2025-04-09")
+    for prefix in ("업로드_", "업로드_업로드_", "1a2b3c4d_", "1a2b3c4d_업로드_", "업로드_1a2b3c4d_", "1a2b3c4d_업로드_9f8e7d6c_"):
+        assert parse_filename(f"{prefix}간이투자설명서(ETF)_{FUND}(2025년04월09일).pdf") == expected, prefix
+
+
+def test_parse_filename_keeps_non_hash_prefixes():
+    # 8자리 16진수가 아니거나 투자설명서/업로드 접두어가 뒤따르지 않으면 파일명의 일부로 취급
+    assert parse_filename("1a2b3c4d_etf_info.pdf") == ("1a2b3c4d_etf_info", None)
+    assert parse_filename(f"XYZ12345_투자설명서_{FUND}.pdf")[0] == f"XYZ12345_투자설명서_{FUND}"
+
+
+def test_parse_filename_invalid_date():
+    assert parse_filename(f"투자설명서_{FUND}(2025년13월40일).pdf") == (FUND, None)
+
+
+def test_parse_header():
+    text = "[펀드코드 : C5424]\n작성기준일 : 2025. 4. 2\n"
+    assert parse_header(text) == ("C5424", "2025-04-02")
+    assert parse_header("신한SOL미국S&P500증권상장지수투자신탁[주식]( DP561)") == ("DP561", None)
+    assert parse_header("머리말 없음") == (None, None)
+
+
+def test_fund_key_prefers_code_and_normalizes_name():
+    assert _version("a.pdf", fund_code="C5424").fund_key == "code:C5424"
+    assert _version("a.pdf", fund_name="신한SOL 국고채 투자신탁[채권]").fund_key == \
+        _version("b.pdf", fund_name="신한SOL국고채투자신탁채권").fund_key
+
+
+def test_hash_prefixed_upload_copy_groups_with_original():
+    original = _version(f"/docs/간이투자설명서(ETF)_{FUND}(2025년01월09일).pdf", effective_date="2025-01-09")
+    copy_name = f"1a2b3c4d_업로드_간이투자설명서(ETF)_{FUND}(2025년04월09일).pdf"
+    fund_name, effective_date = parse_filename(copy_name)
+    copy = _version(f"/docs/{copy_name}", fund_name=fund_name, effective_date=effective_date)
+    latest, superseded = select_latest([original, copy])
+    assert list(latest.values()) == [copy]
+    assert superseded == [original]
+
+
+def test_select_latest_orders_by_effective_then_base_date():
+    old = _version("old.pdf", effective_date="2024-03-07")
+    new = _version("new.pdf", effective_date="2025-04-09")
+    same_day_later_base = _version("base.pdf", effective_date="2025-04-09", base_date="2025-04-02")
+    latest, superseded = select_latest([new, old, same_day_later_base])
+    assert latest[new.fund_key] is same_day_later_base
+    assert {version.source for version in superseded} == {"old.pdf", "new.pdf"}
+
+
+def test_select_latest_tie_breaks_on_indexed_then_original_file():
+    indexed = _version("/docs/업로드_a.pdf", effective_date="2025-04-09")
+    original = _version("/docs/a.pdf", effective_date="2025-04-09")
+    latest, _ = select_latest([original, indexed], prefer={"업로드_a.pdf"})
+    assert latest[original.fund_key] is indexed
+    latest, _ = select_latest([indexed, original])
+    assert latest[original.fund_key] is original
+
+
+def test_select_latest_keeps_funds_separate():
+    a = _version("a.pdf", fund_code="C1", effective_date="2025-01-01")
+    b = _version("b.pdf", fund_code="C2", effective_date="2024-01-01")
+    latest, superseded = select_latest([a, b])
+    assert set(latest) == {"code:C1", "code:C2"}
+    assert superseded == []
@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from schemas import RebalanceNecessity
+from services import etf_service
+from services.model_router import LLMOutputValidationError
+
+ANALYSIS = {"as_of": None, "portfolio": None}
+
+
+class FakeRouter:
+    def __init__(self, necessity):
+        self.necessity = necessity
+
+    async def run(self, operation, call, validate=None):
+        if operation == "rebalance_necessity":
+            if isinstance(self.necessity, Exception):
+                raise self.necessity
+            return self.necessity
+        return f"{operation} 본문"
+
+
+@pytest.fixture
+def rebalance(monkeypatch):
+    monkeypatch.setattr(etf_service, "analyze_portfolio", lambda holdings: ANALYSIS)
+    monkeypatch.setattr(etf_service, "format_facts", lambda analysis: "")
+    monkeypatch.setattr(
+        etf_service, "rebalance_from_catalog",
+        lambda customer_id, *args: {"customer_id": customer_id, "degraded": True}
+    )
+
+    def run(necessity):
+        monkeypatch.setattr(etf_service, "model_router", FakeRouter(necessity))
+        return asyncio.run(etf_service.generate_rebalance_report(
+            customer_id="C001",
+            etfs_owned=["KODEX 200"],
+            risk_tolerance="Medium",
+            age=40,
+            financial_status={"income": 400, "savings": 1000}
+        ))
+    return run
+
+
+def test_rebalance_report_uses_necessity_result(rebalance):
+    result = rebalance(RebalanceNecessity(rebalancing_needed=True, analysis="비중 조정이 필요합니다."))
+    assert result["rebalancing_needed"] is True
+    assert result["rebalancing_analysis"] == "비중 조정이 필요합니다."
+    assert result["performance_analysis"] == "rebalance_performance 본문"
+    assert not result.get("degraded")
+
+
+@pytest.mark.parametrize("error", [RuntimeError("API 오류"), LLMOutputValidationError("빈 분석")])
+def test_rebalance_report_falls_back_when_necessity_fails(rebalance, error):
+    # 필요 여부를 판단하지 못하면 '리밸런싱 불필요'로 답하지 않고 카탈로그 기반 리포트로 대체
+    assert rebalance(error) == {"customer_id": "C001", "degraded": True}
@@ -0,0 +1,154 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import uvicorn
+from langchain_core.documents import Document
+from services import vector_search_service, warmup
+from services.etf_service import RemoteVectorSearch, VectorSearchUnavailableError
+
+
+class StubVectorDB:
+    """쿼리 텍스트로 결과를 만들고 묶음 검색 호출을 기록하는 검색 서비스용 인덱스"""
+
+    generation = "g1"
+
+    class vectordb:
+        ntotal = 3
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def get(self):
+        return self
+
+    def shard_stats(self):
+        return {"layout": "asset_class", "vectors": 3}
+
+    def similarity_search_batch(self, queries, k=4, shards=None):
+        self.batches.append((list(queries), k, shards))
+        if self.delay:
+            time.sleep(self.delay)
+        return [
+            [(Document(id=f"equity:{i}", page_content=f"{query}-{i}", metadata={"shards": shards}), float(i)) for i in range(k)]
+            for query in queries
+        ]
+
+
+class SearchService:
+    """vector_search_service 앱을 unix 소켓으로 실행하는 테스트용 서버"""
+
+    def __init__(self, path):
+        self.path = path
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        self._server = uvicorn.Server(uvicorn.Config(vector_search_service.app, uds=self.path, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 5
+        while not self._server.started:
+            assert time.monotonic() < deadline, "검색 서비스 시작 시간 초과"
+            time.sleep(0.01)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(5)
+            self._server = None
+
+
+@pytest.fixture
+def stub_db(monkeypatch):
+    db = StubVectorDB()
+    monkeypatch.setattr(vector_search_service, "vector_db", db)
+    return db
+
+
+@pytest.fixture
+def service(tmp_path, stub_db):
+    service = SearchService(str(tmp_path / "search.sock"))
+    yield service
+    service.stop()
+
+
+def _client(service, **kwargs):
+    return RemoteVectorSearch(f"unix://{service.path}", **{"timeout": 2, "batch_window": 0, **kwargs})
+
+
+def test_unavailable_service_raises_fallback_error(tmp_path):
+    client = RemoteVectorSearch(f"unix://{tmp_path / 'missing.sock'}", timeout=1, batch_window=0)
+    with pytest.raises(VectorSearchUnavailableError):
+        client.health()
+    with pytest.raises(VectorSearchUnavailableError):
+        client.similarity_search("국내 주식 ETF", k=3)
+
+
+def test_rejects_unsupported_url_before_starting_threads():
+    with pytest.raises(ValueError):
+        RemoteVectorSearch("tcp://localhost:9000")
+
+
+def test_readiness_follows_search_service(service, monkeypatch):
+    monkeypatch.setattr(warmup, "_resources", [])
+    monkeypatch.setattr(warmup, "_checks", {})
+    client = _client(service)
+    warmup.register_check("vector_search_service", client.health)
+
+    # API 서버가 먼저 시작한 경우
+    status = warmup.readiness()
+    assert not warmup.is_ready(status)
+    assert status["vector_search_service"]["error"]
+
+    service.start()
+    assert warmup.is_ready()
+    assert warmup.readiness()["vector_search_service"]["error"] is None
+
+    # 실행 중에 검색 서비스가 중단된 경우
+    service.stop()
+    assert not warmup.is_ready()
+
+
+def test_concurrent_queries_share_one_round_trip(service, stub_db):
+    service.start()
+    client = _client(service, batch_window=0.2, max_batch=8)
+    requests = [("채권", 1, None), ("주식", 2, None), ("금", 3, ["equity"]), ("리츠", 2, None)]
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        futures = [executor.submit(client.similarity_search, query, k, shards) for query, k, shards in requests]
+        results = [future.result() for future in futures]
+
+    # 각 호출자는 자기 쿼리의 결과를 요청한 k개만 받음
+    for (query, k, shards), docs in zip(requests, results):
+        assert [doc.page_content for doc in docs] == [f"{query}-{i}" for i in range(k)]
+        assert all(doc.metadata["shards"] == shards for doc in docs)
+    assert client.generation == "g1"
+    # 한 번의 요청으로 전송되고, 서비스는 대상 샤드가 같은 쿼리끼리 묶어 한 번에 검색
+    assert sorted((sorted(queries), k, shards) for queries, k, shards in stub_db.batches) == [
+        (["금"], 3, ["equity"]),
+        (["리츠", "주식", "채권"], 2, None),
+    ]
+
+
+def test_sequential_requests_reuse_connection(service):
+    service.start()
+    client = _client(service)
+    connect = client._connect
+    connections = []
+    client._connect = lambda: connections.append(1) or connect()
+
+    for query in ("주식", "채권", "금"):
+        assert client.similarity_search(query, k=1)[0].page_content == f"{query}-0"
+    assert client.shard_stats()["vectors"] == 3
+    assert len(connections) == 1
+
+
+def test_slow_response_times_out(service, stub_db):
+    stub_db.delay = 1.0
+    service.start()
+    client = _client(service, timeout=0.2)
+    started = time.monotonic()
+    with pytest.raises(VectorSearchUnavailableError):
+        client.similarity_search("주식", k=1)
+    assert time.monotonic() - started < 0.9
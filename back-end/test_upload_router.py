@@ -0,0 +1,134 @@
+import io
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from routers import etf_router
+from services import upload_storage
+
+
+class FakeVectorDB:
+    def __init__(self, status="success", error=None):
+        self.status = status
+        self.error = error
+        self.ingested = set()
+        self.calls = []
+
+    def is_ingested(self, content_hash):
+        return content_hash in self.ingested
+
+    def ingest_files(self, sources, on_progress=None):
+        self.calls.append(sources)
+        if self.error is not None:
+            raise self.error
+        report = []
+        for path, content_hash in sources:
+            if self.status == "success":
+                self.ingested.add(content_hash)
+            report.append({"file": path.rsplit("/", 1)[-1], "content_hash": content_hash, "status": self.status, "chunks": 1})
+        return report
+
+
+@pytest.fixture
+def docs_path(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    incoming = docs / ".incoming"
+    incoming.mkdir(parents=True)
+    monkeypatch.setattr(upload_storage, "DOCS_PATH", str(docs))
+    monkeypatch.setattr(upload_storage, "INCOMING_PATH", str(incoming))
+    return docs
+
+
+def _client(monkeypatch, vector_db):
+    monkeypatch.setattr(etf_router, "vector_db", vector_db)
+    app = FastAPI()
+    app.include_router(etf_router.router)
+    return TestClient(app)
+
+
+def _documents(docs_path):
+    return sorted(name for name in (p.name for p in docs_path.iterdir()) if name != ".incoming") + [
+        f".incoming/{p.name}" for p in (docs_path / ".incoming").iterdir()
+    ]
+
+
+def _upload(client, filename, content):
+    return client.post("/api/v1/update-etf-knowledge", files={"pdf_file": (filename, io.BytesIO(content), "application/pdf")})
+
+
+def test_update_success_keeps_file(docs_path, monkeypatch):
+    client = _client(monkeypatch, FakeVectorDB())
+    response = _upload(client, "투자설명서_A펀드.pdf", b"v1")
+    assert response.status_code == 200
+    assert response.json()["status"] == "success"
+    assert _documents(docs_path) == ["투자설명서_A펀드.pdf"]
+
+
+@pytest.mark.parametrize("vector_db", [FakeVectorDB(status="failed"), FakeVectorDB(error=RuntimeError("index"))])
+def test_update_failure_removes_committed_file(docs_path, monkeypatch, vector_db):
+    client = _client(monkeypatch, vector_db)
+    response = _upload(client, "투자설명서_A펀드.pdf", b"v1")
+    assert response.status_code == 500
+    assert vector_db.calls
+    assert _documents(docs_path) == []
+
+
+def test_update_failure_keeps_existing_file_with_same_content(docs_path, monkeypatch):
+    (docs_path / "투자설명서_A펀드.pdf").write_bytes(b"v1")
+    client = _client(monkeypatch, FakeVectorDB(status="failed"))
+    assert _upload(client, "투자설명서_A펀드.pdf", b"v1").status_code == 500
+    assert _documents(docs_path) == ["투자설명서_A펀드.pdf"]
+
+
+def test_update_skipped_by_concurrent_ingestion_removes_duplicate(docs_path, monkeypatch):
+    client = _client(monkeypatch, FakeVectorDB(status="skipped"))
+    response = _upload(client, "투자설명서_A펀드.pdf", b"v1")
+    assert response.status_code == 200
+    assert response.json()["status"] == "skipped"
+    assert _documents(docs_path) == []
+
+
+def _bulk(client, files):
+    return client.post(
+        "/api/v1/update-etf-knowledge/bulk",
+        files=[("files", (name, io.BytesIO(content), "application/pdf")) for name, content in files]
+    )
+
+
+def test_bulk_failed_entries_are_removed(docs_path, monkeypatch):
+    class PartialVectorDB(FakeVectorDB):
+        def ingest_files(self, sources, on_progress=None):
+            report = super().ingest_files(sources, on_progress)
+            report[1]["status"] = "failed"
+            return report
+
+    client = _client(monkeypatch, PartialVectorDB())
+    response = _bulk(client, [("A.pdf", b"a"), ("B.pdf", b"b")])
+    assert response.status_code == 200
+    assert response.json()["summary"]["failed"] == 1
+    assert _documents(docs_path) == ["A.pdf"]
+
+
+def test_bulk_ingestion_error_removes_unrecorded_files(docs_path, monkeypatch):
+    (docs_path / "A.pdf").write_bytes(b"a")
+    vector_db = FakeVectorDB(error=RuntimeError("index"))
+    client = _client(monkeypatch, vector_db)
+    response = _bulk(client, [("A.pdf", b"a"), ("B.pdf", b"b"), ("C.pdf", b"c")])
+    assert response.status_code == 500
+    assert len(vector_db.calls[0]) == 3
+    # 이미 있던 같은 내용의 파일만 남음
+    assert _documents(docs_path) == ["A.pdf"]
+
+
+def test_bulk_commit_error_removes_committed_files(docs_path, monkeypatch):
+    commits = []
+
+    def failing_commit(item):
+        if commits:
+            raise OSError("disk full")
+        commits.append(item)
+        return upload_storage.commit_upload(item)
+
+    monkeypatch.setattr(etf_router, "commit_upload", failing_commit)
+    client = _client(monkeypatch, FakeVectorDB())
+    assert _bulk(client, [("A.pdf", b"a"), ("B.pdf", b"b")]).status_code == 500
+    assert _documents(docs_path) == []
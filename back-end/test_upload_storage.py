@@ -0,0 +1,128 @@
+import os
+import hashlib
+import zipfile
+import pytest
+from services import upload_storage
+from services.upload_storage import StoredUpload, commit_upload, rollback_upload
+
+
+@pytest.fixture
+def docs_path(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    incoming = docs / ".incoming"
+    incoming.mkdir(parents=True)
+    monkeypatch.setattr(upload_storage, "DOCS_PATH", str(docs))
+    monkeypatch.setattr(upload_storage, "INCOMING_PATH", str(incoming))
+    return docs
+
+
+def _stage(docs_path, filename: str, content: bytes) -> StoredUpload:
+    path = docs_path / ".incoming" / f"{hashlib.md5(content).hexdigest()}.part"
+    path.write_bytes(content)
+    return StoredUpload(path=str(path), filename=filename, content_hash=hashlib.sha256(content).hexdigest(), size=len(content))
+
+
+def test_commit_upload_moves_file(docs_path):
+    stored = _stage(docs_path, "투자설명서_A펀드.pdf", b"v1")
+    final_path = commit_upload(stored)
+    assert final_path == os.path.join(str(docs_path), "투자설명서_A펀드.pdf")
+    assert open(final_path, "rb").read() == b"v1"
+    assert stored.path == final_path
+
+
+def test_commit_upload_keeps_existing_file_with_different_content(docs_path):
+    commit_upload(_stage(docs_path, "투자설명서_A펀드.pdf", b"v1"))
+    stored = _stage(docs_path, "투자설명서_A펀드.pdf", b"v2")
+    final_path = commit_upload(stored)
+    assert stored.filename == f"{stored.content_hash[:8]}_투자설명서_A펀드.pdf"
+    assert open(final_path, "rb").read() == b"v2"
+    assert (docs_path / "투자설명서_A펀드.pdf").read_bytes() == b"v1"
+
+
+def test_commit_upload_same_content_reuses_name(docs_path):
+    commit_upload(_stage(docs_path, "투자설명서_A펀드.pdf", b"v1"))
+    stored = _stage(docs_path, "투자설명서_A펀드.pdf", b"v1")
+    commit_upload(stored)
+    assert stored.filename == "투자설명서_A펀드.pdf"
+    assert sorted(os.listdir(docs_path)) == [".incoming", "투자설명서_A펀드.pdf"]
+
+
+def _zip_upload(docs_path, members) -> StoredUpload:
+    path = docs_path / ".incoming" / "bundle.part"
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return StoredUpload(path=str(path), filename="bundle.zip", content_hash="", size=path.stat().st_size)
+
+
+def test_extract_pdfs_from_zip_keeps_only_pdfs(docs_path):
+    stored = _zip_upload(docs_path, [
+        ("funds/투자설명서_A펀드.pdf", b"a"),
+        ("funds/readme.txt", b"skip"),
+        ("__MACOSX/funds/._투자설명서_A펀드.pdf", b"meta"),
+        ("../escape/B.PDF", b"b"),
+    ])
+    items = upload_storage.extract_pdfs_from_zip(stored)
+    assert [item.filename for item in items] == ["투자설명서_A펀드.pdf", "B.PDF"]
+    assert [item.content_hash for item in items] == [hashlib.sha256(b"a").hexdigest(), hashlib.sha256(b"b").hexdigest()]
+    assert [item.size for item in items] == [1, 1]
+    assert all(os.path.dirname(item.path) == str(docs_path / ".incoming") for item in items)
+    # 원본 ZIP은 추출 후 삭제
+    assert not os.path.exists(stored.path)
+
+
+def _incoming_files(docs_path):
+    return os.listdir(docs_path / ".incoming")
+
+
+def test_extract_pdfs_from_zip_rejects_too_many_members(docs_path, monkeypatch):
+    monkeypatch.setattr(upload_storage, "BULK_MAX_FILES", 2)
+    stored = _zip_upload(docs_path, [(f"{i}.pdf", b"x") for i in range(3)])
+    with pytest.raises(upload_storage.UploadTooLargeError):
+        upload_storage.extract_pdfs_from_zip(stored)
+    assert _incoming_files(docs_path) == []
+
+
+def test_extract_pdfs_from_zip_limits_member_size(docs_path, monkeypatch):
+    monkeypatch.setattr(upload_storage, "MAX_UPLOAD_BYTES", 10)
+    monkeypatch.setattr(upload_storage, "UPLOAD_CHUNK_SIZE", 4)
+    stored = _zip_upload(docs_path, [("small.pdf", b"x" * 10), ("large.pdf", b"x" * 11)])
+    with pytest.raises(upload_storage.UploadTooLargeError):
+        upload_storage.extract_pdfs_from_zip(stored)
+    assert _incoming_files(docs_path) == []
+
+
+def test_extract_pdfs_from_zip_limits_total_size(docs_path, monkeypatch):
+    monkeypatch.setattr(upload_storage, "BULK_MAX_TOTAL_BYTES", 15)
+    stored = _zip_upload(docs_path, [("a.pdf", b"x" * 8), ("b.pdf", b"x" * 8)])
+    with pytest.raises(upload_storage.UploadTooLargeError):
+        upload_storage.extract_pdfs_from_zip(stored)
+    assert _incoming_files(docs_path) == []
+
+
+def test_extract_pdfs_from_zip_rejects_non_zip(docs_path):
+    path = docs_path / ".incoming" / "broken.part"
+    path.write_bytes(b"not a zip")
+    with pytest.raises(zipfile.BadZipFile):
+        upload_storage.extract_pdfs_from_zip(StoredUpload(path=str(path), filename="broken.zip", content_hash="", size=9))
+    assert _incoming_files(docs_path) == []
+
+
+def test_rollback_upload_removes_only_created_files(docs_path):
+    created = _stage(docs_path, "투자설명서_A펀드.pdf", b"v1")
+    commit_upload(created)
+    assert created.created
+    rollback_upload(created)
+    assert not os.path.exists(created.path)
+
+    (docs_path / "투자설명서_B펀드.pdf").write_bytes(b"v1")
+    reused = _stage(docs_path, "투자설명서_B펀드.pdf", b"v1")
+    commit_upload(reused)
+    assert not reused.created
+    # 같은 내용으로 이미 있던 문서 파일은 남김
+    rollback_upload(reused)
+    assert (docs_path / "투자설명서_B펀드.pdf").read_bytes() == b"v1"
+
+    staged = _stage(docs_path, "투자설명서_C펀드.pdf", b"v3")
+    rollback_upload(staged)
+    assert not os.path.exists(staged.path)
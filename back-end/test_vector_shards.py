@@ -0,0 +1,67 @@
+import pytest
+from langchain_core.documents import Document
+from services import vector_shards
+from services.vector_shards import (
+    ALTERNATIVE,
+    BOND,
+    EQUITY,
+    MIXED,
+    OTHER,
+    asset_class_shard,
+    hash_router,
+    layout_name,
+    query_shards,
+    shard_router,
+)
+
+
+def test_asset_class_shard_labels():
+    assert asset_class_shard("주식") == EQUITY
+    assert asset_class_shard("채권") == BOND
+    assert asset_class_shard("채권혼합-파생형") == MIXED
+    assert asset_class_shard("주식혼합") == MIXED
+    assert asset_class_shard("원자재") == ALTERNATIVE
+    assert asset_class_shard("금-파생재간접형") == ALTERNATIVE
+    assert asset_class_shard("") is None
+
+
+def test_route_by_asset_class(make_catalog, monkeypatch):
+    monkeypatch.setattr(vector_shards, "etf_catalog", make_catalog([
+        {"etf_code": "A000001", "etf_name": "KODEX 200", "asset_large": "주식"},
+        {"etf_code": "A000002", "etf_name": "KODEX 골드선물", "asset_large": "원자재"},
+    ]))
+    route = shard_router("asset_class")
+    assert route(Document(page_content="", metadata={"asset_class": "채권"})) == BOND
+    # asset_class 메타데이터가 없는 이전 CSV 청크는 카탈로그에서 조회
+    assert route(Document(page_content="", metadata={"etf_code": "A000002"})) == ALTERNATIVE
+    assert route(Document(page_content="", metadata={
+        "source": "/docs/간이투자설명서(ETF)_신한SOL미국채혼합50증권상장지수투자신탁[채권혼합-파생형](2025년04월18일).pdf"
+    })) == MIXED
+    assert route(Document(page_content="", metadata={"source": "/docs/안내문.pdf"})) == OTHER
+
+
+def test_hash_router_is_stable_and_bounded():
+    route = shard_router(layout_name("hash", 3))
+    docs = [Document(page_content=f"청크 {i}", metadata={"source": "a.pdf"}) for i in range(30)]
+    names = [route(doc) for doc in docs]
+    assert set(names) <= {"hash-00", "hash-01", "hash-02"}
+    assert len(set(names)) > 1
+    assert names == [hash_router(3)(doc) for doc in docs]
+
+
+def test_unknown_layout_is_rejected():
+    with pytest.raises(ValueError):
+        layout_name("random", 4)
+    with pytest.raises(ValueError):
+        shard_router("hash0")
+
+
+def test_query_shards_by_risk_tolerance():
+    assert query_shards("asset_class", "High") == [EQUITY, ALTERNATIVE, OTHER]
+    assert query_shards("asset_class", "높음") == [EQUITY, ALTERNATIVE, OTHER]
+    # Low/Medium과 알 수 없는 값은 전체 샤드
+    assert query_shards("asset_class", "Low") is None
+    assert query_shards("asset_class", "Medium") is None
+    assert query_shards("asset_class", None) is None
+    # hash 샤드는 내용과 무관하게 나뉘므로 항상 전체 샤드
+    assert query_shards("hash4", "High") is None
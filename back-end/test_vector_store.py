@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from services.vector_store import ETFVectorStore, ShardedVectorStore, migrate_pickled_faiss
+
+
+class PointEmbeddings(Embeddings):
+    """'x,y' 형식의 텍스트를 2차원 벡터로 변환하는 임베딩"""
+
+    def embed_documents(self, texts):
+        return [[float(value) for value in text.split(",")] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _store(tmp_path, name, points):
+    folder = tmp_path / name
+    folder.mkdir()
+    store = ETFVectorStore.create(PointEmbeddings(), str(folder))
+    store.add_documents([Document(page_content=point, metadata={"source": f"{name}.pdf"}) for point in points])
+    return store
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    shards = {
+        "equity": _store(tmp_path, "equity", ["0,0", "5,0", "9,0"]),
+        "bond": _store(tmp_path, "bond", ["1,0", "7,0"]),
+        "mixed": _store(tmp_path, "mixed", ["3,0"]),
+    }
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        yield ShardedVectorStore(PointEmbeddings(), shards, route=lambda doc: "equity", executor=executor)
+
+
+def test_sharded_search_merges_by_distance(sharded):
+    hits = sharded.similarity_search_with_score("2.25,0", k=4)
+    assert [doc.page_content for doc, _ in hits] == ["3,0", "1,0", "0,0", "5,0"]
+    assert [score for _, score in hits] == [0.5625, 1.5625, 5.0625, 7.5625]
+    assert [doc.id.split(":")[0] for doc, _ in hits] == ["mixed", "bond", "equity", "equity"]
+
+
+def test_sharded_search_only_targets_requested_shards(sharded):
+    hits = sharded.similarity_search("2,0", k=3, shards=["equity", "mixed", "unknown"])
+    assert [doc.page_content for doc in hits] == ["3,0", "0,0", "5,0"]
+
+
+def test_sharded_batch_search_keeps_query_order(sharded):
+    results = sharded.similarity_search_with_score_by_vectors(np.array([[7.5, 0], [0, 0]], dtype=np.float32), k=2)
+    assert [[doc.page_content for doc, _ in hits] for hits in results] == [["7,0", "9,0"], ["0,0", "1,0"]]
+
+
+def test_migrate_pickled_faiss(tmp_path):
+    from langchain_community.vectorstores import FAISS
+    points = ["0,0", "4,0", "9,0"]
+    legacy = FAISS.from_texts(points, PointEmbeddings(), metadatas=[{"source": f"{i}.pdf"} for i in range(3)])
+    legacy.save_local(str(tmp_path))
+
+    store = migrate_pickled_faiss(PointEmbeddings(), str(tmp_path))
+    assert store.ntotal == 3
+    assert sorted(store.docstore.sources()) == ["0.pdf", "1.pdf", "2.pdf"]
+    hits = store.similarity_search_with_score("5,0", k=2)
+    assert [(doc.page_content, doc.metadata["source"], score) for doc, score in hits] == [
+        ("4,0", "1.pdf", 1.0), ("9,0", "2.pdf", 16.0)
+    ]
+
+
+def test_migrate_pickled_faiss_without_legacy_files(tmp_path):
+    assert migrate_pickled_faiss(PointEmbeddings(), str(tmp_path)) is None
@@ -1,7 +1,9 @@
 import streamlit as st
 import requests
-import json
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
+from typing import Dict, Any, Optional
 import os
 from dotenv import load_dotenv
 import io
@@ -11,13 +13,44 @@ load_dotenv()
 
 # API 기본 URL 설정
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+# 연결/응답 대기 시간(초)
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "60"))
+# 업로드 요청은 파일 전송 시간이 있으므로 별도 설정
+API_UPLOAD_TIMEOUT = float(os.getenv("API_UPLOAD_TIMEOUT", "300"))
+# 서버 상태 확인 결과를 재사용하는 시간(초)
+HEALTH_CHECK_TTL = int(os.getenv("HEALTH_CHECK_TTL", "10"))
+# 고객별 분석 결과를 재사용하는 시간(초)
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "600"))
+# 백그라운드 작업 진행률 조회 간격(초)과 최대 대기 시간(초)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_POLL_TIMEOUT = float(os.getenv("JOB_POLL_TIMEOUT", "600"))
 
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    앱 프로세스 전체에서 공유하는 HTTP 세션 (연결 재사용).
+    멱등 요청(GET)만 연결 오류 시 재시도합니다. 분석/업로드 요청(POST)은 서버에서 중복 실행되지 않도록 재시도하지 않습니다.
+    """
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=frozenset({"GET"}))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def get_result_cache() -> Dict[str, Dict[str, Any]]:
+    """고객별 분석 결과 캐시 (앱 프로세스 전체에서 공유, 브라우저 세션이 바뀌어도 재사용)"""
+    return {}
+
+@st.cache_data(ttl=HEALTH_CHECK_TTL, show_spinner=False)
 def check_api_health() -> bool:
-    """API 서버 상태 확인"""
+    """API 서버 상태 확인 (HEALTH_CHECK_TTL초 동안 결과 재사용)"""
     try:
-        response = requests.get(f"{API_BASE_URL}/api/v1/health")
+        response = get_session().get(f"{API_BASE_URL}/api/v1/health", timeout=(API_CONNECT_TIMEOUT, 5))
         return response.status_code == 200
-    except:
+    except requests.exceptions.RequestException:
         return False
 
 def display_analysis_results(result: Dict[str, Any]):
@@ -26,57 +59,148 @@ def display_analysis_results(result: Dict[str, Any]):
         # ETF 보유 고객의 경우
         st.header("📊 포트폴리오 성과 분석")
         st.markdown(result['performance_analysis'])
-        
+
         st.header("🔄 리밸런싱 필요성")
-        st.markdown(result['report'].split('2. 리밸런싱 필요성')[1].split('3. 리밸런싱 제안')[0])
-        
+        st.markdown(
+            result.get('rebalancing_analysis')
+            or result['report'].split('2. 리밸런싱 필요성')[1].split('3. 리밸런싱 제안')[0]
+        )
+
         st.header("💡 리밸런싱 제안")
         st.markdown(result['suggestions'])
-        
+
         if result['rebalancing_needed']:
             st.warning("⚠️ 포트폴리오 리밸런싱이 필요합니다.")
         else:
             st.success("✅ 현재 포트폴리오는 적절한 상태입니다.")
-            
+
     elif 'recommendations' in result:
         # ETF 미보유 고객의 경우
         st.header("📈 ETF 추천")
-        
+
         for i, (etf, reason) in enumerate(zip(result['recommendations'], result['reasons']), 1):
             st.subheader(f"추천 {i}: {etf}")
             st.markdown(reason)
             st.divider()  # 구분선 추가
-                
+
         st.info("💡 위 추천은 고객님의 위험 감내도와 투자 여건을 고려하여 선정되었습니다.")
 
-def analyze_customer_etf(customer_id: str, name: str) -> Dict[str, Any]:
-    """고객 ETF 분석 API 호출"""
+def get_cached_result(customer_id: str) -> Optional[Dict[str, Any]]:
+    """세션 또는 프로세스 캐시에 있는 고객의 분석 결과 (RESULT_CACHE_TTL 이내)"""
+    cached = st.session_state.results.get(customer_id) or get_result_cache().get(customer_id)
+    if cached and time.time() - cached['fetched_at'] < RESULT_CACHE_TTL:
+        return cached
+    return None
+
+def store_result(customer_id: str, result: Dict[str, Any]):
+    entry = {"result": result, "fetched_at": time.time()}
+    st.session_state.results[customer_id] = entry
+    get_result_cache()[customer_id] = entry
+
+def submit_customer_etf_analysis(customer_id: str, name: str) -> Optional[str]:
+    """고객 ETF 분석 작업 제출 (같은 고객의 분석이 진행 중이면 서버가 기존 작업을 반환)"""
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/api/v1/customer-etf-analysis",
-            json={"customer_id": customer_id, "name": name}
+        response = get_session().post(
+            f"{API_BASE_URL}/api/v1/jobs/customer-etf-analysis",
+            json={"customer_id": customer_id, "name": name},
+            timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
         )
         response.raise_for_status()
-        return response.json()
+        return response.json()['job_id']
     except requests.exceptions.RequestException as e:
         st.error(f"API 요청 실패: {str(e)}")
         return None
 
-def update_etf_knowledge(pdf_file: bytes, filename: str) -> Dict[str, Any]:
-    """ETF 지식 업데이트 요청"""
+def submit_etf_knowledge_update(uploaded_files) -> Optional[str]:
+    """PDF/ZIP 파일을 업로드하고 수집 작업 ID를 반환 (수집은 서버에서 백그라운드로 진행)"""
     try:
-        files = {
-            'pdf_file': (filename, pdf_file, 'application/pdf')
-        }
-        response = requests.post(
-            f"{API_BASE_URL}/api/v1/update-etf-knowledge",
-            files=files
+        files = [
+            ('files', (f.name, f.getvalue(), 'application/zip' if f.name.lower().endswith('.zip') else 'application/pdf'))
+            for f in uploaded_files
+        ]
+        response = get_session().post(
+            f"{API_BASE_URL}/api/v1/update-etf-knowledge/bulk",
+            params={"background": "true"},
+            files=files,
+            timeout=(API_CONNECT_TIMEOUT, API_UPLOAD_TIMEOUT)
         )
         response.raise_for_status()
-        return response.json()
+        return response.json()['job_id']
     except requests.exceptions.RequestException as e:
         st.error(f"ETF 지식 업데이트 중 오류 발생: {str(e)}")
-        return {}
+        return None
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """백그라운드 작업 상태 조회. 일시적인 연결 오류면 None."""
+    try:
+        response = get_session().get(
+            f"{API_BASE_URL}/api/v1/jobs/{job_id}",
+            timeout=(API_CONNECT_TIMEOUT, 10)
+        )
+        if response.status_code == 404:
+            return {"status": "failed", "error": "작업을 찾을 수 없습니다."}
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException:
+        return None
+
+def wait_for_job(job_id: str, label: str, container=st) -> Optional[Dict[str, Any]]:
+    """
+    작업이 끝날 때까지 진행률을 표시하며 기다립니다.
+    완료되면 작업 정보를, JOB_POLL_TIMEOUT을 넘기면 None을 반환합니다.
+    (작업 ID는 session_state에 보관되므로 그 사이 화면이 다시 실행되어도 같은 작업을 이어서 기다립니다)
+    """
+    progress = container.progress(0.0, text=label)
+    deadline = time.monotonic() + JOB_POLL_TIMEOUT
+    while time.monotonic() < deadline:
+        job = get_job(job_id)
+        if job is not None:
+            if job['status'] in ('succeeded', 'failed'):
+                progress.empty()
+                return job
+            progress.progress(job.get('progress') or 0.0, text=f"{label} {job.get('message') or ''}")
+        time.sleep(JOB_POLL_INTERVAL)
+    progress.empty()
+    return None
+
+def display_bulk_report(result: Dict[str, Any]):
+    """일괄 업데이트 결과 표시"""
+    summary = result.get('summary', {})
+    st.sidebar.write(
+        f"성공 {summary.get('success', 0)} · 건너뜀 {summary.get('skipped', 0) + summary.get('superseded', 0)} · "
+        f"실패 {summary.get('failed', 0) + summary.get('rejected', 0)} · 청크 {result.get('total_chunks', 0)}개"
+    )
+    st.sidebar.dataframe(
+        [
+            {"파일": f.get('file'), "상태": f.get('status'), "청크": f.get('chunks', 0), "메시지": f.get('message', '')}
+            for f in result.get('files', [])
+        ],
+        hide_index=True
+    )
+
+def run_analysis(customer_id: str):
+    """진행 중인 분석 작업을 기다려 결과를 캐시에 저장합니다."""
+    job_id = st.session_state.analysis_jobs[customer_id]
+    job = wait_for_job(job_id, "고객 ETF 분석 중...")
+    if job is None:
+        st.warning("분석이 아직 진행 중입니다. 잠시 후 다시 확인해주세요.")
+        return
+    del st.session_state.analysis_jobs[customer_id]
+    if job['status'] == 'succeeded':
+        store_result(customer_id, job['result'])
+    else:
+        st.error(f"ETF 분석에 실패했습니다: {job.get('error', '')}")
+
+def run_knowledge_update():
+    """진행 중인 지식 업데이트 작업을 기다려 결과를 표시합니다."""
+    job = wait_for_job(st.session_state.upload_job, "ETF 지식 업데이트 중...", container=st.sidebar)
+    if job is None:
+        st.sidebar.warning("업데이트가 아직 진행 중입니다. 잠시 후 다시 확인해주세요.")
+        return
+    st.session_state.upload_job = None
+    st.session_state.upload_result = job.get('result') or {}
+    if job['status'] == 'failed':
+        st.sidebar.error(f"ETF 지식 업데이트에 실패했습니다: {job.get('error', '')}")
 
 def main():
     st.set_page_config(
@@ -84,43 +208,69 @@ def main():
         page_icon="📈",
         layout="wide"
     )
-    
+
+    # 화면이 다시 실행되어도 유지되는 상태 (고객별 결과, 진행 중인 작업 ID)
+    st.session_state.setdefault("results", {})
+    st.session_state.setdefault("analysis_jobs", {})
+    st.session_state.setdefault("upload_job", None)
+    st.session_state.setdefault("upload_result", None)
+
     # API 상태 확인
     if not check_api_health():
         st.error("API 서버에 연결할 수 없습니다. 서버 상태를 확인해주세요.")
         return
-    
+
     # 고객 정보 입력 섹션
     st.sidebar.header("👤 고객 정보 입력")
     customer_id = st.sidebar.text_input("고객 ID")
     name = st.sidebar.text_input("이름")
-    
+    refresh = st.sidebar.checkbox("저장된 결과 무시하고 다시 분석", value=False)
+
     if st.sidebar.button("분석 시작"):
         if not customer_id or not name:
             st.sidebar.error("고객 ID와 이름을 모두 입력해주세요.")
-        else:
-            with st.spinner("고객 ETF 분석 중..."):
-                result = analyze_customer_etf(customer_id, name)
-                if result:
-                    display_analysis_results(result)
-                else:
-                    st.error("ETF 분석에 실패했습니다.")
+        elif customer_id not in st.session_state.analysis_jobs and (refresh or get_cached_result(customer_id) is None):
+            # 이미 제출한 분석은 새로 요청하지 않고 아래에서 이어서 기다림
+            job_id = submit_customer_etf_analysis(customer_id, name)
+            if job_id:
+                st.session_state.analysis_jobs[customer_id] = job_id
+
+    if customer_id in st.session_state.analysis_jobs:
+        run_analysis(customer_id)
+
+    # 입력한 고객의 결과가 있으면 다른 위젯을 조작해도 계속 표시
+    cached = get_cached_result(customer_id) if customer_id else None
+    if cached:
+        st.caption(f"분석 시각: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(cached['fetched_at']))}")
+        display_analysis_results(cached['result'])
 
     # PDF 업로더 섹션
     st.sidebar.header("📄 ETF 지식 업데이트")
-    pdf_file = st.sidebar.file_uploader(
-        "ETF 정보 PDF 파일을 업로드하세요",
-        type=['pdf'],
-        help="ETF 정보가 포함된 PDF 파일을 업로드하세요"
+    uploaded_files = st.sidebar.file_uploader(
+        "ETF 정보 PDF 또는 ZIP 파일을 업로드하세요",
+        type=['pdf', 'zip'],
+        accept_multiple_files=True,
+        help="ETF 정보가 포함된 PDF 파일 여러 개 또는 PDF를 묶은 ZIP 파일을 업로드하세요"
     )
-    
-    if pdf_file and st.sidebar.button("업데이트 시작"):
-        with st.spinner("ETF 지식 업데이트 중..."):
-            success = update_etf_knowledge(pdf_file, pdf_file.name)
-            if success:
-                st.sidebar.success("ETF 지식이 성공적으로 업데이트되었습니다.")
+
+    if uploaded_files and st.session_state.upload_job is None and st.sidebar.button("업데이트 시작"):
+        st.session_state.upload_result = None
+        st.session_state.upload_job = submit_etf_knowledge_update(uploaded_files)
+
+    if st.session_state.upload_job:
+        run_knowledge_update()
+
+    result = st.session_state.upload_result
+    if result:
+        if result.get('status') == 'success':
+            summary = result.get('summary', {})
+            if summary.get('superseded') and not summary.get('success'):
+                st.sidebar.info("더 최신 버전의 투자설명서가 이미 수집되어 있습니다.")
             else:
-                st.sidebar.error("ETF 지식 업데이트에 실패했습니다.")
-    
+                st.sidebar.success("ETF 지식이 성공적으로 업데이트되었습니다.")
+        else:
+            st.sidebar.warning("일부 파일의 업데이트에 실패했습니다.")
+        display_bulk_report(result)
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file